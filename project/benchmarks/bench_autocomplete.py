@@ -0,0 +1,102 @@
+"""
+Latência do autocompletar por tecla digitada num catálogo grande (100k+
+títulos sintéticos, montados com palavras e artistas do dataset): sessão
+incremental (cada tecla refina a faixa anterior) contra consulta do zero
+a cada tecla, por tamanho do prefixo, conferindo que as sugestões são iguais.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_autocomplete [--csv data/processed/songs.csv] [--titles 120000] [--sessions 300]
+"""
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_path_search import BASE_DIR
+from src.preprocessing.csr_graph import CSRGraph
+from src.services.autocomplete import Autocomplete
+
+
+def synthetic_catalog(csv, n_titles, seed=0):
+    '''
+    Grafo sem arestas com n_titles músicas: nomes de 1 a 4 palavras sorteadas
+    do vocabulário dos nomes do dataset, artistas sorteados do dataset.
+    '''
+    df = pd.read_csv(csv, usecols=['track_name', 'artists']).fillna('')
+    palavras = sorted({p for nome in df['track_name'] for p in nome.split()})
+    artistas = df['artists'].tolist()
+
+    rng = random.Random(seed)
+    nomes = [' '.join(rng.choices(palavras, k=rng.randint(1, 4))) for _ in range(n_titles)]
+    return CSRGraph(
+        np.zeros(n_titles + 1, dtype=np.int64), [], [],
+        [f"s{i}" for i in range(n_titles)],
+        node_attrs={'name': nomes, 'artist': rng.choices(artistas, k=n_titles)},
+    )
+
+
+def typed_queries(G, n_sessions, max_len, seed=0):
+    '''
+    Textos que o usuário digitaria (começos de nomes/artistas existentes).
+    '''
+    rng = random.Random(seed)
+    fontes = G.node_attrs['name'] + G.node_attrs['artist']
+    return [rng.choice(fontes)[:max_len] for _ in range(n_sessions)]
+
+
+def run(engine, textos, limit):
+    '''
+    :return: dict {tamanho do prefixo: (ms incremental, ms do zero, faixa média)} e divergências
+    '''
+    incremental, do_zero, faixas = defaultdict(list), defaultdict(list), defaultdict(list)
+    divergencias = 0
+
+    for texto in textos:
+        sessao = engine.session()
+        for i in range(1, len(texto) + 1):
+            inicio = time.perf_counter()
+            sugestoes = sessao.update(texto[:i], limit)
+            incremental[i].append(time.perf_counter() - inicio)
+            faixas[i].append(sessao._stack[-1][2] - sessao._stack[-1][1])
+
+            inicio = time.perf_counter()
+            esperado = engine.complete(texto[:i], limit)
+            do_zero[i].append(time.perf_counter() - inicio)
+            divergencias += sugestoes != esperado
+
+    tabela = {
+        i: (1000 * np.mean(incremental[i]), 1000 * np.mean(do_zero[i]), np.mean(faixas[i]))
+        for i in sorted(incremental)
+    }
+    return tabela, divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--titles', type=int, default=120000)
+    parser.add_argument('--sessions', type=int, default=300)
+    parser.add_argument('--max-len', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    G = synthetic_catalog(args.csv, args.titles)
+    inicio = time.perf_counter()
+    engine = Autocomplete(G)
+    construcao = time.perf_counter() - inicio
+
+    tabela, divergencias = run(engine, typed_queries(G, args.sessions, args.max_len), args.limit)
+
+    print(f"Catálogo: {G.number_of_nodes()} títulos, {len(engine)} chaves; construção {construcao:.2f}s")
+    print(f"{'prefixo':>8s}{'faixa média':>14s}{'incremental (ms)':>19s}{'do zero (ms)':>15s}")
+    for tamanho, (inc, zero, faixa) in tabela.items():
+        print(f"{tamanho:8d}{faixa:14.0f}{inc:19.3f}{zero:15.3f}")
+    print(f"Sugestões diferentes entre sessão e consulta do zero: {divergencias}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Caminhos de poucas músicas semente para muitos destinos: dijkstra par a par
+contra batch_shortest_paths (uma árvore por origem), conferindo que os
+resultados são idênticos.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_batch_paths [--csv data/processed/songs.csv] [--k 50] [--seeds 5] [--pairs 500]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_path_search import BASE_DIR, build
+from src.algorithm.batch import batch_shortest_paths
+from src.algorithm.search import dijkstra
+
+
+def seed_pairs(G, n_seeds, n_pairs, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = np.asarray(G.node_ids.tolist(), dtype=object)
+    sementes = rng.choice(nodes, size=n_seeds, replace=False).tolist()
+    return [(sementes[i % n_seeds], rng.choice(nodes)) for i in range(n_pairs)]
+
+
+def run(G, pairs, jobs=(None,)):
+    '''
+    :return: dict {método: segundos} e 'identical'
+    '''
+    inicio = time.perf_counter()
+    esperado = [dijkstra(G, o, d) for o, d in pairs]
+    resultados = {'per_pair': time.perf_counter() - inicio, 'identical': True}
+
+    for n_jobs in jobs:
+        inicio = time.perf_counter()
+        lote = batch_shortest_paths(G, pairs, n_jobs=n_jobs)
+        resultados[f'batch (n_jobs={n_jobs})'] = time.perf_counter() - inicio
+        resultados['identical'] &= lote == esperado
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--jobs', type=int, nargs='*', default=[None])
+    args = parser.parse_args()
+
+    G = build(args.csv, args.k)
+    r = run(G, seed_pairs(G, args.seeds, args.pairs), args.jobs)
+
+    print(f"Grafo: {G.number_of_nodes()} nós; {args.pairs} pares a partir de {args.seeds} sementes")
+    identicos = r.pop('identical')
+    base = r['per_pair']
+    for nome, segundos in r.items():
+        print(f"{nome:22s}{segundos:9.2f}s{base / segundos:8.1f}x")
+    print(f"Resultados idênticos ao dijkstra: {identicos}")
+
+
+if __name__ == "__main__":
+    main()
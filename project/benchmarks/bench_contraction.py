@@ -0,0 +1,77 @@
+"""
+Custo e ganho da hierarquia de contração (CH) no grafo K-NN: tempo de
+pré-processamento, número de atalhos e tamanho do índice, e a latência por
+consulta em pares aleatórios comparada ao dijkstra (conferindo que o caminho
+desempacotado é idêntico ao do dijkstra).
+
+Grafos K-NN em dimensão alta ficam densos no topo da hierarquia; com K grande
+o pré-processamento demora bastante, por isso o K padrão aqui é menor que o da aplicação.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_contraction [--csv data/processed/songs.csv] [--k 10] [--pairs 200]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_path_search import BASE_DIR, build, random_pairs
+from src.algorithm.contraction import ContractionHierarchy, ch_search
+from src.algorithm.search import bidirectional_dijkstra, dijkstra
+
+
+def run(G, pairs):
+    '''
+    :return: dict com build_s, shortcuts, bytes e {algoritmo: latency_ms}, divergências
+    '''
+    inicio = time.perf_counter()
+    ch = ContractionHierarchy.build(G)
+    resultado = {
+        'build_s': time.perf_counter() - inicio,
+        'shortcuts': ch.num_shortcuts,
+        'edges': ch.num_edges,
+        'bytes': ch.nbytes,
+        'levels': int(np.max(ch.rank)) + 1 if len(ch) else 0,
+    }
+
+    algoritmos = {
+        'dijkstra': dijkstra,
+        'bidirectional': bidirectional_dijkstra,
+        'ch': lambda G, o, d: ch_search(G, o, d, ch),
+    }
+    respostas = {}
+    for nome, func in algoritmos.items():
+        tempos = []
+        for origem, destino in pairs:
+            inicio = time.perf_counter()
+            respostas[nome, origem, destino] = func(G, origem, destino)
+            tempos.append(time.perf_counter() - inicio)
+        resultado[nome] = 1000 * float(np.mean(tempos))
+
+    resultado['mismatches'] = sum(respostas['ch', o, d] != respostas['dijkstra', o, d] for o, d in pairs)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--pairs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    G = build(args.csv, args.k)
+    r = run(G, random_pairs(G, args.pairs, args.seed))
+
+    print(f"Grafo: {G.number_of_nodes()} nós, {G.number_of_edges()} arestas (K={args.k}), {args.pairs} pares")
+    print(f"Pré-processamento: {r['build_s']:.1f}s, {r['levels']} níveis, {r['shortcuts']} atalhos, "
+          f"{r['edges']} arestas na hierarquia, {r['bytes'] / 2**20:.1f} MB")
+    print(f"{'algoritmo':14s}{'latência (ms)':>15s}{'vs dijkstra':>13s}")
+    for nome in ('dijkstra', 'bidirectional', 'ch'):
+        print(f"{nome:14s}{r[nome]:15.3f}{r['dijkstra'] / r[nome]:12.1f}x")
+    print(f"Caminhos diferentes do dijkstra: {r['mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compara os dois formatos dos datasets processados (songs_full e songs):
+- csv: to_csv / pd.read_csv (texto, tipos inferidos no parse);
+- columnar: write_columnar / read_columnar (binário, float32 e categorias preservados).
+
+A leitura é a do GraphBuilder (só as colunas usadas no grafo). Mede tempo de
+escrita, tempo de leitura e tamanho em disco. O CSV bruto é sintético.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_dataset_io [--rows 114000] [--samples 800]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import RAW_ROWS, make_raw_csv
+from src.preprocessing.columnar import write_columnar
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.processor import DataProcessor
+
+FORMATS = ('csv', 'columnar')
+
+
+def _tamanho(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(raiz, f)) for raiz, _, arqs in os.walk(path) for f in arqs)
+
+
+def _medir(func, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = func(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def _datasets(raw_path, samples_per_genre):
+    '''
+    [INTERNO] Dataset completo (limpo, tipado) e uma amostra por gênero do mesmo tamanho da do ETL.
+    '''
+    with contextlib.redirect_stdout(io.StringIO()):
+        dp = DataProcessor(raw_path, '')
+        full = dp._typed_frame(dp._load_and_filter()).reset_index(drop=True)
+    graph = full[full['track_genre'].isin(dp.TARGET_GENRES)].groupby('track_genre', observed=True).head(samples_per_genre)
+    return {'songs_full': full, 'songs': graph.reset_index(drop=True)}
+
+
+def run(n_rows=RAW_ROWS, samples_per_genre=800, seed=0):
+    '''
+    :return: dict {dataset: {formato: métricas}}
+    '''
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = make_raw_csv(os.path.join(tmp, 'dataset.csv'), n_rows, seed)
+
+        for nome, df in _datasets(raw_path, samples_per_genre).items():
+            resultados[nome] = {}
+            for fmt in FORMATS:
+                path = os.path.join(tmp, nome + ('.csv' if fmt == 'csv' else '.cols'))
+                if fmt == 'csv':
+                    _, t_write = _medir(df.to_csv, path, index=False)
+                else:
+                    _, t_write = _medir(write_columnar, df, path)
+                lido, t_read = _medir(GraphBuilder(path)._load_dataset)
+                resultados[nome][fmt] = {
+                    'write_s': t_write,
+                    'read_s': t_read,
+                    'size_bytes': _tamanho(path),
+                    'rows': len(lido),
+                }
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=RAW_ROWS)
+    parser.add_argument('--samples', type=int, default=800)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    r = run(args.rows, args.samples, args.seed)
+    print(f"{'dataset':12s}{'formato':10s}{'escrita (s)':>13s}{'leitura (s)':>13s}{'tamanho (MB)':>14s}{'linhas':>9s}")
+    for nome, formatos in r.items():
+        for fmt, m in formatos.items():
+            print(f"{nome:12s}{fmt:10s}{m['write_s']:13.3f}{m['read_s']:13.3f}"
+                  f"{m['size_bytes'] / 2**20:14.2f}{m['rows']:9d}")
+        csv, cols = formatos['csv'], formatos['columnar']
+        print(f"{'':12s}colunar: leitura {csv['read_s'] / cols['read_s']:.1f}x, escrita "
+              f"{csv['write_s'] / cols['write_s']:.1f}x mais rápidas; tamanho {cols['size_bytes'] / csv['size_bytes']:.2f}x o do CSV")
+
+
+if __name__ == "__main__":
+    main()
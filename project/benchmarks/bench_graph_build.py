@@ -0,0 +1,96 @@
+"""
+Benchmark da construção do grafo: laço antigo (df.loc + nsmallest + add_edge
+por vizinho) contra a construção vetorizada atual do GraphBuilder.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_graph_build [--csv data/processed/songs.csv] [--k 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import networkx as nx
+import pandas as pd
+from scipy.spatial.distance import cdist
+from sklearn.preprocessing import MinMaxScaler
+
+from src.preprocessing.graph_builder import GraphBuilder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FEATURE_COLS = ['danceability', 'energy', 'valence', 'tempo', 'acousticness', 'instrumentalness']
+
+
+def legacy_build_graph(csv_path, k_neighbors):
+    """
+    Reprodução da construção original: matriz n x n em DataFrame e
+    inserção nó a nó / aresta a aresta.
+    """
+    df = pd.read_csv(csv_path).set_index('track_id')
+    data_numeric = df[[c for c in FEATURE_COLS if c in df.columns]].dropna()
+    data_norm = pd.DataFrame(
+        MinMaxScaler().fit_transform(data_numeric),
+        columns=data_numeric.columns,
+        index=data_numeric.index
+    )
+    df_dist = pd.DataFrame(cdist(data_norm, data_norm), index=data_norm.index, columns=data_norm.index)
+
+    G = nx.DiGraph()
+    for song_id in data_norm.index:
+        G.add_node(song_id, name=df.loc[song_id].get('track_name'), artist=df.loc[song_id].get('artists'))
+        for vizinho_id, distancia in df_dist.loc[song_id].nsmallest(k_neighbors + 1).iloc[1:].items():
+            G.add_edge(song_id, vizinho_id, weight=distancia)
+    return G
+
+
+def _timed(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        resultado = func(*args, **kwargs)
+        return resultado, time.perf_counter() - inicio
+
+
+def run(csv_path, k_neighbors=50, repeat=1):
+    """
+    Executa o benchmark e retorna um dict com os tempos (segundos).
+    """
+    legacy_times, new_times = [], []
+    for _ in range(repeat):
+        G_old, t_old = _timed(legacy_build_graph, csv_path, k_neighbors)
+        G_new, t_new = _timed(GraphBuilder(csv_path).build_graph, k_neighbors=k_neighbors)
+        legacy_times.append(t_old)
+        new_times.append(t_new)
+
+    identicos = (
+        {(u, v): d['weight'] for u, v, d in G_old.edges(data=True)}
+        == {(u, v): d['weight'] for u, v, d in G_new.edges(data=True)}
+    )
+
+    return {
+        'nodes': G_new.number_of_nodes(),
+        'edges': G_new.number_of_edges(),
+        'legacy_s': min(legacy_times),
+        'vectorized_s': min(new_times),
+        'speedup': min(legacy_times) / min(new_times),
+        'identical': identicos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    r = run(args.csv, args.k, args.repeat)
+    print(f"Grafo: {r['nodes']} nós, {r['edges']} arestas (K={args.k})")
+    print(f"  laço antigo      : {r['legacy_s']:8.3f} s")
+    print(f"  inserção em lote : {r['vectorized_s']:8.3f} s")
+    print(f"  speedup          : {r['speedup']:8.1f}x")
+    print(f"  arestas idênticas: {r['identical']}")
+
+
+if __name__ == "__main__":
+    main()
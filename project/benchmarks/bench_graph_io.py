@@ -0,0 +1,73 @@
+"""
+Compara salvar/carregar o grafo em GraphML e no snapshot binário (mmap).
+Para o snapshot mede também uma "primeira consulta" (vizinhos de um nó),
+já que com mmap a carga em si só lê o meta.json.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_graph_io [--csv data/processed/songs.csv] [--k 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from src.preprocessing.graph_builder import GraphBuilder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _tamanho(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(raiz, f)) for raiz, _, arqs in os.walk(path) for f in arqs)
+
+
+def _medir(func, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = func(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def run(csv_path, k_neighbors=50):
+    """
+    Retorna um dict por formato com tempos (s) de save/load/primeira consulta e tamanho (bytes).
+    """
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        builder = GraphBuilder(csv_path)
+        builder.build_graph(k_neighbors=k_neighbors)
+        origem = next(iter(builder.G.nodes))
+
+        for fmt, nome in (('graphml', 'graph.graphml'), ('snapshot', 'graph_snapshot')):
+            path = os.path.join(tmp, nome)
+            _, t_save = _medir(builder.save_graph, path, fmt=fmt)
+            G, t_load = _medir(GraphBuilder.load_graph, path)
+            _, t_query = _medir(lambda: list(G[str(origem)].items()))
+            resultados[fmt] = {
+                'save_s': t_save,
+                'load_s': t_load,
+                'first_query_s': t_query,
+                'size_bytes': _tamanho(path),
+            }
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.csv, args.k)
+    print(f"{'formato':10s}{'save (s)':>10s}{'load (s)':>10s}{'1a consulta (s)':>17s}{'tamanho (MB)':>14s}")
+    for fmt, m in r.items():
+        print(f"{fmt:10s}{m['save_s']:10.3f}{m['load_s']:10.3f}{m['first_query_s']:17.4f}"
+              f"{m['size_bytes'] / 2**20:14.1f}")
+    print(f"Load GraphML / snapshot: {r['graphml']['load_s'] / r['snapshot']['load_s']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
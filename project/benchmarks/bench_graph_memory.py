@@ -0,0 +1,43 @@
+"""
+Compara lado a lado a memória do grafo em nx.DiGraph e em CSRGraph.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_graph_memory [--csv data/processed/songs.csv] [--k 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+
+from src.preprocessing.csr_graph import memory_report
+from src.preprocessing.graph_builder import GraphBuilder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(csv_path, k_neighbors=50):
+    """
+    Constrói o grafo nas duas representações e retorna o relatório de memória.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        G_nx = GraphBuilder(csv_path).build_graph(k_neighbors=k_neighbors)
+        G_csr = GraphBuilder(csv_path).build_graph(k_neighbors=k_neighbors, representation='csr')
+    return memory_report(G_nx, G_csr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.csv, args.k)
+    print(f"Grafo: {r['nodes']} nós, {r['edges']} arestas (K={args.k})")
+    print(f"{'':12s}{'total (MB)':>14s}{'bytes/aresta':>16s}")
+    print(f"{'nx.DiGraph':12s}{r['networkx_bytes'] / 2**20:14.1f}{r['networkx_bytes_per_edge']:16.1f}")
+    print(f"{'CSRGraph':12s}{r['csr_bytes'] / 2**20:14.1f}{r['csr_bytes_per_edge']:16.1f}")
+    print(f"Redução: {r['ratio']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
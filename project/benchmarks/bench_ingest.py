@@ -0,0 +1,130 @@
+"""
+Compara a leitura do CSV bruto antes e depois da ingestão tipada:
+- legado: pd.read_csv(low_memory=False) de todas as colunas, depois o recorte
+  das colunas usadas, dropna e drop_duplicates;
+- tipado: DataProcessor._load_and_filter (só as colunas usadas, float32,
+  track_genre categórico, artistas internados, leitura em blocos).
+
+Cada variante roda num processo novo, para medir o pico de memória residente (RSS)
+sem interferência da outra. O CSV é sintético, do tamanho do dataset bruto.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_ingest [--rows 114000] [--engine auto]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import RAW_ROWS, make_raw_csv
+from src.preprocessing.processor import DataProcessor
+
+
+def _peak_rss_mb():
+    '''
+    Pico de memória residente do processo atual, em MB (ru_maxrss é KB no Linux e bytes no macOS).
+    None onde o módulo resource não existe (Windows).
+    '''
+    try:
+        import resource  # só existe em sistemas Unix
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+
+
+def _current_rss_mb():
+    '''
+    Memória residente atual em MB (/proc no Linux; nos demais sistemas, o pico até agora).
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _fmt_mb(valor, largura):
+    '''
+    [INTERNO] Valor em MB alinhado à direita, ou 'n/d' se a medida não existe na plataforma.
+    '''
+    return f"{'n/d':>{largura}s}" if valor is None else f"{valor:{largura}.1f}"
+
+
+def _legacy_ingest(raw_path):
+    df = pd.read_csv(raw_path, low_memory=False)
+    df = df[[c for c in DataProcessor(raw_path, '').REQUIRED_COLS if c in df.columns]]
+    df = df.dropna()
+    df = df.drop_duplicates(subset='track_id')
+    return df.drop_duplicates(subset=['track_name', 'artists'])
+
+
+def _typed_ingest(raw_path, engine='auto'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataProcessor(raw_path, '', engine=engine)._load_and_filter()
+
+
+def _measure(variant, raw_path, engine):
+    '''
+    [INTERNO] Executado no processo filho: tempo de leitura, RSS (base antes da leitura,
+    pico do processo e acréscimo residente com o DataFrame vivo) e memória do DataFrame.
+    '''
+    base = _current_rss_mb()
+    inicio = time.perf_counter()
+    df = _legacy_ingest(raw_path) if variant == 'legacy' else _typed_ingest(raw_path, engine)
+    parse_s = time.perf_counter() - inicio
+    atual = _current_rss_mb()
+    return {
+        'parse_s': parse_s,
+        'base_rss_mb': base,
+        'peak_rss_mb': _peak_rss_mb(),
+        'resident_mb': None if atual is None or base is None else atual - base,
+        'dataframe_mb': df.memory_usage(deep=True).sum() / 2**20,
+        'rows': len(df),
+    }
+
+
+def run(n_rows=RAW_ROWS, engine='auto', seed=0):
+    '''
+    :return: dict {'legacy': métricas, 'typed': métricas}
+    '''
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = make_raw_csv(os.path.join(tmp, 'dataset.csv'), n_rows, seed)
+        resultados = {}
+        for variant in ('legacy', 'typed'):
+            with ctx.Pool(1) as pool:
+                resultados[variant] = pool.apply(_measure, (variant, raw_path, engine))
+        resultados['file_mb'] = os.path.getsize(raw_path) / 2**20
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=RAW_ROWS)
+    parser.add_argument('--engine', choices=DataProcessor.ENGINES, default='auto')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    r = run(args.rows, args.engine, args.seed)
+    print(f"CSV sintético: {args.rows} linhas, {r['file_mb']:.1f} MB")
+    print(f"{'':8s}{'leitura (s)':>13s}{'RSS base (MB)':>15s}{'pico RSS (MB)':>15s}"
+          f"{'residente (MB)':>16s}{'DataFrame (MB)':>16s}{'linhas':>9s}")
+    for nome in ('legacy', 'typed'):
+        m = r[nome]
+        print(f"{nome:8s}{m['parse_s']:13.3f}{_fmt_mb(m['base_rss_mb'], 15)}{_fmt_mb(m['peak_rss_mb'], 15)}"
+              f"{_fmt_mb(m['resident_mb'], 16)}{m['dataframe_mb']:16.1f}{m['rows']:9d}")
+    if r['legacy']['resident_mb'] is not None and r['typed']['resident_mb'] is not None:
+        print(f"Residente após a leitura: {r['legacy']['resident_mb'] / max(r['typed']['resident_mb'], 0.1):.1f}x menor")
+    print(f"Leitura: {r['legacy']['parse_s'] / r['typed']['parse_s']:.1f}x mais rápida")
+    print("(DataFrame = memory_usage(deep=True), que conta cada artista repetido mesmo internado)")
+
+
+if __name__ == "__main__":
+    main()
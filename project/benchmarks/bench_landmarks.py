@@ -0,0 +1,62 @@
+"""
+Custo e ganho dos landmarks (ALT) no grafo K-NN: para cada L mede o tempo de
+pré-processamento, o tamanho do índice e, em pares aleatórios, a latência e os
+nós expandidos da busca ALT comparados ao dijkstra e ao A* euclidiano.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_landmarks [--csv data/processed/songs.csv] [--k 50] [--pairs 200]
+"""
+import argparse
+import functools
+import os
+import time
+
+from benchmarks.bench_path_search import BASE_DIR, build, random_pairs, run
+from src.algorithm.landmarks import LandmarkIndex, alt_search
+from src.algorithm.search import astar, dijkstra
+
+
+def run_landmarks(G, pairs, sizes=(1, 2, 4, 8, 16, 32), strategy='farthest'):
+    '''
+    :return: (referência {dijkstra, astar}, lista de dicts por L)
+    '''
+    referencia = run(G, pairs, {'dijkstra': dijkstra, 'astar': astar})
+    resultados = []
+
+    for L in sizes:
+        inicio = time.perf_counter()
+        index = LandmarkIndex.build(G, n_landmarks=L, strategy=strategy)
+        segundos = time.perf_counter() - inicio
+
+        m = run(G, pairs, {'dijkstra': dijkstra, 'alt': functools.partial(alt_search, landmarks=index)})['alt']
+        resultados.append({'landmarks': L, 'build_s': segundos, 'bytes': index.nbytes, **m})
+
+    return referencia, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--pairs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strategy', choices=('farthest', 'random'), default='farthest')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    G = build(args.csv, args.k)
+    referencia, resultados = run_landmarks(G, random_pairs(G, args.pairs, args.seed), args.sizes, args.strategy)
+
+    base = referencia['dijkstra']
+    print(f"Grafo: {G.number_of_nodes()} nós, {G.number_of_edges()} arestas, {args.pairs} pares")
+    for nome, m in referencia.items():
+        print(f"{nome:>9s}: {m['latency_ms']:8.3f} ms, {m['settled']:8.1f} nós expandidos")
+    print(f"{'L':>4s}{'pré-proc (s)':>14s}{'índice (KB)':>13s}{'latência (ms)':>15s}"
+          f"{'nós expandidos':>16s}{'vs dijkstra':>13s}{'divergências':>14s}")
+    for r in resultados:
+        print(f"{r['landmarks']:4d}{r['build_s']:14.3f}{r['bytes'] / 1024:13.1f}{r['latency_ms']:15.3f}"
+              f"{r['settled']:16.1f}{base['latency_ms'] / r['latency_ms']:12.1f}x{r['mismatches']:14d}")
+
+
+if __name__ == "__main__":
+    main()
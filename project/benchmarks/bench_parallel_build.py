@@ -0,0 +1,66 @@
+"""
+Escalabilidade do K-NN da construção do grafo com n_jobs processos
+(matriz normalizada em memória compartilhada). Para cada n_jobs mede o tempo
+e confere se os vizinhos são idênticos aos da execução serial.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_parallel_build [--rows 50000] [--k 50] [--backend brute]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.preprocessing.neighbors import get_backend
+
+
+def _jobs_padrao():
+    cpus = os.cpu_count() or 1
+    jobs, n = [], 1
+    while n < cpus:
+        jobs.append(n)
+        n *= 2
+    return jobs + [cpus]
+
+
+def run(n_rows=50_000, k_neighbors=50, backend='brute', jobs=None, seed=0):
+    '''
+    :return: lista de dicts {n_jobs, seconds, speedup, identical}
+    '''
+    data = np.random.default_rng(seed).random((n_rows, 6))
+    resultados, serial = [], None
+
+    for n_jobs in jobs or _jobs_padrao():
+        inicio = time.perf_counter()
+        idx, dist = get_backend(backend, n_jobs=n_jobs).kneighbors(data, k_neighbors)
+        segundos = time.perf_counter() - inicio
+
+        if serial is None:
+            serial = (idx, dist, segundos)
+        resultados.append({
+            'n_jobs': n_jobs,
+            'seconds': segundos,
+            'speedup': serial[2] / segundos,
+            'identical': np.array_equal(idx, serial[0]) and np.array_equal(dist, serial[1]),
+        })
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--backend', choices=('brute', 'tree'), default='brute')
+    parser.add_argument('--jobs', type=int, nargs='*', help="valores de n_jobs (padrão: 1, 2, 4... até os núcleos)")
+    args = parser.parse_args()
+
+    print(f"K-NN '{args.backend}': {args.rows} linhas, K={args.k}, {os.cpu_count()} núcleos")
+    print(f"{'n_jobs':>7s}{'tempo (s)':>11s}{'speedup':>9s}{'idêntico':>10s}")
+    for r in run(args.rows, args.k, args.backend, args.jobs):
+        print(f"{r['n_jobs']:7d}{r['seconds']:11.3f}{r['speedup']:9.2f}{str(r['identical']):>10s}")
+
+
+if __name__ == "__main__":
+    main()
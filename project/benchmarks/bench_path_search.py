@@ -0,0 +1,119 @@
+"""
+Compara os algoritmos de menor caminho em pares aleatórios de músicas do grafo
+K-NN (CSRGraph com features): latência média e nós expandidos (settled) por
+consulta, conferindo se o custo encontrado é o mesmo do dijkstra.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_path_search [--csv data/processed/songs.csv] [--k 50] [--pairs 200]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import time
+
+import numpy as np
+
+from src.algorithm.search import astar, bidirectional_dijkstra, dijkstra
+from src.preprocessing.graph_builder import GraphBuilder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALGORITHMS = {
+    'dijkstra': dijkstra,
+    'astar': astar,
+    'bidirectional': bidirectional_dijkstra,
+}
+
+
+class _ContadorExpansoes:
+    """
+    Conta as listas de vizinhos lidas (= nós expandidos) substituindo
+    neighbors_of/predecessors_of na instância do CSRGraph, usadas por todos os algoritmos.
+    """
+
+    METODOS = ('neighbors_of', 'predecessors_of')
+
+    def __init__(self, G):
+        self.G = G
+        self.total = 0
+
+    def __enter__(self):
+        for metodo in self.METODOS:
+            setattr(self.G, metodo, self._contar(getattr(self.G, metodo)))
+        return self
+
+    def __exit__(self, *exc):
+        for metodo in self.METODOS:
+            delattr(self.G, metodo)
+
+    def _contar(self, original):
+        def contar(index):
+            self.total += 1
+            return original(index)
+        return contar
+
+
+def build(csv_path, k_neighbors=50):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return GraphBuilder(csv_path).build_graph(k_neighbors=k_neighbors, representation='csr')
+
+
+def random_pairs(G, n_pairs, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = np.asarray(G.node_ids.tolist(), dtype=object)
+    return [tuple(rng.choice(nodes, size=2, replace=False).tolist()) for _ in range(n_pairs)]
+
+
+def run(G, pairs, algorithms=None):
+    '''
+    :return: dict {algoritmo: {'latency_ms', 'settled', 'mismatches'}}
+    '''
+    algorithms = algorithms or ALGORITHMS
+    referencia = {}
+    resultados = {}
+
+    for nome, func in algorithms.items():
+        tempos, expandidos, divergentes = [], [], 0
+        for origem, destino in pairs:
+            with _ContadorExpansoes(G) as contador:
+                inicio = time.perf_counter()
+                _, custo = func(G, origem, destino)
+                tempos.append(time.perf_counter() - inicio)
+            expandidos.append(contador.total)
+
+            esperado = referencia.setdefault((origem, destino), custo)
+            if not math.isclose(custo, esperado, rel_tol=1e-9) and not (math.isinf(custo) and math.isinf(esperado)):
+                divergentes += 1
+
+        resultados[nome] = {
+            'latency_ms': 1000 * float(np.mean(tempos)),
+            'settled': float(np.mean(expandidos)),
+            'mismatches': divergentes,
+        }
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--pairs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    G = build(args.csv, args.k)
+    r = run(G, random_pairs(G, args.pairs, args.seed))
+
+    base = r['dijkstra']
+    print(f"Grafo: {G.number_of_nodes()} nós, {G.number_of_edges()} arestas, {args.pairs} pares")
+    print(f"{'algoritmo':12s}{'latência (ms)':>15s}{'nós expandidos':>16s}{'vs dijkstra':>13s}{'divergências':>14s}")
+    for nome, m in r.items():
+        print(f"{nome:12s}{m['latency_ms']:15.3f}{m['settled']:16.1f}"
+              f"{base['latency_ms'] / m['latency_ms']:12.1f}x{m['mismatches']:14d}")
+
+
+if __name__ == "__main__":
+    main()
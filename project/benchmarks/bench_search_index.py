@@ -0,0 +1,109 @@
+"""
+Busca de músicas por nome/artista: varredura linear de todos os nós (a busca
+original do main) contra o índice SongIndex (trigramas + top-k por heap),
+conferindo que o ranking é idêntico.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_search_index [--csv data/processed/songs.csv] [--queries 500] [--top 20]
+"""
+import argparse
+import os
+import random
+import time
+
+import networkx as nx
+import pandas as pd
+
+from benchmarks.bench_path_search import BASE_DIR
+from src.services.search_index import SongIndex
+
+
+def linear_search(G, termo):
+    termo = termo.lower()
+    candidatos = []
+    for node_id, data in G.nodes(data=True):
+        nome = data.get("name", "").lower()
+        artista = data.get("artist", "").lower()
+        score = 0
+        if termo == nome:
+            score = 1000
+        elif termo == artista:
+            score = 900
+        elif nome.startswith(termo):
+            score = 500
+        elif artista.startswith(termo):
+            score = 400
+        elif termo in nome:
+            score = 100
+        elif termo in artista:
+            score = 50
+        if score > 0:
+            candidatos.append((node_id, data, score - len(nome) * 0.1))
+    candidatos.sort(key=lambda x: x[2], reverse=True)
+    return candidatos
+
+
+def load(csv):
+    df = pd.read_csv(csv, usecols=['track_id', 'track_name', 'artists']).fillna('')
+    G = nx.DiGraph()
+    for track_id, nome, artista in df.itertuples(index=False):
+        G.add_node(track_id, name=nome, artist=artista)
+    return G
+
+
+def queries(G, n, seed=0):
+    '''
+    Termos como os digitados na interface: trechos de nomes e artistas de 1 a 12 caracteres.
+    '''
+    rng = random.Random(seed)
+    textos = [t for _, data in G.nodes(data=True) for t in (data['name'], data['artist']) if t]
+    termos = []
+    for _ in range(n):
+        texto = rng.choice(textos)
+        inicio = rng.randrange(len(texto))
+        termos.append(texto[inicio:inicio + rng.randint(1, 12)])
+    return termos
+
+
+def run(G, termos, top):
+    '''
+    :return: dict com build_s, linear_ms, index_ms (por consulta) e divergências
+    '''
+    inicio = time.perf_counter()
+    index = SongIndex(G)
+    resultado = {'build_s': time.perf_counter() - inicio}
+
+    inicio = time.perf_counter()
+    esperado = [linear_search(G, t)[:top] for t in termos]
+    resultado['linear_ms'] = 1000 * (time.perf_counter() - inicio) / len(termos)
+
+    inicio = time.perf_counter()
+    obtido = [index.search(t, limit=top)[1] for t in termos]
+    resultado['index_ms'] = 1000 * (time.perf_counter() - inicio) / len(termos)
+
+    resultado['mismatches'] = sum(
+        [(n, s) for n, _, s in a] != [(n, s) for n, _, s in b] for a, b in zip(esperado, obtido)
+    )
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'data', 'processed', 'songs.csv'))
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    G = load(args.csv)
+    r = run(G, queries(G, args.queries, args.seed), args.top)
+
+    print(f"Músicas: {G.number_of_nodes()}; {args.queries} buscas (top {args.top})")
+    print(f"Construção do índice: {r['build_s']:.3f}s")
+    print(f"Varredura linear: {r['linear_ms']:8.3f} ms/busca")
+    print(f"Índice:           {r['index_ms']:8.3f} ms/busca ({r['linear_ms'] / r['index_ms']:.1f}x)")
+    print(f"Rankings diferentes: {r['mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Suíte de desempenho do pipeline completo em datasets sintéticos no layout do
+Kaggle (1k, 10k, 100k e 1M linhas): ETL (process_full_dataset e
+process_graph_dataset), construção do grafo por K, save_graph/load_graph,
+dijkstra em pares aleatórios, construção do índice de busca e buscar_musicas.
+
+Cada caso roda num processo novo, para que o pico de memória residente (RSS)
+seja só dele; o preparo (ler o snapshot salvo pelo caso anterior, sortear pares)
+fica fora do tempo medido. Cada execução é anexada a um histórico JSON, e o
+comando compare aponta os casos que ficaram mais lentos (ou usaram mais
+memória) que a execução de referência além de um limiar.
+
+Uso (a partir da pasta project/):
+    python -m benchmarks.bench_suite run [--sizes 1000 10000 100000] [--k 10 50] [--history benchmarks/results/history.json]
+    python -m benchmarks.bench_suite run --sizes 1000000 --k 10
+    python -m benchmarks.bench_suite compare [--baseline -2] [--current -1] [--threshold 0.1]
+
+O compare sai com código 1 se houver regressão (útil em CI).
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ingest import _current_rss_mb, _fmt_mb, _peak_rss_mb
+from benchmarks.bench_path_search import BASE_DIR
+from benchmarks.synthetic import make_raw_csv
+
+# Tamanhos (linhas do CSV bruto) padrão; 1M só quando pedido em --sizes
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_K = (10, 50)
+
+DEFAULT_HISTORY = os.path.join(BASE_DIR, 'benchmarks', 'results', 'history.json')
+
+# Regressão: mais lento/maior que a referência além do limiar, ignorando
+# tempos e acréscimos de memória pequenos demais para serem medidos com confiança
+DEFAULT_THRESHOLD = 0.10
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 5.0
+
+FULL_CSV = 'songs_full.csv'
+GRAPH_CSV = 'songs.csv'
+
+
+# --- casos (executados no processo filho) ---------------------------------------
+
+def _silencioso(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _snapshot_path(workdir, k):
+    return os.path.join(workdir, f'graph_k{k}')
+
+
+def case_etl_full(workdir, raw_path):
+    from src.preprocessing.processor import DataProcessor
+
+    inicio = time.perf_counter()
+    _silencioso(DataProcessor(raw_path, workdir).process_full_dataset, FULL_CSV)
+    return {'wall_s': time.perf_counter() - inicio}
+
+
+def case_etl_graph(workdir, raw_path):
+    from src.preprocessing.processor import DataProcessor
+
+    processor = DataProcessor(raw_path, workdir)
+    # Amostra proporcional ao tamanho, para que o caso cresça com o dataset
+    por_genero = max(1, _contar_linhas(raw_path) // len(processor.TARGET_GENRES))
+    inicio = time.perf_counter()
+    _silencioso(processor.process_graph_dataset, GRAPH_CSV, samples_per_genre=por_genero)
+    return {'wall_s': time.perf_counter() - inicio}
+
+
+def case_build_graph(workdir, k):
+    from src.preprocessing.graph_builder import GraphBuilder
+
+    builder = GraphBuilder(os.path.join(workdir, FULL_CSV))
+    inicio = time.perf_counter()
+    _silencioso(builder.build_graph, k_neighbors=k, representation='csr')
+    resultado = {'wall_s': time.perf_counter() - inicio, 'nodes': builder.G.number_of_nodes()}
+
+    # Snapshot usado pelos casos seguintes (fora do tempo medido)
+    _silencioso(builder.save_graph, _snapshot_path(workdir, k), fmt='snapshot')
+    return resultado
+
+
+def case_save_graph(workdir, k):
+    from src.preprocessing.graph_builder import GraphBuilder
+
+    builder = GraphBuilder(os.path.join(workdir, FULL_CSV))
+    builder.G = _silencioso(GraphBuilder.load_graph, _snapshot_path(workdir, k), mmap=False)
+    inicio = time.perf_counter()
+    _silencioso(builder.save_graph, _snapshot_path(workdir, k) + '_copy', fmt='snapshot')
+    return {'wall_s': time.perf_counter() - inicio}
+
+
+def case_load_graph(workdir, k, mmap):
+    from src.preprocessing.graph_builder import GraphBuilder
+
+    inicio = time.perf_counter()
+    G = _silencioso(GraphBuilder.load_graph, _snapshot_path(workdir, k), mmap=mmap)
+    # Primeira consulta: com mmap é quando os arrays começam a ser lidos
+    G.neighbors_of(0)
+    return {'wall_s': time.perf_counter() - inicio}
+
+
+def case_dijkstra(workdir, k, pairs, seed):
+    from src.algorithm.search import dijkstra
+    from src.preprocessing.graph_builder import GraphBuilder
+
+    G = _silencioso(GraphBuilder.load_graph, _snapshot_path(workdir, k), mmap=False)
+    rng = np.random.default_rng(seed)
+    ids = G.node_ids.tolist()
+    pares = [(ids[o], ids[d]) for o, d in rng.integers(0, len(ids), size=(pairs, 2))]
+
+    inicio = time.perf_counter()
+    for origem, destino in pares:
+        dijkstra(G, origem, destino)
+    return {'wall_s': time.perf_counter() - inicio, 'ops': pairs}
+
+
+def case_search_index(workdir, k):
+    from src.preprocessing.graph_builder import GraphBuilder
+    from src.services.search_index import SongIndex
+
+    G = _silencioso(GraphBuilder.load_graph, _snapshot_path(workdir, k), mmap=False)
+    inicio = time.perf_counter()
+    SongIndex.for_graph(G)
+    return {'wall_s': time.perf_counter() - inicio}
+
+
+def case_buscar_musicas(workdir, k, queries, seed):
+    from main import buscar_musicas
+    from src.preprocessing.graph_builder import GraphBuilder
+    from src.services.search_index import SongIndex
+
+    G = _silencioso(GraphBuilder.load_graph, _snapshot_path(workdir, k), mmap=False)
+    SongIndex.for_graph(G)  # índice construído fora do tempo medido (ver case_search_index)
+
+    rng = np.random.default_rng(seed)
+    textos = [str(t) for t in G.node_attrs['name']] + [str(t) for t in G.node_attrs['artist']]
+    termos = []
+    for i in rng.integers(0, len(textos), size=queries):
+        texto = textos[i]
+        inicio = int(rng.integers(0, max(1, len(texto))))
+        termos.append(texto[inicio:inicio + int(rng.integers(1, 12))])
+
+    inicio = time.perf_counter()
+    for termo in termos:
+        buscar_musicas(G, termo, limite=20)
+    return {'wall_s': time.perf_counter() - inicio, 'ops': queries}
+
+
+def _contar_linhas(path):
+    with open(path, 'rb') as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def _measure(case, args):
+    '''
+    [INTERNO] Executado no processo filho: roda o caso e devolve suas métricas
+    com o RSS base (antes do caso) e o pico do processo.
+    '''
+    base = _current_rss_mb()
+    metricas = CASES[case](*args)
+    metricas.update(base_rss_mb=base, peak_rss_mb=_peak_rss_mb())
+    return metricas
+
+
+CASES = {
+    'etl_full': case_etl_full,
+    'etl_graph': case_etl_graph,
+    'build_graph': case_build_graph,
+    'save_graph': case_save_graph,
+    'load_graph': case_load_graph,
+    'dijkstra': case_dijkstra,
+    'search_index': case_search_index,
+    'buscar_musicas': case_buscar_musicas,
+}
+
+
+# --- execução e histórico -------------------------------------------------------
+
+def plan(k_values, pairs, queries, seed):
+    '''
+    Casos de um tamanho, em ordem de dependência (cada um lê o que o anterior gravou).
+
+    :return: lista de (nome no histórico, caso, argumentos além de workdir)
+    '''
+    casos = [('etl_full', 'etl_full', ('RAW',)), ('etl_graph', 'etl_graph', ('RAW',))]
+    for k in k_values:
+        casos += [
+            (f'build_graph[k={k}]', 'build_graph', (k,)),
+            (f'save_graph[k={k}]', 'save_graph', (k,)),
+            (f'load_graph[k={k},mmap]', 'load_graph', (k, True)),
+            (f'load_graph[k={k}]', 'load_graph', (k, False)),
+            (f'dijkstra[k={k}]', 'dijkstra', (k, pairs, seed)),
+        ]
+    casos += [
+        ('search_index', 'search_index', (k_values[0],)),
+        ('buscar_musicas', 'buscar_musicas', (k_values[0], queries, seed)),
+    ]
+    return casos
+
+
+def run(sizes=DEFAULT_SIZES, k_values=DEFAULT_K, pairs=50, queries=200, seed=0, log=print):
+    '''
+    :return: dict {"<linhas>/<caso>": métricas (wall_s, peak_rss_mb, base_rss_mb, ...)}
+    '''
+    ctx = multiprocessing.get_context('spawn')
+    resultados = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            raw_path = make_raw_csv(os.path.join(workdir, 'dataset.csv'), size, seed)
+            for nome, caso, args in plan(list(k_values), pairs, queries, seed):
+                args = tuple(raw_path if a == 'RAW' else a for a in args)
+                with ctx.Pool(1) as pool:
+                    metricas = pool.apply(_measure, (caso, (workdir,) + args))
+                resultados[f'{size}/{nome}'] = metricas
+                log(f"{size:>9d} {nome:24s}{metricas['wall_s']:10.3f}s{_fmt_mb(metricas['peak_rss_mb'], 10)} MB")
+    return resultados
+
+
+def _git_commit():
+    '''
+    :return: hash curto do commit atual (None fora de um repositório git ou sem git)
+    '''
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                               capture_output=True, text=True, timeout=10, check=True)
+        return saida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):  # inclui CalledProcessError (código != 0)
+        return None
+
+
+def load_history(path):
+    '''
+    :return: lista de execuções (vazia se o arquivo não existe)
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def append_history(path, resultados, params):
+    '''
+    Anexa uma execução ao histórico.
+
+    :return: a execução gravada
+    '''
+    execucao = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'params': params,
+        'results': resultados,
+    }
+    historico = load_history(path) + [execucao]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(historico, f, indent=2)
+    return execucao
+
+
+def compare_runs(base, atual, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_SECONDS, min_rss_mb=MIN_RSS_MB):
+    '''
+    Compara duas execuções caso a caso (só os casos presentes nas duas). A memória
+    não é comparada se o pico de RSS não foi medido (None) em uma delas.
+
+    :return: lista de dicts (case, base_s, atual_s, time_ratio, base_rss_mb,
+        atual_rss_mb, rss_ratio, regressions), regressions ⊆ {'tempo', 'memória'}
+    '''
+    linhas = []
+    for case, m_atual in atual['results'].items():
+        m_base = base['results'].get(case)
+        if m_base is None:
+            continue
+
+        regressoes = []
+        razao_t = m_atual['wall_s'] / m_base['wall_s'] if m_base['wall_s'] > 0 else float('inf')
+        if razao_t > 1 + threshold and m_atual['wall_s'] >= min_seconds:
+            regressoes.append('tempo')
+
+        razao_m = None
+        if m_base['peak_rss_mb'] is not None and m_atual['peak_rss_mb'] is not None:
+            razao_m = m_atual['peak_rss_mb'] / m_base['peak_rss_mb'] if m_base['peak_rss_mb'] > 0 else float('inf')
+            if razao_m > 1 + threshold and m_atual['peak_rss_mb'] - m_base['peak_rss_mb'] >= min_rss_mb:
+                regressoes.append('memória')
+
+        linhas.append({
+            'case': case,
+            'base_s': m_base['wall_s'], 'atual_s': m_atual['wall_s'], 'time_ratio': razao_t,
+            'base_rss_mb': m_base['peak_rss_mb'], 'atual_rss_mb': m_atual['peak_rss_mb'], 'rss_ratio': razao_m,
+            'regressions': regressoes,
+        })
+    return linhas
+
+
+# --- linha de comando -----------------------------------------------------------
+
+def _cmd_run(args):
+    params = {'sizes': args.sizes, 'k': args.k, 'pairs': args.pairs, 'queries': args.queries, 'seed': args.seed}
+    print(f"{'linhas':>9s} {'caso':24s}{'tempo':>11s}{'pico RSS':>13s}")
+    resultados = run(args.sizes, args.k, args.pairs, args.queries, args.seed)
+    execucao = append_history(args.history, resultados, params)
+    print(f"Execução gravada em {args.history} (commit {execucao['commit']}, {execucao['timestamp']})")
+    return 0
+
+
+def _cmd_compare(args):
+    historico = load_history(args.history)
+    try:
+        base, atual = historico[args.baseline], historico[args.current]
+    except IndexError:
+        print(f"Histórico com {len(historico)} execução(ões): não há as posições {args.baseline} e {args.current}")
+        return 2
+
+    linhas = compare_runs(base, atual, args.threshold, args.min_seconds, args.min_rss_mb)
+    print(f"Referência: {base['timestamp']} ({base['commit']})  Atual: {atual['timestamp']} ({atual['commit']})")
+    print(f"{'caso':34s}{'ref (s)':>10s}{'atual (s)':>11s}{'razão':>8s}{'ref MB':>9s}{'atual MB':>10s}{'razão':>8s}")
+    for l in linhas:
+        marca = f"  REGRESSÃO ({', '.join(l['regressions'])})" if l['regressions'] else ''
+        razao_m = f"{'n/d':>8s}" if l['rss_ratio'] is None else f"{l['rss_ratio']:8.2f}"
+        print(f"{l['case']:34s}{l['base_s']:10.3f}{l['atual_s']:11.3f}{l['time_ratio']:8.2f}"
+              f"{_fmt_mb(l['base_rss_mb'], 9)}{_fmt_mb(l['atual_rss_mb'], 10)}{razao_m}{marca}")
+
+    regressoes = [l for l in linhas if l['regressions']]
+    print(f"{len(regressoes)} regressão(ões) acima de {100 * args.threshold:.0f}% em {len(linhas)} casos comparados")
+    return 1 if regressoes else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help='executa a suíte e grava no histórico')
+    p_run.add_argument('--history', default=DEFAULT_HISTORY)
+    p_run.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    p_run.add_argument('--k', type=int, nargs='+', default=list(DEFAULT_K))
+    p_run.add_argument('--pairs', type=int, default=50)
+    p_run.add_argument('--queries', type=int, default=200)
+    p_run.add_argument('--seed', type=int, default=0)
+    p_run.set_defaults(func=_cmd_run)
+
+    p_cmp = sub.add_parser('compare', help='compara duas execuções do histórico')
+    p_cmp.add_argument('--history', default=DEFAULT_HISTORY)
+    p_cmp.add_argument('--baseline', type=int, default=-2, help='posição da execução de referência')
+    p_cmp.add_argument('--current', type=int, default=-1, help='posição da execução comparada')
+    p_cmp.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    p_cmp.add_argument('--min-seconds', type=float, default=MIN_SECONDS)
+    p_cmp.add_argument('--min-rss-mb', type=float, default=MIN_RSS_MB)
+    p_cmp.set_defaults(func=_cmd_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Gera CSVs brutos sintéticos com o mesmo layout do dataset do Kaggle
+(Spotify Tracks Dataset: 21 colunas, ~114 mil linhas), para os benchmarks.
+"""
+import numpy as np
+import pandas as pd
+
+# Tamanho do dataset bruto original
+RAW_ROWS = 114_000
+
+GENRES = [
+    'pop', 'rock', 'metal', 'classical', 'acoustic', 'piano', 'dance', 'brazil',
+    'jazz', 'hip-hop', 'electronic', 'reggae', 'funk', 'blues', 'country', 'soul',
+]
+
+
+def make_raw_dataframe(n_rows=RAW_ROWS, seed=0, duplicate_ratio=0.1):
+    """
+    DataFrame com as colunas do CSV bruto. Uma fração das linhas repete
+    track_id ou (track_name, artists) de linhas anteriores, como no original.
+
+    :param n_rows: número de linhas
+    :param seed: semente
+    :param duplicate_ratio: fração de linhas duplicadas
+    :return: pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    n_artists = max(1, n_rows // 4)
+
+    ids = np.array([f'{i:022x}' for i in rng.integers(0, 2**62, size=n_rows)], dtype=object)
+    artistas = np.array([f'Artist {i}' for i in range(n_artists)], dtype=object)[rng.integers(0, n_artists, n_rows)]
+    nomes = np.array([f'Track {i}' for i in range(n_rows)], dtype=object)
+
+    # Duplicatas: copia id ou nome+artista de uma linha anterior
+    dup = np.flatnonzero(rng.random(n_rows) < duplicate_ratio)
+    dup = dup[dup > 0]
+    origem = (rng.random(len(dup)) * dup).astype(int)
+    por_id = rng.random(len(dup)) < 0.5
+    ids[dup[por_id]] = ids[origem[por_id]]
+    nomes[dup[~por_id]] = nomes[origem[~por_id]]
+    artistas[dup[~por_id]] = artistas[origem[~por_id]]
+
+    return pd.DataFrame({
+        'Unnamed: 0': np.arange(n_rows),
+        'track_id': ids,
+        'artists': artistas,
+        'album_name': [f'Album {i}' for i in rng.integers(0, max(1, n_rows // 10), n_rows)],
+        'track_name': nomes,
+        'popularity': rng.integers(0, 100, n_rows),
+        'duration_ms': rng.integers(60_000, 400_000, n_rows),
+        'explicit': rng.random(n_rows) < 0.1,
+        'danceability': rng.random(n_rows).round(3),
+        'energy': rng.random(n_rows).round(3),
+        'key': rng.integers(0, 12, n_rows),
+        'loudness': (rng.random(n_rows) * -30).round(3),
+        'mode': rng.integers(0, 2, n_rows),
+        'speechiness': rng.random(n_rows).round(4),
+        'acousticness': rng.random(n_rows).round(4),
+        'instrumentalness': (rng.random(n_rows) ** 4).round(6),
+        'liveness': rng.random(n_rows).round(4),
+        'valence': rng.random(n_rows).round(3),
+        'tempo': (60 + rng.random(n_rows) * 140).round(3),
+        'time_signature': rng.integers(3, 6, n_rows),
+        'track_genre': np.array(GENRES, dtype=object)[rng.integers(0, len(GENRES), n_rows)],
+    })
+
+
+def make_raw_csv(path, n_rows=RAW_ROWS, seed=0, duplicate_ratio=0.1):
+    """
+    Escreve o CSV bruto sintético em path.
+
+    :return: path
+    """
+    make_raw_dataframe(n_rows, seed, duplicate_ratio).to_csv(path, index=False)
+    return path
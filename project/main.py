@@ -1,53 +1,57 @@
 import os
 import sys
+import time
 
+from src import instrumentation
 from src.services.graph_service import GraphService
-from src.algorithm.search import dijkstra
+from src.algorithm.contraction import ch_search
+from src.algorithm.landmarks import alt_search
+from src.algorithm.search import PathCache, SearchStats, astar, bidirectional_dijkstra, dijkstra
+from src.services.autocomplete import Autocomplete
+from src.services.search_index import SongIndex
 
 # Caminho raiz do projeto
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Resultados e árvores de caminhos já calculados (descartados quando o grafo muda de versão)
+CACHE_CAMINHOS = PathCache()
 
-def buscar_musicas(G, termo):
+# Algoritmos de menor caminho disponíveis na interface (todos devolvem o mesmo custo)
+ALGORITMOS = {
+    'dijkstra': 'Dijkstra',
+    'bidirecional': 'Dijkstra bidirecional',
+    'astar': 'A* (heurística euclidiana)',
+    'alt': 'ALT (A* com landmarks)',
+    'ch': 'Hierarquia de contração',
+}
+
+
+def resolver_algoritmo(nome):
     """
-    Busca músicas que contém o termo no nome ou artista.
-    Retorna lista de (node_id, data, score) ordenada por relevância.
+    Retorna a função de busca de caminho pelo nome (ver ALGORITMOS).
     """
-    if not termo:
-        return []
-    
-    termo = termo.lower()
-    candidatos = []
+    funcoes = {
+        'dijkstra': dijkstra,
+        'bidirecional': bidirectional_dijkstra,
+        'astar': astar,
+        'alt': alt_search,
+        'ch': ch_search,
+    }
+    if nome not in funcoes:
+        raise ValueError(f"Algoritmo desconhecido: {nome}. Opções: {list(funcoes)}")
+    return funcoes[nome]
 
-    for node_id, data in G.nodes(data=True):
-        nome = data.get("name", "").lower()
-        artista = data.get("artist", "").lower()
-        
-        score = 0
-        
-        # Pontuação por tipo de match
-        if termo == nome:
-            score = 1000  # Match exato no nome
-        elif termo == artista:
-            score = 900   # Match exato no artista
-        elif nome.startswith(termo):
-            score = 500   # Começa com o termo
-        elif artista.startswith(termo):
-            score = 400   # Artista começa com o termo
-        elif termo in nome:
-            score = 100   # Contém o termo no nome
-        elif termo in artista:
-            score = 50    # Contém o termo no artista
-        
-        if score > 0:
-            # Penaliza nomes muito longos (preferência por matches mais específicos)
-            score -= len(nome) * 0.1
-            candidatos.append((node_id, data, score))
 
-    # Ordena por pontuação (maior primeiro)
-    candidatos.sort(key=lambda x: x[2], reverse=True)
-    
-    return candidatos
+def buscar_musicas(G, termo, limite=None):
+    """
+    Busca músicas que contém o termo no nome ou artista.
+    Retorna lista de (node_id, data, score) ordenada por relevância
+    (no máximo `limite` resultados, se informado).
+
+    Usa o índice de busca do grafo (SongIndex), construído uma vez por versão do grafo.
+    """
+    _, resultados = SongIndex.for_graph(G).search(termo, limite)
+    return resultados
 
 
 def formatar_musica(G, node_id):
@@ -76,11 +80,14 @@ def listar_e_selecionar_musica(G, tipo, termo_inicial=None):
     Returns:
         node_id da música selecionada ou None se cancelado
     """
+    sessao = None  # autocompletar incremental (termos terminados em '*')
+
     while True:
         # Se não há termo inicial, solicita
         if termo_inicial is None:
             print(f"\n🎵  Buscar música de {tipo}")
-            print("    (Digite parte do nome ou artista, ou 'sair' para cancelar)")
+            print("    (Digite parte do nome ou artista, o começo seguido de * para autocompletar,")
+            print("     ou 'sair' para cancelar)")
             termo = input(" → Busca: ").strip()
             
             if termo.lower() in ['sair', 'cancelar', 'exit']:
@@ -93,19 +100,22 @@ def listar_e_selecionar_musica(G, tipo, termo_inicial=None):
             print("⚠️  Digite algo para buscar!")
             continue
         
-        # Busca músicas
-        resultados = buscar_musicas(G, termo)
+        # Busca músicas (limita a 20 resultados para não poluir a tela)
+        if termo.endswith('*'):
+            # Autocompletar: refina as sugestões do prefixo anterior quando o termo cresce
+            if sessao is None:
+                sessao = Autocomplete.for_graph(G).session()
+            total, resultados_exibir = sessao.update(termo[:-1].strip(), limit=20)
+        else:
+            total, resultados_exibir = SongIndex.for_graph(G).search(termo, limit=20)
         
-        if not resultados:
+        if not total:
             print(f"❌ Nenhuma música encontrada com '{termo}'")
             print("    Tente outro termo de busca.\n")
             continue
         
-        # Limita a 20 resultados para não poluir a tela
-        resultados_exibir = resultados[:20]
-        
         # Exibe resultados
-        print(f"\n📋 Encontradas {len(resultados)} música(s) - Mostrando top {len(resultados_exibir)}:\n")
+        print(f"\n📋 Encontradas {total} música(s) - Mostrando top {len(resultados_exibir)}:\n")
         
         for i, (node_id, data, score) in enumerate(resultados_exibir, 1):
             nome = data.get("name", "??")
@@ -140,10 +150,16 @@ def listar_e_selecionar_musica(G, tipo, termo_inicial=None):
             print("❌ Digite um número válido!")
 
 
-def processar_busca_caminho(G, origem, destino):
-    """Processa e exibe o resultado da busca de caminho"""
+def processar_busca_caminho(G, origem, destino, algoritmo='dijkstra', verbose=False):
+    """
+    Processa e exibe o resultado da busca de caminho.
+    Com verbose=True a busca não passa pelo cache e as estatísticas dela
+    (nós fechados, arestas examinadas, operações na fila, tempo) são exibidas.
+    """
+    busca = resolver_algoritmo(algoritmo)
+
     print("\n" + "="*70)
-    print(f"🔍 Calculando menor caminho entre:")
+    print(f"🔍 Calculando menor caminho ({ALGORITMOS[algoritmo]}) entre:")
     print(f"   Origem : {formatar_musica(G, origem)}")
     print(f"   Destino: {formatar_musica(G, destino)}")
     print("="*70)
@@ -153,7 +169,11 @@ def processar_busca_caminho(G, origem, destino):
         return
 
     try:
-        path, dist = dijkstra(G, origem, destino)
+        stats = SearchStats() if verbose else None
+        if stats is not None:
+            path, dist = busca(G, origem, destino, stats=stats)
+        else:
+            path, dist = CACHE_CAMINHOS.shortest_path(G, origem, destino, busca)
 
         if path is None:
             print("\n❌ Nenhum caminho encontrado entre essas músicas!")
@@ -167,27 +187,89 @@ def processar_busca_caminho(G, origem, destino):
             
             print(f"\n🎯 Distância total: {dist:.4f}")
             print("="*70 + "\n")
+
+        if stats is not None:
+            exibir_estatisticas(stats)
     
     except Exception as e:
         print(f"❌ Erro ao calcular caminho: {e}\n")
 
 
-def menu_principal():
+def exibir_estatisticas(stats):
+    """Exibe as estatísticas de uma busca (SearchStats)"""
+    print("📊 Estatísticas da busca:")
+    print(f"   Nós fechados         : {stats.settled}")
+    print(f"   Arestas examinadas   : {stats.relaxed}")
+    print(f"   Inserções na fila    : {stats.pushes}")
+    print(f"   Remoções da fila     : {stats.pops}")
+    print(f"   Entradas descartadas : {stats.stale}")
+    print(f"   Tempo                : {stats.elapsed_s * 1000:.2f} ms\n")
+
+
+def menu_principal(algoritmo='dijkstra'):
     """Exibe menu principal"""
     print("\n" + "="*70)
     print("🎵  SISTEMA DE BUSCA DE CAMINHOS ENTRE MÚSICAS")
     print("="*70)
     print("\n  1. Buscar caminho entre duas músicas")
+    print(f"  2. Trocar algoritmo de busca (atual: {ALGORITMOS[algoritmo]})")
     print("  0. Sair")
     
     return input("\n → Escolha uma opção: ").strip()
 
 
-def executar_interface(G):
-    """Interface principal do sistema"""
+def selecionar_algoritmo(atual):
+    """
+    Pergunta qual algoritmo de menor caminho usar.
+    Retorna o nome escolhido (ou o atual, se a opção for inválida).
+    """
+    nomes = list(ALGORITMOS)
+    print()
+    for i, nome in enumerate(nomes, 1):
+        marcador = "*" if nome == atual else " "
+        print(f" {marcador}{i}. {ALGORITMOS[nome]}")
+
+    selecao = input("\n → Selecione o algoritmo: ").strip()
+    if selecao.isdigit() and 1 <= int(selecao) <= len(nomes):
+        escolhido = nomes[int(selecao) - 1]
+        print(f"✔ Algoritmo: {ALGORITMOS[escolhido]}")
+        return escolhido
+
+    print("❌ Opção inválida! Algoritmo mantido.")
+    return atual
+
+
+def preparar_algoritmo(service, algoritmo):
+    """
+    Prepara o índice que o algoritmo exige, só quando ele é escolhido:
+    landmarks para 'alt' e hierarquia de contração para 'ch' (ambos reaproveitados
+    do snapshot se o grafo não mudou). Se a hierarquia for cara demais para o k
+    do grafo (ver GraphService.CH_MAX_K), só é construída com confirmação.
+    Retorna True se o algoritmo pode ser usado.
+    """
+    try:
+        if algoritmo == 'alt':
+            service.get_landmarks()
+        elif algoritmo == 'ch' and service.get_hierarchy() is None:
+            resposta = input(" → Construir a hierarquia mesmo assim? (s/N): ").strip().lower()
+            if resposta not in ('s', 'sim'):
+                print(f"❌ {ALGORITMOS[algoritmo]} não foi preparada.")
+                return False
+            service.get_hierarchy(allow_large_k=True)
+    except Exception as e:
+        print(f"⚠️  {ALGORITMOS[algoritmo]} indisponível ({e}).")
+        return False
+    return True
+
+
+def executar_interface(G, algoritmo='dijkstra', verbose=False, service=None):
+    """
+    Interface principal do sistema. Com service, o índice de um algoritmo
+    escolhido no menu é preparado na hora (ver preparar_algoritmo).
+    """
         
     while True:
-        opcao = menu_principal()
+        opcao = menu_principal(algoritmo)
         
         if opcao == '1':
             # Buscar caminho
@@ -205,10 +287,20 @@ def executar_interface(G):
                 print("❌ Busca cancelada.\n")
                 continue
             
-            processar_busca_caminho(G, origem, destino)
+            processar_busca_caminho(G, origem, destino, algoritmo, verbose)
             
             input("\n[Pressione ENTER para continuar]")
         
+        elif opcao == '2':
+            escolhido = selecionar_algoritmo(algoritmo)
+            if service is None:
+                algoritmo = escolhido
+            elif preparar_algoritmo(service, escolhido):
+                algoritmo = escolhido
+                G = service.get_graph()  # o índice fica anexado ao grafo em cache do serviço
+            else:
+                print(f"❌ Algoritmo mantido: {ALGORITMOS[algoritmo]}")
+
         elif opcao == '0':
             print("\n👋 Até logo!\n")
             break
@@ -217,23 +309,37 @@ def executar_interface(G):
             print("❌ Opção inválida!")
 
 
-def main():
+def main(force_rebuild=False, algoritmo='dijkstra', verbose=False):
+    """
+    Ponto de entrada. ETL e grafo só são refeitos se as entradas mudaram
+    (ou com force_rebuild=True / argumento --rebuild).
+    O algoritmo de busca inicial pode ser escolhido com --algoritmo=<nome>, e
+    --trace=<arquivo.jsonl> grava os tempos de cada etapa (ver src.instrumentation).
+    Com --verbose cada busca de caminho exibe suas estatísticas (SearchStats).
+    """
     print("🔄 Carregando grafo, aguarde...")
+    inicio = time.perf_counter()
 
     service = GraphService(root_dir=BASE_DIR)
 
     try:
-        service.run_full_etl()
-        G = service.get_graph(force_rebuild=True)
+        resolver_algoritmo(algoritmo)  # valida o nome antes do carregamento
+        service.run_full_etl(force=force_rebuild)
+        G = service.get_graph(force_rebuild=force_rebuild)
 
         if not G or len(G.nodes) == 0:
             print("❌ Grafo vazio! Verifique os dados de entrada.")
             return
 
-        print(f"✔ Grafo carregado com sucesso!")
+        print(f"✔ Grafo carregado com sucesso! ({time.perf_counter() - inicio:.2f}s)")
+
+        # Landmarks (ALT) e hierarquia de contração têm pré-processamento caro: só quando pedidos
+        if not preparar_algoritmo(service, algoritmo):
+            algoritmo = 'dijkstra'
+        G = service.get_graph()  # o índice fica anexado ao grafo em cache do serviço
 
         # Inicia interface
-        executar_interface(G)
+        executar_interface(G, algoritmo, verbose, service)
 
     except FileNotFoundError as e:
         print(f"💥 Arquivo não encontrado: {e}")
@@ -246,4 +352,16 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = sys.argv[1:]
+    algoritmos = [a.split('=', 1)[1] for a in args if a.startswith('--algoritmo=')]
+
+    # --trace=<arquivo.jsonl>: grava os spans de tempo e contadores do pipeline
+    traces = [a.split('=', 1)[1] for a in args if a.startswith('--trace=')]
+    if traces:
+        instrumentation.add_sink(instrumentation.JsonLinesSink(traces[-1]))
+
+    main(
+        force_rebuild='--rebuild' in args,
+        algoritmo=algoritmos[-1] if algoritmos else 'dijkstra',
+        verbose='--verbose' in args,
+    )
\ No newline at end of file
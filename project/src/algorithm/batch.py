@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from src.algorithm.search import SearchStats, path_from_tree, shortest_path_tree
+from src.preprocessing.parallel import resolve_n_jobs
+
+
+# Grafo de cada processo do pool (recebido uma vez, no inicializador)
+_WORKER = {}
+
+
+def group_by_origin(pairs):
+    '''
+    Agrupa os pares pela origem, preservando a ordem da primeira ocorrência.
+
+    :param pairs: lista de (origem, destino)
+    :return: dict origem -> lista de (posição no pedido, destino)
+    '''
+    grupos = {}
+    for pos, (origem, destino) in enumerate(pairs):
+        grupos.setdefault(origem, []).append((pos, destino))
+    return grupos
+
+
+def batch_shortest_paths(graph, pairs, n_jobs=None, stats=None):
+    '''
+    Menores caminhos para muitos pares (origem, destino) de uma vez: uma única
+    busca completa (shortest_path_tree) por origem distinta, e todos os destinos
+    daquela origem saem da mesma árvore de predecessores. Os resultados são os
+    mesmos do dijkstra par a par.
+
+    :param graph: CSRGraph ou grafo NetworkX
+    :param pairs: lista de (origem, destino)
+    :param n_jobs: processos para distribuir as origens (None = serial, -1 = todos os núcleos)
+    :param stats: SearchStatsAggregate que recebe as estatísticas de cada árvore (opcional)
+    :return: lista de (caminho, distância) na ordem de pairs
+    '''
+    pairs = list(pairs)
+    grupos = group_by_origin(pairs)
+    for origem, destino in pairs:
+        for node in (origem, destino):
+            if node not in graph:
+                raise KeyError(node)
+
+    tarefas = [(origem, [d for _, d in destinos], stats is not None) for origem, destinos in grupos.items()]
+    jobs = min(resolve_n_jobs(n_jobs), len(tarefas))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(graph,)) as pool:
+            respostas = list(pool.map(_paths_task, tarefas))
+    else:
+        respostas = [_paths_from_origin(graph, *tarefa) for tarefa in tarefas]
+
+    resultados = [None] * len(pairs)
+    for destinos, (caminhos, estatisticas) in zip(grupos.values(), respostas):
+        if stats is not None:
+            stats.add(estatisticas)
+        for (pos, _), resultado in zip(destinos, caminhos):
+            resultados[pos] = resultado
+    return resultados
+
+
+def _paths_from_origin(graph, origem, destinos, com_stats=False):
+    '''
+    [INTERNO] Uma árvore a partir de origem; um caminho por destino.
+    :return: tupla (caminhos, dict das estatísticas da árvore ou None)
+    '''
+    estatisticas = SearchStats() if com_stats else None
+    tree = shortest_path_tree(graph, origem, stats=estatisticas)
+    caminhos = [path_from_tree(tree, destino) for destino in destinos]
+    return caminhos, (None if estatisticas is None else estatisticas.as_dict())
+
+
+def _init_worker(graph):
+    '''
+    [INTERNO] Inicializador do pool: guarda o grafo no processo.
+    '''
+    _WORKER.clear()
+    _WORKER['graph'] = graph
+
+
+def _paths_task(task):
+    '''
+    [INTERNO] Executa _paths_from_origin num processo do pool.
+    '''
+    return _paths_from_origin(_WORKER['graph'], *task)
@@ -0,0 +1,514 @@
+import heapq
+import itertools
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+from src.algorithm.search import _finish
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.snapshot import snapshot_state
+
+
+HIERARCHY_DIR = 'hierarchy'
+HIERARCHY_META = 'meta.json'
+# Um atalho só é dispensado se existir caminho testemunha estritamente mais curto
+# (com folga para o arredondamento das somas de pesos)
+WITNESS_TOLERANCE = 1e-12
+# Fontes por chamada do Dijkstra limitado das buscas de testemunha
+WITNESS_BATCH = 64
+# Máximo de pares (entrada x saída) avaliados de uma vez
+MAX_PAIRS = 2_000_000
+# Fração dos nós restantes (os de menor prioridade) candidata a cada rodada
+ROUND_FRACTION = 0.25
+
+
+class ContractionHierarchy:
+    """
+    Hierarquia de contração (CH) sobre o grafo K-NN. Os nós são contraídos em
+    rodadas, do menos ao mais importante (diferença de arestas); ao remover v,
+    cada caminho u -> v -> x que era o menor de u até x vira um atalho u -> x.
+    Cada nó guarda só as arestas para nós contraídos depois dele:
+        up:   arestas v -> x de saída (busca a partir da origem)
+        down: arestas u -> v de entrada (busca a partir do destino)
+    Atalhos guardam o nó do meio (middle >= 0), usado para desempacotar o caminho.
+    """
+
+    ARRAYS = ('indptr', 'indices', 'weights', 'middle')
+
+    def __init__(self, rank, up, down, key=None):
+        '''
+        :param rank: nível de contração de cada nó (n,)
+        :param up: tupla (indptr, indices, weights, middle) das arestas de saída para cima
+        :param down: tupla (indptr, indices, weights, middle) das arestas de entrada vindas de cima
+        :param key: impressão digital do grafo de origem (opcional)
+        '''
+        self.rank = rank
+        self.up = tuple(up)
+        self.down = tuple(down)
+        self.key = key
+
+    @classmethod
+    def build(cls, graph, key=None):
+        '''
+        Contrai todos os nós do grafo. Em cada rodada um conjunto independente
+        de nós de menor prioridade é contraído junto; as buscas de testemunha
+        rodam em lote (Dijkstra limitado do scipy) no grafo restante.
+
+        :param graph: CSRGraph
+        :param key: impressão digital do grafo, guardada junto da hierarquia
+        :return: ContractionHierarchy
+        '''
+        n = graph.number_of_nodes()
+        indptr = np.asarray(graph.indptr)
+        src = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        dst = np.asarray(graph.indices, dtype=np.int64)
+        laco = src != dst
+        arestas = _unique_edges(
+            src[laco], dst[laco], np.asarray(graph.weights, dtype=np.float64)[laco],
+            np.full(int(laco.sum()), -1, dtype=np.int64)
+        )
+
+        rank = np.full(n, -1, dtype=np.int64)
+        vivos = np.ones(n, dtype=bool)
+        removidos = np.zeros(n, dtype=np.int64)  # vizinhos já contraídos
+        prioridade = np.zeros(n)
+        sujos = np.ones(n, dtype=bool)
+        subidas, descidas = [], []
+        rodada = 0
+
+        while vivos.any():
+            restante = _Remaining(arestas, vivos)
+
+            # Prioridade = atalhos necessários - arestas removidas + vizinhos já contraídos
+            recalcular = np.flatnonzero(sujos & vivos)
+            atalhos = restante.count_shortcuts(recalcular)
+            prioridade[recalcular] = (
+                atalhos - restante.out_degree(recalcular) - restante.in_degree(recalcular)
+                + removidos[recalcular]
+            )
+            sujos[:] = False
+
+            S = restante.independent_set(prioridade, ROUND_FRACTION)
+            u, x, w, meio = restante.shortcuts(S)
+
+            rank[S] = rodada
+            vivos[S] = False
+            rodada += 1
+
+            src, dst, peso, middle = arestas
+            sai, entra = ~vivos[src], ~vivos[dst]
+            subidas.append((src[sai], dst[sai], peso[sai], middle[sai]))
+            descidas.append((dst[entra], src[entra], peso[entra], middle[entra]))
+
+            tocados = np.concatenate([src[sai | entra], dst[sai | entra]])
+            np.add.at(removidos, tocados, 1)
+            sujos[tocados] = True
+
+            manter = ~(sai | entra)
+            arestas = _unique_edges(
+                np.concatenate([src[manter], u]), np.concatenate([dst[manter], x]),
+                np.concatenate([peso[manter], w]), np.concatenate([middle[manter], meio])
+            )
+
+        return cls(rank, _to_csr(subidas, n), _to_csr(descidas, n), key)
+
+    def __len__(self):
+        return len(self.rank)
+
+    @property
+    def num_shortcuts(self):
+        return int((np.asarray(self.up[3]) >= 0).sum() + (np.asarray(self.down[3]) >= 0).sum())
+
+    @property
+    def num_edges(self):
+        return len(self.up[1]) + len(self.down[1])
+
+    @property
+    def nbytes(self):
+        return np.asarray(self.rank).nbytes + sum(np.asarray(a).nbytes for a in self.up + self.down)
+
+    def save(self, path, **meta):
+        '''
+        Salva a hierarquia num diretório (um .npy por array + meta.json).
+
+        :param path: diretório de destino
+        :param meta: valores extras gravados no meta.json
+        :return: path
+        '''
+        tmp = path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'rank.npy'), np.asarray(self.rank))
+        for lado, arrays in (('up', self.up), ('down', self.down)):
+            for nome, array in zip(self.ARRAYS, arrays):
+                np.save(os.path.join(tmp, f'{lado}_{nome}.npy'), np.asarray(array))
+        with open(os.path.join(tmp, HIERARCHY_META), 'w', encoding='utf-8') as f:
+            json.dump({'num_nodes': len(self), 'num_shortcuts': self.num_shortcuts, 'key': self.key, **meta}, f, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        :param path: diretório salvo por save()
+        :param mmap: mapeia os arrays em vez de lê-los inteiros
+        :return: ContractionHierarchy
+        '''
+        with open(os.path.join(path, HIERARCHY_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+
+        def carregar(nome):
+            return np.load(os.path.join(path, f'{nome}.npy'), mmap_mode=mode)
+
+        return cls(
+            carregar('rank'),
+            tuple(carregar(f'up_{nome}') for nome in cls.ARRAYS),
+            tuple(carregar(f'down_{nome}') for nome in cls.ARRAYS),
+            meta.get('key'),
+        )
+
+
+class _Remaining:
+    """
+    [INTERNO] Grafo ainda não contraído de uma rodada: listas de saída/entrada
+    (ids globais) e a matriz esparsa compacta usada nas buscas de testemunha.
+    """
+
+    def __init__(self, arestas, vivos):
+        self.src, self.dst, self.weights, _ = arestas
+        n = len(vivos)
+
+        self.out_order = np.argsort(self.src, kind='stable')
+        self.out_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.src, minlength=n))])
+        self.in_order = np.argsort(self.dst, kind='stable')
+        self.in_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.dst, minlength=n))])
+
+        self.vivos = np.flatnonzero(vivos)
+        self.local = np.full(n, -1, dtype=np.int64)
+        self.local[self.vivos] = np.arange(len(self.vivos))
+        m = len(self.vivos)
+        self.matrix = sp.csr_matrix(
+            (self.weights, (self.local[self.src], self.local[self.dst])), shape=(m, m)
+        )
+
+    def out_degree(self, nodes):
+        return self.out_ptr[nodes + 1] - self.out_ptr[nodes]
+
+    def in_degree(self, nodes):
+        return self.in_ptr[nodes + 1] - self.in_ptr[nodes]
+
+    def count_shortcuts(self, nodes):
+        '''
+        :return: número de atalhos que a contração de cada nó criaria
+        '''
+        contagem = np.zeros(len(self.local), dtype=np.int64)
+        for grupo in self._groups(nodes):
+            _, v, _, _ = self._needed(grupo)
+            np.add.at(contagem, v, 1)
+        return contagem[nodes]
+
+    def shortcuts(self, nodes):
+        '''
+        :return: arrays (u, x, peso, meio) dos atalhos da contração de nodes
+        '''
+        partes = [self._needed(grupo) for grupo in self._groups(nodes)]
+        if not partes:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio, np.empty(0), vazio
+        u, v, x, w = (np.concatenate(p) for p in zip(*partes))
+        return u, x, w, v
+
+    def independent_set(self, prioridade, fracao):
+        '''
+        Nós sem arestas entre si, escolhidos gulosamente em ordem de prioridade
+        entre a fração de menor prioridade dos restantes.
+        '''
+        candidatos = self.vivos[np.argsort(prioridade[self.vivos], kind='stable')]
+        candidatos = candidatos[:max(1, int(np.ceil(len(candidatos) * fracao)))]
+        bloqueados = np.zeros(len(self.local), dtype=bool)
+        escolhidos = []
+
+        for v in candidatos.tolist():
+            if bloqueados[v]:
+                continue
+            escolhidos.append(v)
+            bloqueados[self.dst[self.out_order[self.out_ptr[v]:self.out_ptr[v + 1]]]] = True
+            bloqueados[self.src[self.in_order[self.in_ptr[v]:self.in_ptr[v + 1]]]] = True
+
+        return np.asarray(escolhidos, dtype=np.int64)
+
+    def _groups(self, nodes):
+        '''
+        [INTERNO] Divide nodes em grupos de até MAX_PAIRS pares entrada x saída.
+        '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        pares = np.cumsum(self.in_degree(nodes) * self.out_degree(nodes))
+        inicio = 0
+        while inicio < len(nodes):
+            base = pares[inicio - 1] if inicio else 0
+            fim = max(inicio + 1, int(np.searchsorted(pares, base + MAX_PAIRS, side='right')))
+            yield nodes[inicio:fim]
+            inicio = fim
+
+    def _needed(self, nodes):
+        '''
+        [INTERNO] Pares (u -> v -> x) de nodes cujo caminho por v é o menor de u
+        até x (não há testemunha mais curta): esses viram atalhos.
+        '''
+        entradas = self.in_order[np.concatenate(
+            [np.arange(self.in_ptr[v], self.in_ptr[v + 1]) for v in nodes.tolist()] or [np.empty(0, dtype=np.int64)]
+        ).astype(np.int64)]
+        meio = self.dst[entradas]
+        por_entrada = self.out_degree(meio)
+
+        repetida = np.repeat(np.arange(len(entradas)), por_entrada)
+        deslocamento = np.arange(len(repetida)) - np.repeat(np.cumsum(por_entrada) - por_entrada, por_entrada)
+        saidas = self.out_order[self.out_ptr[meio[repetida]] + deslocamento]
+
+        u = self.src[entradas][repetida]
+        v = meio[repetida]
+        x = self.dst[saidas]
+        w = self.weights[entradas][repetida] + self.weights[saidas]
+        valido = u != x
+        u, v, x, w = u[valido], v[valido], x[valido], w[valido]
+
+        precisa = self._witness(self.local[u], self.local[x], w)
+        return u[precisa], v[precisa], x[precisa], w[precisa]
+
+    def _witness(self, u, x, w):
+        '''
+        [INTERNO] Para cada par, True se a menor distância de u a x (no grafo
+        restante, limitada ao custo via v) não for menor que w.
+        '''
+        precisa = np.ones(len(u), dtype=bool)
+        if not len(u):
+            return precisa
+
+        limite = np.zeros(self.matrix.shape[0])
+        np.maximum.at(limite, u, w)
+        fontes = np.unique(u)
+        # Fontes com limites parecidos na mesma chamada: o limite é o do lote
+        fontes = fontes[np.argsort(limite[fontes], kind='stable')]
+
+        ordem = np.argsort(u, kind='stable')
+        inicio = np.searchsorted(u[ordem], fontes)
+        fim = np.searchsorted(u[ordem], fontes, side='right')
+        posicao = np.full(self.matrix.shape[0], -1, dtype=np.int64)
+
+        for i in range(0, len(fontes), WITNESS_BATCH):
+            lote = fontes[i:i + WITNESS_BATCH]
+            posicao[lote] = np.arange(len(lote))
+            pares = ordem[np.concatenate([np.arange(a, b) for a, b in zip(inicio[i:i + WITNESS_BATCH], fim[i:i + WITNESS_BATCH])])]
+            dist = csgraph_dijkstra(self.matrix, indices=lote, limit=limite[lote].max() * (1 + 1e-9))
+            precisa[pares] = dist[posicao[u[pares]], x[pares]] >= w[pares] * (1 - WITNESS_TOLERANCE)
+
+        return precisa
+
+
+def _unique_edges(src, dst, weights, middle):
+    '''
+    [INTERNO] Mantém só a aresta de menor peso para cada par (src, dst).
+    '''
+    ordem = np.lexsort((weights, dst, src))
+    src, dst, weights, middle = src[ordem], dst[ordem], weights[ordem], middle[ordem]
+    primeira = np.ones(len(src), dtype=bool)
+    primeira[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    return src[primeira], dst[primeira], weights[primeira], middle[primeira]
+
+
+def _to_csr(partes, n):
+    '''
+    [INTERNO] Junta as arestas (dono, vizinho, peso, meio) das rodadas em CSR
+    por dono, com os vizinhos ordenados (busca binária no desempacotamento).
+    '''
+    dono, vizinho, peso, meio = (np.concatenate(p) for p in zip(*partes)) if partes else ([],) * 4
+    dono, vizinho = np.asarray(dono, dtype=np.int64), np.asarray(vizinho, dtype=np.int64)
+    ordem = np.lexsort((vizinho, dono))
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(dono, minlength=n))]).astype(np.int64)
+    return (
+        indptr,
+        vizinho[ordem],
+        np.asarray(peso, dtype=np.float64)[ordem],
+        np.asarray(meio, dtype=np.int64)[ordem],
+    )
+
+
+def save_hierarchy(snapshot_path, hierarchy):
+    '''
+    Guarda a hierarquia dentro do diretório do snapshot (<snapshot>/hierarchy),
+    junto do estado do snapshot que ela cobre (ver snapshot_state).
+
+    :return: path da hierarquia
+    '''
+    return hierarchy.save(os.path.join(snapshot_path, HIERARCHY_DIR), snapshot=snapshot_state(snapshot_path))
+
+
+def load_hierarchy(snapshot_path, key=None, mmap=True):
+    '''
+    Carrega a hierarquia guardada com o snapshot, se ainda corresponder a ele.
+
+    :param snapshot_path: diretório do snapshot
+    :param key: impressão digital esperada (None = não confere)
+    :return: ContractionHierarchy ou None se ausente/desatualizada
+    '''
+    path = os.path.join(snapshot_path, HIERARCHY_DIR)
+    meta_path = os.path.join(path, HIERARCHY_META)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, encoding='utf-8') as f:
+        dados = json.load(f)
+    if dados.get('snapshot') != snapshot_state(snapshot_path):
+        return None
+    if key is not None and dados.get('key') != key:
+        return None
+    return ContractionHierarchy.load(path, mmap=mmap)
+
+
+def ch_search(graph, source, target, hierarchy=None, stats=None):
+    '''
+    Menor caminho pela hierarquia de contração: busca bidirecional só por
+    arestas "para cima" (origem pelas up, destino pelas down); o melhor ponto de
+    encontro dá a distância, e os atalhos são desempacotados no caminho original.
+    O custo é somado aresta a aresta na ordem do caminho, como no dijkstra.
+
+    :param graph: CSRGraph
+    :param source: id da música de origem
+    :param target: id da música de destino
+    :param hierarchy: ContractionHierarchy; se None usa graph.hierarchy
+    :param stats: SearchStats a preencher (opcional; nós podados pelo stall-on-demand
+        contam como fechados sem arestas examinadas)
+    :return: tupla (caminho, distância), ou (None, inf) se não houver caminho
+    '''
+    hierarchy = hierarchy if hierarchy is not None else getattr(graph, 'hierarchy', None)
+    if not isinstance(graph, CSRGraph):
+        raise TypeError("ch_search requer um CSRGraph")
+    if hierarchy is None:
+        raise ValueError("Grafo sem hierarquia de contração. Use ContractionHierarchy.build ou GraphService.get_hierarchy.")
+
+    inicio = time.perf_counter()
+    s, t = graph.index_of(source), graph.index_of(target)
+    if s == t:
+        if stats is not None:
+            stats.record(0, 0, 0, 0)
+        return _finish(stats, inicio, [source], 0.0)
+
+    arestas = _upward_search(hierarchy, s, t, stats)
+    if arestas is None:
+        return _finish(stats, inicio, None, float('inf'))
+
+    path, custo = [s], 0.0
+    for _, v, peso in _unpack(hierarchy, arestas):
+        path.append(v)
+        custo += peso
+    return _finish(stats, inicio, graph.node_ids[np.asarray(path)].tolist(), custo)
+
+
+def _upward_search(hierarchy, s, t, stats=None):
+    '''
+    [INTERNO] Busca bidirecional para cima. Cada lado para quando o topo da sua
+    fila já não melhora o melhor encontro (mu).
+    :return: arestas (a, b, peso, meio) do caminho na hierarquia, ou None
+    '''
+    ordem = itertools.count()
+    grafos = (hierarchy.up, hierarchy.down)
+    dist = ({s: 0.0}, {t: 0.0})
+    # prev[lado][nó] = (nó anterior na busca, posição da aresta na lista do anterior)
+    prev = ({s: None}, {t: None})
+    filas = ([(0.0, next(ordem), s)], [(0.0, next(ordem), t)])
+    mu, encontro = float('inf'), None
+    pops = stale = relaxed = descartadas = 0
+
+    while filas[0] or filas[1]:
+        lado = 0 if filas[0] and (not filas[1] or filas[0][0][0] <= filas[1][0][0]) else 1
+        current_dist, _, current_node = heapq.heappop(filas[lado])
+        pops += 1
+        if current_dist >= mu:
+            stale += 1
+            descartadas += len(filas[lado])
+            filas[lado].clear()
+            continue
+        if current_dist > dist[lado][current_node]:
+            stale += 1
+            continue
+
+        outro = dist[1 - lado].get(current_node)
+        if outro is not None and current_dist + outro < mu:
+            mu, encontro = current_dist + outro, current_node
+
+        # Stall-on-demand: se um nó mais alto já chega a este por menos, ele não
+        # está num menor caminho para cima e não precisa ser expandido
+        indptr, indices, weights, _ = grafos[1 - lado]
+        inicio, fim = int(indptr[current_node]), int(indptr[current_node + 1])
+        if any(dist[lado].get(u, float('inf')) + weight < current_dist
+               for u, weight in zip(indices[inicio:fim].tolist(), weights[inicio:fim].tolist())):
+            continue
+
+        indptr, indices, weights, _ = grafos[lado]
+        inicio, fim = int(indptr[current_node]), int(indptr[current_node + 1])
+        relaxed += fim - inicio
+        for pos, (neighbor, weight) in enumerate(zip(indices[inicio:fim].tolist(), weights[inicio:fim].tolist()), inicio):
+            new_dist = current_dist + weight
+            if new_dist < dist[lado].get(neighbor, float('inf')):
+                dist[lado][neighbor] = new_dist
+                prev[lado][neighbor] = (current_node, pos)
+                heapq.heappush(filas[lado], (new_dist, next(ordem), neighbor))
+
+    if stats is not None:
+        stats.record(pops, stale, relaxed, pops + descartadas)
+
+    if encontro is None:
+        return None
+
+    # origem .. encontro pelas arestas up; encontro .. destino pelas down
+    ida = []
+    current = encontro
+    while prev[0][current] is not None:
+        anterior, pos = prev[0][current]
+        ida.append((anterior, current, float(hierarchy.up[2][pos]), int(hierarchy.up[3][pos])))
+        current = anterior
+    ida.reverse()
+
+    volta = []
+    current = encontro
+    while prev[1][current] is not None:
+        proximo, pos = prev[1][current]
+        volta.append((current, proximo, float(hierarchy.down[2][pos]), int(hierarchy.down[3][pos])))
+        current = proximo
+
+    return ida + volta
+
+
+def _unpack(hierarchy, arestas):
+    '''
+    [INTERNO] Expande os atalhos: a -> b via m vira a -> m (down de m) e m -> b (up de m).
+    :return: lista de arestas originais (a, b, peso) em ordem
+    '''
+    saida = []
+    pilha = list(reversed(arestas))
+    while pilha:
+        a, b, peso, meio = pilha.pop()
+        if meio < 0:
+            saida.append((a, b, peso))
+            continue
+        pilha.append(_edge(hierarchy.up, meio, b, meio, b))
+        pilha.append(_edge(hierarchy.down, meio, a, a, meio))
+    return saida
+
+
+def _edge(lista, dono, vizinho, a, b):
+    '''
+    [INTERNO] Aresta (a, b, peso, meio) guardada na lista do dono (vizinhos ordenados).
+    '''
+    indptr, indices, weights, middle = lista
+    inicio, fim = int(indptr[dono]), int(indptr[dono + 1])
+    pos = inicio + int(np.searchsorted(indices[inicio:fim], vizinho))
+    return a, b, float(weights[pos]), int(middle[pos])
@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+from src.algorithm.search import HEURISTIC_SLACK, _astar, _euclidean_heuristic, _finish
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.snapshot import snapshot_state
+
+
+LANDMARKS_DIR = 'landmarks'
+LANDMARKS_META = 'meta.json'
+STRATEGIES = ('farthest', 'random')
+
+
+class LandmarkIndex:
+    """
+    Pré-processamento ALT (A*, Landmarks e desigualdade Triangular).
+    Para L músicas de referência (landmarks) guarda a distância de cada landmark
+    até todos os nós (forward, L x n) e de todos os nós até cada landmark
+    (backward, L x n). Para um destino t, o custo restante de v é pelo menos
+        max_L( d(L, t) - d(L, v),  d(v, L) - d(t, L) )
+    o que dá uma heurística admissível e consistente para o A*.
+    """
+
+    def __init__(self, landmarks, forward, backward, key=None):
+        '''
+        :param landmarks: ids internos dos landmarks (L,)
+        :param forward: distâncias landmark -> nó (L x n)
+        :param backward: distâncias nó -> landmark (L x n)
+        :param key: impressão digital do grafo de origem (opcional)
+        '''
+        self.landmarks = np.asarray(landmarks, dtype=np.int64)
+        self.forward = forward
+        self.backward = backward
+        self.key = key
+
+    @classmethod
+    def build(cls, graph, n_landmarks=16, strategy='farthest', seed=0, key=None):
+        '''
+        Escolhe os landmarks e calcula as distâncias (2 Dijkstras por landmark).
+
+        'farthest': o primeiro é sorteado; cada próximo é o nó mais distante dos
+        já escolhidos (maior distância mínima, ida ou volta), espalhando os landmarks
+        pelas bordas do grafo. 'random': sorteio simples.
+
+        :param graph: CSRGraph
+        :param n_landmarks: número de landmarks (L)
+        :param strategy: 'farthest' ou 'random'
+        :param seed: semente do sorteio
+        :param key: impressão digital do grafo, guardada junto do índice
+        :return: LandmarkIndex
+        '''
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estratégia desconhecida: {strategy}. Opções: {STRATEGIES}")
+
+        n = graph.number_of_nodes()
+        n_landmarks = max(0, min(n_landmarks, n))
+        matriz = _sparse_matrix(graph)
+        reversa = matriz.T.tocsr()
+        rng = np.random.default_rng(seed)
+
+        if strategy == 'random':
+            escolhidos = rng.choice(n, size=n_landmarks, replace=False)
+            forward = csgraph_dijkstra(matriz, indices=escolhidos)
+            backward = csgraph_dijkstra(reversa, indices=escolhidos)
+            return cls(escolhidos, forward, backward, key)
+
+        escolhidos = []
+        forward = np.empty((n_landmarks, n))
+        backward = np.empty((n_landmarks, n))
+        minima = np.full(n, np.inf)
+        proximo = int(rng.integers(n)) if n else 0
+
+        for i in range(n_landmarks):
+            escolhidos.append(proximo)
+            forward[i] = csgraph_dijkstra(matriz, indices=proximo)
+            backward[i] = csgraph_dijkstra(reversa, indices=proximo)
+
+            # Distância "ida ou volta" ao landmark; nós inalcançáveis não contam como distantes
+            perto = np.fmin(forward[i], backward[i])
+            minima = np.minimum(minima, np.where(np.isfinite(perto), perto, -np.inf))
+            minima[escolhidos] = -np.inf
+            proximo = int(np.argmax(minima))
+
+        return cls(escolhidos, forward, backward, key)
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    @property
+    def nbytes(self):
+        return self.landmarks.nbytes + np.asarray(self.forward).nbytes + np.asarray(self.backward).nbytes
+
+    def heuristic(self, target):
+        '''
+        :param target: id interno do destino
+        :return: função lista de ids internos -> limites inferiores até target
+        '''
+        para_alvo = np.asarray(self.forward[:, target])[:, None]
+        do_alvo = np.asarray(self.backward[:, target])[:, None]
+
+        def heuristica(nodes):
+            if len(self) == 0:
+                return [0.0] * len(nodes)
+            nodes = np.asarray(nodes, dtype=np.int64)
+            with np.errstate(invalid='ignore'):
+                limites = np.maximum(
+                    para_alvo - np.asarray(self.forward[:, nodes]),
+                    np.asarray(self.backward[:, nodes]) - do_alvo
+                )
+            # inf - inf (landmark sem informação sobre o par) não limita nada
+            limites = np.nan_to_num(limites, nan=0.0, posinf=np.inf, neginf=0.0)
+            return (np.maximum(limites.max(axis=0), 0.0) * HEURISTIC_SLACK).tolist()
+
+        return heuristica
+
+    def save(self, path, **meta):
+        '''
+        Salva o índice num diretório (um .npy por array + meta.json).
+
+        :param path: diretório de destino
+        :param meta: valores extras gravados no meta.json
+        :return: path
+        '''
+        tmp = path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'landmarks.npy'), self.landmarks)
+        np.save(os.path.join(tmp, 'forward.npy'), np.asarray(self.forward, dtype=np.float64))
+        np.save(os.path.join(tmp, 'backward.npy'), np.asarray(self.backward, dtype=np.float64))
+        with open(os.path.join(tmp, LANDMARKS_META), 'w', encoding='utf-8') as f:
+            json.dump({'num_landmarks': len(self), 'key': self.key, **meta}, f, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        :param path: diretório salvo por save()
+        :param mmap: mapeia as matrizes de distância em vez de lê-las inteiras
+        :return: LandmarkIndex
+        '''
+        with open(os.path.join(path, LANDMARKS_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        return cls(
+            np.load(os.path.join(path, 'landmarks.npy')),
+            np.load(os.path.join(path, 'forward.npy'), mmap_mode=mode),
+            np.load(os.path.join(path, 'backward.npy'), mmap_mode=mode),
+            meta.get('key'),
+        )
+
+
+def _sparse_matrix(graph):
+    '''
+    [INTERNO] Matriz esparsa de adjacência (pesos) do CSRGraph, sem cópia da topologia.
+    '''
+    n = graph.number_of_nodes()
+    return sp.csr_matrix(
+        (np.asarray(graph.weights), np.asarray(graph.indices), np.asarray(graph.indptr)),
+        shape=(n, n)
+    )
+
+
+def save_landmarks(snapshot_path, index):
+    '''
+    Guarda o índice dentro do diretório do snapshot (<snapshot>/landmarks).
+    A chave registrada inclui os deltas já aplicados: um add_tracks posterior
+    (novo delta) ou um snapshot reescrito invalida os landmarks.
+
+    :return: path do índice
+    '''
+    return index.save(os.path.join(snapshot_path, LANDMARKS_DIR), snapshot=snapshot_state(snapshot_path))
+
+
+def load_landmarks(snapshot_path, key=None, mmap=True):
+    '''
+    Carrega os landmarks guardados com o snapshot, se ainda corresponderem a ele.
+
+    :param snapshot_path: diretório do snapshot
+    :param key: impressão digital esperada (None = não confere)
+    :return: LandmarkIndex ou None se ausente/desatualizado
+    '''
+    path = os.path.join(snapshot_path, LANDMARKS_DIR)
+    meta_path = os.path.join(path, LANDMARKS_META)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, encoding='utf-8') as f:
+        dados = json.load(f)
+    if dados.get('snapshot') != snapshot_state(snapshot_path):
+        return None
+    if key is not None and dados.get('key') != key:
+        return None
+    return LandmarkIndex.load(path, mmap=mmap)
+
+
+def alt_search(graph, source, target, landmarks=None, stats=None):
+    '''
+    Menor caminho com A* guiado por landmarks (ALT). A heurística é o maior
+    entre o limite dos landmarks e a distância euclidiana das features (se o
+    grafo as tiver); os dois são admissíveis, então o caminho é ótimo.
+
+    :param graph: CSRGraph
+    :param source: id da música de origem
+    :param target: id da música de destino
+    :param landmarks: LandmarkIndex; se None usa graph.landmarks
+    :param stats: SearchStats a preencher (opcional)
+    :return: tupla (caminho, distância), ou (None, inf) se não houver caminho
+    '''
+    landmarks = landmarks if landmarks is not None else getattr(graph, 'landmarks', None)
+    if not isinstance(graph, CSRGraph):
+        raise TypeError("alt_search requer um CSRGraph")
+    if landmarks is None:
+        raise ValueError("Grafo sem landmarks. Use LandmarkIndex.build ou GraphService.get_landmarks.")
+
+    inicio = time.perf_counter()
+    s, t = graph.index_of(source), graph.index_of(target)
+    alt = landmarks.heuristic(t)
+    if graph.features is not None:
+        euclidiana = _euclidean_heuristic(np.asarray(graph.features), t)
+
+        def heuristica(nodes):
+            return np.maximum(alt(nodes), euclidiana(nodes)).tolist()
+    else:
+        heuristica = alt
+
+    def vizinhos(i):
+        indices, pesos = graph.neighbors_of(i)
+        return indices.tolist(), pesos.tolist()
+
+    path, custo = _astar(s, t, vizinhos, heuristica, stats)
+    return _finish(stats, inicio, (None if path is None else graph.node_ids[np.asarray(path)].tolist()), custo)
@@ -1,24 +1,142 @@
 import heapq
+import itertools
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 
+from src.preprocessing.csr_graph import CSRGraph
+
+# A heurística é multiplicada por este fator para absorver o erro de arredondamento
+# entre o peso calculado no K-NN (cdist) e a distância recalculada aqui.
+HEURISTIC_SLACK = 1.0 - 1e-9
+
+# Atributo do grafo (G.graph) com a versão carimbada pelo GraphService
+GRAPH_VERSION_ATTR = 'version'
+# Orçamento padrão do PathCache
+DEFAULT_CACHE_BYTES = 64 * 2**20
+# Origens (as mais recentes) cujas falhas o PathCache conta para decidir quando guardar a árvore
+DEFAULT_TRACKED_ORIGINS = 4096
+
+
+class SearchStats:
+    """
+    Estatísticas de uma busca de menor caminho. Opcionais: as funções de busca
+    só as preenchem quando recebem um SearchStats em stats=.
+        settled:   nós fechados (retirados da fila com a distância final)
+        relaxed:   arestas examinadas a partir dos nós fechados
+        pushes:    entradas inseridas na fila de prioridade
+        pops:      entradas retiradas da fila
+        stale:     entradas retiradas e descartadas (nó já fechado por uma distância
+                   menor ou, na hierarquia de contração, além do melhor encontro)
+        elapsed_s: tempo da busca, em segundos
+    Os contadores são somados só a cada retirada da fila (pushes sai do tamanho
+    final da fila), então o custo com stats é pequeno; sem stats é nenhum.
+    """
+
+    FIELDS = ('settled', 'relaxed', 'pushes', 'pops', 'stale', 'elapsed_s')
+
+    __slots__ = FIELDS
+
+    def __init__(self):
+        self.settled = self.relaxed = self.pushes = self.pops = self.stale = 0
+        self.elapsed_s = 0.0
+
+    def record(self, pops, stale, relaxed, pushes, settled=None):
+        '''
+        Guarda os contadores de uma busca (settled padrão: pops - stale).
+        '''
+        self.pops = pops
+        self.stale = stale
+        self.relaxed = relaxed
+        self.pushes = pushes
+        self.settled = pops - stale if settled is None else settled
+
+    def as_dict(self):
+        '''
+        :return: dict campo -> valor
+        '''
+        return {campo: getattr(self, campo) for campo in self.FIELDS}
+
+    def __repr__(self):
+        campos = ', '.join(f"{campo}={valor}" for campo, valor in self.as_dict().items())
+        return f"SearchStats({campos})"
+
+
+class SearchStatsAggregate:
+    """
+    Junta as estatísticas de muitas buscas (ex: um lote de consultas) para
+    resumos e histogramas por campo.
+    """
+
+    def __init__(self):
+        self.values = {campo: [] for campo in SearchStats.FIELDS}
+
+    def __len__(self):
+        return len(self.values['pops'])
+
+    def add(self, stats):
+        '''
+        :param stats: SearchStats (ou dict campo -> valor) de uma busca
+        '''
+        valores = stats if isinstance(stats, dict) else stats.as_dict()
+        for campo in SearchStats.FIELDS:
+            self.values[campo].append(valores[campo])
 
-def dijkstra(graph, source, target):
+    def histogram(self, field, bins=10):
+        '''
+        :param field: campo de SearchStats (ex: 'settled')
+        :param bins: número de faixas (ou bordas), como em np.histogram
+        :return: tupla (contagens, bordas)
+        '''
+        return np.histogram(np.asarray(self.values[field], dtype=np.float64), bins=bins)
+
+    def summary(self):
+        '''
+        :return: dict campo -> {'total', 'mean', 'p50', 'p90', 'p99', 'max'}
+        '''
+        resumo = {}
+        for campo, valores in self.values.items():
+            if not valores:
+                continue
+            a = np.asarray(valores, dtype=np.float64)
+            p50, p90, p99 = np.percentile(a, [50, 90, 99]).tolist()
+            resumo[campo] = {
+                'total': float(a.sum()), 'mean': float(a.mean()),
+                'p50': p50, 'p90': p90, 'p99': p99, 'max': float(a.max()),
+            }
+        return resumo
+
+
+def dijkstra(graph, source, target, stats=None):
+    '''
+    :param stats: SearchStats a preencher (opcional)
+    :return: tupla (caminho, distância), ou (None, inf) se não houver caminho
+    '''
+    inicio = time.perf_counter()
     dist = {node: float('inf') for node in graph.nodes}
     prev = {node: None for node in graph.nodes}
     dist[source] = 0
     pq = [(0, source)]
+    pops = stale = relaxed = 0
 
     while pq:
         current_dist, current_node = heapq.heappop(pq)
+        pops += 1
 
         if current_dist > dist[current_node]:
+           stale += 1
            continue
        
         if current_node == target:
            break
 
-        for neighbor, data in graph[current_node].items():
+        vizinhos = graph[current_node]
+        relaxed += len(vizinhos)
+        for neighbor, data in vizinhos.items():
             weight = data.get('weight', 1.0)
             new_dist = current_dist + weight
 
@@ -27,6 +145,10 @@ def dijkstra(graph, source, target):
                 prev[neighbor] = current_node
                 heapq.heappush(pq, (new_dist, neighbor))
 
+    if stats is not None:
+        stats.record(pops, stale, relaxed, pops + len(pq))
+        stats.elapsed_s = time.perf_counter() - inicio
+
     if dist[target] == float('inf'):
         return None, float('inf')
         
@@ -39,6 +161,521 @@ def dijkstra(graph, source, target):
     path.reverse()
     return path, dist[target]
 
+
+def shortest_path_tree(graph, source, stats=None):
+    '''
+    Dijkstra completo a partir de source (sem destino): distância e predecessor
+    de todos os nós alcançáveis. Segue a mesma ordem de expansão e o mesmo
+    desempate do dijkstra, então os caminhos extraídos (path_from_tree) são
+    idênticos aos dele para qualquer destino.
+
+    :param graph: CSRGraph ou grafo NetworkX
+    :param source: id da música de origem
+    :param stats: SearchStats a preencher (opcional)
+    :return: tupla (dist, prev): dicts id -> distância e id -> id anterior (None na origem)
+    '''
+    if source not in graph:
+        raise KeyError(source)
+
+    inicio = time.perf_counter()
+    pops = stale = relaxed = 0
+
+    if isinstance(graph, CSRGraph):
+        ids = graph.node_ids.tolist()
+        s = graph.index_of(source)
+        dist = {s: 0}
+        prev = {s: None}
+        pq = [(0, source, s)]  # (distância, id, índice): desempata pelo id, como o dijkstra
+
+        while pq:
+            current_dist, _, current = heapq.heappop(pq)
+            pops += 1
+            if current_dist > dist[current]:
+                stale += 1
+                continue
+
+            indices, pesos = graph.neighbors_of(current)
+            relaxed += len(indices)
+            for neighbor, weight in zip(indices.tolist(), pesos.tolist()):
+                new_dist = current_dist + weight
+                if new_dist < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = new_dist
+                    prev[neighbor] = current
+                    heapq.heappush(pq, (new_dist, ids[neighbor], neighbor))
+
+        tree = (
+            {ids[i]: d for i, d in dist.items()},
+            {ids[i]: (None if p is None else ids[p]) for i, p in prev.items()},
+        )
+    else:
+        dist = {source: 0}
+        prev = {source: None}
+        pq = [(0, source)]
+
+        while pq:
+            current_dist, current_node = heapq.heappop(pq)
+            pops += 1
+            if current_dist > dist[current_node]:
+                stale += 1
+                continue
+
+            vizinhos = graph[current_node]
+            relaxed += len(vizinhos)
+            for neighbor, data in vizinhos.items():
+                new_dist = current_dist + data.get('weight', 1.0)
+                if new_dist < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = new_dist
+                    prev[neighbor] = current_node
+                    heapq.heappush(pq, (new_dist, neighbor))
+
+        tree = dist, prev
+
+    if stats is not None:
+        stats.record(pops, stale, relaxed, pops)  # a fila termina vazia
+        stats.elapsed_s = time.perf_counter() - inicio
+    return tree
+
+
+def path_from_tree(tree, target):
+    '''
+    Caminho da origem da árvore (shortest_path_tree) até target.
+
+    :param tree: tupla (dist, prev)
+    :param target: id da música de destino
+    :return: tupla (caminho, distância), ou (None, inf) se target não é alcançável
+    '''
+    dist, prev = tree
+    if target not in dist:
+        return None, float('inf')
+
+    path = []
+    current = target
+    while current is not None:
+        path.append(current)
+        current = prev[current]
+
+    path.reverse()
+    return path, dist[target]
+
+
+def astar(graph, source, target, features=None, stats=None):
+    '''
+    Menor caminho com A*. Os pesos do grafo são distâncias euclidianas entre
+    as features normalizadas, então a distância em linha reta de um nó até o
+    destino nunca superestima o custo restante (desigualdade triangular): a
+    heurística é admissível e consistente e o caminho é ótimo, como no dijkstra.
+    O estado (dist/prev) só é criado para os nós alcançados pela busca.
+
+    :param graph: CSRGraph (usa graph.features) ou nx.DiGraph
+    :param source: id da música de origem
+    :param target: id da música de destino
+    :param features: matriz (n x features) na ordem dos nós do CSRGraph, ou dict
+        {id: vetor} para NetworkX; sem features a heurística é zero (vira Dijkstra)
+    :param stats: SearchStats a preencher (opcional)
+    :return: tupla (caminho, distância), ou (None, inf) se não houver caminho
+    '''
+    inicio = time.perf_counter()
+    if isinstance(graph, CSRGraph):
+        s, t = graph.index_of(source), graph.index_of(target)
+        F = graph.features if features is None else features
+
+        def vizinhos_csr(i):
+            indices, pesos = graph.neighbors_of(i)
+            return indices.tolist(), pesos.tolist()
+
+        heuristica = _euclidean_heuristic(None if F is None else np.asarray(F), t)
+        path, custo = _astar(s, t, vizinhos_csr, heuristica, stats)
+        return _finish(stats, inicio, (None if path is None else graph.node_ids[np.asarray(path)].tolist()), custo)
+
+    if source not in graph or target not in graph:
+        raise KeyError(source if source not in graph else target)
+
+    def vizinhos_nx(u):
+        items = list(graph[u].items())
+        return [v for v, _ in items], [data.get('weight', 1.0) for _, data in items]
+
+    heuristica = _euclidean_heuristic(features, target)
+    return _finish(stats, inicio, *_astar(source, target, vizinhos_nx, heuristica, stats))
+
+
+def bidirectional_dijkstra(graph, source, target, stats=None):
+    '''
+    Dijkstra bidirecional: uma busca parte da origem pelas arestas de saída e
+    outra parte do destino pelas arestas de entrada (listas K-NN reversas);
+    cada passo avança a fronteira de menor distância. Para quando a soma dos
+    topos das duas filas já não melhora o melhor caminho encontrado (mu).
+    O custo é o mesmo do dijkstra, expandindo bem menos nós.
+
+    :param graph: CSRGraph (usa o índice reverso) ou grafo NetworkX
+    :param source: id da música de origem
+    :param target: id da música de destino
+    :param stats: SearchStats a preencher (opcional)
+    :return: tupla (caminho, distância), ou (None, inf) se não houver caminho
+    '''
+    inicio = time.perf_counter()
+    if isinstance(graph, CSRGraph):
+        s, t = graph.index_of(source), graph.index_of(target)
+
+        def saida_csr(i):
+            indices, pesos = graph.neighbors_of(i)
+            return zip(indices.tolist(), pesos.tolist())
+
+        def entrada_csr(i):
+            indices, pesos = graph.predecessors_of(i)
+            return zip(indices.tolist(), pesos.tolist())
+
+        path, custo = _bidirectional(s, t, saida_csr, entrada_csr, stats)
+        return _finish(stats, inicio, (None if path is None else graph.node_ids[np.asarray(path)].tolist()), custo)
+
+    if source not in graph or target not in graph:
+        raise KeyError(source if source not in graph else target)
+
+    succ = graph.succ if graph.is_directed() else graph.adj
+    pred = graph.pred if graph.is_directed() else graph.adj
+
+    def saida_nx(u):
+        return ((v, data.get('weight', 1.0)) for v, data in succ[u].items())
+
+    def entrada_nx(u):
+        return ((v, data.get('weight', 1.0)) for v, data in pred[u].items())
+
+    return _finish(stats, inicio, *_bidirectional(source, target, saida_nx, entrada_nx, stats))
+
+
+def _bidirectional(source, target, saida, entrada, stats=None):
+    '''
+    [INTERNO] Laço do Dijkstra bidirecional sobre funções de arestas de saída e de entrada.
+    '''
+    if source == target:
+        if stats is not None:
+            stats.record(0, 0, 0, 0)
+        return [source], 0.0
+
+    ordem = itertools.count()
+    # Índice 0: busca para frente (origem); 1: para trás (destino)
+    dist = ({source: 0.0}, {target: 0.0})
+    prev = ({source: None}, {target: None})
+    filas = ([(0.0, next(ordem), source)], [(0.0, next(ordem), target)])
+    arestas = (saida, entrada)
+    fechados = (set(), set())
+    mu, encontro = float('inf'), None
+    pops = stale = relaxed = 0
+
+    while filas[0] and filas[1]:
+        if filas[0][0][0] + filas[1][0][0] >= mu:
+            break
+
+        lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+        outro = 1 - lado
+        current_dist, _, current_node = heapq.heappop(filas[lado])
+        pops += 1
+
+        if current_node in fechados[lado]:
+            stale += 1
+            continue
+        fechados[lado].add(current_node)
+
+        for neighbor, weight in arestas[lado](current_node):
+            relaxed += 1
+            new_dist = current_dist + weight
+            if new_dist < dist[lado].get(neighbor, float('inf')):
+                dist[lado][neighbor] = new_dist
+                prev[lado][neighbor] = current_node
+                heapq.heappush(filas[lado], (new_dist, next(ordem), neighbor))
+
+            if neighbor in dist[outro] and new_dist + dist[outro][neighbor] < mu:
+                mu = new_dist + dist[outro][neighbor]
+                encontro = (current_node, neighbor) if lado == 0 else (neighbor, current_node)
+
+    if stats is not None:
+        stats.record(pops, stale, relaxed, pops + len(filas[0]) + len(filas[1]))
+
+    if encontro is None:
+        return None, float('inf')
+
+    # encontro = aresta (u, v) do caminho: origem..u pela busca para frente, v..destino pela de trás
+    path = []
+    current = encontro[0]
+    while current is not None:
+        path.append(current)
+        current = prev[0][current]
+    path.reverse()
+
+    current = encontro[1]
+    while current is not None:
+        path.append(current)
+        current = prev[1][current]
+
+    return path, mu
+
+
+def _euclidean_heuristic(features, target):
+    '''
+    [INTERNO] Função nós -> distâncias euclidianas até o destino (em lote).
+    features pode ser matriz indexada por posição, dict {id: vetor} ou None.
+    '''
+    if features is None:
+        return lambda nodes: [0.0] * len(nodes)
+
+    alvo = np.asarray(features[target], dtype=np.float64)
+
+    def heuristica(nodes):
+        if isinstance(features, np.ndarray):
+            vetores = features[nodes]
+        else:
+            vetores = np.array([features[v] for v in nodes], dtype=np.float64)
+        diff = vetores - alvo
+        return (np.sqrt(np.einsum('ij,ij->i', diff, diff)) * HEURISTIC_SLACK).tolist()
+
+    return heuristica
+
+
+def _astar(source, target, vizinhos, heuristica, stats=None):
+    '''
+    [INTERNO] Laço do A* sobre uma função de vizinhos e uma heurística em lote.
+    '''
+    dist = {source: 0.0}
+    prev = {source: None}
+    ordem = itertools.count()  # desempate sem comparar os ids dos nós
+    pq = [(heuristica([source])[0], next(ordem), 0.0, source)]
+    pops = stale = relaxed = 0
+
+    while pq:
+        _, _, current_dist, current_node = heapq.heappop(pq)
+        pops += 1
+
+        if current_dist > dist[current_node]:
+            stale += 1
+            continue
+
+        if current_node == target:
+            break
+
+        nodes, pesos = vizinhos(current_node)
+        relaxed += len(nodes)
+        melhores = [
+            (neighbor, current_dist + weight) for neighbor, weight in zip(nodes, pesos)
+            if current_dist + weight < dist.get(neighbor, float('inf'))
+        ]
+        if not melhores:
+            continue
+
+        for (neighbor, new_dist), h in zip(melhores, heuristica([v for v, _ in melhores])):
+            dist[neighbor] = new_dist
+            prev[neighbor] = current_node
+            heapq.heappush(pq, (new_dist + h, next(ordem), new_dist, neighbor))
+
+    if stats is not None:
+        stats.record(pops, stale, relaxed, pops + len(pq))
+
+    if target not in dist:
+        return None, float('inf')
+
+    path = []
+    current = target
+    while current is not None:
+        path.append(current)
+        current = prev[current]
+
+    path.reverse()
+    return path, dist[target]
+
+def _finish(stats, inicio, path, custo):
+    '''
+    [INTERNO] Fecha o tempo da busca em stats (se houver) e devolve (caminho, distância).
+    '''
+    if stats is not None:
+        stats.elapsed_s = time.perf_counter() - inicio
+    return path, custo
+
+
+def graph_version(graph):
+    '''
+    :return: versão do grafo (G.graph['version'], carimbada pelo GraphService) ou None
+    '''
+    atributos = getattr(graph, 'graph', None)
+    return atributos.get(GRAPH_VERSION_ATTR) if isinstance(atributos, dict) else None
+
+
+class PathCache:
+    """
+    Cache LRU de buscas de menor caminho, limitado em bytes. Guarda resultados
+    (origem, destino) por algoritmo e, para origens consultadas com frequência,
+    a árvore de menores caminhos inteira (shortest_path_tree), que responde
+    qualquer destino daquela origem sem nova busca (só para o dijkstra, cujos
+    caminhos ela reproduz exatamente).
+
+    As entradas valem para uma versão do grafo (graph_version): quando chega um
+    grafo de outra versão (rebuild, add_tracks) o cache é esvaziado. Grafos sem
+    versão não passam pelo cache.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, hot_origin_queries=3,
+                 max_tracked_origins=DEFAULT_TRACKED_ORIGINS):
+        '''
+        :param max_bytes: tamanho máximo estimado das entradas
+        :param hot_origin_queries: consultas (falhas) de uma origem para guardar a árvore dela
+        :param max_tracked_origins: origens (as mais recentes) com consultas contadas
+        '''
+        self.max_bytes = max_bytes
+        self.hot_origin_queries = hot_origin_queries
+        self.max_tracked_origins = max_tracked_origins
+        self.version = None
+        self.nbytes = 0
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # chave -> (valor, bytes), do menos ao mais recente
+        # origem -> falhas, da menos à mais recente; None = a árvore dela não cabe no orçamento
+        self._origin_queries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def shortest_path(self, graph, source, target, algorithm=dijkstra):
+        '''
+        Menor caminho de source a target, reaproveitando o cache quando possível.
+
+        :param graph: grafo (CSRGraph ou NetworkX)
+        :param algorithm: função (graph, source, target) -> (caminho, distância)
+        :return: tupla (caminho, distância), como o algoritmo
+        '''
+        version = graph_version(graph)
+        if version is None:
+            return algorithm(graph, source, target)
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+
+        chave = ('path', algorithm, source, target)
+        if chave in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(chave)
+            return _copy_result(self._entries[chave][0])
+
+        arvore = ('tree', source)
+        if algorithm is dijkstra and arvore in self._entries:
+            self.hits += 1
+            self.tree_hits += 1
+            self._entries.move_to_end(arvore)
+            return path_from_tree(self._entries[arvore][0], target)
+
+        self.misses += 1
+        consultas = self._count_origin(source)
+        if algorithm is dijkstra and consultas is not None and consultas >= self.hot_origin_queries:
+            tree = shortest_path_tree(graph, source)
+            tamanho = _tree_nbytes(tree)
+            if tamanho <= self.max_bytes:
+                self._drop_paths_from(source)  # a árvore responde todos os destinos dessa origem
+                self._store(arvore, tree, tamanho)
+                return path_from_tree(tree, target)
+            # Não cabe: as próximas falhas dessa origem voltam a buscar (e guardar) só o par
+            self._origin_queries[source] = None
+            resultado = path_from_tree(tree, target)
+        else:
+            resultado = algorithm(graph, source, target)
+        self._store(chave, _copy_result(resultado), _result_nbytes(resultado))
+        return resultado
+
+    def clear(self):
+        '''
+        Esvazia o cache (os contadores de acerto/falha são mantidos).
+        '''
+        self._entries.clear()
+        self._origin_queries.clear()
+        self.nbytes = 0
+        self.version = None
+
+    def stats(self):
+        '''
+        :return: dict com contadores, número de entradas/árvores e bytes usados
+        '''
+        consultas = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'tree_hits': self.tree_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / consultas if consultas else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'trees': sum(1 for chave in self._entries if chave[0] == 'tree'),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _count_origin(self, source):
+        '''
+        [INTERNO] Registra uma falha de source e devolve quantas ela já teve (None se a
+        árvore dela não cabe no cache). Só as max_tracked_origins origens mais
+        recentes são lembradas.
+        '''
+        consultas = self._origin_queries.pop(source, 0)
+        if consultas is not None:
+            consultas += 1
+        self._origin_queries[source] = consultas
+        if len(self._origin_queries) > self.max_tracked_origins:
+            self._origin_queries.popitem(last=False)
+        return consultas
+
+    def _drop_paths_from(self, source):
+        '''
+        [INTERNO] Remove os resultados (origem, destino) do dijkstra a partir de source.
+        '''
+        for chave in [c for c in self._entries if c[0] == 'path' and c[1] is dijkstra and c[2] == source]:
+            self.nbytes -= self._entries.pop(chave)[1]
+
+    def _store(self, chave, valor, tamanho):
+        '''
+        [INTERNO] Insere a entrada e descarta as menos recentes até caber no orçamento.
+        '''
+        if tamanho > self.max_bytes:
+            return
+        if chave in self._entries:
+            self.nbytes -= self._entries.pop(chave)[1]
+        self._entries[chave] = (valor, tamanho)
+        self.nbytes += tamanho
+
+        while self.nbytes > self.max_bytes:
+            _, (_, liberado) = self._entries.popitem(last=False)
+            self.nbytes -= liberado
+            self.evictions += 1
+
+
+def _copy_result(resultado):
+    '''
+    [INTERNO] Cópia do caminho, para que quem recebe não altere a entrada do cache.
+    '''
+    path, custo = resultado
+    return (None if path is None else list(path)), custo
+
+
+def _result_nbytes(resultado):
+    '''
+    [INTERNO] Tamanho estimado de um (caminho, distância): tupla, float, lista e os ids
+    do caminho (num snapshot são strings novas, criadas a cada busca).
+    '''
+    path, custo = resultado
+    tamanho = sys.getsizeof(resultado) + sys.getsizeof(custo)
+    if path is not None:
+        tamanho += sys.getsizeof(path) + sum(map(sys.getsizeof, path))
+    return tamanho
+
+
+def _tree_nbytes(tree):
+    '''
+    [INTERNO] Tamanho estimado de uma árvore (dist, prev): as duas tabelas, um float
+    por nó e os ids. Num snapshot os ids são strings novas a cada árvore
+    (node_ids.tolist()); os predecessores são os mesmos objetos das chaves.
+    '''
+    dist, prev = tree
+    return sys.getsizeof(dist) + sys.getsizeof(prev) + 24 * len(dist) + sum(map(sys.getsizeof, dist))
+
+
 def mostrar_grafo(graph, path=None):
     plt.figure(figsize=(6, 5))
 
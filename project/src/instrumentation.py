@@ -0,0 +1,275 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Sinks instalados: callables que recebem o dict de cada evento. Sem nenhum,
+# span() devolve sempre o mesmo span vazio e count() retorna na hora.
+_sinks = []
+_local = threading.local()
+
+
+class Span:
+    """
+    Span de tempo em andamento. Atributos podem ser acrescentados durante a
+    execução com set() (ex: número de nós só conhecido no fim).
+
+    Ao fechar vira o evento {'type': 'span', 'name', 'path', 'parent', 'start',
+    'duration_s', 'attrs'}, em que path junta os nomes dos spans abertos na
+    mesma thread ('get_graph/build_graph/knn').
+    """
+
+    __slots__ = ('name', 'attrs', 'path', 'parent', 'start', 'duration_s', '_inicio')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.path = self.parent = None
+        self.start = self.duration_s = None
+        self._inicio = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        pilha = _stack()
+        self.parent = pilha[-1].path if pilha else None
+        self.path = f"{self.parent}/{self.name}" if self.parent else self.name
+        pilha.append(self)
+        self.start = time.time()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_s = time.perf_counter() - self._inicio
+        pilha = _stack()
+        if pilha and pilha[-1] is self:
+            pilha.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+
+        _emit({
+            'type': 'span',
+            'name': self.name,
+            'path': self.path,
+            'parent': self.parent,
+            'start': self.start,
+            'duration_s': self.duration_s,
+            'attrs': self.attrs,
+        })
+        return False
+
+
+class _NoSpan:
+    """
+    [INTERNO] Span usado com a instrumentação desligada: não mede nem emite nada.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+# Fim da iteração em traced()
+_FIM = object()
+
+
+def enabled():
+    '''
+    :return: True se há algum sink recebendo eventos
+    '''
+    return bool(_sinks)
+
+
+def span(name, **attrs):
+    '''
+    Span de tempo para usar com `with`; aninhado no span aberto no momento (mesma thread).
+
+    :param name: nome da etapa (ex: 'read_csv', 'knn')
+    :param attrs: atributos do evento (ex: k=50)
+    :return: Span (ou um span vazio se a instrumentação estiver desligada)
+    '''
+    if not _sinks:
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def count(name, value=1, **attrs):
+    '''
+    Registra um contador (ex: linhas descartadas, nós, arestas) no span atual,
+    como o evento {'type': 'counter', 'name', 'value', 'span', 'time', 'attrs'}.
+
+    :param name: nome do contador
+    :param value: valor a somar
+    :param attrs: atributos do evento
+    '''
+    if not _sinks:
+        return
+    pilha = _stack()
+    _emit({
+        'type': 'counter',
+        'name': name,
+        'value': value,
+        'span': pilha[-1].path if pilha else None,
+        'time': time.time(),
+        'attrs': attrs,
+    })
+
+
+def traced(name, iterable, **attrs):
+    '''
+    Itera medindo cada next() num span próprio (ex: leitura de um CSV em blocos,
+    em que o tempo de leitura fica dentro do iterador). O último span é o do
+    next() que encerra a iteração.
+
+    :param name: nome dos spans
+    :param iterable: iterável a percorrer
+    :return: gerador com os mesmos itens
+    '''
+    iterador = iter(iterable)
+    while True:
+        with span(name, **attrs):
+            item = next(iterador, _FIM)
+        if item is _FIM:
+            return
+        yield item
+
+
+def add_sink(sink):
+    '''
+    Instala um sink: qualquer callable que recebe o dict de cada evento.
+
+    :return: o próprio sink
+    '''
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    '''
+    Remove um sink instalado (chamando close(), se ele tiver).
+    '''
+    if sink in _sinks:
+        _sinks.remove(sink)
+    if hasattr(sink, 'close'):
+        sink.close()
+
+
+@contextmanager
+def capture():
+    '''
+    Instala um MemorySink enquanto o bloco executa (usado nos testes).
+
+    :return: o MemorySink
+    '''
+    sink = add_sink(MemorySink())
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+
+class MemorySink:
+    """
+    Guarda os eventos numa lista.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def spans(self, name=None):
+        '''
+        :param name: filtra pelo nome (None = todos)
+        :return: eventos de span, na ordem em que terminaram
+        '''
+        return [e for e in self.events if e['type'] == 'span' and (name is None or e['name'] == name)]
+
+    def counters(self):
+        '''
+        :return: dict nome -> soma dos valores
+        '''
+        totais = {}
+        for e in self.events:
+            if e['type'] == 'counter':
+                totais[e['name']] = totais.get(e['name'], 0) + e['value']
+        return totais
+
+    def clear(self):
+        self.events.clear()
+
+
+class LoggingSink:
+    """
+    Escreve cada evento como uma linha de log.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        '''
+        :param logger: logging.Logger (padrão: o deste módulo)
+        :param level: nível das mensagens
+        '''
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, event):
+        attrs = ' '.join(f"{k}={v}" for k, v in event['attrs'].items())
+        if event['type'] == 'span':
+            self.logger.log(self.level, "%s %.4fs %s", event['path'], event['duration_s'], attrs)
+        else:
+            self.logger.log(self.level, "%s %s=%s %s", event['span'] or '-', event['name'], event['value'], attrs)
+
+
+class JsonLinesSink:
+    """
+    Anexa cada evento como uma linha JSON num arquivo.
+    """
+
+    def __init__(self, path):
+        '''
+        :param path: arquivo de saída (aberto em modo append)
+        '''
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        linha = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(linha + '\n')
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def _stack():
+    '''
+    [INTERNO] Pilha de spans abertos da thread atual.
+    '''
+    pilha = getattr(_local, 'stack', None)
+    if pilha is None:
+        pilha = _local.stack = []
+    return pilha
+
+
+def _emit(event):
+    '''
+    [INTERNO] Entrega o evento a todos os sinks instalados.
+    '''
+    for sink in list(_sinks):
+        sink(event)
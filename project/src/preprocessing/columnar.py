@@ -0,0 +1,272 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing.snapshot import StringColumn
+
+
+COLUMNAR_FORMAT = 'musical-recommender-columns'
+COLUMNAR_VERSION = 1
+COLUMNAR_EXTENSION = '.cols'
+META_FILE = 'meta.json'
+
+
+def columnar_path(path):
+    '''
+    Caminho do dataset colunar equivalente a um CSV (songs.csv -> songs.cols).
+    '''
+    raiz, ext = os.path.splitext(path)
+    return (raiz if ext == '.csv' else path) + COLUMNAR_EXTENSION
+
+
+class ColumnarWriter:
+    """
+    Escreve um DataFrame em formato colunar binário, bloco a bloco: um diretório
+    com um arquivo binário por coluna e um meta.json com o tipo de cada uma.
+    Tipos preservados: numéricos (float32, int64, bool...) como arrays crus,
+    categóricos como códigos int32 + categorias, texto como StringColumn
+    (bytes UTF-8 concatenados + offsets + nulos).
+
+    O meta.json é gravado por último e guarda o número de linhas; um leitor só
+    considera as linhas registradas, então um append interrompido não corrompe o dataset.
+    """
+
+    def __init__(self, path, append=False):
+        '''
+        :param path: diretório do dataset
+        :param append: se True, acrescenta linhas a um dataset existente
+        '''
+        self.path = path
+        self.append = append
+
+        if append:
+            self.meta = read_columnar_meta(path)
+            self._dir = path
+            self._truncate()
+        else:
+            self.meta = None
+            self._dir = path.rstrip(os.sep) + '.tmp'
+            shutil.rmtree(self._dir, ignore_errors=True)
+            os.makedirs(self._dir)
+
+    def write(self, df):
+        '''
+        Acrescenta as linhas de df (mesmas colunas do primeiro bloco).
+        '''
+        if self.meta is None:
+            self.meta = {
+                'format': COLUMNAR_FORMAT,
+                'version': COLUMNAR_VERSION,
+                'num_rows': 0,
+                'columns': [self._describe(i, name, df[name]) for i, name in enumerate(df.columns)],
+            }
+
+        nomes = [col['name'] for col in self.meta['columns']]
+        faltando = set(nomes) - set(df.columns)
+        if faltando:
+            raise ValueError(f"Colunas faltando no bloco: {faltando}")
+
+        for col in self.meta['columns']:
+            self._write_column(col, df[col['name']])
+        self.meta['num_rows'] += len(df)
+        return self
+
+    def close(self):
+        '''
+        Grava o meta.json e, num dataset novo, troca o diretório temporário pelo final.
+
+        :return: path do dataset
+        '''
+        if self.meta is None:
+            raise ValueError("Nenhum bloco escrito no dataset colunar")
+
+        tmp_meta = os.path.join(self._dir, META_FILE + '.tmp')
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_meta, os.path.join(self._dir, META_FILE))
+
+        if not self.append:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(self._dir, self.path)
+        return self.path
+
+    @staticmethod
+    def _describe(i, name, series):
+        '''
+        [INTERNO] Tipo de armazenamento de uma coluna a partir do primeiro bloco.
+        '''
+        col = {'name': str(name), 'file': f'c{i}'}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            col.update(kind='category', categories=[])
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            col.update(kind='numeric', dtype=np.dtype(series.dtype).str)
+        else:
+            col.update(kind='string')
+        return col
+
+    def _file(self, col, suffix):
+        return os.path.join(self._dir, f"{col['file']}.{suffix}")
+
+    def _write_column(self, col, series):
+        '''
+        [INTERNO] Acrescenta os valores de uma coluna aos seus arquivos.
+        '''
+        if col['kind'] == 'numeric':
+            _append_bytes(self._file(col, 'values'), series.to_numpy(dtype=np.dtype(col['dtype'])))
+
+        elif col['kind'] == 'category':
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            # Códigos locais do bloco -> códigos globais do dataset (categorias novas vão ao final)
+            indice = {categoria: i for i, categoria in enumerate(col['categories'])}
+            for categoria in series.cat.categories.tolist():
+                if categoria not in indice:
+                    indice[categoria] = len(col['categories'])
+                    col['categories'].append(categoria)
+            mapa = np.array([indice[c] for c in series.cat.categories.tolist()] + [-1], dtype=np.int32)
+            _append_bytes(self._file(col, 'codes'), mapa[series.cat.codes.to_numpy()])
+
+        else:
+            valores = [None if pd.isna(v) else v for v in series.tolist()]
+            coluna = StringColumn.from_values(valores)
+            base = self._string_bytes(col)
+            if base == 0 and not os.path.exists(self._file(col, 'offsets')):
+                _append_bytes(self._file(col, 'offsets'), np.zeros(1, dtype=np.int64))
+            _append_bytes(self._file(col, 'data'), coluna.data)
+            _append_bytes(self._file(col, 'offsets'), coluna.offsets[1:] + base)
+            nulls = coluna.nulls if coluna.nulls is not None else np.zeros(len(valores), dtype=bool)
+            _append_bytes(self._file(col, 'nulls'), nulls)
+
+    def _truncate(self):
+        '''
+        [INTERNO] Descarta bytes de um append anterior interrompido (além das linhas registradas).
+        '''
+        n = self.meta['num_rows']
+        for col in self.meta['columns']:
+            if col['kind'] == 'numeric':
+                tamanhos = {'values': n * np.dtype(col['dtype']).itemsize}
+            elif col['kind'] == 'category':
+                tamanhos = {'codes': n * 4}
+            else:
+                tamanhos = {'offsets': (n + 1) * 8 if n else 0, 'nulls': n, 'data': self._string_bytes(col)}
+            for suffix, tamanho in tamanhos.items():
+                if os.path.exists(self._file(col, suffix)):
+                    os.truncate(self._file(col, suffix), tamanho)
+
+    def _string_bytes(self, col):
+        '''
+        [INTERNO] Bytes de texto já gravados na coluna (offset final das linhas registradas).
+        '''
+        n = self.meta['num_rows']
+        if n == 0 or not os.path.exists(self._file(col, 'offsets')):
+            return 0
+        return int(np.fromfile(self._file(col, 'offsets'), dtype=np.int64, count=1, offset=8 * n)[0])
+
+
+def _append_bytes(path, array):
+    with open(path, 'ab') as f:
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+def write_columnar(df, path):
+    '''
+    Salva um DataFrame inteiro em formato colunar.
+
+    :param df: DataFrame (o índice não é salvo, como no to_csv(index=False))
+    :param path: diretório de destino
+    :return: path
+    '''
+    return ColumnarWriter(path).write(df).close()
+
+
+def append_columnar(df, path):
+    '''
+    Acrescenta linhas a um dataset colunar existente.
+
+    :return: path
+    '''
+    return ColumnarWriter(path, append=True).write(df).close()
+
+
+def read_columnar(path, columns=None, start=0, stop=None):
+    '''
+    Lê um dataset colunar. Só os arquivos das colunas pedidas são lidos e,
+    com start/stop, só a faixa de linhas pedida de cada arquivo.
+
+    :param path: diretório do dataset
+    :param columns: lista de colunas (None = todas), na ordem desejada
+    :param start: primeira linha lida
+    :param stop: linha final, exclusiva (None = até o fim)
+    :return: pd.DataFrame com os tipos originais (float32, category, texto...)
+    '''
+    meta = read_columnar_meta(path)
+    por_nome = {col['name']: col for col in meta['columns']}
+    nomes = list(columns) if columns is not None else [col['name'] for col in meta['columns']]
+
+    faltando = [nome for nome in nomes if nome not in por_nome]
+    if faltando:
+        raise KeyError(f"Colunas não encontradas no dataset colunar: {faltando}")
+
+    stop = meta['num_rows'] if stop is None else min(stop, meta['num_rows'])
+    start = min(start, stop)
+    dados = {nome: _read_column(path, por_nome[nome], stop - start, start) for nome in nomes}
+    return pd.DataFrame(dados, columns=nomes, index=pd.RangeIndex(start, stop))
+
+
+def _read_column(path, col, n, start=0):
+    '''
+    [INTERNO] Lê n linhas de uma coluna, a partir da linha start.
+    '''
+    def arquivo(suffix):
+        return os.path.join(path, f"{col['file']}.{suffix}")
+
+    def ler(suffix, dtype, count, inicio):
+        dtype = np.dtype(dtype)
+        return np.fromfile(arquivo(suffix), dtype=dtype, count=count, offset=inicio * dtype.itemsize)
+
+    if col['kind'] == 'numeric':
+        return ler('values', col['dtype'], n, start) if n else np.empty(0, dtype=np.dtype(col['dtype']))
+
+    if col['kind'] == 'category':
+        codes = ler('codes', np.int32, n, start) if n else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=col['categories'])
+
+    if n == 0:
+        return pd.Series([], dtype=object)
+    offsets = ler('offsets', np.int64, n + 1, start)
+    data = ler('data', np.uint8, int(offsets[-1] - offsets[0]), int(offsets[0]))
+    nulls = ler('nulls', bool, n, start)
+    valores = StringColumn(data, offsets - offsets[0], nulls if nulls.any() else None).tolist()
+    return pd.Series(valores, index=pd.RangeIndex(start, start + n))
+
+
+def read_columnar_meta(path):
+    '''
+    Lê e valida o meta.json de um dataset colunar.
+
+    :param path: diretório do dataset
+    :return: dict com os metadados
+    '''
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Dataset colunar não encontrado: {path}")
+
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if meta.get('format') != COLUMNAR_FORMAT:
+        raise ValueError(f"Formato de dataset colunar inválido em {path}")
+    if meta.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f"Versão de dataset colunar não suportada: {meta.get('version')}")
+
+    return meta
+
+
+def is_columnar(path):
+    '''
+    :return: True se path é um diretório de dataset colunar
+    '''
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
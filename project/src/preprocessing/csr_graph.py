@@ -0,0 +1,317 @@
+import sys
+
+import numpy as np
+import networkx as nx
+
+
+class CSRGraph:
+    """
+    Grafo direcionado compacto no formato CSR (Compressed Sparse Row).
+    As arestas do nó i ficam em indices[indptr[i]:indptr[i+1]] (ids internos int32)
+    com os pesos correspondentes em weights.
+
+    Expõe o subconjunto da API do nx.DiGraph usado pelo projeto
+    (G.nodes, G.nodes[id], G.nodes(data=True), G[u].items(), len(G), ...),
+    então pode substituir o DiGraph na busca e na interface.
+    """
+
+    def __init__(self, indptr, indices, weights, node_ids, node_attrs=None, features=None):
+        '''
+        :param indptr: array (n+1) com o início das arestas de cada nó
+        :param indices: array (arestas) com o id interno do destino de cada aresta
+        :param weights: array (arestas) com o peso de cada aresta
+        :param node_ids: ids externos (track_id) na ordem dos ids internos
+            (lista, array NumPy ou StringColumn)
+        :param node_attrs: dict {atributo: sequência alinhada aos nós}, ex: name/artist
+        :param features: matriz (n x features) normalizada, opcional
+        '''
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # ids podem vir como array NumPy (ex: int64 mapeado do disco) ou como
+        # coluna de strings lida sob demanda (snapshot); o resto vira array object
+        self.node_ids = node_ids if hasattr(node_ids, 'tolist') else np.asarray(node_ids, dtype=object)
+        self.node_attrs = dict(node_attrs or {})
+        self.features = features
+        self.graph = {}  # atributos do grafo, como no NetworkX
+        self.landmarks = None  # índice ALT opcional (src.algorithm.landmarks.LandmarkIndex)
+        self.hierarchy = None  # hierarquia de contração opcional (src.algorithm.contraction)
+
+        if len(self.indptr) != len(self.node_ids) + 1:
+            raise ValueError("indptr deve ter tamanho número de nós + 1")
+
+        self._index = None  # dict id externo -> id interno (criado sob demanda)
+        self._reverse = None  # arestas de entrada em CSR (criado sob demanda)
+        self.nodes = NodeView(self)
+
+    @classmethod
+    def from_knn(cls, node_ids, indices, distances, node_attrs=None, features=None):
+        '''
+        Cria o grafo a partir dos arrays (n x k) de vizinhos de um K-NN.
+
+        :param node_ids: ids externos dos nós
+        :param indices: matriz (n x k) de posições dos vizinhos
+        :param distances: matriz (n x k) de distâncias (pesos)
+        :return: CSRGraph
+        '''
+        n, k = np.shape(indices)
+        indptr = np.arange(n + 1, dtype=np.int64) * k
+        return cls(indptr, np.ravel(indices), np.ravel(distances), node_ids, node_attrs, features)
+
+    @classmethod
+    def from_networkx(cls, G, attrs=('name', 'artist')):
+        '''
+        Converte um nx.DiGraph preservando a ordem de nós e de vizinhos.
+
+        :param G: grafo NetworkX
+        :param attrs: atributos de nó a copiar
+        :return: CSRGraph
+        '''
+        node_ids = list(G.nodes)
+        index = {node: i for i, node in enumerate(node_ids)}
+
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        indices, weights = [], []
+        for i, node in enumerate(node_ids):
+            for vizinho, data in G[node].items():
+                indices.append(index[vizinho])
+                weights.append(data.get('weight', 1.0))
+            indptr[i + 1] = len(indices)
+
+        node_attrs = {
+            attr: [G.nodes[node].get(attr) for node in node_ids]
+            for attr in attrs
+        }
+        graph = cls(indptr, indices, weights, node_ids, node_attrs)
+        graph.graph.update(G.graph)
+        return graph
+
+    def to_networkx(self):
+        '''
+        Converte para nx.DiGraph (ex: para exportar em GraphML).
+
+        :return: nx.DiGraph equivalente
+        '''
+        G = nx.DiGraph()
+        # Só atributos escalares (listas como data_min não são suportadas pelo GraphML)
+        G.graph.update({
+            chave: valor for chave, valor in self.graph.items()
+            if isinstance(valor, (str, int, float, bool))
+        })
+        G.add_nodes_from(self.nodes(data=True))
+
+        origens = np.repeat(np.asarray(self.node_ids), np.diff(self.indptr))
+        G.add_weighted_edges_from(
+            zip(origens.tolist(), self.node_ids[self.indices].tolist(), self.weights.tolist())
+        )
+        return G
+
+    # --- API compatível com NetworkX ---
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids.tolist())
+
+    def __contains__(self, node_id):
+        return node_id in self._id_index()
+
+    def __getitem__(self, node_id):
+        return AdjacencyView(self, self.index_of(node_id))
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def edges(self, data=False):
+        '''
+        Itera sobre as arestas como (u, v) ou (u, v, {'weight': w}).
+        '''
+        for i, node in enumerate(self.node_ids):
+            for j, w in zip(*self.neighbors_of(i)):
+                v = self.node_ids[j]
+                yield (node, v, {'weight': float(w)}) if data else (node, v)
+
+    # --- Acesso por id interno (usado pelos algoritmos) ---
+
+    def index_of(self, node_id):
+        '''
+        :param node_id: id externo (track_id)
+        :return: id interno (posição nos arrays)
+        '''
+        try:
+            return self._id_index()[node_id]
+        except KeyError:
+            raise KeyError(node_id) from None
+
+    def neighbors_of(self, index):
+        '''
+        :param index: id interno do nó
+        :return: tupla (ids internos dos vizinhos, pesos)
+        '''
+        inicio, fim = self.indptr[index], self.indptr[index + 1]
+        return self.indices[inicio:fim], self.weights[inicio:fim]
+
+    def predecessors_of(self, index):
+        '''
+        Arestas de entrada do nó (as listas K-NN reversas), a partir de um
+        índice reverso em CSR montado na primeira chamada.
+
+        :param index: id interno do nó
+        :return: tupla (ids internos das origens, pesos)
+        '''
+        indptr, indices, weights = self.reverse_index()
+        inicio, fim = indptr[index], indptr[index + 1]
+        return indices[inicio:fim], weights[inicio:fim]
+
+    def reverse_index(self):
+        '''
+        Grafo reverso em CSR: para cada nó, as origens das arestas que chegam nele.
+        As origens ficam em ordem crescente de id interno.
+
+        :return: tupla (indptr, indices, weights)
+        '''
+        if self._reverse is None:
+            n = len(self.node_ids)
+            origens = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+            ordem = np.argsort(self.indices, kind='stable')
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=n), out=indptr[1:])
+            self._reverse = (indptr, origens[ordem], self.weights[ordem])
+        return self._reverse
+
+    def node_data(self, index):
+        '''
+        :param index: id interno do nó
+        :return: dict com os atributos do nó
+        '''
+        return {attr: values[index] for attr, values in self.node_attrs.items()}
+
+    def memory_usage(self):
+        '''
+        Memória ocupada pelos arrays do grafo, em bytes
+        (topologia, pesos, ids e atributos de nó).
+        '''
+        total = self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes + self.node_ids.nbytes
+        total += sum(sys.getsizeof(node_id) for node_id in self.node_ids)
+        for values in self.node_attrs.values():
+            total += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+        if self.features is not None:
+            total += np.asarray(self.features).nbytes
+        return total
+
+    def _id_index(self):
+        if self._index is None:
+            self._index = {node_id: i for i, node_id in enumerate(self.node_ids.tolist())}
+        return self._index
+
+
+class NodeView:
+    """
+    Equivalente a G.nodes do NetworkX: iterável, suporta 'in', len(),
+    G.nodes[id] (atributos) e G.nodes(data=True).
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node_id):
+        return node_id in self._graph
+
+    def __getitem__(self, node_id):
+        return self._graph.node_data(self._graph.index_of(node_id))
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self._graph)
+        return (
+            (node_id, self._graph.node_data(i))
+            for i, node_id in enumerate(self._graph.node_ids.tolist())
+        )
+
+
+class AdjacencyView:
+    """
+    Equivalente a G[u] do NetworkX: mapeia vizinho -> {'weight': peso}.
+    """
+
+    def __init__(self, graph, index):
+        self._graph = graph
+        self._indices, self._weights = graph.neighbors_of(index)
+
+    def __iter__(self):
+        return iter(self._graph.node_ids[self._indices].tolist())
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __contains__(self, node_id):
+        return node_id in self.keys()
+
+    def __getitem__(self, node_id):
+        for vizinho, data in self.items():
+            if vizinho == node_id:
+                return data
+        raise KeyError(node_id)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return zip(
+            self._graph.node_ids[self._indices].tolist(),
+            ({'weight': w} for w in self._weights.tolist())
+        )
+
+
+def networkx_memory_usage(G):
+    '''
+    Estima a memória de um nx.DiGraph somando os dicts de adjacência
+    (_succ/_pred compartilham o dict de atributos de cada aresta), os
+    atributos de nó e os objetos referenciados.
+
+    :param G: grafo NetworkX
+    :return: bytes estimados
+    '''
+    vistos = set()
+
+    def tamanho(obj):
+        if id(obj) in vistos:
+            return 0
+        vistos.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(tamanho(k) + tamanho(v) for k, v in obj.items())
+        return total
+
+    dicts = [G._node, G._adj] + ([G._pred] if G.is_directed() else [])
+    return sum(tamanho(d) for d in dicts)
+
+
+def memory_report(nx_graph, csr_graph):
+    '''
+    Compara lado a lado a memória das duas representações.
+
+    :return: dict com bytes de cada uma, bytes por aresta e a razão entre elas
+    '''
+    nx_bytes = networkx_memory_usage(nx_graph)
+    csr_bytes = csr_graph.memory_usage()
+    arestas = max(csr_graph.number_of_edges(), 1)
+    return {
+        'nodes': csr_graph.number_of_nodes(),
+        'edges': csr_graph.number_of_edges(),
+        'networkx_bytes': nx_bytes,
+        'csr_bytes': csr_bytes,
+        'networkx_bytes_per_edge': nx_bytes / arestas,
+        'csr_bytes_per_edge': csr_bytes / arestas,
+        'ratio': nx_bytes / max(csr_bytes, 1),
+    }
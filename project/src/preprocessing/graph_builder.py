@@ -1,109 +1,498 @@
+import numpy as np
 import pandas as pd
 import networkx as nx
 from sklearn.preprocessing import MinMaxScaler
-from scipy.spatial.distance import cdist
 import os
 
+from src.instrumentation import count, span
+from src.preprocessing.columnar import is_columnar, read_columnar, read_columnar_meta
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.incremental import IncrementalKNN
+from src.preprocessing.memory import (
+    MB,
+    MemoryTracker,
+    available_memory,
+    estimate_build_memory,
+    plan_build,
+    plan_out_of_core,
+)
+from src.preprocessing.neighbors import estimate_recall, get_backend, resolve_block_size
+from src.preprocessing.out_of_core import OutOfCoreBuild
+from src.preprocessing.snapshot import load_snapshot, save_snapshot
+
 
 class GraphBuilder:
     """
     Responsável por transformar um CSV de músicas num Grafo Direcionado (DiGraph).
     Usa K-Nearest Neighbors (K-NN) baseado na Distância Euclidiana.
+    Pode devolver um nx.DiGraph ou um CSRGraph compacto (representation='csr').
+    Aceita o dataset em CSV ou no formato colunar do DataProcessor (.cols);
+    nos dois casos só as colunas usadas no grafo são lidas.
     """
 
+    REPRESENTATIONS = ('networkx', 'csr')
+
+    # Features numéricas usadas no cálculo de distância
+    FEATURE_COLS = ['danceability', 'energy', 'valence', 'tempo', 'acousticness', 'instrumentalness']
+
+    # Colunas lidas do dataset: id, metadados dos nós e features
+    LOAD_COLS = ['track_id', 'track_name', 'artists'] + FEATURE_COLS
+
     def __init__(self, csv_path):
         '''
         Inicializa o construtor de grafo com o caminho do dataset que deve ser usado
-        :param csv_path: o path do dataset CSV de músicas processado
+        :param csv_path: o path do dataset de músicas processado (CSV ou diretório colunar)
         '''
         self.csv_path = csv_path
         self.G = nx.DiGraph()
         self.df = None  # Guardará o DataFrame carregado
+        self.recall = None  # Recall do K-NN em relação ao exato (se medido)
+        self.csr_graph = None  # Versão CSR do último grafo construído
+        self._incremental = None  # Estado do K-NN incremental (criado no primeiro add_tracks)
+        self.build_plan = None  # Estratégia escolhida pelo orçamento de memória (build_graph)
+        self.memory_report = []  # Memória medida em cada etapa do último build_graph
+        self._memory = MemoryTracker()  # Tracker do build em andamento
 
-    def build_graph(self, k_neighbors=50, save_path=None):
+    def build_graph(self, k_neighbors=50, save_path=None, block_size=None, memory_budget_mb=None,
+                    backend=None, backend_options=None, evaluate_recall=False, representation='networkx',
+                    n_jobs=None, build_memory_budget_mb=None, trace_allocations=False, out_of_core=False,
+                    work_dir=None):
         '''
         Constrói o grafo a partir do CSV fornecido no construtor.
         Usa K-NN baseado na Distância Euclidiana entre features numéricas.
 
+        Se block_size ou memory_budget_mb forem informados, usa o modo em blocos:
+        as distâncias são calculadas por faixas de linhas e só os top-k de cada
+        linha são mantidos, sem materializar a matriz n x n.
+        Nós e arestas são inseridos em lote a partir dos arrays de vizinhos.
+
+        A memória de cada etapa (pico de RSS e, com trace_allocations, das
+        alocações do tracemalloc) é exibida no fim e fica em memory_report.
+        Com build_memory_budget_mb, o pico do build é estimado antes do K-NN e o bloco de
+        distâncias (e o número de processos) é escolhido para caber no orçamento;
+        se nenhuma estratégia couber, MemoryError é levantado antes de alocar.
+        Sem orçamento, só há um aviso se a estimativa passar da memória disponível.
+
+        Com out_of_core=True (ou quando o orçamento só comporta esse modo), o grafo
+        é construído em disco (OutOfCoreBuild): features normalizadas num np.memmap,
+        vizinhos de cada bloco anexados a um arquivo de arestas e o snapshot em
+        save_path montado em fluxo, depois aberto com mmap. Exige
+        representation='csr', backend 'brute' e save_path de snapshot; o K-NN é
+        serial. Se o build for interrompido, rodar de novo com os mesmos
+        parâmetros continua do último bloco concluído. O grafo é igual ao do build em memória.
+
         :param k_neighbors: numero de vizinhos a considerar para cada nó
-        :param save_path: path opcional para salvar o grafo em GraphML após construção
+        :param save_path: path opcional para salvar o grafo após construção (snapshot ou .graphml)
+        :param block_size: linhas de consulta por bloco no modo em blocos
+        :param memory_budget_mb: orçamento de memória (MB) para cada bloco de distâncias
+            (não do build inteiro: ver build_memory_budget_mb)
+        :param backend: backend de busca de vizinhos ('brute', 'tree', 'hnsw' ou instância)
+        :param backend_options: dict de opções repassadas ao construtor do backend
+        :param evaluate_recall: se True, mede o recall do K-NN contra o exato (amostral)
+        :param representation: 'networkx' (nx.DiGraph) ou 'csr' (CSRGraph compacto)
+        :param n_jobs: processos para o K-NN dos backends exatos ('brute' e 'tree'),
+            com a matriz normalizada em memória compartilhada (None = serial, -1 = todos os núcleos)
+        :param build_memory_budget_mb: orçamento de memória do build inteiro (pico de RSS do processo), em MB
+        :param trace_allocations: se True, mede também o pico das alocações com tracemalloc (mais lento)
+        :param out_of_core: se True, constrói o grafo em disco
+        :param work_dir: diretório de trabalho do build em disco (padrão: save_path + '.build')
         :return:
         '''
-        print("--- [GRAFO] Iniciando construção do grafo ---")
+        if representation not in self.REPRESENTATIONS:
+            raise ValueError(f"Representação desconhecida: {representation}. Opções: {self.REPRESENTATIONS}")
+        em_disco_possivel = (representation == 'csr' and backend in (None, 'brute')
+                             and bool(save_path) and not save_path.endswith('.graphml'))
+        if out_of_core and not em_disco_possivel:
+            raise ValueError("O build em disco exige representation='csr', backend 'brute' e save_path de snapshot")
+
+        with span('build_graph', k=k_neighbors, representation=representation), \
+                MemoryTracker(python_allocations=trace_allocations) as memoria:
+            print("--- [GRAFO] Iniciando construção do grafo ---")
+
+            if not os.path.exists(self.csv_path):
+                raise FileNotFoundError(f"Arquivo não encontrado: {self.csv_path}")
+
+            self._memory = memoria
+            self.memory_report = memoria.stages
 
-        if not os.path.exists(self.csv_path):
-            raise FileNotFoundError(f"Arquivo não encontrado: {self.csv_path}")
+            if out_of_core:
+                return self._build_out_of_core(k_neighbors, save_path, work_dir, block_size,
+                                               memory_budget_mb, build_memory_budget_mb)
 
-        # Carregar Dados
-        self.df = pd.read_csv(self.csv_path)
-        if 'track_id' in self.df.columns:
-            self.df.set_index('track_id', inplace=True)
+            # Carregar Dados
+            with memoria.stage('read_csv'):
+                self.df = self._load_dataset()
+            if 'track_id' in self.df.columns:
+                self.df.set_index('track_id', inplace=True)
 
-        print(f"-> Carregadas {len(self.df)} músicas.")
+            print(f"-> Carregadas {len(self.df)} músicas.")
 
-        # Seleção de Features Numéricas para o Cálculo
-        feature_cols = ['danceability', 'energy', 'valence', 'tempo', 'acousticness', 'instrumentalness']
+            # Seleção de Features Numéricas para o Cálculo
+            # Filtra apenas colunas que existem (segurança)
+            cols_presentes = [c for c in self.FEATURE_COLS if c in self.df.columns]
 
-        # Filtra apenas colunas que existem (segurança)
-        cols_presentes = [c for c in feature_cols if c in self.df.columns]
+            if not cols_presentes:
+                raise ValueError("O dataset não contém as colunas necessárias para o cálculo!")
 
+            # float64 no cálculo, qualquer que seja o tipo armazenado (float32 no colunar)
+            data_numeric = self.df[cols_presentes].dropna().astype(np.float64)
+
+            options = dict(backend_options or {})
+            if backend in (None, 'brute'):
+                options.setdefault('block_size', block_size)
+                options.setdefault('memory_budget_mb', memory_budget_mb)
+            if backend in (None, 'brute', 'tree'):
+                options.setdefault('n_jobs', n_jobs)
+            self._check_memory(len(data_numeric), len(cols_presentes), k_neighbors, representation,
+                               backend, options, build_memory_budget_mb, em_disco_possivel)
+            if self.build_plan and self.build_plan['out_of_core']:
+                # o dataset carregado dá lugar ao build em disco
+                del data_numeric
+                self.df = None
+                return self._build_out_of_core(k_neighbors, save_path, work_dir,
+                                               self.build_plan['block_size'], memory_budget_mb, None)
+
+            # NORMALIZAÇÃO (Min-Max Scaling)
+            print("-> Normalizando dados (tempo, Energy, etc)...")
+            with memoria.stage('normalize', rows=len(data_numeric)):
+                scaler = MinMaxScaler()
+                data_norm = pd.DataFrame(
+                    scaler.fit_transform(data_numeric),
+                    columns=data_numeric.columns,
+                    index=data_numeric.index
+                )
+
+            self._add_edges_knn(data_norm, k_neighbors, get_backend(backend or 'brute', **options),
+                                evaluate_recall, representation)
+
+            # Parâmetros necessários para inserir músicas depois sem reconstruir (add_tracks)
+            self.csr_graph.graph.update({
+                'k_neighbors': k_neighbors,
+                'feature_cols': cols_presentes,
+                'data_min': scaler.data_min_.tolist(),
+                'data_max': scaler.data_max_.tolist(),
+            })
+
+            count('nodes', self.G.number_of_nodes())
+            count('edges', self.G.number_of_edges())
+            print(f"--- [GRAFO] Concluído! Nós: {self.G.number_of_nodes()}, Arestas: {self.G.number_of_edges()} ---")
+            # salva apos buildar
+            if save_path:
+                with memoria.measure('save_graph'):
+                    self.save_graph(save_path)
+
+            self._print_memory_report()
+            return self.G
+
+    def _build_out_of_core(self, k_neighbors, save_path, work_dir, block_size, memory_budget_mb,
+                           build_memory_budget_mb):
+        '''
+        [INTERNO] Build em disco (OutOfCoreBuild) dentro do build_graph: as etapas
+        são medidas no tracker do build e o snapshot montado vira self.G.
+        '''
+        memoria = self._memory
+        cols_presentes = [c for c in self.FEATURE_COLS if c in self._dataset_columns()]
         if not cols_presentes:
             raise ValueError("O dataset não contém as colunas necessárias para o cálculo!")
 
-        data_numeric = self.df[cols_presentes].dropna()
+        build = OutOfCoreBuild(self.csv_path, work_dir or save_path.rstrip(os.sep) + '.build', k_neighbors,
+                               cols_presentes, self.LOAD_COLS, block_size, memory_budget_mb)
+        if build.progress:
+            print(f"-> Continuando build em disco: {build.progress['rows_done']} de {build.n} linhas já calculadas.")
+
+        print(f"-> Normalizando dados em blocos para {build.work_dir}...")
+        with memoria.stage('normalize', out_of_core=True):
+            n = build.prepare()
 
-        # NORMALIZAÇÃO (Min-Max Scaling)
-        print("-> Normalizando dados (tempo, Energy, etc)...")
-        scaler = MinMaxScaler()
-        data_norm = pd.DataFrame(
-            scaler.fit_transform(data_numeric),
-            columns=data_numeric.columns,
-            index=data_numeric.index
+        if build_memory_budget_mb is not None and block_size is None:
+            self.build_plan = plan_out_of_core(n, len(cols_presentes), k_neighbors, build_memory_budget_mb,
+                                               memory_budget_mb=memory_budget_mb)
+            build.block_size = self.build_plan['block_size']
+            print(f"-> Orçamento de memória: {build_memory_budget_mb} MB "
+                  f"(pico estimado {self.build_plan['peak'] / MB:.0f} MB, bloco {build.block_size}, build em disco)")
+
+        print(f"-> Calculando K-NN em disco (K={k_neighbors}, {n} músicas)...")
+        with memoria.stage('knn', backend='brute', rows=n, out_of_core=True):
+            build.knn()
+
+        print(f"-> Montando snapshot: {save_path}")
+        with memoria.stage('assemble'):
+            build.assemble(save_path, {
+                'k_neighbors': k_neighbors,
+                'feature_cols': cols_presentes,
+                'data_min': build.progress['data_min'],
+                'data_max': build.progress['data_max'],
+            })
+
+        self.df = None
+        self.recall = None
+        self.G = self.csr_graph = load_snapshot(save_path, mmap=True)
+        count('nodes', self.G.number_of_nodes())
+        count('edges', self.G.number_of_edges())
+        print(f"--- [GRAFO] Concluído! Nós: {self.G.number_of_nodes()}, Arestas: {self.G.number_of_edges()} ---")
+        self._print_memory_report()
+        return self.G
+
+    def _print_memory_report(self):
+        '''
+        [INTERNO] Exibe a memória de cada etapa do build.
+        '''
+        print("-> Memória por etapa:")
+        for linha in self._memory.report():
+            print(f"   {linha}")
+
+    def _check_memory(self, n, n_features, k_neighbors, representation, backend, options, build_memory_budget_mb,
+                      out_of_core=False):
+        '''
+        [INTERNO] Estima o pico do build antes do K-NN. Com orçamento, escolhe o
+        bloco de distâncias e os processos do backend 'brute' (em options) que
+        cabem nele, ou o build em disco se só ele couber (e out_of_core for
+        permitido); sem orçamento, só avisa se a estimativa passar da memória disponível.
+        '''
+        nome = backend if isinstance(backend, str) else getattr(backend, 'name', 'brute')
+        if build_memory_budget_mb is None:
+            self.build_plan = None
+            estimativa = estimate_build_memory(n, n_features, k_neighbors, representation, nome,
+                                               options.get('block_size'), options.get('memory_budget_mb'),
+                                               options.get('n_jobs'))
+            adicional, disponivel = max(estimativa.values()), available_memory()
+            if disponivel is not None and adicional > disponivel:
+                print(f"⚠️  O build deve precisar de mais {adicional / MB:.0f} MB, acima da memória disponível "
+                      f"({disponivel / MB:.0f} MB). Considere build_memory_budget_mb, representation='csr' "
+                      "ou out_of_core=True.")
+            return
+
+        ajustavel = backend in (None, 'brute')
+        if not ajustavel and nome == 'brute':
+            # instância já configurada: só confere o bloco dela
+            options = {'block_size': resolve_block_size(n, backend.block_size, backend.memory_budget_mb),
+                       'n_jobs': backend.n_jobs}
+        self.build_plan = plan_build(
+            n, n_features, k_neighbors, build_memory_budget_mb, representation=representation, backend=nome,
+            block_size=options.get('block_size'), memory_budget_mb=options.get('memory_budget_mb'),
+            n_jobs=options.get('n_jobs'), out_of_core=out_of_core,
         )
+        if self.build_plan['out_of_core']:
+            return
+        if ajustavel:
+            options['block_size'] = self.build_plan['block_size']
+            options['n_jobs'] = self.build_plan['n_jobs']
+        print(f"-> Orçamento de memória: {build_memory_budget_mb} MB "
+              f"(pico estimado {self.build_plan['peak'] / MB:.0f} MB, "
+              f"bloco {self.build_plan['block_size']}, processos {self.build_plan['n_jobs'] or 1})")
+
+    def _dataset_columns(self):
+        '''
+        [INTERNO] Colunas do dataset (só o cabeçalho do CSV ou o meta do colunar).
+        '''
+        if is_columnar(self.csv_path):
+            return [col['name'] for col in read_columnar_meta(self.csv_path)['columns']]
+        return pd.read_csv(self.csv_path, nrows=0).columns.tolist()
+
+    def _load_dataset(self):
+        '''
+        [INTERNO] Lê só as colunas de LOAD_COLS presentes no dataset, do formato
+        colunar (sem parse, tipos preservados) ou do CSV.
+        '''
+        if is_columnar(self.csv_path):
+            presentes = {col['name'] for col in read_columnar_meta(self.csv_path)['columns']}
+            return read_columnar(self.csv_path, columns=[c for c in self.LOAD_COLS if c in presentes])
 
-        # Calcula a distância euclidiana de TODOS para TODOS
-        print("-> Calculando distâncias euclidianas...")
-        dist_matrix = cdist(data_norm, data_norm, metric='euclidean')
+        return pd.read_csv(self.csv_path, usecols=lambda c: c in self.LOAD_COLS)
 
-        # Transformamos em DataFrame para facilitar a consulta por track_id
-        df_dist = pd.DataFrame(dist_matrix, index=data_numeric.index, columns=data_numeric.index)
+    def _add_edges_knn(self, data_norm, k_neighbors, backend, evaluate_recall=False, representation='networkx'):
+        '''
+        [INTERNO] Cria as arestas a partir de um backend de busca de vizinhos
+        (força bruta em blocos, árvore espacial ou HNSW aproximado).
+        '''
+        print(f"-> Calculando K-NN com backend '{backend.name}' (K={k_neighbors})...")
+        data = data_norm.to_numpy()
+        with self._memory.stage('knn', backend=backend.name, rows=len(data)):
+            indices, distances = backend.kneighbors(data, k_neighbors)
 
-        #Criação dos Nós e Arestas
-        print(f"-> Criando arestas (K={k_neighbors})...")
+        if evaluate_recall:
+            with self._memory.stage('recall'):
+                self.recall = estimate_recall(data, indices)
+            print(f"-> Recall do backend '{backend.name}' vs K-NN exato: {self.recall:.4f}")
 
-        count = 0
-        total = len(data_numeric)
+        #Criação dos Nós e Arestas em lote
+        print(f"-> Criando nós e arestas em lote (K={k_neighbors})...")
+        with self._memory.stage('edges', representation=representation):
+            song_ids = data_norm.index.to_numpy()
 
-        for song_id in data_numeric.index:
-            # Adiciona o nó com metadados(Nome e Artista)
-            nome = self.df.loc[song_id].get('track_name', 'Unknown')
-            artista = self.df.loc[song_id].get('artists', 'Unknown')
+            # Metadados lidos coluna a coluna, uma única vez
+            nomes = self._metadata_column('track_name', data_norm.index)
+            artistas = self._metadata_column('artists', data_norm.index)
 
-            self.G.add_node(song_id, name=nome, artist=artista)
+            # Versão compacta sempre guardada: é dela que sai o snapshot binário
+            self.csr_graph = CSRGraph.from_knn(
+                song_ids, indices, distances,
+                node_attrs={'name': nomes, 'artist': artistas},
+                features=data
+            )
 
-            # Pega a linha de distâncias dessa música, ordena (ascendente) e pega os K primeiros
-            vizinhos = df_dist.loc[song_id].nsmallest(k_neighbors + 1).iloc[1:]
+            if representation == 'csr':
+                self.G = self.csr_graph
+                return
 
-            for vizinho_id, distancia in vizinhos.items():
-                # Peso da aresta = Distância (Quanto menor, mais similar)
-                self.G.add_edge(song_id, vizinho_id, weight=distancia)
+            self.G.add_nodes_from(
+                (song_id, {'name': nome, 'artist': artista})
+                for song_id, nome, artista in zip(song_ids.tolist(), nomes, artistas)
+            )
 
-            count += 1
-            if count % 500 == 0:
-                print(f"   Processados {count}/{total} nós...")
+            # Peso da aresta = Distância (Quanto menor, mais similar)
+            origens = np.repeat(song_ids, indices.shape[1])
+            destinos = song_ids[indices.ravel()]
+            self.G.add_weighted_edges_from(
+                zip(origens.tolist(), destinos.tolist(), distances.ravel().tolist())
+            )
 
-        print(f"--- [GRAFO] Concluído! Nós: {self.G.number_of_nodes()}, Arestas: {self.G.number_of_edges()} ---")
-        # salva apos buildar
-        if save_path:
-            self.save_graph(save_path)
+    def _metadata_column(self, column, index):
+        '''
+        [INTERNO] Retorna a coluna de metadados alinhada ao índice informado,
+        ou 'Unknown' para todas as linhas se a coluna não existir.
+        '''
+        if column not in self.df.columns:
+            return ['Unknown'] * len(index)
+        return self.df.loc[index, column].tolist()
 
-        return self.G
+    def add_tracks(self, df):
+        '''
+        Insere músicas novas no grafo já construído (ou carregado de um snapshot)
+        sem refazer o K-NN completo. Calcula os k vizinhos de cada música nova e,
+        com um índice de vizinhos reversos, encontra as músicas existentes que
+        passam a tê-la entre seus k vizinhos; só essas listas são alteradas.
+        O resultado é idêntico a reconstruir o grafo com as músicas no final do CSV.
+
+        Só é possível se as features novas estiverem dentro do intervalo min/max
+        da base (senão a normalização de todas as músicas muda).
+
+        :param df: DataFrame com as colunas do CSV processado (track_id, features, ...)
+        :return: dict com o delta aplicado (nós novos e linhas alteradas),
+            ou None se for necessário reconstruir o grafo do zero
+        '''
+        csr = self._as_csr() if self.G is not None and len(self.G) else None
+        meta = csr.graph if csr is not None else {}
+
+        if csr is None or csr.features is None or 'data_min' not in meta:
+            print("[AVISO] Grafo sem estado para inserção incremental. Reconstrução necessária.")
+            return None
+
+        df = df.set_index('track_id') if 'track_id' in df.columns else df
+        repetidos = [song_id for song_id in df.index if song_id in csr]
+        if repetidos:
+            raise ValueError(f"Músicas já existentes no grafo: {repetidos[:5]}")
+
+        feature_cols = meta['feature_cols']
+        faltando = set(feature_cols) - set(df.columns)
+        if faltando:
+            raise ValueError(f"Colunas faltando nas músicas novas: {faltando}")
+
+        data_numeric = df[feature_cols].dropna()
+        data_min, data_max = np.asarray(meta['data_min']), np.asarray(meta['data_max'])
+        valores = data_numeric.to_numpy(dtype=np.float64)
+
+        if np.any(valores < data_min) or np.any(valores > data_max):
+            print("[AVISO] Músicas novas fora do intervalo da normalização. Reconstrução necessária.")
+            return None
+
+        if self._incremental is None:
+            n = csr.number_of_nodes()
+            width = csr.number_of_edges() // max(n, 1)
+            if np.any(np.diff(csr.indptr) != width):
+                print("[AVISO] Grafo sem grau fixo (não veio do K-NN). Reconstrução necessária.")
+                return None
+            self._incremental = IncrementalKNN(
+                np.asarray(csr.features),
+                np.asarray(csr.indices).reshape(n, width),
+                np.asarray(csr.weights).reshape(n, width),
+                meta['k_neighbors']
+            )
+
+        # Mesma normalização da construção original (mesmo min/max)
+        scaler = MinMaxScaler().fit(np.vstack([data_min, data_max]))
+        novos = scaler.transform(valores)
+
+        print(f"-> Inserindo {len(novos)} músicas no grafo existente...")
+        with span('add_tracks', tracks=len(novos)):
+            linhas = self._incremental.add(novos)
+
+        delta = {
+            'node_ids': data_numeric.index.tolist(),
+            'node_attrs': {
+                'name': self._new_metadata(df, 'track_name', data_numeric.index),
+                'artist': self._new_metadata(df, 'artists', data_numeric.index),
+            },
+            'features': novos,
+            'rows': linhas,
+            'indices': self._incremental.indices[linhas],
+            'distances': self._incremental.distances[linhas],
+        }
+        self._apply_delta(csr, delta)
+        count('tracks_added', len(novos))
+
+        print(f"✔ {len(novos)} músicas inseridas, {len(linhas) - len(novos)} listas de vizinhos alteradas.")
+        return delta
+
+    def _apply_delta(self, csr, delta):
+        '''
+        [INTERNO] Atualiza self.G (CSR ou NetworkX) com o resultado de add_tracks.
+        '''
+        inc = self._incremental
+        node_ids = np.empty(inc.n, dtype=object)
+        node_ids[:len(csr)] = np.asarray(csr.node_ids)
+        node_ids[len(csr):] = delta['node_ids']
+
+        node_attrs = {
+            attr: list(values) + list(delta['node_attrs'].get(attr, []))
+            for attr, values in csr.node_attrs.items()
+        }
+
+        novo = CSRGraph.from_knn(node_ids, inc.indices, inc.distances, node_attrs, inc.features)
+        novo.graph.update(csr.graph)
+        # Copia o dicionário id -> posição (mais barato que recriá-lo); o do grafo
+        # anterior não pode mudar, pois quem ainda o tem continua buscando nele
+        if csr._index is not None:
+            novo._index = dict(csr._index)
+            novo._index.update((song_id, len(csr) + i) for i, song_id in enumerate(delta['node_ids']))
+        self.csr_graph = novo
+
+        if isinstance(self.G, CSRGraph):
+            self.G = novo
+            return
+
+        # NetworkX: adiciona nós novos e troca só as listas de saída alteradas
+        self.G.add_nodes_from(
+            (song_id, {'name': nome, 'artist': artista})
+            for song_id, nome, artista in zip(delta['node_ids'], delta['node_attrs']['name'],
+                                              delta['node_attrs']['artist'])
+        )
+        for linha, vizinhos, pesos in zip(delta['rows'], delta['indices'], delta['distances']):
+            song_id = node_ids[linha]
+            self.G.remove_edges_from(list(self.G.out_edges(song_id)))
+            self.G.add_weighted_edges_from(
+                zip([song_id] * len(vizinhos), node_ids[vizinhos].tolist(), pesos.tolist())
+            )
+
+    @staticmethod
+    def _new_metadata(df, column, index):
+        '''
+        [INTERNO] Metadados das músicas novas ('Unknown' se a coluna não existir).
+        '''
+        if column not in df.columns:
+            return ['Unknown'] * len(index)
+        return df.loc[index, column].tolist()
 
     # Salvar o grafo em disco
-    def save_graph(self, output_path):
+    def save_graph(self, output_path, fmt=None):
         '''
-        Salva o grafo em formato padrão GraphML (.graphml).
-        :param output_path: Path completo do arquivo de saída
+        Salva o grafo em disco, como snapshot binário ou GraphML.
+        O snapshot é um diretório de arrays .npy que load_graph abre com mmap;
+        GraphML (.graphml) continua disponível para exportação/interoperabilidade.
+
+        :param output_path: Path completo do arquivo (GraphML) ou diretório (snapshot)
+        :param fmt: 'snapshot' ou 'graphml'; se None, usa GraphML quando o path
+            termina em .graphml e snapshot nos demais casos
         :return: NONE
         '''
 
@@ -112,28 +501,52 @@ class GraphBuilder:
             print("[AVISO] Grafo vazio. Nada salvo.")
             return
 
-        print(f"-> Exportando grafo para GraphML: {output_path}")
+        fmt = fmt or ('graphml' if output_path.endswith('.graphml') else 'snapshot')
+        if fmt not in ('snapshot', 'graphml'):
+            raise ValueError(f"Formato desconhecido: {fmt} (use 'snapshot' ou 'graphml')")
+
+        print(f"-> Exportando grafo ({fmt}): {output_path}")
         try:
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            nx.write_graphml(self.G, output_path)
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            with span('save_graph', fmt=fmt):
+                if fmt == 'snapshot':
+                    save_snapshot(self._as_csr(), output_path)
+                else:
+                    G = self.G.to_networkx() if isinstance(self.G, CSRGraph) else self.G
+                    nx.write_graphml(G, output_path)
             print("✔ Grafo exportado com sucesso.")
         except Exception as e:
             print(f"✖ Erro ao exportar grafo: {e}")
 
+    def _as_csr(self):
+        '''
+        [INTERNO] Versão CSR do grafo atual (com features, se vier do build).
+        '''
+        if isinstance(self.G, CSRGraph):
+            return self.G
+        if self.csr_graph is not None and self.csr_graph.number_of_nodes() == self.G.number_of_nodes():
+            return self.csr_graph
+        return CSRGraph.from_networkx(self.G)
+
     @staticmethod
-    def load_graph(input_path):
+    def load_graph(input_path, mmap=True):
         """
-        Carrega um arquivo GraphML do disco.
+        Carrega um grafo do disco: snapshot binário (diretório) ou GraphML.
 
-        :param input_path: Path completo do arquivo GraphML
-        :return: Um grafo NetworkX DiGraph
+        :param input_path: Path do diretório de snapshot ou do arquivo GraphML
+        :param mmap: para snapshots, mapeia os arrays em vez de lê-los inteiros
+        :return: CSRGraph (snapshot) ou nx.DiGraph (GraphML)
         """
         if not os.path.exists(input_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {input_path}")
 
         print(f"-> Importando grafo de: {input_path}")
-        # A função nativa que lê e já devolve o objeto Grafo
-        G = nx.read_graphml(input_path)
+        with span('load_graph', fmt='snapshot' if os.path.isdir(input_path) else 'graphml', mmap=mmap):
+            if os.path.isdir(input_path):
+                G = load_snapshot(input_path, mmap=mmap)
+            else:
+                # A função nativa que lê e já devolve o objeto Grafo
+                G = nx.read_graphml(input_path)
 
         print(f"✔ Grafo carregado! ({G.number_of_nodes()} nós)")
         return G
@@ -0,0 +1,206 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+from sklearn.neighbors import KDTree
+
+from src.preprocessing.neighbors import blocked_knn, topk_smallest
+
+
+# Folga relativa/absoluta nos raios de busca para não perder empates por
+# diferenças de arredondamento entre a árvore e o cdist
+_RADIUS_SLACK = 1e-9
+
+
+def _slack(radius):
+    return radius * (1 + _RADIUS_SLACK) + _RADIUS_SLACK
+
+
+class ReverseNeighborIndex:
+    """
+    Índice de vizinhos reversos (RkNN): responde "quais músicas passariam a ter
+    x entre seus k vizinhos?". Uma música u aceita x se d(u, x) < r_u, onde r_u
+    é a distância do seu k-ésimo vizinho atual.
+
+    As músicas são separadas em faixas por raio; cada faixa tem uma KD-Tree e o
+    maior raio da faixa. Uma consulta busca cada faixa só até esse raio e depois
+    filtra pelo raio individual. Como os raios só diminuem quando entram vizinhos
+    novos, os raios máximos das faixas continuam sendo limites válidos.
+    """
+
+    def __init__(self, features, radii, n_bands=8):
+        '''
+        :param features: matriz (n x features) das músicas indexadas
+        :param radii: raio atual (distância do k-ésimo vizinho) de cada música
+        :param n_bands: número de faixas de raio
+        '''
+        self.size = len(features)
+        self.bands = []
+
+        if self.size == 0:
+            return
+
+        ordem = np.argsort(radii, kind='stable')
+        for membros in np.array_split(ordem, min(n_bands, self.size)):
+            if len(membros) == 0:
+                continue
+            membros = np.sort(membros)
+            self.bands.append((KDTree(features[membros]), membros, float(np.max(radii[membros]))))
+
+    def candidates(self, point):
+        '''
+        :param point: vetor de features da música nova
+        :return: posições das músicas indexadas que podem aceitar o ponto (superconjunto)
+        '''
+        encontrados = [
+            membros[tree.query_radius(point[None, :], r=_slack(raio_max))[0]]
+            for tree, membros, raio_max in self.bands
+        ]
+        if not encontrados:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(encontrados))
+
+
+class IncrementalKNN:
+    """
+    Listas K-NN (n x k) que aceitam inserção de músicas novas sem refazer o
+    cálculo O(n^2). O resultado é idêntico ao de um K-NN completo com as
+    músicas novas adicionadas ao final da base (mesmas regras de desempate).
+
+    Custo por música nova: uma consulta na KD-Tree para achar os vizinhos dela,
+    uma consulta no ReverseNeighborIndex para achar quem passa a apontar para ela,
+    e força bruta apenas contra as músicas inseridas depois da última reindexação.
+    """
+
+    def __init__(self, features, indices, distances, k, rebuild_ratio=0.25):
+        '''
+        :param features: matriz (n x features) normalizada
+        :param indices: matriz (n x min(k, n-1)) de vizinhos
+        :param distances: matriz (n x min(k, n-1)) de distâncias
+        :param k: número de vizinhos por nó usado na construção
+        :param rebuild_ratio: reindexa quando as músicas novas passam dessa fração da base
+        '''
+        self.k = k
+        self.rebuild_ratio = rebuild_ratio
+        self.n = len(features)
+
+        capacidade = max(self.n, 1)
+        self._features = np.empty((capacidade, np.shape(features)[1]), dtype=np.float64)
+        self._indices = np.empty((capacidade, k), dtype=np.intp)
+        self._distances = np.empty((capacidade, k), dtype=np.float64)
+
+        self._features[:self.n] = features
+        self.width = np.shape(indices)[1]
+        self._indices[:self.n, :self.width] = indices
+        self._distances[:self.n, :self.width] = distances
+
+        self._base = 0  # músicas cobertas pelas árvores; as demais são comparadas por força bruta
+        self._tree = None
+        self._reverse = None
+
+    @property
+    def features(self):
+        return self._features[:self.n]
+
+    @property
+    def indices(self):
+        return self._indices[:self.n, :self.width]
+
+    @property
+    def distances(self):
+        return self._distances[:self.n, :self.width]
+
+    def add(self, new_features):
+        '''
+        Insere músicas novas (na ordem recebida) e atualiza as listas afetadas.
+
+        :param new_features: matriz (m x features) já normalizada
+        :return: posições (ordenadas) de todas as linhas alteradas, incluindo as novas
+        '''
+        new_features = np.asarray(new_features, dtype=np.float64)
+        if len(new_features) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        self._reserve(self.n + len(new_features))
+        alteradas = set()
+
+        if self.k == 0:
+            self._features[self.n:self.n + len(new_features)] = new_features
+            self.n += len(new_features)
+            return np.arange(self.n - len(new_features), self.n)
+
+        # Enquanto a base tem até k músicas, todas as listas crescem: refaz tudo (barato)
+        if self.width < self.k:
+            inicio = self.n
+            self._features[inicio:inicio + len(new_features)] = new_features
+            self.n += len(new_features)
+            self.width = min(self.k, self.n - 1)
+            self._indices[:self.n, :self.width], self._distances[:self.n, :self.width] = \
+                blocked_knn(self.features, self.k)
+            self._tree = self._reverse = None
+            self._base = 0
+            return np.arange(self.n)
+
+        for point in new_features:
+            if self.n - self._base > self.rebuild_ratio * max(self._base, 1):
+                self._reindex()
+            alteradas.update(self._insert(point).tolist())
+
+        return np.array(sorted(alteradas), dtype=np.intp)
+
+    def _insert(self, point):
+        '''
+        [INTERNO] Insere uma música e devolve as posições das linhas alteradas.
+        '''
+        pos = self.n
+        self._features[pos] = point
+        self.n += 1
+
+        # 1) Quem passa a ter a música nova entre seus k vizinhos
+        candidatos = self._reverse.candidates(point)
+        delta = np.arange(self._base, pos)
+        candidatos = np.concatenate([candidatos, delta])
+
+        dist = cdist(point[None, :], self._features[candidatos])[0]
+        aceitos = dist < self._distances[candidatos, self.width - 1]
+
+        for u, d in zip(candidatos[aceitos].tolist(), dist[aceitos].tolist()):
+            # Entra depois de todos com distância <= d (posição maior perde o empate)
+            at = np.searchsorted(self._distances[u, :self.width], d, side='right')
+            self._indices[u, at + 1:self.width] = self._indices[u, at:self.width - 1].copy()
+            self._distances[u, at + 1:self.width] = self._distances[u, at:self.width - 1].copy()
+            self._indices[u, at] = pos
+            self._distances[u, at] = d
+
+        # 2) Os k vizinhos da própria música nova
+        kk = self.width + 1
+        dist_base, _ = self._tree.query(point[None, :], k=min(kk, self._base))
+        raio = _slack(dist_base[0, -1])
+        proximos = self._tree.query_radius(point[None, :], r=raio)[0]
+
+        colunas = np.concatenate([np.sort(proximos), delta, [pos]]).astype(np.intp)
+        linha = cdist(point[None, :], self._features[colunas])
+        idx, dist_viz = topk_smallest(linha, kk)
+        self._indices[pos, :self.width] = colunas[idx[0, 1:]]
+        self._distances[pos, :self.width] = dist_viz[0, 1:]
+
+        return np.append(candidatos[aceitos], pos)
+
+    def _reindex(self):
+        '''
+        [INTERNO] Reconstrói a KD-Tree e o índice reverso sobre todas as músicas atuais.
+        '''
+        self._base = self.n
+        self._tree = KDTree(self.features)
+        self._reverse = ReverseNeighborIndex(self.features, self._distances[:self.n, self.width - 1])
+
+    def _reserve(self, capacidade):
+        '''
+        [INTERNO] Garante espaço nos buffers (crescimento geométrico).
+        '''
+        if capacidade <= len(self._features):
+            return
+        nova = max(capacidade, 2 * len(self._features))
+        for nome in ('_features', '_indices', '_distances'):
+            antigo = getattr(self, nome)
+            buffer = np.empty((nova, antigo.shape[1]), dtype=antigo.dtype)
+            buffer[:len(antigo)] = antigo
+            setattr(self, nome, buffer)
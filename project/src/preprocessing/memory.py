@@ -0,0 +1,335 @@
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+from src.instrumentation import span
+from src.preprocessing.neighbors import BYTES_PER_CELL, resolve_block_size
+from src.preprocessing.out_of_core import READ_CHUNKSIZE
+from src.preprocessing.parallel import effective_n_jobs
+
+
+MB = 1024 * 1024
+
+# Bytes estimados por elemento nas etapas do build (medidos no grafo K-NN do projeto):
+# nx.DiGraph guarda cada aresta em _succ e _pred, com um dict {'weight': float} próprio,
+# e cada nó com seu dict de atributos; o HNSW guarda listas Python de vizinhos por camada.
+NX_BYTES_PER_EDGE = 290
+NX_BYTES_PER_NODE = 550
+HNSW_BYTES_PER_NODE = 1500
+# Listas de metadados (nome/artista) e indptr do CSRGraph
+CSR_BYTES_PER_NODE = 24
+
+# Bytes por linha de um bloco do dataset lido pelo build em disco (DataFrame com
+# ids, metadados e features, mais a cópia em float64 e a saída do scaler)
+OUT_OF_CORE_BYTES_PER_ROW = 400
+
+# Folga sobre a estimativa (fragmentação, temporários não modelados)
+ESTIMATE_MARGIN = 1.2
+
+
+def current_rss():
+    '''
+    :return: memória residente atual do processo, em bytes (None se indisponível)
+    '''
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    '''
+    Pico de memória residente (high-water mark) desde o início do processo ou
+    desde o último reset_peak_rss().
+
+    :return: bytes (None se indisponível)
+    '''
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource  # só existe em sistemas Unix
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024  # macOS em bytes, Linux em KB
+
+
+def reset_peak_rss():
+    '''
+    Zera o pico de memória residente do processo (Linux: /proc/self/clear_refs),
+    para medir o pico de uma etapa isolada.
+
+    :return: True se o pico foi zerado
+    '''
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def available_memory():
+    '''
+    :return: memória disponível no sistema em bytes (MemAvailable), ou None
+    '''
+    try:
+        with open('/proc/meminfo', encoding='ascii') as f:
+            for linha in f:
+                if linha.startswith('MemAvailable:'):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class MemoryTracker:
+    """
+    Mede a memória de cada etapa do build. Para cada stage() registra o RSS no
+    início e no fim, o pico de RSS da etapa (o high-water mark é zerado no
+    início dela quando o sistema permite; senão vale o pico do processo até
+    ali) e, com python_allocations=True, o pico das alocações rastreadas pelo
+    tracemalloc (inclui os arrays do numpy), que custa tempo em código Python.
+
+    Cada etapa também é um span da instrumentação, com os picos como atributos.
+    """
+
+    def __init__(self, python_allocations=False):
+        '''
+        :param python_allocations: se True, liga o tracemalloc enquanto o tracker estiver aberto
+        '''
+        self.python_allocations = python_allocations
+        self.stages = []
+        self._iniciou_tracemalloc = False
+
+    def __enter__(self):
+        if self.python_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+        return False
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        '''
+        Etapa medida e registrada como span (usar com `with`; etapas não devem ser aninhadas).
+
+        :param name: nome da etapa (também o nome do span)
+        :param attrs: atributos do span
+        :return: o span da etapa, que recebe os picos em MB como atributos
+        '''
+        with span(name, **attrs) as s:
+            with self.measure(name) as registro:
+                yield s
+            s.set(**{
+                f'{campo}_mb': round(registro[campo] / MB, 1)
+                for campo in ('rss_peak', 'python_peak') if registro[campo] is not None
+            })
+
+    @contextmanager
+    def measure(self, name):
+        '''
+        Etapa medida sem span próprio (ex: uma chamada que já abre o seu).
+
+        :param name: nome da etapa
+        :return: dict da etapa (preenchido ao sair do bloco)
+        '''
+        registro = {'stage': name, 'rss_start': current_rss(), 'peak_reset': reset_peak_rss()}
+        rastreando = self.python_allocations and tracemalloc.is_tracing()
+        if rastreando:
+            tracemalloc.reset_peak()
+            alocado = tracemalloc.get_traced_memory()[0]
+        try:
+            yield registro
+        finally:
+            registro['rss_end'] = current_rss()
+            registro['rss_peak'] = peak_rss()
+            registro['python_peak'] = tracemalloc.get_traced_memory()[1] - alocado if rastreando else None
+            self.stages.append(registro)
+
+    def peak(self):
+        '''
+        :return: maior pico de RSS entre as etapas, em bytes (None se nada foi medido)
+        '''
+        picos = [e['rss_peak'] for e in self.stages if e['rss_peak'] is not None]
+        return max(picos) if picos else None
+
+    def report(self):
+        '''
+        :return: linhas de texto com o pico de cada etapa
+        '''
+        linhas = []
+        for e in self.stages:
+            linha = f"{e['stage']:<12} pico RSS {_mb(e['rss_peak'])}"
+            if e['rss_start'] is not None and e['rss_end'] is not None:
+                linha += f"  (início {_mb(e['rss_start'])}, fim {_mb(e['rss_end'])})"
+            if e['python_peak'] is not None:
+                linha += f"  alocações {_mb(e['python_peak'])}"
+            linhas.append(linha)
+        return linhas
+
+
+def estimate_build_memory(n, n_features, k, representation='networkx', backend='brute',
+                          block_size=None, memory_budget_mb=None, n_jobs=None):
+    '''
+    Estima quanto cada etapa do build acrescenta à memória do processo (acima
+    do dataset já carregado), no pico da etapa. Os dados normalizados seguem
+    vivos até o fim, então entram em todas as etapas seguintes.
+
+    :param n: músicas (linhas com features)
+    :param n_features: features usadas no K-NN
+    :param k: vizinhos por nó
+    :param representation: 'networkx' ou 'csr'
+    :param backend: nome do backend de vizinhos ('brute', 'tree' ou 'hnsw')
+    :param block_size: linhas por bloco de distâncias (backend 'brute')
+    :param memory_budget_mb: orçamento de cada bloco de distâncias, se block_size não for dado
+    :param n_jobs: processos do K-NN (os blocos dos processos também são contados)
+    :return: dict etapa ('normalize', 'knn', 'edges') -> bytes
+    '''
+    largura = max(min(k + 1, n) - 1, 0)
+    dados = 2 * n * n_features * 8        # features em float64 + normalizadas
+    vizinhos = n * largura * 16           # índices (intp) + distâncias (float64)
+
+    if backend == 'brute':
+        jobs = effective_n_jobs(n, n_jobs)
+        bloco = resolve_block_size(n, block_size, memory_budget_mb)
+        knn = jobs * bloco * n * BYTES_PER_CELL + vizinhos
+        if jobs > 1:
+            knn += n * n_features * 8 + vizinhos  # matriz compartilhada + partes antes de concatenar
+    elif backend == 'tree':
+        knn = n * (n_features * 8 + 8) + 2 * vizinhos  # cópia da árvore + resultado com a própria música
+    else:
+        knn = n * HNSW_BYTES_PER_NODE + vizinhos
+
+    arestas = vizinhos + n * CSR_BYTES_PER_NODE
+    if representation == 'networkx':
+        arestas += n * NX_BYTES_PER_NODE + n * largura * NX_BYTES_PER_EDGE
+
+    return {
+        'normalize': dados + n * n_features * 8,  # + saída do scaler antes do DataFrame
+        'knn': dados + knn,
+        'edges': dados + arestas,
+    }
+
+
+def estimate_out_of_core_memory(n, n_features, k, block_size=None, memory_budget_mb=None, chunksize=READ_CHUNKSIZE):
+    '''
+    Estima as etapas do build em disco (OutOfCoreBuild): só um bloco do
+    dataset, ou um bloco de distâncias com seus vizinhos, fica em memória; as
+    features mapeadas (np.memmap) contam inteiras, pois são lidas a cada bloco.
+
+    :param chunksize: linhas do dataset lidas por vez
+    :return: dict etapa ('normalize', 'knn', 'assemble') -> bytes
+    '''
+    largura = max(min(k + 1, n) - 1, 0)
+    bloco = resolve_block_size(n, block_size, memory_budget_mb)
+    dados = n * n_features * 8
+    return {
+        'normalize': min(chunksize, n) * (OUT_OF_CORE_BYTES_PER_ROW + n_features * 8) + dados,
+        'knn': bloco * n * BYTES_PER_CELL + bloco * largura * 16 + dados,
+        'assemble': 0,  # cópia em fluxo, sem arrays inteiros em memória
+    }
+
+
+def plan_build(n, n_features, k, memory_budget, baseline=None, representation='networkx', backend='brute',
+               block_size=None, memory_budget_mb=None, n_jobs=None, out_of_core=False):
+    '''
+    Escolhe como construir o grafo sem passar de memory_budget (MB, pico de
+    RSS do processo). O pico estimado é a memória atual (baseline) mais a
+    maior etapa de estimate_build_memory, com ESTIMATE_MARGIN de folga. No
+    backend 'brute' sem block_size explícito, o bloco de distâncias é o maior
+    que cabe (limitado ao bloco padrão); se nem um bloco de uma linha couber
+    com vários processos, o K-NN passa a ser serial. Se ainda assim não
+    couber e out_of_core=True, o plano passa a ser o build em disco.
+
+    :param memory_budget: orçamento total do build, em MB
+    :param baseline: memória já usada pelo processo, em bytes (padrão: RSS atual)
+    :param out_of_core: se True, aceita o build em disco (OutOfCoreBuild) quando o em memória não cabe
+    :return: dict com block_size, n_jobs, out_of_core, estimate (bytes por etapa), peak e budget (bytes)
+    :raises MemoryError: se nenhuma estratégia couber no orçamento
+    '''
+    if memory_budget <= 0:
+        raise ValueError("memory_budget deve ser positivo")
+
+    orcamento = int(memory_budget * MB)
+    baseline = (current_rss() or 0) if baseline is None else baseline
+    livre = (orcamento - baseline) / ESTIMATE_MARGIN
+
+    plano = {'block_size': block_size, 'n_jobs': n_jobs}
+    if backend == 'brute' and block_size is None:
+        padrao = resolve_block_size(n, None, memory_budget_mb)
+        for jobs in dict.fromkeys([effective_n_jobs(n, n_jobs), 1]):
+            sem_bloco = estimate_build_memory(n, n_features, k, representation, backend, 1, None, jobs)['knn']
+            por_linha = jobs * max(n, 1) * BYTES_PER_CELL
+            bloco = int((livre - sem_bloco) // por_linha) + 1
+            if bloco >= 1:
+                plano = {'block_size': min(bloco, padrao), 'n_jobs': jobs}
+                break
+
+    estimativa = estimate_build_memory(n, n_features, k, representation, backend,
+                                       plano['block_size'], memory_budget_mb, plano['n_jobs'])
+    pico = int(baseline + max(estimativa.values()) * ESTIMATE_MARGIN)
+    plano.update(out_of_core=False, estimate=estimativa, peak=pico, budget=orcamento)
+
+    if pico > orcamento and out_of_core:
+        try:
+            return plan_out_of_core(n, n_features, k, memory_budget, baseline, block_size, memory_budget_mb)
+        except MemoryError:
+            pass  # mensagem do build em memória, que é o pedido
+
+    if pico > orcamento:
+        etapa = max(estimativa, key=estimativa.get)
+        dica = " Use representation='csr'." if representation == 'networkx' and etapa == 'edges' else ""
+        raise MemoryError(
+            f"Build estimado em {_mb(pico)} (etapa '{etapa}', {_mb(baseline)} já em uso), "
+            f"acima do orçamento de {_mb(orcamento)}.{dica}"
+        )
+    return plano
+
+
+def plan_out_of_core(n, n_features, k, memory_budget, baseline=None, block_size=None, memory_budget_mb=None):
+    '''
+    Escolhe o bloco do K-NN do build em disco (o maior que cabe em
+    memory_budget, limitado ao bloco padrão), como plan_build.
+
+    :return: dict com block_size, n_jobs (sempre 1), out_of_core=True, estimate, peak e budget
+    :raises MemoryError: se nem um bloco de uma linha couber
+    '''
+    orcamento = int(memory_budget * MB)
+    baseline = (current_rss() or 0) if baseline is None else baseline
+    livre = (orcamento - baseline) / ESTIMATE_MARGIN
+
+    if block_size is None:
+        sem_bloco = estimate_out_of_core_memory(n, n_features, k, block_size=1)['knn']
+        por_linha = max(n, 1) * BYTES_PER_CELL + max(min(k + 1, n) - 1, 0) * 16
+        block_size = max(min(int((livre - sem_bloco) // por_linha) + 1, resolve_block_size(n, None, memory_budget_mb)), 1)
+
+    estimativa = estimate_out_of_core_memory(n, n_features, k, block_size)
+    pico = int(baseline + max(estimativa.values()) * ESTIMATE_MARGIN)
+    if pico > orcamento:
+        etapa = max(estimativa, key=estimativa.get)
+        raise MemoryError(
+            f"Build em disco estimado em {_mb(pico)} (etapa '{etapa}', {_mb(baseline)} já em uso), "
+            f"acima do orçamento de {_mb(orcamento)}."
+        )
+    return {'block_size': block_size, 'n_jobs': 1, 'out_of_core': True,
+            'estimate': estimativa, 'peak': pico, 'budget': orcamento}
+
+
+def _mb(nbytes):
+    '''
+    [INTERNO] Bytes formatados em MB.
+    '''
+    return '?' if nbytes is None else f"{nbytes / MB:.1f} MB"
@@ -0,0 +1,490 @@
+import heapq
+import math
+
+import numpy as np
+from scipy.spatial.distance import cdist
+from sklearn.neighbors import BallTree, KDTree
+
+from src.preprocessing.parallel import effective_n_jobs, parallel_knn, worker_cache
+
+
+# Bytes estimados por célula de um bloco de distâncias:
+# matriz float64 + cópia do argpartition (int64) + máscaras booleanas.
+BYTES_PER_CELL = 24
+
+# Orçamento padrão por bloco quando nada é informado: blocos menores que a
+# matriz inteira também aproveitam melhor o cache.
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+
+def topk_smallest(dist, k):
+    '''
+    Seleciona, para cada linha, os k menores valores de uma matriz de distâncias.
+    Usa argpartition (O(n) por linha) em vez de ordenar a linha inteira.
+    Empates são resolvidos pela posição da coluna, exatamente como
+    pd.Series.nsmallest(keep='first').
+
+    :param dist: matriz (linhas x colunas) de distâncias
+    :param k: quantidade de menores valores por linha
+    :return: tupla (indices, distancias), ambas com shape (linhas, k) em ordem crescente
+    '''
+    n_rows, n_cols = dist.shape
+    k = min(k, n_cols)
+
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp), np.empty((n_rows, 0), dtype=dist.dtype)
+
+    if k == n_cols:
+        cols = np.argsort(dist, axis=1, kind='stable')
+        return cols, np.take_along_axis(dist, cols, axis=1)
+
+    # argpartition já deixa os k menores (em ordem arbitrária) nas k primeiras colunas
+    part = np.argpartition(dist, k - 1, axis=1)
+    cols = part[:, :k]
+    kth = np.take_along_axis(dist, part[:, k - 1:k], axis=1)
+    del part
+
+    # Linhas com empates no limiar: refaz a seleção mantendo os primeiros por coluna
+    excess = np.flatnonzero(np.count_nonzero(dist <= kth, axis=1) > k)
+    if len(excess):
+        sub = dist[excess]
+        less = sub < kth[excess]
+        equal = sub == kth[excess]
+        missing = k - np.count_nonzero(less, axis=1)[:, None]
+        keep = less | (equal & (np.cumsum(equal, axis=1) <= missing))
+        cols[excess] = np.nonzero(keep)[1].reshape(len(excess), k)
+
+    # Ordena por (distância, coluna): primeiro por coluna, depois estável por distância
+    cols = np.sort(cols, axis=1)
+    vals = np.take_along_axis(dist, cols, axis=1)
+    order = np.argsort(vals, axis=1, kind='stable')
+    return np.take_along_axis(cols, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+def resolve_block_size(n_rows, block_size=None, memory_budget_mb=None):
+    '''
+    Define quantas linhas de consulta processar por bloco.
+
+    :param n_rows: total de linhas (músicas) da base
+    :param block_size: tamanho de bloco explícito (tem prioridade)
+    :param memory_budget_mb: orçamento de memória para o bloco de distâncias, em MB
+        (DEFAULT_MEMORY_BUDGET_MB se nenhum dos dois for informado)
+    :return: número de linhas por bloco (>= 1)
+    '''
+    if block_size is not None:
+        if block_size < 1:
+            raise ValueError("block_size deve ser >= 1")
+        return int(block_size)
+
+    if memory_budget_mb is None:
+        memory_budget_mb = DEFAULT_MEMORY_BUDGET_MB
+
+    if memory_budget_mb <= 0:
+        raise ValueError("memory_budget_mb deve ser positivo")
+
+    budget = int(memory_budget_mb * 1024 * 1024)
+    return max(1, min(n_rows, budget // (max(n_rows, 1) * BYTES_PER_CELL)))
+
+
+def blocked_knn(data, k, block_size=None, memory_budget_mb=None, n_jobs=None):
+    '''
+    K-NN exato por força bruta, calculado em blocos de linhas.
+    Em vez da matriz n x n completa, cada bloco (block x n) é reduzido
+    imediatamente aos seus top-k, então o pico de memória é O(n*block + n*k).
+
+    Segue a mesma regra do grafo original: pega os k+1 menores de cada linha
+    e descarta o primeiro (a própria música).
+
+    Com n_jobs, as linhas são divididas em faixas entre processos que leem a
+    matriz da memória compartilhada; o resultado é idêntico ao serial.
+
+    :param data: matriz (n x features) já normalizada
+    :param k: número de vizinhos por nó
+    :param block_size: linhas por bloco (opcional)
+    :param memory_budget_mb: orçamento de memória por bloco em MB (opcional; vale por processo)
+    :param n_jobs: número de processos (None = serial, -1 = todos os núcleos)
+    :return: tupla (indices, distancias), shape (n, min(k, n-1))
+    '''
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+    kk = min(k + 1, n)
+    block = resolve_block_size(n, block_size, memory_budget_mb)
+
+    jobs = effective_n_jobs(n, n_jobs)
+    if jobs > 1:
+        return parallel_knn(data, _blocked_rows, (kk, block), n_jobs=jobs)
+    return _blocked_rows(data, 0, n, kk, block)
+
+
+def _blocked_rows(data, start, stop, kk, block):
+    '''
+    [INTERNO] Top-kk (sem a própria música) das linhas start:stop, em blocos de block linhas.
+    '''
+    width = max(kk - 1, 0)
+    indices = np.empty((stop - start, width), dtype=np.intp)
+    distances = np.empty((stop - start, width), dtype=np.float64)
+
+    for inicio in range(start, stop, block):
+        fim = min(inicio + block, stop)
+        indices[inicio - start:fim - start], distances[inicio - start:fim - start] = \
+            _knn_block(data[inicio:fim], data, kk)
+
+    return indices, distances
+
+
+def exact_knn_rows(data, rows, k):
+    '''
+    K-NN exato apenas para um subconjunto de linhas (usado na medição de recall).
+
+    :param data: matriz (n x features) já normalizada
+    :param rows: posições das linhas de consulta
+    :param k: número de vizinhos por nó
+    :return: tupla (indices, distancias), shape (len(rows), min(k, n-1))
+    '''
+    data = np.asarray(data, dtype=np.float64)
+    return _knn_block(data[np.asarray(rows)], data, min(k + 1, len(data)))
+
+
+def _knn_block(queries, data, kk):
+    '''
+    [INTERNO] Top-kk de um bloco de consultas contra a base inteira,
+    descartando o primeiro resultado (a própria música).
+    '''
+    dist_block = cdist(queries, data, metric='euclidean')
+    idx, dist = topk_smallest(dist_block, kk)
+    return idx[:, 1:], dist[:, 1:]
+
+
+def knn_recall(indices, exact_indices):
+    '''
+    Recall médio de um K-NN aproximado: fração dos vizinhos exatos
+    que aparecem na lista aproximada de cada linha.
+
+    :param indices: vizinhos encontrados pelo backend (linhas x k)
+    :param exact_indices: vizinhos exatos das mesmas linhas (linhas x k)
+    :return: recall entre 0 e 1
+    '''
+    exact_indices = np.asarray(exact_indices)
+    if exact_indices.size == 0:
+        return 1.0
+
+    hits = sum(
+        len(np.intersect1d(approx, exact, assume_unique=True))
+        for approx, exact in zip(np.asarray(indices), exact_indices)
+    )
+    return hits / exact_indices.size
+
+
+def estimate_recall(data, indices, sample_size=1000, seed=42):
+    '''
+    Estima o recall de um K-NN comparando uma amostra de linhas com o K-NN exato.
+    Custa O(amostra * n) em vez de O(n^2).
+
+    :param data: matriz (n x features) já normalizada
+    :param indices: vizinhos encontrados pelo backend (n x k)
+    :param sample_size: número de linhas sorteadas para a comparação
+    :param seed: semente do sorteio
+    :return: recall entre 0 e 1
+    '''
+    n, k = np.asarray(indices).shape
+    if n == 0 or k == 0:
+        return 1.0
+
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(n, size=min(sample_size, n), replace=False))
+    exact, _ = exact_knn_rows(data, rows, k)
+    return knn_recall(np.asarray(indices)[rows], exact)
+
+
+class BruteForceBackend:
+    '''
+    Backend exato: força bruta em blocos (O(n^2) tempo, memória limitada).
+    '''
+    name = 'brute'
+    exact = True
+
+    def __init__(self, block_size=None, memory_budget_mb=None, n_jobs=None):
+        self.block_size = block_size
+        self.memory_budget_mb = memory_budget_mb
+        self.n_jobs = n_jobs
+
+    def kneighbors(self, data, k):
+        '''
+        :param data: matriz (n x features) já normalizada
+        :param k: número de vizinhos por nó
+        :return: tupla (indices, distancias), shape (n, min(k, n-1))
+        '''
+        return blocked_knn(data, k, block_size=self.block_size, memory_budget_mb=self.memory_budget_mb,
+                           n_jobs=self.n_jobs)
+
+
+class TreeBackend:
+    '''
+    Backend exato baseado em árvore espacial (KD-Tree ou Ball-Tree do scikit-learn).
+    Em 6 dimensões a consulta fica perto de O(log n) por música.
+    Com n_jobs, cada processo monta a árvore a partir da matriz compartilhada
+    e consulta uma faixa de linhas.
+    '''
+    name = 'tree'
+    exact = True
+
+    _TREES = {'kd': KDTree, 'ball': BallTree}
+
+    def __init__(self, kind='kd', leaf_size=40, n_jobs=None):
+        if kind not in self._TREES:
+            raise ValueError(f"Tipo de árvore desconhecido: {kind} (use 'kd' ou 'ball')")
+        self.kind = kind
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+
+    def kneighbors(self, data, k):
+        '''
+        :param data: matriz (n x features) já normalizada
+        :param k: número de vizinhos por nó
+        :return: tupla (indices, distancias), shape (n, min(k, n-1))
+        '''
+        data = np.asarray(data, dtype=np.float64)
+        n = len(data)
+        kk = min(k + 1, n)
+        if kk == 0:
+            return np.empty((0, 0), dtype=np.intp), np.empty((0, 0))
+
+        jobs = effective_n_jobs(n, self.n_jobs)
+        if jobs > 1:
+            return parallel_knn(data, _tree_rows, (kk, self.kind, self.leaf_size), n_jobs=jobs)
+        return _tree_rows(data, 0, n, kk, self.kind, self.leaf_size)
+
+
+def _tree_rows(data, start, stop, kk, kind, leaf_size):
+    '''
+    [INTERNO] Top-kk (sem a própria música) das linhas start:stop consultando uma
+    árvore da base inteira (construída uma vez por processo do pool).
+    '''
+    tree = worker_cache(('tree', kind, leaf_size), lambda: TreeBackend._TREES[kind](data, leaf_size=leaf_size))
+    dist, idx = tree.query(data[start:stop], k=kk)
+
+    # Reordena por (distância, posição) para desempatar como o backend exato
+    order = np.lexsort((idx, dist))
+    idx = np.take_along_axis(idx, order, axis=1)
+    dist = np.take_along_axis(dist, order, axis=1)
+    return idx[:, 1:].astype(np.intp), dist[:, 1:]
+
+
+class HNSWBackend:
+    '''
+    Backend aproximado: grafo HNSW (Hierarchical Navigable Small World)
+    implementado no próprio projeto. Construção e consulta são ~O(n log n),
+    ao custo de um recall menor que 1 (medido com estimate_recall).
+
+    :param M: número de ligações por nó nas camadas superiores (2*M na camada 0)
+    :param ef_construction: tamanho da lista de candidatos durante a inserção
+    :param ef_search: tamanho da lista de candidatos durante a consulta
+    :param seed: semente para o sorteio de camadas
+    '''
+    name = 'hnsw'
+    exact = False
+
+    def __init__(self, M=16, ef_construction=100, ef_search=64, seed=42):
+        if M < 2:
+            raise ValueError("M deve ser >= 2")
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+
+        self._data = None
+        self._layers = []
+        self._entry = None
+        self._entry_level = -1
+
+    def fit(self, data):
+        '''
+        Constrói o índice HNSW inserindo os pontos um a um.
+
+        :param data: matriz (n x features) já normalizada
+        :return: self
+        '''
+        self._data = np.asarray(data, dtype=np.float64)
+        self._layers = []
+        self._entry = None
+        self._entry_level = -1
+
+        rng = np.random.default_rng(self.seed)
+        mult = 1.0 / math.log(self.M)
+        levels = np.floor(-np.log(1.0 - rng.random(len(self._data))) * mult).astype(int)
+
+        for node, level in enumerate(levels):
+            self._insert(node, level)
+
+        return self
+
+    def query(self, point, k, ef=None):
+        '''
+        Busca aproximada dos k pontos mais próximos de point.
+
+        :return: lista [(distancia, indice)] em ordem crescente
+        '''
+        if self._entry is None:
+            return []
+
+        ef = max(ef or self.ef_search, k)
+        entry = [self._entry]
+        for level in range(self._entry_level, 0, -1):
+            entry = [self._search_layer(point, entry, 1, level)[0][1]]
+
+        return self._search_layer(point, entry, ef, 0)[:k]
+
+    def kneighbors(self, data, k):
+        '''
+        :param data: matriz (n x features) já normalizada
+        :param k: número de vizinhos por nó
+        :return: tupla (indices, distancias), shape (n, min(k, n-1))
+        '''
+        self.fit(data)
+        n = len(self._data)
+        width = max(min(k, n - 1), 0)
+
+        indices = np.empty((n, width), dtype=np.intp)
+        distances = np.empty((n, width), dtype=np.float64)
+
+        for node in range(n):
+            found = [(d, i) for d, i in self.query(self._data[node], width + 1) if i != node][:width]
+
+            # Se a busca aproximada achou menos que width, completa com os mais próximos conhecidos
+            if len(found) < width:
+                found = self._fill(node, found, width)
+
+            distances[node] = [d for d, _ in found]
+            indices[node] = [i for _, i in found]
+
+        return indices, distances
+
+    def _distances(self, point, nodes):
+        diff = self._data[nodes] - point
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    def _search_layer(self, point, entry, ef, level):
+        '''
+        [INTERNO] Busca gulosa com lista de ef candidatos numa camada.
+        Retorna [(distancia, indice)] em ordem crescente.
+        '''
+        links = self._layers[level]
+        visited = set(entry)
+        dists = self._distances(point, entry)
+
+        candidates = [(d, e) for d, e in zip(dists.tolist(), entry)]
+        heapq.heapify(candidates)
+        results = [(-d, e) for d, e in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0]:
+                break
+
+            novos = [e for e in links[node] if e not in visited]
+            if not novos:
+                continue
+            visited.update(novos)
+
+            for d, e in zip(self._distances(point, novos).tolist(), novos):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, e))
+                    heapq.heappush(results, (-d, e))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted((-d, e) for d, e in results)
+
+    def _select_neighbors(self, found, max_links):
+        '''
+        [INTERNO] Heurística de diversidade do HNSW: um candidato só entra se
+        estiver mais perto do ponto do que de qualquer vizinho já escolhido.
+        Vagas restantes são completadas com os descartados mais próximos.
+        '''
+        selected, pruned = [], []
+        for dist, node in found:
+            if len(selected) >= max_links:
+                break
+            if not selected or np.all(self._distances(self._data[node], selected) > dist):
+                selected.append(node)
+            else:
+                pruned.append(node)
+
+        return selected + pruned[:max_links - len(selected)]
+
+    def _insert(self, node, level):
+        '''
+        [INTERNO] Insere um ponto no índice em todas as camadas até level.
+        '''
+        while len(self._layers) <= level:
+            self._layers.append({})
+        for lvl in range(level + 1):
+            self._layers[lvl][node] = []
+
+        if self._entry is None:
+            self._entry = node
+            self._entry_level = level
+            return
+
+        point = self._data[node]
+        entry = [self._entry]
+        for lvl in range(self._entry_level, level, -1):
+            entry = [self._search_layer(point, entry, 1, lvl)[0][1]]
+
+        for lvl in range(min(level, self._entry_level), -1, -1):
+            found = self._search_layer(point, entry, self.ef_construction, lvl)
+            max_links = 2 * self.M if lvl == 0 else self.M
+
+            neighbors = self._select_neighbors(found, self.M)
+            self._layers[lvl][node] = neighbors
+
+            for other in neighbors:
+                links = self._layers[lvl][other]
+                links.append(node)
+                if len(links) > max_links:
+                    dists = self._distances(self._data[other], links)
+                    ordered = sorted(zip(dists.tolist(), links))
+                    self._layers[lvl][other] = self._select_neighbors(ordered, max_links)
+
+            entry = [e for _, e in found]
+
+        if level > self._entry_level:
+            self._entry = node
+            self._entry_level = level
+
+    def _fill(self, node, found, width):
+        '''
+        [INTERNO] Completa uma lista de vizinhos com busca exaustiva (raro: só
+        acontece quando a base é menor que ef ou o grafo ficou desconexo).
+        '''
+        dists = self._distances(self._data[node], np.arange(len(self._data)))
+        dists[node] = np.inf
+        order = np.lexsort((np.arange(len(dists)), dists))[:width]
+        return [(dists[i], int(i)) for i in order]
+
+
+NEIGHBOR_BACKENDS = {
+    'brute': BruteForceBackend,
+    'tree': TreeBackend,
+    'hnsw': HNSWBackend,
+}
+
+
+def get_backend(backend='brute', **options):
+    '''
+    Resolve um backend de busca de vizinhos pelo nome (ou devolve a instância recebida).
+
+    :param backend: nome registrado em NEIGHBOR_BACKENDS ou objeto com kneighbors(data, k)
+    :param options: argumentos repassados ao construtor do backend
+    :return: instância do backend
+    '''
+    if hasattr(backend, 'kneighbors'):
+        return backend
+
+    if backend not in NEIGHBOR_BACKENDS:
+        raise ValueError(f"Backend de vizinhos desconhecido: {backend}. Opções: {list(NEIGHBOR_BACKENDS)}")
+
+    return NEIGHBOR_BACKENDS[backend](**options)
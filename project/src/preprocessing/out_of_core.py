@@ -0,0 +1,338 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from src.instrumentation import count, span
+from src.preprocessing.columnar import _append_bytes, is_columnar, read_columnar, read_columnar_meta
+from src.preprocessing.neighbors import _knn_block, resolve_block_size
+from src.preprocessing.snapshot import META_FILE, SNAPSHOT_FORMAT, SNAPSHOT_VERSION, StringColumn
+
+
+# Linhas do dataset processadas por vez nas passadas de normalização
+READ_CHUNKSIZE = 50_000
+# Elementos copiados por vez na montagem do snapshot
+COPY_CHUNK = 1 << 22
+PROGRESS_FILE = 'progress.json'
+
+
+class OutOfCoreBuild:
+    """
+    Construção do grafo K-NN em disco, para bases em que as arestas (n x k) e
+    a matriz de features não cabem na memória. Tudo fica num diretório de trabalho:
+        features.npy            features normalizadas (np.memmap, n x features)
+        node_ids.*, attr_*.*    ids e metadados, anexados bloco a bloco
+        indices.bin/weights.bin vizinhos de cada bloco de linhas, anexados em ordem
+        progress.json           parâmetros, normalização e linhas já concluídas
+
+    Etapas: prepare() lê o dataset em blocos duas vezes (mínimo/máximo das
+    features, depois normalização para o memmap); knn() calcula o K-NN exato
+    por blocos de linhas contra o memmap e anexa cada bloco ao arquivo de
+    arestas; assemble() monta o snapshot copiando os arquivos em fluxo.
+
+    O progresso é gravado depois de cada bloco do K-NN (com os arquivos já em
+    disco); ao rodar de novo com os mesmos parâmetros, a construção continua
+    do último bloco concluído. O snapshot é igual ao do build em memória.
+    """
+
+    def __init__(self, source, work_dir, k_neighbors, feature_cols, load_cols,
+                 block_size=None, memory_budget_mb=None, chunksize=None):
+        '''
+        :param source: dataset processado (CSV ou diretório colunar)
+        :param work_dir: diretório de trabalho (mantido até a montagem do snapshot)
+        :param k_neighbors: vizinhos por nó
+        :param feature_cols: features usadas no K-NN (as presentes no dataset)
+        :param load_cols: colunas lidas do dataset (id, metadados e features)
+        :param block_size: linhas de consulta por bloco do K-NN
+        :param memory_budget_mb: orçamento de memória por bloco, se block_size não for dado
+        :param chunksize: linhas lidas por vez do dataset (padrão: READ_CHUNKSIZE)
+        '''
+        self.source = source
+        self.work_dir = work_dir
+        self.k_neighbors = k_neighbors
+        self.feature_cols = list(feature_cols)
+        self.load_cols = list(load_cols)
+        self.block_size = block_size
+        self.memory_budget_mb = memory_budget_mb
+        self.chunksize = chunksize or READ_CHUNKSIZE
+        self.progress = self._read_progress()
+
+    @property
+    def n(self):
+        return self.progress['num_nodes']
+
+    @property
+    def width(self):
+        return self.progress['width']
+
+    @property
+    def done(self):
+        '''
+        :return: True se o K-NN de todas as linhas já está em disco
+        '''
+        return 'num_nodes' in self.progress and self.progress['rows_done'] >= self.n
+
+    def prepare(self):
+        '''
+        Normaliza as features para o memmap e grava ids e metadados. Refeita do
+        zero se foi interrompida (é linear no tamanho da base); pulada se o
+        progresso gravado já a contém.
+
+        :return: número de músicas
+        '''
+        if 'num_nodes' in self.progress:
+            return self.n
+
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        os.makedirs(self.work_dir)
+
+        scaler = MinMaxScaler()
+        n = 0
+        for _, numericos in self._chunks():
+            if len(numericos):
+                scaler.partial_fit(numericos)
+                n += len(numericos)
+        if n == 0:
+            raise ValueError("O dataset não tem músicas com todas as features")
+
+        largura = max(min(self.k_neighbors + 1, n) - 1, 0)
+        features = np.lib.format.open_memmap(
+            self._file('features.npy'), mode='w+', dtype=np.float64, shape=(n, len(self.feature_cols))
+        )
+        # coluna do snapshot -> coluna do dataset (None = ids, o índice)
+        colunas = {
+            nome: _ColumnAppender(self._file(nome), origem)
+            for nome, origem in (('node_ids', None), ('attr_name', 'track_name'), ('attr_artist', 'artists'))
+        }
+
+        pos = 0
+        for validos, numericos in self._chunks():
+            if not len(numericos):
+                continue
+            features[pos:pos + len(numericos)] = scaler.transform(numericos)
+            pos += len(numericos)
+            for coluna in colunas.values():
+                if coluna.source is None:
+                    coluna.append(validos.index.tolist())
+                elif coluna.source in validos.columns:
+                    coluna.append(validos[coluna.source].tolist())
+                else:
+                    coluna.append(['Unknown'] * len(validos))
+        features.flush()
+        del features
+
+        self.progress = {
+            'signature': self._signature(),
+            'num_nodes': n,
+            'width': largura,
+            'columns': {nome: {'kind': c.kind, 'nulls': c.has_nulls} for nome, c in colunas.items()},
+            'data_min': scaler.data_min_.tolist(),
+            'data_max': scaler.data_max_.tolist(),
+            'rows_done': 0,
+        }
+        self._write_progress()
+        count('rows_prepared', n)
+        return n
+
+    def knn(self):
+        '''
+        K-NN por blocos de linhas, a partir da primeira linha ainda não concluída.
+        Cada bloco é anexado a indices.bin/weights.bin e só então registrado no progresso.
+
+        :return: número de blocos calculados nesta chamada
+        '''
+        n, largura = self.n, self.width
+        inicio = self.progress['rows_done']
+        # descarta o que passou da última linha registrada (bloco interrompido)
+        for nome, dtype in (('indices.bin', np.int32), ('weights.bin', np.float64)):
+            caminho = self._file(nome)
+            with open(caminho, 'ab'):
+                pass
+            os.truncate(caminho, inicio * largura * np.dtype(dtype).itemsize)
+
+        data = np.load(self._file('features.npy'), mmap_mode='r')
+        bloco = resolve_block_size(n, self.block_size, self.memory_budget_mb)
+        kk = min(self.k_neighbors + 1, n)
+        blocos = 0
+        for linha in range(inicio, n, bloco):
+            fim = min(linha + bloco, n)
+            with span('knn_block', start=linha, rows=fim - linha):
+                indices, distancias = _knn_block(np.asarray(data[linha:fim]), data, kk)
+                _append_durable(self._file('indices.bin'), indices.astype(np.int32))
+                _append_durable(self._file('weights.bin'), distancias.astype(np.float64))
+            self.progress['rows_done'] = fim
+            self._write_progress()
+            blocos += 1
+        return blocos
+
+    def assemble(self, save_path, graph_attrs=None):
+        '''
+        Monta o snapshot (mesmo formato de save_snapshot) copiando os arquivos
+        de trabalho em fluxo, e apaga o diretório de trabalho.
+
+        :param save_path: diretório do snapshot
+        :param graph_attrs: atributos do grafo (meta.json)
+        :return: save_path
+        '''
+        if not self.done:
+            raise RuntimeError("K-NN incompleto: execute knn() antes de assemble()")
+
+        n, largura = self.n, self.width
+        tmp_path = save_path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, 'indptr.npy'), np.arange(n + 1, dtype=np.int64) * largura)
+        _stream_to_npy(self._file('indices.bin'), os.path.join(tmp_path, 'indices.npy'), np.int32)
+        _stream_to_npy(self._file('weights.bin'), os.path.join(tmp_path, 'weights.npy'), np.float64)
+        os.replace(self._file('features.npy'), os.path.join(tmp_path, 'features.npy'))
+
+        for nome, coluna in self.progress['columns'].items():
+            partes = ['int'] if coluna['kind'] == 'int' else ['data', 'offsets'] + (['nulls'] if coluna['nulls'] else [])
+            for parte in partes:
+                dtype = {'int': np.int64, 'data': np.uint8, 'offsets': np.int64, 'nulls': bool}[parte]
+                _stream_to_npy(self._file(f'{nome}.{parte}'), os.path.join(tmp_path, f'{nome}.{parte}.npy'), dtype)
+
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'num_nodes': n,
+            'num_edges': n * largura,
+            'node_id_kind': self.progress['columns']['node_ids']['kind'],
+            'node_attrs': ['name', 'artist'],
+            'has_features': True,
+            'graph': dict(graph_attrs or {}),
+        }
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+        shutil.rmtree(save_path, ignore_errors=True)
+        os.replace(tmp_path, save_path)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        return save_path
+
+    def _chunks(self):
+        '''
+        [INTERNO] Blocos do dataset: (linhas com todas as features, indexadas pelo id;
+        features dessas linhas em float64), como o dropna do build em memória.
+        '''
+        if is_columnar(self.source):
+            meta = read_columnar_meta(self.source)
+            colunas = [c for c in self.load_cols if c in {col['name'] for col in meta['columns']}]
+            blocos = (
+                read_columnar(self.source, columns=colunas, start=i, stop=i + self.chunksize)
+                for i in range(0, meta['num_rows'], self.chunksize)
+            )
+        else:
+            blocos = pd.read_csv(self.source, usecols=lambda c: c in self.load_cols, chunksize=self.chunksize)
+
+        for bloco in blocos:
+            if 'track_id' in bloco.columns:
+                bloco = bloco.set_index('track_id')
+            validos = bloco[bloco[self.feature_cols].notna().all(axis=1)]
+            yield validos, validos[self.feature_cols].astype(np.float64)
+
+    def _signature(self):
+        '''
+        [INTERNO] O que precisa ser igual para continuar um build interrompido.
+        '''
+        estado = os.stat(self.source) if os.path.isfile(self.source) else \
+            os.stat(os.path.join(self.source, META_FILE))
+        return {
+            'source': os.path.abspath(self.source),
+            'size': estado.st_size,
+            'mtime_ns': estado.st_mtime_ns,
+            'k_neighbors': self.k_neighbors,
+            'feature_cols': self.feature_cols,
+        }
+
+    def _read_progress(self):
+        '''
+        [INTERNO] Progresso gravado, se for de um build com os mesmos parâmetros.
+        '''
+        try:
+            with open(self._file(PROGRESS_FILE), encoding='utf-8') as f:
+                progresso = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return progresso if progresso.get('signature') == self._signature() else {}
+
+    def _write_progress(self):
+        tmp = self._file(PROGRESS_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.progress, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file(PROGRESS_FILE))
+
+    def _file(self, nome):
+        return os.path.join(self.work_dir, nome)
+
+
+class _ColumnAppender:
+    """
+    [INTERNO] Coluna de ids ou metadados gravada bloco a bloco nos arquivos
+    crus de uma StringColumn (<base>.data, .offsets, .nulls) ou, se os valores
+    forem inteiros, num array int64 (<base>.int), como _column_arrays do snapshot.
+    """
+
+    def __init__(self, base, source=None):
+        self.base = base
+        self.source = source  # coluna do dataset (None = índice)
+        self.kind = None
+        self.has_nulls = False
+        self._bytes = 0
+        self._linhas = 0
+
+    def append(self, valores):
+        inteiros = bool(valores) and all(
+            isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in valores
+        )
+        kind = 'int' if inteiros else 'str'
+        if valores and self.kind is not None and kind != self.kind:
+            raise ValueError(f"Tipos diferentes entre blocos na coluna {self.source or 'track_id'} ({self.kind} e {kind})")
+        self.kind = self.kind or (kind if valores else None)
+
+        if self.kind == 'int':
+            _append_bytes(f'{self.base}.int', np.asarray(valores, dtype=np.int64))
+            return
+
+        coluna = StringColumn.from_values(valores)
+        if self._linhas == 0:
+            _append_bytes(f'{self.base}.offsets', np.zeros(1, dtype=np.int64))
+        _append_bytes(f'{self.base}.data', coluna.data)
+        _append_bytes(f'{self.base}.offsets', coluna.offsets[1:] + self._bytes)
+        nulos = coluna.nulls if coluna.nulls is not None else np.zeros(len(valores), dtype=bool)
+        _append_bytes(f'{self.base}.nulls', nulos)
+        self.has_nulls = self.has_nulls or coluna.nulls is not None
+        self._bytes += int(coluna.offsets[-1])
+        self._linhas += len(valores)
+
+
+def _append_durable(path, array):
+    '''
+    [INTERNO] Anexa o array ao arquivo e só retorna com os bytes gravados em disco.
+    '''
+    with open(path, 'ab') as f:
+        f.write(np.ascontiguousarray(array).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _stream_to_npy(origem, destino, dtype):
+    '''
+    [INTERNO] Converte um arquivo binário cru num .npy 1-D, copiando COPY_CHUNK elementos por vez.
+    '''
+    dtype = np.dtype(dtype)
+    total = os.path.getsize(origem) // dtype.itemsize if os.path.exists(origem) else 0
+    saida = np.lib.format.open_memmap(destino, mode='w+', dtype=dtype, shape=(total,))
+    if total:
+        entrada = np.memmap(origem, dtype=dtype, mode='r', shape=(total,))
+        for inicio in range(0, total, COPY_CHUNK):
+            saida[inicio:inicio + COPY_CHUNK] = entrada[inicio:inicio + COPY_CHUNK]
+        del entrada
+    saida.flush()
+    del saida
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Abaixo disso o custo de subir os processos supera o ganho
+MIN_ROWS_PER_JOB = 2_000
+
+# Estado de cada processo do pool: matriz compartilhada e índices já construídos
+_SHARED = {}
+
+
+def resolve_n_jobs(n_jobs=None):
+    '''
+    Número de processos a usar (como no scikit-learn: None = 1, -1 = todos os núcleos).
+
+    :param n_jobs: inteiro positivo, -1 (todos) ou None
+    :return: inteiro >= 1
+    '''
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0 or n_jobs < -1:
+        raise ValueError("n_jobs deve ser positivo, -1 (todos os núcleos) ou None")
+    cpus = os.cpu_count() or 1
+    return cpus if n_jobs == -1 else int(n_jobs)
+
+
+def effective_n_jobs(n_rows, n_jobs=None):
+    '''
+    Processos que compensam para n_rows linhas de consulta (1 = execução serial).
+    '''
+    return max(1, min(resolve_n_jobs(n_jobs), n_rows // MIN_ROWS_PER_JOB))
+
+
+class SharedMatrix:
+    """
+    Cópia de uma matriz NumPy num bloco de memória compartilhada (multiprocessing.shared_memory).
+    Os processos do pool abrem o bloco pelo nome, sem receber os dados por pickle.
+    Usada como context manager: o bloco é liberado na saída.
+    """
+
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.spec = (self._shm.name, array.shape, array.dtype.str)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)[...] = array
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def _init_worker(spec):
+    '''
+    [INTERNO] Inicializador do pool: abre a matriz compartilhada (sem copiar).
+    '''
+    name, shape, dtype = spec
+    # Só leitura: quem cria o bloco (SharedMatrix) é quem o libera
+    shm = shared_memory.SharedMemory(name=name)
+    _SHARED.clear()
+    _SHARED['shm'] = shm
+    _SHARED['data'] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def worker_cache(key, factory):
+    '''
+    Objeto reaproveitado entre as faixas de um mesmo processo (ex: a árvore do K-NN,
+    construída uma vez por processo). Fora de um pool, apenas chama factory().
+
+    :param key: chave do objeto
+    :param factory: função sem argumentos que cria o objeto
+    '''
+    if 'data' not in _SHARED:
+        return factory()
+    if key not in _SHARED:
+        _SHARED[key] = factory()
+    return _SHARED[key]
+
+
+def _run_shard(task):
+    '''
+    [INTERNO] Executa func(data, start, stop, *args) sobre a matriz compartilhada.
+    '''
+    func, start, stop, args = task
+    return func(_SHARED['data'], start, stop, *args)
+
+
+def shard_bounds(n_rows, n_shards):
+    '''
+    Divide [0, n_rows) em n_shards faixas contíguas de tamanho quase igual.
+
+    :return: lista de tuplas (start, stop)
+    '''
+    n_shards = max(1, min(n_shards, n_rows))
+    limites = np.linspace(0, n_rows, n_shards + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+
+
+def parallel_knn(data, func, args=(), n_jobs=-1, shards_per_job=4):
+    '''
+    Calcula o K-NN por faixas de linhas de consulta num pool de processos.
+    A matriz fica em memória compartilhada; cada faixa devolve seus arrays
+    (indices, distancias) e o resultado é montado na ordem das faixas,
+    então é idêntico ao cálculo serial.
+
+    :param data: matriz (n x features) já normalizada
+    :param func: função de módulo func(data, start, stop, *args) -> (indices, distancias)
+        das linhas start:stop (precisa ser importável pelos processos filhos)
+    :param args: argumentos extras de func
+    :param n_jobs: número de processos (-1 = todos os núcleos)
+    :param shards_per_job: faixas por processo (faixas menores equilibram melhor a carga)
+    :return: tupla (indices, distancias) com as linhas de todas as faixas
+    '''
+    n = len(data)
+    jobs = resolve_n_jobs(n_jobs)
+    faixas = shard_bounds(n, jobs * shards_per_job)
+
+    with SharedMatrix(data) as shared, ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(shared.spec,)) as pool:
+        partes = list(pool.map(_run_shard, [(func, start, stop, args) for start, stop in faixas]))
+
+    if not partes:
+        return func(np.asarray(data), 0, 0, *args)
+    return np.concatenate([p[0] for p in partes]), np.concatenate([p[1] for p in partes])
+
@@ -1,6 +1,28 @@
+import importlib.util
+import sys
+
+import numpy as np
 import pandas as pd
 import os
 
+from src.instrumentation import count, span, traced
+from src.preprocessing.columnar import ColumnarWriter, columnar_path, write_columnar
+from src.preprocessing.sampling import ReservoirSampler
+
+
+def resolve_engine(engine='auto'):
+    """
+    Leitor do CSV bruto usado de fato para a engine pedida: 'pyarrow' ou 'c'.
+    Sem pyarrow instalado, usa o leitor C do pandas.
+    """
+    if engine == 'c':
+        return 'c'
+    if importlib.util.find_spec('pyarrow') is not None:
+        return 'pyarrow'
+    if engine == 'pyarrow':
+        print("   [AVISO] pyarrow não instalado. Usando o leitor C do pandas.")
+    return 'c'
+
 
 class DataProcessor:
     """
@@ -9,19 +31,69 @@ class DataProcessor:
     Gera dois arquivos CSV:
     1. songs_full.csv - Dataset completo limpo.
     2. songs.csv - Amostra balanceada para construção do grafo.
+
+    O CSV bruto é lido em blocos (chunksize linhas); as duplicatas são removidas
+    entre blocos com conjuntos de hashes das chaves, então a memória usada depende
+    do tamanho do bloco e do número de músicas distintas, não do tamanho do arquivo.
+
+    Com output_format='columnar' (ou 'both'), os datasets também são salvos em
+    formato colunar binário (songs_full.cols / songs.cols), que preserva float32
+    e categorias e é lido pelo GraphBuilder sem parse de texto.
     """
 
-    def __init__(self, input_path: str, output_dir: str):
+    DEFAULT_CHUNKSIZE = 100_000
+
+    # Colunas lidas como texto: as chaves de deduplicação não podem mudar de tipo entre blocos
+    KEY_COLS = ['track_id', 'track_name', 'artists']
+
+    # Features de áudio: float32 basta para a precisão do dataset e ocupa metade
+    FEATURE_COLS = ['tempo', 'danceability', 'energy', 'valence', 'acousticness', 'instrumentalness']
+
+    ENGINES = ('auto', 'pyarrow', 'c')
+
+    # Textos lidos como nulo pelos dois leitores (os padrões do pandas). O pyarrow
+    # tem outra lista padrão (sem 'None', por exemplo), o que mudaria a saída do ETL
+    NA_VALUES = [
+        '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+    ]
+
+    # 'csv': só CSV; 'columnar': só o formato colunar; 'both': os dois
+    OUTPUT_FORMATS = ('csv', 'columnar', 'both')
+
+    DEFAULT_TARGET_GENRES = [
+        'pop', 'rock', 'metal', 'classical', 'acoustic',
+        'piano', 'dance', 'brazil', 'jazz', 'hip-hop',
+        'electronic', 'reggae'
+    ]
+
+    def __init__(self, input_path: str, output_dir: str, chunksize=None, target_genres=None, seed=42,
+                 engine='auto', output_format='csv'):
         '''
         Inicializa o processador com caminhos de entrada e saída para os
         datasets gerados
 
         :param input_path: Caminho do arquivo CSV bruto de entrada
         :param output_dir: Diretório onde os arquivos processados serão salvos
+        :param chunksize: linhas lidas por bloco do CSV bruto (DEFAULT_CHUNKSIZE se None)
+        :param target_genres: gêneros amostrados para o grafo (DEFAULT_TARGET_GENRES se None)
+        :param seed: semente da amostragem por gênero
+        :param engine: leitor do CSV: 'pyarrow' (mais rápido, se instalado), 'c' (pandas)
+            ou 'auto' (pyarrow quando disponível, senão c). Os dois geram a mesma saída
+        :param output_format: 'csv', 'columnar' ou 'both' (CSV legível + colunar binário)
 
         '''
+        if engine not in self.ENGINES:
+            raise ValueError(f"Engine desconhecida: {engine}. Opções: {self.ENGINES}")
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Formato de saída desconhecido: {output_format}. Opções: {self.OUTPUT_FORMATS}")
+
         self.input_path = input_path
         self.output_dir = output_dir
+        self.chunksize = chunksize or self.DEFAULT_CHUNKSIZE
+        self.seed = seed
+        self.engine = engine
+        self.output_format = output_format
 
         # Define as colunas que serão usadas no processamento
         self.REQUIRED_COLS = [
@@ -37,38 +109,205 @@ class DataProcessor:
             'instrumentalness'
         ]
 
-    def _load_and_filter(self):
+        self.TARGET_GENRES = list(target_genres) if target_genres else list(self.DEFAULT_TARGET_GENRES)
+
+    def _iter_clean_chunks(self):
         """
-        [INTERNO] Carrega, seleciona colunas e remove duplicatas/nulos.
+        [INTERNO] Lê o CSV bruto em blocos, seleciona colunas e remove nulos e
+        duplicatas (por track_id e por track_name + artists), mantendo sempre a
+        primeira ocorrência no arquivo, como o drop_duplicates sobre o arquivo inteiro.
         """
         if not os.path.exists(self.input_path):
             raise FileNotFoundError(f"Arquivo raw não encontrado: {self.input_path}")
 
-        print("   -> Lendo CSV bruto...")
-        df = pd.read_csv(self.input_path, low_memory=False)
+        print("   -> Lendo CSV bruto em blocos...")
+        header = pd.read_csv(self.input_path, nrows=0).columns
 
         # Verifica quais colunas da lista existem no dataframe
-        cols_to_keep = [c for c in self.REQUIRED_COLS if c in df.columns]
+        cols_to_keep = [c for c in self.REQUIRED_COLS if c in header]
 
         if len(cols_to_keep) < len(self.REQUIRED_COLS):
             missing = set(self.REQUIRED_COLS) - set(cols_to_keep)
             print(f"   [AVISO] Colunas faltando no CSV original: {missing}")
 
-        df = df[cols_to_keep]
+        reader = self._read_raw_chunks(cols_to_keep)
+
+        # Hashes (64 bits) das chaves já vistas em blocos anteriores
+        ids_vistos, pares_vistos = set(), set()
+        initial_len = valid_len = nulos = 0
+
+        for chunk in traced('read_csv', reader):
+            with span('clean', rows=len(chunk)):
+                chunk = chunk[cols_to_keep]
+                initial_len += len(chunk)
+
+                # Artistas se repetem muito: uma única cópia de cada string
+                if 'artists' in chunk.columns:
+                    chunk['artists'] = self._interned(chunk['artists'])
+
+                # Limpeza
+                antes = len(chunk)
+                chunk = chunk.dropna()
+                nulos += antes - len(chunk)
+
+            with span('dedupe', rows=len(chunk)):
+                # Remove duplicatas baseadas no ID
+                if 'track_id' in chunk.columns:
+                    chunk = chunk[self._first_occurrence(chunk[['track_id']], ids_vistos)]
+
+                if 'track_name' in chunk.columns and 'artists' in chunk.columns:
+                    chunk = chunk[self._first_occurrence(chunk[['track_name', 'artists']], pares_vistos)]
+
+            valid_len += len(chunk)
+            yield chunk
+
+        count('rows_read', initial_len)
+        count('rows_dropped_null', nulos)
+        count('rows_dropped_duplicate', initial_len - nulos - valid_len)
+        count('rows_valid', valid_len)
+        print(f"   -> Limpeza: {initial_len} linhas -> {valid_len} linhas válidas.")
+
+    def _column_dtypes(self, cols):
+        """
+        [INTERNO] Tipos explícitos de cada coluna lida do CSV bruto.
+        """
+        dtypes = {}
+        for col in cols:
+            if col in self.KEY_COLS:
+                dtypes[col] = 'str'
+            elif col in self.FEATURE_COLS:
+                dtypes[col] = 'float32'
+            elif col == 'track_genre':
+                dtypes[col] = 'category'
+        return dtypes
+
+    def _resolve_engine(self):
+        """
+        [INTERNO] Leitor do CSV usado por este processador (ver resolve_engine).
+        """
+        return resolve_engine(self.engine)
+
+    def _read_raw_chunks(self, cols):
+        """
+        [INTERNO] Lê só as colunas cols do CSV bruto, já com os tipos de _column_dtypes,
+        em blocos de DataFrame de chunksize linhas.
+        """
+        dtypes = self._column_dtypes(cols)
+
+        if self._resolve_engine() == 'pyarrow':
+            yield from self._read_raw_chunks_pyarrow(cols, dtypes)
+            return
+
+        # Textos como object (strings Python): no pandas 3, 'str' vira string Arrow
+        yield from pd.read_csv(
+            self.input_path,
+            usecols=cols,
+            dtype={col: object if dtype == 'str' else dtype for col, dtype in dtypes.items()},
+            na_values=self.NA_VALUES,
+            keep_default_na=False,
+            chunksize=self.chunksize
+        )
+
+    def _read_raw_chunks_pyarrow(self, cols, dtypes):
+        """
+        [INTERNO] Leitura em streaming com pyarrow.csv (multithread, projeção de colunas).
+        Os lotes do pyarrow (definidos em bytes) são recortados em blocos de chunksize
+        linhas, com o mesmo índice e os mesmos nulos do leitor C.
+        """
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        tipos = {'str': pa.string(), 'float32': pa.float32(), 'category': pa.dictionary(pa.int32(), pa.string())}
+        reader = pa_csv.open_csv(
+            self.input_path,
+            read_options=pa_csv.ReadOptions(block_size=max(1 << 20, self.chunksize * 256)),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=cols,
+                column_types={col: tipos[dtype] for col, dtype in dtypes.items()},
+                null_values=self.NA_VALUES,
+                strings_can_be_null=True
+            )
+        )
+
+        pendentes, linhas, inicio = [], 0, 0
+        for batch in reader:
+            pendentes.append(batch)
+            linhas += batch.num_rows
+            while linhas >= self.chunksize:
+                tabela = pa.Table.from_batches(pendentes)
+                yield self._arrow_frame(tabela.slice(0, self.chunksize), dtypes, inicio)
+                inicio += self.chunksize
+                resto = tabela.slice(self.chunksize)
+                pendentes, linhas = resto.to_batches(), resto.num_rows
+        if linhas:
+            yield self._arrow_frame(pa.Table.from_batches(pendentes), dtypes, inicio)
+
+    @staticmethod
+    def _arrow_frame(tabela, dtypes, inicio):
+        """
+        [INTERNO] Converte um bloco do pyarrow em DataFrame com os tipos do leitor C
+        (textos como object) e o índice continuando a partir da linha inicio.
+        """
+        chunk = tabela.to_pandas()
+        chunk.index = pd.RangeIndex(inicio, inicio + len(chunk))
+        for col, dtype in dtypes.items():
+            if dtype == 'str':
+                chunk[col] = chunk[col].astype(object)
+        return chunk
+
+    @staticmethod
+    def _interned(coluna):
+        """
+        [INTERNO] Coluna de texto com cada string internada (sys.intern). O dtype
+        object é explícito: com inferência de string, o pandas 3 guardaria em Arrow
+        e as cópias únicas se perderiam.
+        """
+        valores = [sys.intern(v) if isinstance(v, str) else v for v in coluna.to_numpy(dtype=object)]
+        return pd.Series(valores, index=coluna.index, dtype=object)
+
+    @staticmethod
+    def _first_occurrence(keys, vistos):
+        """
+        [INTERNO] Máscara das linhas cuja chave ainda não apareceu (no bloco ou em
+        blocos anteriores) e registra as chaves novas em vistos.
+        """
+        # Hash 64 bits por coluna (sem categorizar, que é o passo caro), combinados por linha
+        hashes = np.zeros(len(keys), dtype=np.uint64)
+        for col in keys.columns:
+            coluna = pd.util.hash_array(keys[col].to_numpy(dtype=object), categorize=False)
+            hashes = np.multiply(hashes, np.uint64(0x100000001B3)) ^ coluna
+        novos = ~pd.Series(hashes).duplicated().to_numpy()
+        ja_vistos = np.fromiter(map(vistos.__contains__, hashes.tolist()), dtype=bool, count=len(hashes))
+
+        mask = novos & ~ja_vistos
+        vistos.update(hashes[mask].tolist())
+        return mask
 
-        # Limpeza
-        initial_len = len(df)
-        df = df.dropna()
+    def _load_and_filter(self):
+        """
+        [INTERNO] Carrega, seleciona colunas e remove duplicatas/nulos.
+        """
+        chunks = list(self._iter_clean_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=self.REQUIRED_COLS)
+        return pd.concat(chunks)
 
-        # Remove duplicatas baseadas no ID
-        if 'track_id' in df.columns:
-            df = df.drop_duplicates(subset='track_id')
+    def process_all_datasets(self, full_filename='songs_full.csv', graph_filename='songs.csv',
+                             samples_per_genre=800):
+        """
+        Gera os dois datasets numa única leitura do CSV bruto: cada bloco limpo é
+        anexado ao songs_full.csv e repassado à amostragem por gênero.
 
-        if 'track_name' in df.columns and 'artists' in df.columns:
-            df = df.drop_duplicates(subset=['track_name', 'artists'])
+        :param full_filename: nome do arquivo para o dataset completo
+        :param graph_filename: Nome do arquivo de saída para o dataset do grafo
+        :param samples_per_genre: numero de amostras por gênero alvo
+        :return: tupla (path do dataset completo, path do dataset do grafo)
+        """
+        print(f"\n[ETL] Gerando {full_filename} e {graph_filename} numa única leitura...")
+        full_path, graph_path = self._run_pipeline(full_filename, graph_filename, samples_per_genre)
 
-        print(f"   -> Limpeza: {initial_len} linhas -> {len(df)} linhas válidas.")
-        return df
+        print(f"   ✔ Arquivo Mestre salvo em: {full_path}")
+        return full_path, graph_path
 
     def process_full_dataset(self, filename='songs_full.csv'):
         '''
@@ -79,11 +318,7 @@ class DataProcessor:
         '''
         print(f"\n[ETL] Gerando Dataset COMPLETO ({filename})...")
 
-        df = self._load_and_filter()
-
-        os.makedirs(self.output_dir, exist_ok=True)
-        full_path = os.path.join(self.output_dir, filename)
-        df.to_csv(full_path, index=False)
+        full_path, _ = self._run_pipeline(full_filename=filename)
 
         print(f"   ✔ Arquivo Mestre salvo em: {full_path}")
         return full_path
@@ -98,36 +333,93 @@ class DataProcessor:
         """
         print(f"\n[ETL] Gerando Dataset para GRAFO ({filename})...")
 
-        df = self._load_and_filter()
+        _, graph_path = self._run_pipeline(graph_filename=filename, samples_per_genre=samples_per_genre)
+        return graph_path
 
-        target_genres = [
-            'pop', 'rock', 'metal', 'classical', 'acoustic',
-            'piano', 'dance', 'brazil', 'jazz', 'hip-hop',
-            'electronic', 'reggae'
-        ]
+    def _run_pipeline(self, full_filename=None, graph_filename=None, samples_per_genre=800):
+        """
+        [INTERNO] Percorre os blocos limpos uma vez, escrevendo o dataset completo
+        (se full_filename) e alimentando a amostragem por gênero (se graph_filename).
+        Os paths devolvidos são os colunares se output_format='columnar', senão os CSVs.
+        """
+        with span('etl', full=full_filename, graph=graph_filename, output_format=self.output_format):
+            os.makedirs(self.output_dir, exist_ok=True)
+            full_path = os.path.join(self.output_dir, full_filename) if full_filename else None
+            graph_path = os.path.join(self.output_dir, graph_filename) if graph_filename else None
 
-        df_final = pd.DataFrame()
-        print(f"   -> Filtrando gêneros alvo e coletando até {samples_per_genre} amostras...")
+            write_csv = self.output_format in ('csv', 'both')
+            write_cols = self.output_format in ('columnar', 'both')
+            full_writer = ColumnarWriter(columnar_path(full_path)) if full_path and write_cols else None
 
-        # Verifica se temos a coluna de gênero para filtrar
-        col_genre = 'track_genre' if 'track_genre' in df.columns else None
+            sampler = None
+            colunas = self.REQUIRED_COLS
+            primeiro = True
+
+            for chunk in self._iter_clean_chunks():
+                colunas = chunk.columns
+                if full_path:
+                    with span('write_full', rows=len(chunk)):
+                        if write_csv:
+                            chunk.to_csv(full_path, mode='w' if primeiro else 'a', header=primeiro, index=False)
+                        if full_writer is not None:
+                            full_writer.write(chunk)
+
+                if graph_path:
+                    with span('sample', rows=len(chunk)):
+                        if sampler is None:
+                            sampler = self._new_sampler(chunk, samples_per_genre)
+                        sampler.update(chunk, 'track_genre' if 'track_genre' in chunk.columns else None)
+
+                primeiro = False
 
-        if col_genre:
-            for genre in target_genres:
-                df_genre = df[df[col_genre] == genre]
+            if full_path and primeiro:
+                vazio = self._typed_frame(pd.DataFrame(columns=colunas))
+                if write_csv:
+                    vazio.to_csv(full_path, index=False)
+                if full_writer is not None:
+                    full_writer.write(vazio)
+            if full_writer is not None:
+                full_writer.close()
 
-                if len(df_genre) > samples_per_genre:
-                    df_genre = df_genre.sample(n=samples_per_genre, random_state=42)
+            if graph_path:
+                with span('write_graph'):
+                    df_final = sampler.result() if sampler is not None else pd.DataFrame()
+                    if df_final.empty:
+                        df_final = pd.DataFrame(columns=colunas)
+                    df_final = self._typed_frame(df_final)
 
-                df_final = pd.concat([df_final, df_genre])
-        else:
-            print("   [!] Coluna de gênero não encontrada. Fazendo amostragem simples.")
-            df_final = df.sample(n=min(len(df), samples_per_genre * 12), random_state=42)
+                    if write_csv:
+                        df_final.to_csv(graph_path, index=False)
+                    if write_cols:
+                        write_columnar(df_final, columnar_path(graph_path))
+                count('rows_sampled', len(df_final))
 
-        os.makedirs(self.output_dir, exist_ok=True)
-        graph_path = os.path.join(self.output_dir, filename)
-        df_final.to_csv(graph_path, index=False)
+                print(f"   ✔ Arquivo do Grafo salvo em: {graph_path if write_csv else columnar_path(graph_path)}")
+                print(f"   -> Nós prontos para o grafo: {len(df_final)}")
+
+            if not write_csv:
+                full_path = columnar_path(full_path) if full_path else None
+                graph_path = columnar_path(graph_path) if graph_path else None
+            return full_path, graph_path
+
+    def _typed_frame(self, df):
+        """
+        [INTERNO] Aplica os tipos compactos da leitura (float32, gênero categórico)
+        a um DataFrame montado fora do leitor, como a amostra concatenada de vários blocos.
+        """
+        dtypes = self._column_dtypes(df.columns)
+        return df.astype({col: object if dtype == 'str' else dtype for col, dtype in dtypes.items()})
+
+    def _new_sampler(self, chunk, samples_per_genre):
+        """
+        [INTERNO] Amostrador por gênero (um reservatório por gênero alvo), ou
+        amostragem simples se o CSV não tiver a coluna de gênero.
+        """
+        print(f"   -> Filtrando gêneros alvo e coletando até {samples_per_genre} amostras...")
+
+        # Verifica se temos a coluna de gênero para filtrar
+        if 'track_genre' in chunk.columns:
+            return ReservoirSampler(samples_per_genre, groups=self.TARGET_GENRES, seed=self.seed)
 
-        print(f"   ✔ Arquivo do Grafo salvo em: {graph_path}")
-        print(f"   -> Nós prontos para o grafo: {len(df_final)}")
-        return graph_path
\ No newline at end of file
+        print("   [!] Coluna de gênero não encontrada. Fazendo amostragem simples.")
+        return ReservoirSampler(samples_per_genre * len(self.TARGET_GENRES), seed=self.seed)
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+class ReservoirSampler:
+    """
+    Amostragem uniforme de tamanho fixo por grupo (ex: gênero) sobre um fluxo
+    de blocos de um DataFrame, com o Algoritmo R: cada grupo guarda no máximo
+    `size` linhas, então a memória é O(grupos x size) qualquer que seja a entrada.
+
+    Cada grupo tem seu próprio gerador (semente derivada de seed e da posição do
+    grupo), então a amostra de um gênero depende só das linhas daquele gênero,
+    e não do tamanho dos blocos nem dos outros gêneros.
+    """
+
+    def __init__(self, size, groups=None, seed=42):
+        '''
+        :param size: número máximo de linhas amostradas por grupo
+        :param groups: lista de grupos aceitos, na ordem do resultado
+            (None = um único grupo com todas as linhas)
+        :param seed: semente da amostragem
+        '''
+        if size < 0:
+            raise ValueError("size deve ser >= 0")
+
+        self.size = size
+        self.groups = list(groups) if groups is not None else [None]
+        self.seen = {group: 0 for group in self.groups}
+
+        self._rngs = {group: np.random.default_rng([seed, i]) for i, group in enumerate(self.groups)}
+        self._reservoirs = {group: None for group in self.groups}
+        self._positions = {group: np.empty(0, dtype=np.int64) for group in self.groups}
+
+    def update(self, chunk, column=None):
+        '''
+        Processa mais um bloco de linhas.
+
+        :param chunk: DataFrame com as próximas linhas do fluxo
+        :param column: coluna com o grupo de cada linha (None = grupo único)
+        :return: self
+        '''
+        if column is None:
+            self._update_group(None, chunk)
+            return self
+
+        alvo = chunk[chunk[column].isin(self.seen)]
+        for group, grupo in alvo.groupby(column, sort=False, observed=True):
+            self._update_group(group, grupo)
+        return self
+
+    def result(self):
+        '''
+        :return: DataFrame com as amostras de todos os grupos, na ordem de
+            self.groups e, dentro de cada grupo, na ordem original do fluxo
+        '''
+        amostras = []
+        for group in self.groups:
+            reservoir = self._reservoirs[group]
+            if reservoir is None or len(reservoir) == 0:
+                continue
+            amostras.append(reservoir.iloc[np.argsort(self._positions[group], kind='stable')])
+
+        if not amostras:
+            return pd.DataFrame()
+        return pd.concat(amostras)
+
+    def _update_group(self, group, rows):
+        '''
+        [INTERNO] Algoritmo R vetorizado para as linhas de um grupo num bloco.
+        A linha de posição t (1-based) entra se um sorteio j em [0, t) cair
+        abaixo de size, substituindo a vaga j; vagas sorteadas mais de uma vez
+        no mesmo bloco ficam com a última linha, como no algoritmo sequencial.
+        '''
+        m = len(rows)
+        if m == 0:
+            return
+
+        inicio = self.seen[group]
+        self.seen[group] += m
+        posicoes = np.arange(inicio, inicio + m, dtype=np.int64)
+
+        reservoir = self._reservoirs[group]
+        atual = 0 if reservoir is None else len(reservoir)
+
+        # Enquanto o reservatório não enche, as linhas entram direto
+        livres = min(self.size - atual, m)
+        slots = np.arange(atual, atual + livres, dtype=np.int64)
+        linhas = np.arange(livres, dtype=np.int64)
+
+        if livres < m:
+            t = posicoes[livres:] + 1
+            j = self._rngs[group].integers(0, t, dtype=np.int64)
+            aceitas = np.flatnonzero(j < self.size)
+            slots = np.concatenate([slots, j[aceitas]])
+            linhas = np.concatenate([linhas, livres + aceitas])
+
+        if len(slots) == 0:
+            return
+
+        # Última escrita em cada vaga vence
+        ultimo = len(slots) - 1 - np.unique(slots[::-1], return_index=True)[1]
+        slots, linhas = slots[ultimo], linhas[ultimo]
+
+        tamanho = min(self.size, atual + m)
+        origem = np.arange(tamanho, dtype=np.int64)  # < atual: linha antiga; >= atual: linha nova
+        origem[slots] = atual + linhas
+
+        base = rows if reservoir is None else pd.concat([reservoir, rows])
+        self._reservoirs[group] = base.iloc[origem]
+        self._positions[group] = np.concatenate([self._positions[group], posicoes])[origem]
@@ -0,0 +1,409 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from src.preprocessing.csr_graph import CSRGraph
+
+
+SNAPSHOT_FORMAT = 'musical-recommender-snapshot'
+SNAPSHOT_VERSION = 1
+META_FILE = 'meta.json'
+DELTAS_DIR = 'deltas'
+
+
+class StringColumn:
+    """
+    Coluna de strings em formato binário: todos os textos concatenados em UTF-8
+    (data) e a posição de início de cada um (offsets, tamanho n+1).
+    Cada valor só é decodificado quando acessado, então funciona bem com mmap.
+    """
+
+    def __init__(self, data, offsets, nulls=None):
+        '''
+        :param data: array uint8 com os bytes UTF-8 concatenados
+        :param offsets: array int64 (n+1) com o início de cada valor
+        :param nulls: array bool opcional marcando valores ausentes (None)
+        '''
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+
+    @classmethod
+    def from_values(cls, values):
+        '''
+        Codifica uma sequência de valores (convertidos para str; None vira ausente).
+        '''
+        values = list(values)
+        nulls = np.array([v is None for v in values], dtype=bool)
+        encoded = [b'' if v is None else str(v).encode('utf-8') for v in values]
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets, nulls if nulls.any() else None)
+
+    def extend(self, values):
+        '''
+        Nova coluna com os valores desta seguidos de values (sem decodificar os atuais).
+        '''
+        novos = StringColumn.from_values(values)
+        offsets = np.concatenate([self.offsets[:-1], novos.offsets + self.offsets[-1]])
+        nulls = None
+        if self.nulls is not None or novos.nulls is not None:
+            nulls = np.concatenate([
+                self.nulls if self.nulls is not None else np.zeros(len(self), dtype=bool),
+                novos.nulls if novos.nulls is not None else np.zeros(len(novos), dtype=bool),
+            ])
+        return StringColumn(np.concatenate([self.data, novos.data]), offsets, nulls)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return (self._decode(i) for i in range(len(self)))
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            if item < 0:
+                item += len(self)
+            if not 0 <= item < len(self):
+                raise IndexError(item)
+            return self._decode(int(item))
+
+        posicoes = np.arange(len(self))[item]
+        resultado = np.empty(len(posicoes), dtype=object)
+        resultado[:] = [self._decode(int(i)) for i in posicoes]
+        return resultado
+
+    def __array__(self, dtype=None, copy=None):
+        resultado = np.empty(len(self), dtype=object)
+        resultado[:] = self.tolist()
+        return resultado
+
+    def tolist(self):
+        # Decodifica a partir de uma única cópia do buffer (bem mais rápido que valor a valor)
+        buffer = np.asarray(self.data).tobytes()
+        valores = [
+            buffer[inicio:fim].decode('utf-8')
+            for inicio, fim in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())
+        ]
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls).tolist():
+                valores[i] = None
+        return valores
+
+    @property
+    def nbytes(self):
+        total = self.data.nbytes + self.offsets.nbytes
+        return total + (self.nulls.nbytes if self.nulls is not None else 0)
+
+    def _decode(self, i):
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+
+def save_snapshot(graph, path):
+    '''
+    Salva um CSRGraph como snapshot binário: um diretório com um .npy por array
+    (topologia, pesos, features, colunas de metadados) e um meta.json.
+    A escrita é feita num diretório temporário e trocada no final, então um
+    snapshot antigo nunca fica pela metade.
+
+    :param graph: CSRGraph a salvar
+    :param path: diretório de destino
+    :return: path do snapshot
+    '''
+    tmp_path = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, 'indptr.npy'), np.asarray(graph.indptr))
+    np.save(os.path.join(tmp_path, 'indices.npy'), np.asarray(graph.indices))
+    np.save(os.path.join(tmp_path, 'weights.npy'), np.asarray(graph.weights))
+
+    if graph.features is not None:
+        np.save(os.path.join(tmp_path, 'features.npy'), np.asarray(graph.features, dtype=np.float64))
+
+    node_id_kind = _save_column(tmp_path, 'node_ids', graph.node_ids)
+    for attr, values in graph.node_attrs.items():
+        _save_column(tmp_path, f'attr_{attr}', values)
+
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'num_nodes': graph.number_of_nodes(),
+        'num_edges': graph.number_of_edges(),
+        'node_id_kind': node_id_kind,
+        'node_attrs': list(graph.node_attrs),
+        'has_features': graph.features is not None,
+        'graph': graph.graph,
+    }
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path, mmap=True):
+    '''
+    Abre um snapshot binário. Com mmap=True os arrays são mapeados com
+    np.load(mmap_mode='r'): só as páginas efetivamente acessadas são lidas do disco.
+    Deltas pendentes (append_delta) são aplicados em memória.
+
+    :param path: diretório do snapshot
+    :param mmap: se False, carrega tudo para a memória
+    :return: CSRGraph
+    '''
+    meta = read_snapshot_meta(path)
+    mode = 'r' if mmap else None
+
+    def carregar(nome):
+        return np.load(os.path.join(path, nome), mmap_mode=mode)
+
+    features = carregar('features.npy') if meta['has_features'] else None
+    node_ids = _load_column(path, 'node_ids', mode)
+    node_attrs = {
+        attr: _load_column(path, f'attr_{attr}', mode)
+        for attr in meta['node_attrs']
+    }
+
+    graph = CSRGraph(
+        carregar('indptr.npy'),
+        carregar('indices.npy'),
+        carregar('weights.npy'),
+        node_ids,
+        node_attrs,
+        features
+    )
+    graph.graph.update(meta.get('graph', {}))
+
+    # Deltas de add_tracks ainda não compactados
+    for delta_path in _delta_files(path):
+        graph = apply_delta(graph, _load_delta(delta_path, meta))
+
+    return graph
+
+
+def read_snapshot_meta(path):
+    '''
+    Lê e valida o meta.json de um snapshot.
+
+    :param path: diretório do snapshot
+    :return: dict com os metadados
+    '''
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Snapshot não encontrado: {path}")
+
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Formato de snapshot inválido em {path}")
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Versão de snapshot não suportada: {meta.get('version')}")
+
+    return meta
+
+
+def is_snapshot(path):
+    '''
+    :return: True se path é um diretório de snapshot
+    '''
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+def snapshot_state(path):
+    '''
+    Estado do snapshot (tamanho base e deltas aplicados), usado por índices
+    auxiliares guardados dentro dele (landmarks, hierarquia de contração) para
+    saber se ainda correspondem ao grafo: um add_tracks ou uma regravação o altera.
+
+    :param path: diretório do snapshot
+    :return: dict serializável em JSON
+    '''
+    meta = read_snapshot_meta(path)
+    return {
+        'num_nodes': meta['num_nodes'],
+        'num_edges': meta['num_edges'],
+        'deltas': [os.path.basename(p) for p in _delta_files(path)],
+    }
+
+
+def append_delta(path, delta):
+    '''
+    Grava o resultado de GraphBuilder.add_tracks como um arquivo de delta
+    (<snapshot>/deltas/NNNNNN.npz). O snapshot base não é reescrito; os deltas
+    são aplicados em ordem por load_snapshot.
+
+    :param path: diretório do snapshot
+    :param delta: dict devolvido por add_tracks
+    :return: path do arquivo de delta
+    '''
+    read_snapshot_meta(path)
+    pasta = os.path.join(path, DELTAS_DIR)
+    os.makedirs(pasta, exist_ok=True)
+
+    arrays = {
+        'features': np.asarray(delta['features'], dtype=np.float64),
+        'rows': np.asarray(delta['rows'], dtype=np.int64),
+        'indices': np.asarray(delta['indices'], dtype=np.int64),
+        'distances': np.asarray(delta['distances'], dtype=np.float64),
+    }
+    arrays.update(_column_arrays('node_ids', delta['node_ids']))
+    for attr, values in delta['node_attrs'].items():
+        arrays.update(_column_arrays(f'attr_{attr}', values))
+
+    numero = len(_delta_files(path)) + 1
+    destino = os.path.join(pasta, f'{numero:06d}.npz')
+    tmp = destino + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, destino)
+    return destino
+
+
+def apply_delta(graph, delta):
+    '''
+    Aplica um delta (nós novos + linhas de vizinhos substituídas) a um CSRGraph
+    de grau fixo e devolve um novo CSRGraph.
+
+    :param graph: CSRGraph base
+    :param delta: dict com node_ids, node_attrs, features, rows, indices, distances
+    :return: CSRGraph atualizado
+    '''
+    n = graph.number_of_nodes()
+    m = len(delta['node_ids'])
+    width = graph.number_of_edges() // max(n, 1)
+    if np.any(np.diff(graph.indptr) != width):
+        raise ValueError("Deltas só podem ser aplicados a grafos de grau fixo (K-NN)")
+
+    rows = np.asarray(delta['rows'], dtype=np.intp)
+    new_width = np.shape(delta['indices'])[1] if len(rows) else width
+    if new_width != width and len(rows) != n + m:
+        raise ValueError("Delta com largura diferente precisa substituir todas as linhas")
+
+    indices = np.empty((n + m, new_width), dtype=np.int32)
+    weights = np.empty((n + m, new_width), dtype=np.float64)
+    if new_width == width:
+        indices[:n] = np.asarray(graph.indices).reshape(n, width)
+        weights[:n] = np.asarray(graph.weights).reshape(n, width)
+    indices[rows] = delta['indices']
+    weights[rows] = delta['distances']
+
+    node_ids = _extend_column(graph.node_ids, delta['node_ids'])
+    node_attrs = {
+        attr: _extend_column(values, delta['node_attrs'].get(attr, [None] * m))
+        for attr, values in graph.node_attrs.items()
+    }
+    features = None
+    if graph.features is not None:
+        features = np.concatenate([np.asarray(graph.features), np.asarray(delta['features'])])
+
+    novo = CSRGraph.from_knn(node_ids, indices, weights, node_attrs, features)
+    novo.graph.update(graph.graph)
+    return novo
+
+
+def compact_snapshot(path):
+    '''
+    Incorpora os deltas pendentes ao snapshot base (reescreve os arrays).
+
+    :param path: diretório do snapshot
+    :return: path do snapshot
+    '''
+    if not _delta_files(path):
+        return path
+    return save_snapshot(load_snapshot(path, mmap=False), path)
+
+
+def _delta_files(path):
+    pasta = os.path.join(path, DELTAS_DIR)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(os.path.join(pasta, f) for f in os.listdir(pasta) if f.endswith('.npz'))
+
+
+def _load_delta(delta_path, meta):
+    '''
+    [INTERNO] Lê um arquivo de delta gravado por append_delta.
+    '''
+    with np.load(delta_path) as arquivo:
+        dados = {nome: arquivo[nome] for nome in arquivo.files}
+
+    def coluna(nome):
+        return _read_column(dados.get, nome).tolist()
+
+    return {
+        'features': dados['features'],
+        'rows': dados['rows'],
+        'indices': dados['indices'],
+        'distances': dados['distances'],
+        'node_ids': coluna('node_ids'),
+        'node_attrs': {attr: coluna(f'attr_{attr}') for attr in meta['node_attrs']},
+    }
+
+
+def _extend_column(values, novos):
+    '''
+    [INTERNO] Concatena valores novos a uma coluna (StringColumn, array ou lista).
+    '''
+    if isinstance(values, StringColumn):
+        return values.extend(novos)
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return np.concatenate([values, np.asarray(novos, dtype=values.dtype)])
+    return list(values) + list(novos)
+
+
+def _column_arrays(name, values):
+    '''
+    [INTERNO] Converte uma coluna em arrays: inteiros como int64 ('<name>.int'),
+    o resto como StringColumn ('<name>.data', '<name>.offsets', '<name>.nulls').
+    '''
+    lista = values.tolist() if hasattr(values, 'tolist') else list(values)
+
+    if lista and all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in lista):
+        return {f'{name}.int': np.asarray(lista, dtype=np.int64)}
+
+    column = StringColumn.from_values(lista)
+    arrays = {f'{name}.data': column.data, f'{name}.offsets': column.offsets}
+    if column.nulls is not None:
+        arrays[f'{name}.nulls'] = column.nulls
+    return arrays
+
+
+def _read_column(get, name):
+    '''
+    [INTERNO] Reconstrói uma coluna gravada por _column_arrays.
+    get(chave) devolve o array correspondente ou None.
+    '''
+    inteiros = get(f'{name}.int')
+    if inteiros is not None:
+        return inteiros
+    return StringColumn(get(f'{name}.data'), get(f'{name}.offsets'), get(f'{name}.nulls'))
+
+
+def _save_column(path, name, values):
+    '''
+    [INTERNO] Salva uma coluna como um .npy por array. Retorna o tipo gravado ('int' ou 'str').
+    '''
+    arrays = _column_arrays(name, values)
+    for chave, array in arrays.items():
+        np.save(os.path.join(path, f'{chave}.npy'), array)
+    return 'int' if f'{name}.int' in arrays else 'str'
+
+
+def _load_column(path, name, mode):
+    '''
+    [INTERNO] Carrega uma coluna salva por _save_column.
+    '''
+    def get(chave):
+        arquivo = os.path.join(path, f'{chave}.npy')
+        return np.load(arquivo, mmap_mode=mode) if os.path.exists(arquivo) else None
+
+    return _read_column(get, name)
@@ -0,0 +1,227 @@
+import bisect
+import weakref
+
+import numpy as np
+
+from src.services.search_index import (
+    NAME_LENGTH_PENALTY,
+    SCORE_EXACT_ARTIST,
+    SCORE_EXACT_NAME,
+    SCORE_PREFIX_ARTIST,
+    SCORE_PREFIX_NAME,
+    SongIndex,
+)
+
+
+# Separador de artistas no campo artist (ex: "The Weeknd;Daft Punk")
+ARTIST_SEPARATOR = ';'
+
+# Limite de sugestões padrão
+DEFAULT_LIMIT = 10
+
+# Chaves pré-selecionadas por sugestão pedida (uma música pode ter várias chaves na faixa)
+CANDIDATES_PER_RESULT = 4
+
+# Maior caractere possível: prefixo + END limita a faixa de chaves com aquele prefixo
+_END = '\U0010ffff'
+
+
+def artist_tokens(artista):
+    '''
+    Tokens de artista para o autocompletar: cada artista do campo (separados
+    por ';') e cada palavra dele, sem repetição.
+
+    :param artista: campo artist já normalizado
+    :return: lista de tokens
+    '''
+    tokens = []
+    for nome in artista.split(ARTIST_SEPARATOR):
+        nome = nome.strip()
+        for token in [nome] + nome.split():
+            if token and token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+class Autocomplete:
+    """
+    Autocompletar por prefixo sobre nomes de músicas e tokens de artista já
+    normalizados (os do SongIndex do grafo). As chaves ficam num array
+    ordenado: as que começam com um prefixo formam uma faixa contígua,
+    encontrada por busca binária. Cada sugestão vale como na busca do main
+    (nome igual 1000, token de artista igual 900, nome com o prefixo 500,
+    token com o prefixo 400, menos 0.1 por caractere do nome); a pontuação
+    de cada chave é calculada na construção.
+    """
+
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, G):
+        '''
+        :param G: grafo de músicas (CSRGraph ou NetworkX) com atributos name/artist
+        '''
+        self.index = SongIndex.for_graph(G)
+
+        chaves = []
+        for pos, (nome, artista) in enumerate(zip(self.index.names, self.index.artists)):
+            if nome:
+                chaves.append((nome, pos, SCORE_EXACT_NAME, SCORE_PREFIX_NAME))
+            for token in artist_tokens(artista):
+                chaves.append((token, pos, SCORE_EXACT_ARTIST, SCORE_PREFIX_ARTIST))
+        chaves.sort(key=lambda c: c[0])
+
+        self.keys = [c[0] for c in chaves]
+        self.positions = np.fromiter((c[1] for c in chaves), dtype=np.int64, count=len(chaves))
+        penalidade = np.fromiter(
+            (len(self.index.names[c[1]]) * NAME_LENGTH_PENALTY for c in chaves), dtype=np.float64, count=len(chaves)
+        )
+        self.exact_scores = np.fromiter((c[2] for c in chaves), dtype=np.float64, count=len(chaves)) - penalidade
+        self.prefix_scores = np.fromiter((c[3] for c in chaves), dtype=np.float64, count=len(chaves)) - penalidade
+
+    @classmethod
+    def for_graph(cls, G):
+        '''
+        Autocompletar do grafo, reaproveitado enquanto o índice de busca do grafo for o mesmo.
+
+        :param G: grafo de músicas
+        :return: Autocomplete
+        '''
+        engine = cls._cache.get(G)
+        if engine is None or engine.index is not SongIndex.for_graph(G):
+            engine = cls(G)
+            cls._cache[G] = engine
+        return engine
+
+    def __len__(self):
+        return len(self.keys)
+
+    def narrow(self, prefix, lo=0, hi=None):
+        '''
+        Faixa das chaves que começam com prefix, procurada dentro de [lo, hi)
+        (a faixa de um prefixo menor do mesmo texto).
+
+        :param prefix: prefixo normalizado
+        :return: tupla (lo, hi) da faixa
+        '''
+        hi = len(self.keys) if hi is None else hi
+        inicio = bisect.bisect_left(self.keys, prefix, lo, hi)
+        return inicio, bisect.bisect_left(self.keys, prefix + _END, inicio, hi)
+
+    def rank(self, prefix, lo, hi, limit=DEFAULT_LIMIT):
+        '''
+        Melhores músicas da faixa [lo, hi) de prefix, cada uma uma vez (pela sua
+        melhor chave), com empates na ordem dos nós.
+
+        :return: tupla (total de músicas com o prefixo, lista de (node_id, data, score))
+        '''
+        if hi <= lo:
+            return 0, []
+
+        scores = self.prefix_scores[lo:hi].copy()
+        exatas = bisect.bisect_right(self.keys, prefix, lo, hi) - lo
+        scores[:exatas] = self.exact_scores[lo:lo + exatas]
+        posicoes = self.positions[lo:hi]
+
+        total = len(np.unique(posicoes))
+        melhores = self._best(scores, posicoes, limit)
+
+        return total, [
+            (self.index.node_ids[pos], self.index.node_data(pos), float(score))
+            for pos, score in zip(posicoes[melhores].tolist(), scores[melhores].tolist())
+        ]
+
+    @staticmethod
+    def _best(scores, posicoes, limit):
+        '''
+        [INTERNO] Índices (na faixa) da melhor chave de cada uma das `limit` melhores
+        músicas. Primeiro ordena só as chaves com pontuação de pelo menos a da
+        CANDIDATES_PER_RESULT * limit-ésima (empates incluídos); se elas não cobrirem
+        `limit` músicas distintas, ordena a faixa inteira.
+        '''
+        tentativas = [np.arange(len(scores))]
+        quantas = CANDIDATES_PER_RESULT * limit
+        if 0 < quantas < len(scores):
+            corte = np.partition(scores, len(scores) - quantas)[len(scores) - quantas]
+            tentativas.insert(0, np.flatnonzero(scores >= corte))
+
+        for candidatas in tentativas:
+            ordem = candidatas[np.lexsort((posicoes[candidatas], -scores[candidatas]))]
+            _, primeiras = np.unique(posicoes[ordem], return_index=True)
+            if len(primeiras) >= limit:
+                break
+
+        primeiras.sort()
+        return ordem[primeiras[:limit]]
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        '''
+        :param prefix: texto digitado (comparado em minúsculas)
+        :param limit: máximo de sugestões
+        :return: tupla (total de músicas com o prefixo, lista de (node_id, data, score))
+        '''
+        if not prefix:
+            return 0, []
+        prefix = prefix.lower()
+        return self.rank(prefix, *self.narrow(prefix), limit)
+
+    def complete_many(self, prefixes, limit=DEFAULT_LIMIT):
+        '''
+        Sugestões para vários prefixos de uma vez. Os prefixos são processados
+        em ordem alfabética numa mesma sessão, então os que compartilham o
+        começo refinam a faixa do anterior.
+
+        :param prefixes: lista de textos
+        :param limit: máximo de sugestões por prefixo
+        :return: lista de (total, sugestões) na ordem de prefixes
+        '''
+        prefixes = list(prefixes)
+        sessao = self.session()
+        resultados = [None] * len(prefixes)
+        for i in sorted(range(len(prefixes)), key=lambda i: prefixes[i].lower()):
+            resultados[i] = sessao.update(prefixes[i], limit)
+        return resultados
+
+    def session(self):
+        '''
+        :return: AutocompleteSession para uma digitação incremental
+        '''
+        return AutocompleteSession(self)
+
+
+class AutocompleteSession:
+    """
+    Digitação incremental: guarda as faixas dos prefixos já consultados. Quando
+    a consulta cresce, a nova faixa é procurada só dentro da anterior (que
+    encolhe a cada caractere); quando diminui, volta para a faixa guardada do
+    maior prefixo ainda válido.
+    """
+
+    def __init__(self, engine):
+        '''
+        :param engine: Autocomplete
+        '''
+        self.engine = engine
+        self._stack = [('', 0, len(engine))]
+
+    @property
+    def query(self):
+        return self._stack[-1][0]
+
+    def update(self, query, limit=DEFAULT_LIMIT):
+        '''
+        :param query: texto digitado até agora
+        :param limit: máximo de sugestões
+        :return: tupla (total de músicas com o prefixo, lista de (node_id, data, score))
+        '''
+        query = query.lower()
+        while not query.startswith(self._stack[-1][0]):
+            self._stack.pop()
+
+        prefix, lo, hi = self._stack[-1]
+        if query != prefix:
+            lo, hi = self.engine.narrow(query, lo, hi)
+            self._stack.append((query, lo, hi))
+
+        if not query:
+            return 0, []
+        return self.engine.rank(query, lo, hi, limit)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+
+
+MANIFEST_FILE = 'build_manifest.json'
+
+# Tamanho dos pedaços lidos ao calcular o hash de um arquivo
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    '''
+    Hash SHA-256 do conteúdo de um arquivo, lido em pedaços.
+
+    :param path: caminho do arquivo
+    :return: hexdigest, ou None se o arquivo não existir
+    '''
+    if not os.path.isfile(path):
+        return None
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def fingerprint(**inputs):
+    '''
+    Impressão digital de um conjunto de entradas (qualquer valor serializável em JSON).
+
+    :return: hexdigest SHA-256 das entradas em JSON canônico
+    '''
+    texto = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def code_version(*modules):
+    '''
+    Versão do código: hash do fonte dos módulos que geram um artefato.
+    Qualquer alteração nesses arquivos invalida os artefatos antigos.
+
+    :param modules: módulos Python (objetos)
+    :return: hexdigest
+    '''
+    return fingerprint(**{m.__name__: file_digest(m.__file__) for m in modules})
+
+
+class BuildCache:
+    """
+    Manifesto dos artefatos gerados (CSVs processados, snapshot, GraphML) e das
+    impressões digitais das entradas que os geraram. Um artefato só é
+    reaproveitado se a impressão digital atual for igual à registrada.
+
+    Os hashes de arquivos de entrada ficam memorizados por (tamanho, mtime),
+    então um arquivo que não mudou não é relido a cada execução.
+    """
+
+    def __init__(self, directory):
+        '''
+        :param directory: diretório onde o manifesto é salvo (junto dos artefatos)
+        '''
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = self._read()
+        return self._manifest
+
+    def exists(self):
+        '''
+        :return: True se já existe um manifesto em disco (senão os artefatos são legados)
+        '''
+        return os.path.exists(self.path)
+
+    def digest(self, path):
+        '''
+        Hash do conteúdo de um arquivo, reaproveitando o valor memorizado
+        se tamanho e mtime não mudaram.
+
+        :param path: caminho do arquivo
+        :return: hexdigest, ou None se o arquivo não existir
+        '''
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        chave = os.path.abspath(path)
+        memo = self.manifest['files'].get(chave)
+        if memo and memo['size'] == stat.st_size and memo['mtime_ns'] == stat.st_mtime_ns:
+            return memo['sha256']
+
+        sha = file_digest(path)
+        self.manifest['files'][chave] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+        return sha
+
+    def is_valid(self, artifact, key):
+        '''
+        :param artifact: caminho do artefato
+        :param key: impressão digital atual das entradas do artefato
+        :return: True se o artefato existe e foi gerado com essa impressão digital
+        '''
+        if not os.path.exists(artifact):
+            return False
+        return self.manifest['artifacts'].get(os.path.abspath(artifact)) == key
+
+    def record(self, artifact, key):
+        '''
+        Registra que o artefato foi gerado com a impressão digital key e salva o manifesto.
+        '''
+        self.manifest['artifacts'][os.path.abspath(artifact)] = key
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _read(self):
+        '''
+        [INTERNO] Lê o manifesto do disco (ou cria um vazio se não existir/estiver corrompido).
+        '''
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault('files', {})
+        manifest.setdefault('artifacts', {})
+        return manifest
@@ -1,7 +1,19 @@
 import os
+import uuid
 import networkx as nx
+import pandas as pd
+from src.algorithm import contraction, landmarks
+from src.algorithm.contraction import ContractionHierarchy, load_hierarchy, save_hierarchy
+from src.algorithm.landmarks import LandmarkIndex, load_landmarks, save_landmarks
+from src.algorithm.search import GRAPH_VERSION_ATTR
+from src.instrumentation import count, span
+from src.preprocessing import columnar, csr_graph, graph_builder, incremental, neighbors, processor, sampling, snapshot
+from src.preprocessing.columnar import append_columnar, columnar_path, is_columnar
+from src.preprocessing.csr_graph import CSRGraph
 from src.preprocessing.graph_builder import GraphBuilder
 from src.preprocessing.processor import DataProcessor
+from src.preprocessing.snapshot import append_delta, save_snapshot
+from src.services.build_cache import BuildCache, code_version, fingerprint
 
 
 class GraphService:
@@ -10,6 +22,10 @@ class GraphService:
     Permite rodar o ETL completo e construir/obter o grafo
     """
 
+    # Acima deste k_neighbors a hierarquia de contração custa muito e quase não
+    # acelera as buscas (grafo de 6054 nós: k=10 -> 102s e 1.4x; k=50 -> ~1950s e 1.0x)
+    CH_MAX_K = 10
+
     def __init__(self, root_dir: str):
         """
         Inicializa o serviço definindo a estrutura de arquivos do projeto.
@@ -28,43 +44,79 @@ class GraphService:
             'input_raw': os.path.join(self.dirs['raw'], 'dataset.csv'),
             'dataset_full': 'songs_full.csv',  # Nome do arquivo processado full
             'dataset_graph': 'songs.csv',  # Nome do arquivo de amostra pro grafo
-            'graph_obj': os.path.join(self.dirs['processed'], 'graph.graphml')  # Arquivo do grafo salvo
+            'graph_obj': os.path.join(self.dirs['processed'], 'graph.graphml'),  # Grafo em GraphML (import/export)
+            'graph_snapshot': os.path.join(self.dirs['processed'], 'graph_snapshot')  # Snapshot binário (preferido)
         }
 
         # cache para não ser necessário sempre buscar do disco
         self._graph_cache = None
+        self._graph_key = None  # impressão digital das entradas do grafo em cache (None = desconhecida)
+        self._graph_k = None  # k_neighbors do grafo em cache
+        # builder que guarda o estado do K-NN incremental entre chamadas de add_tracks
+        self._builder = None
+        # índice ALT (landmarks) do grafo em cache
+        self._landmarks = None
+        # hierarquia de contração do grafo em cache
+        self._hierarchy = None
+
+        # manifesto dos artefatos gerados, para reaproveitá-los entre execuções
+        self.cache = BuildCache(self.dirs['processed'])
 
-    def run_full_etl(self, samples_per_genre=800) -> bool:
+    def run_full_etl(self, samples_per_genre=800, force=False, target_genres=None) -> bool:
         """
         Executa o etl completo de dados:
         1. Gera a base completa (songs_full.csv)
         2. Gera a base amostral (songs.csv)
+        Cada base é salva em CSV (exportação legível) e em formato colunar
+        (songs_full.cols / songs.cols), que é o lido na construção do grafo.
+
+        Se os CSVs processados já foram gerados com as mesmas entradas
+        (conteúdo do dataset bruto, samples_per_genre e versão do código),
+        eles são reaproveitados e o ETL não é executado.
+
+        :param samples_per_genre: numero de amostras por gênero
+        :param force: se True, executa o ETL mesmo com os artefatos atualizados
+        :param target_genres: gêneros amostrados para o grafo (None = padrão do DataProcessor)
         """
         print("[Service] Iniciando Pipeline ETL...")
 
         if not os.path.exists(self.files['input_raw']):
             raise FileNotFoundError(f"Dataset bruto não encontrado em: {self.files['input_raw']}")
 
+        key = self._etl_fingerprint(samples_per_genre, target_genres)
+        csvs = [os.path.join(self.dirs['processed'], self.files[nome]) for nome in ('dataset_full', 'dataset_graph')]
+        saidas = csvs + [columnar_path(csv) for csv in csvs]
+
+        if not force and all(self.cache.is_valid(saida, key) for saida in saidas):
+            self.cache.save()
+            count('etl_cache_hits')
+            print("[Service] Dados processados já estão atualizados. ETL ignorado.")
+            return True
+
         try:
             # Instancia o processador apontando para a pasta de saída
             processor = DataProcessor(
                 input_path=self.files['input_raw'],
-                output_dir=self.dirs['processed']
+                output_dir=self.dirs['processed'],
+                target_genres=target_genres,
+                output_format='both'
             )
 
 
-            print("   -> Processando dataset completa...")
-            processor.process_full_dataset(filename=self.files['dataset_full'])
+            # Uma única leitura do CSV bruto gera a base completa e a amostra
+            print(f"   -> Processando dataset completo e amostra para grafo ({samples_per_genre}/gênero)...")
+            with span('run_full_etl', samples_per_genre=samples_per_genre):
+                processor.process_all_datasets(
+                    full_filename=self.files['dataset_full'],
+                    graph_filename=self.files['dataset_graph'],
+                    samples_per_genre=samples_per_genre
+                )
 
-
-            print(f"   -> Processando amostra para grafo ({samples_per_genre}/gênero)...")
-            processor.process_graph_dataset(
-                filename=self.files['dataset_graph'],
-                samples_per_genre=samples_per_genre
-            )
+            for saida in saidas:
+                self.cache.record(saida, key)
 
             # Limpa o cache do grafo, pois os dados mudaram
-            self._graph_cache = None
+            self._set_graph_cache(None)
             print("[Service] ETL concluído com sucesso.")
             return True
 
@@ -72,42 +124,300 @@ class GraphService:
             print(f"[Service] Erro crítico no ETL: {e}")
             return False
 
-    def get_graph(self, k_neighbors=50, force_rebuild=False) -> nx.DiGraph:
+    def get_graph(self, k_neighbors=50, force_rebuild=False, representation=None):
         """
         Retorna o grafo buildado e pronto para uso
         usa o dataset com amostra balanceada.
 
+        Artefatos em disco (snapshot, GraphML) só são reaproveitados se foram
+        gerados com as mesmas entradas: conteúdo do songs.csv, k_neighbors,
+        features e versão do código. Caso contrário o grafo é reconstruído.
+
         :param k_neighbors: Numero de vizinhos para cada nó
         :param force_rebuild: se True, força a reconstrução do grafo do zero
-        :return: um nx.DiGraph
+        :param representation: 'networkx' (nx.DiGraph), 'csr' (CSRGraph compacto)
+            ou None para devolver como estiver (snapshot e build novo geram CSR)
+        :return: um nx.DiGraph ou CSRGraph
         """
 
         # tenta usar o cache
-        if self._graph_cache is not None and not force_rebuild:
-            return self._graph_cache
+        if self._graph_cache is not None and not force_rebuild and self._graph_k in (None, k_neighbors):
+            return self._as_representation(self._graph_cache, representation)
 
-        # tenta carregar do disco
-        if os.path.exists(self.files['graph_obj']) and not force_rebuild:
+        path_csv_graph = os.path.join(self.dirs['processed'], self.files['dataset_graph'])
+        key = self._graph_fingerprint(k_neighbors)
+
+        # tenta carregar do disco: primeiro o snapshot binário (mmap), depois o GraphML
+        if not force_rebuild and self._reusable(self.files['graph_snapshot'], key):
+            print("[Service] Carregando snapshot binário do disco...")
+            try:
+                with span('get_graph', source='snapshot', k=k_neighbors):
+                    G = GraphBuilder.load_graph(self.files['graph_snapshot'])
+                self._set_graph_cache(self._as_representation(G, representation), key, k_neighbors)
+                return self._graph_cache
+            except Exception as e:
+                print(f"[Service] Erro ao carregar snapshot ({e}). Tentando outras fontes...")
+
+        if not force_rebuild and self._reusable(self.files['graph_obj'], key):
             print("[Service] Carregando grafo salvo do disco...")
             try:
-                self._graph_cache = GraphBuilder.load_graph(self.files['graph_obj'])
+                with span('get_graph', source='graphml', k=k_neighbors):
+                    G = GraphBuilder.load_graph(self.files['graph_obj'])
+                    self._import_snapshot(G, key)
+                self._set_graph_cache(self._as_representation(G, representation), key, k_neighbors)
                 return self._graph_cache
             except Exception as e:
                 print(f"[Service] Erro ao carregar grafo salvo ({e}). Recriando...")
 
         # constrói do zero caso as outras opções falhem
         print("[Service] Construindo novo grafo a partir do CSV...")
-        path_csv_graph = os.path.join(self.dirs['processed'], self.files['dataset_graph'])
 
         if not os.path.exists(path_csv_graph):
             raise FileNotFoundError("CSV do grafo não encontrado. Execute 'run_full_etl()' primeiro.")
 
-        builder = GraphBuilder(csv_path=path_csv_graph)
+        # O formato colunar (sem parse de texto) é preferido quando existe
+        path_cols_graph = columnar_path(path_csv_graph)
+        builder = GraphBuilder(csv_path=path_cols_graph if is_columnar(path_cols_graph) else path_csv_graph)
+
+        # Constrói e já salva o snapshot binário no caminho definido no __init__
+        with span('get_graph', source='build', k=k_neighbors):
+            G = builder.build_graph(
+                k_neighbors=k_neighbors,
+                save_path=self.files['graph_snapshot'],
+                representation=representation or 'csr'
+            )
+        self.cache.record(self.files['graph_snapshot'], key)
+        self._set_graph_cache(G, key, k_neighbors)
+
+        return self._graph_cache
+
+    def add_tracks(self, df, k_neighbors=50):
+        """
+        Adiciona músicas novas ao dataset do grafo e ao grafo, sem reconstruir
+        quando possível: o K-NN é atualizado de forma incremental e o snapshot
+        ganha um arquivo de delta. Se a inserção incremental não for possível
+        (ex: features fora do intervalo da normalização), o grafo é reconstruído.
+
+        :param df: DataFrame com as músicas novas (mesmas colunas do songs.csv)
+        :param k_neighbors: usado apenas se for preciso construir o grafo do zero
+        :return: o grafo atualizado
+        """
+        path_csv_graph = os.path.join(self.dirs['processed'], self.files['dataset_graph'])
+        G = self.get_graph(k_neighbors=k_neighbors)
+
+        if self._builder is None or self._builder.G is not G:
+            self._builder = GraphBuilder(csv_path=path_csv_graph)
+            self._builder.G = G
+
+        delta = self._builder.add_tracks(df)
+
+        # O CSV (e o colunar, se existir) sempre recebe as músicas, para que uma reconstrução futura as inclua
+        colunas = pd.read_csv(path_csv_graph, nrows=0).columns
+        df.reindex(columns=colunas).to_csv(path_csv_graph, mode='a', header=False, index=False)
+        if is_columnar(columnar_path(path_csv_graph)):
+            append_columnar(df.reindex(columns=colunas), columnar_path(path_csv_graph))
+
+        if delta is None:
+            print("[Service] Inserção incremental indisponível. Reconstruindo grafo...")
+            return self.get_graph(k_neighbors=k_neighbors, force_rebuild=True)
+
+        if os.path.exists(self.files['graph_snapshot']):
+            append_delta(self.files['graph_snapshot'], delta)
+        else:
+            save_snapshot(self._builder.csr_graph, self.files['graph_snapshot'])
+
+        # O snapshot (base + deltas) corresponde ao songs.csv já com as músicas novas
+        key = self._graph_fingerprint(k_neighbors)
+        self.cache.record(self.files['graph_snapshot'], key)
+        builder = self._builder
+        self._set_graph_cache(builder.G, key, k_neighbors)
+        self._builder = builder
+        return self._graph_cache
+
+    def get_landmarks(self, n_landmarks=16, strategy='farthest', k_neighbors=50):
+        """
+        Retorna o índice de landmarks (ALT) do grafo atual, já anexado a ele
+        (G.landmarks), para buscas com alt_search.
+
+        O índice fica salvo dentro do snapshot e só é recalculado quando o grafo
+        muda (rebuild, add_tracks) ou quando n_landmarks/strategy são outros.
+
+        :param n_landmarks: número de landmarks (L)
+        :param strategy: 'farthest' ou 'random'
+        :param k_neighbors: repassado ao get_graph
+        :return: LandmarkIndex
+        """
+        G = self._csr_graph(k_neighbors)
+        key = fingerprint(graph=self._graph_key, n_landmarks=n_landmarks, strategy=strategy,
+                          code=code_version(landmarks))
+        if self._landmarks is not None and self._landmarks.key == key:
+            return self._landmarks
+
+        snapshot_path = self.files['graph_snapshot']
+        index = None
+        if self._graph_key is not None and os.path.isdir(snapshot_path):
+            index = load_landmarks(snapshot_path, key)
+        if index is not None and index.forward.shape[1] != G.number_of_nodes():
+            index = None
 
-        # Constrói e já salva automaticamente no caminho definido no __init__
-        self._graph_cache = builder.build_graph(
+        if index is None:
+            print(f"[Service] Calculando {n_landmarks} landmarks ({strategy})...")
+            with span('landmarks', n_landmarks=n_landmarks, strategy=strategy):
+                index = LandmarkIndex.build(G, n_landmarks, strategy, key=key)
+            if self._graph_key is not None and os.path.isdir(snapshot_path):
+                save_landmarks(snapshot_path, index)
+
+        G.landmarks = index
+        self._landmarks = index
+        return index
+
+    def get_hierarchy(self, k_neighbors=50, allow_large_k=False):
+        """
+        Retorna a hierarquia de contração do grafo atual, já anexada a ele
+        (G.hierarchy), para buscas com ch_search.
+
+        O pré-processamento é caro, então a hierarquia fica salva dentro do
+        snapshot e só é recalculada quando o grafo muda (rebuild, add_tracks).
+        Para um grafo com k_neighbors acima de CH_MAX_K ela só é construída
+        com allow_large_k=True (uma já salva é carregada normalmente).
+
+        :param k_neighbors: repassado ao get_graph
+        :param allow_large_k: se True, constrói mesmo acima de CH_MAX_K
+        :return: ContractionHierarchy, ou None se a construção foi recusada pelo k
+        """
+        G = self._csr_graph(k_neighbors)
+        key = fingerprint(graph=self._graph_key, code=code_version(contraction))
+        if self._hierarchy is not None and self._hierarchy.key == key:
+            return self._hierarchy
+
+        snapshot_path = self.files['graph_snapshot']
+        hierarchy = None
+        if self._graph_key is not None and os.path.isdir(snapshot_path):
+            hierarchy = load_hierarchy(snapshot_path, key)
+        if hierarchy is not None and len(hierarchy) != G.number_of_nodes():
+            hierarchy = None
+
+        if hierarchy is None:
+            k = self._graph_k or k_neighbors
+            if k > self.CH_MAX_K:
+                print(f"[Service] AVISO: com k_neighbors={k} (> {self.CH_MAX_K}) a hierarquia de "
+                      "contração pode levar dezenas de minutos e acelera pouco as buscas.")
+                if not allow_large_k:
+                    return None
+            print("[Service] Construindo hierarquia de contração...")
+            with span('contraction'):
+                hierarchy = ContractionHierarchy.build(G, key=key)
+            count('shortcuts', hierarchy.num_shortcuts)
+            print(f"[Service] Hierarquia pronta: {hierarchy.num_shortcuts} atalhos")
+            if self._graph_key is not None and os.path.isdir(snapshot_path):
+                save_hierarchy(snapshot_path, hierarchy)
+
+        G.hierarchy = hierarchy
+        self._hierarchy = hierarchy
+        return hierarchy
+
+    def export_graphml(self, output_path=None):
+        """
+        Exporta o grafo atual (o que está em memória, ou o padrão do get_graph)
+        em GraphML (formato texto, para outras ferramentas).
+
+        :param output_path: destino; por padrão o 'graph_obj' do serviço
+        :return: path do arquivo gerado
+        """
+        output_path = output_path or self.files['graph_obj']
+        G = self._graph_cache if self._graph_cache is not None else self.get_graph()
+        if isinstance(G, CSRGraph):
+            G = G.to_networkx()
+
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        nx.write_graphml(G, output_path)
+        if self._graph_key is not None:
+            self.cache.record(output_path, self._graph_key)
+        print(f"[Service] Grafo exportado em GraphML: {output_path}")
+        return output_path
+
+    def _import_snapshot(self, G, key=None):
+        """
+        Converte um grafo importado (GraphML) em snapshot binário,
+        para que as próximas cargas usem o formato rápido.
+        """
+        if not isinstance(G, (nx.DiGraph, CSRGraph)) or len(G) == 0:
+            return
+        csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+        save_snapshot(csr, self.files['graph_snapshot'])
+        if key is not None:
+            self.cache.record(self.files['graph_snapshot'], key)
+
+    def _set_graph_cache(self, G, key=None, k_neighbors=None):
+        """
+        Atualiza o grafo em memória junto com a impressão digital das entradas
+        que o geraram. O estado incremental (add_tracks) pertence ao grafo antigo.
+        """
+        self._graph_cache = G
+        self._graph_key = key
+        if G is not None:
+            # Versão do grafo: caches de busca (PathCache) descartam o que é de outra versão
+            G.graph[GRAPH_VERSION_ATTR] = key if key is not None else uuid.uuid4().hex
+        self._graph_k = k_neighbors
+        self._builder = None
+        self._landmarks = None
+        self._hierarchy = None
+
+    def _csr_graph(self, k_neighbors):
+        """
+        Grafo atual como CSRGraph (os índices de busca exigem essa representação).
+        """
+        G = self.get_graph(k_neighbors=k_neighbors)
+        if not isinstance(G, CSRGraph):
+            G = self._as_representation(G, 'csr')
+            self._set_graph_cache(G, self._graph_key, self._graph_k)
+        return G
+
+    def _etl_fingerprint(self, samples_per_genre, target_genres=None):
+        """
+        Impressão digital das entradas do ETL, incluindo o leitor do CSV bruto
+        usado de fato (pyarrow ou c), que depende do que está instalado.
+        """
+        return fingerprint(
+            raw=self.cache.digest(self.files['input_raw']),
+            samples_per_genre=samples_per_genre,
+            target_genres=target_genres,
+            engine=processor.resolve_engine(),
+            code=code_version(processor, sampling, columnar),
+        )
+
+    def _graph_fingerprint(self, k_neighbors):
+        """
+        Impressão digital das entradas do grafo. Usa o conteúdo do songs.csv (e não
+        a do ETL) para acompanhar também as músicas adicionadas com add_tracks.
+        """
+        return fingerprint(
+            songs=self.cache.digest(os.path.join(self.dirs['processed'], self.files['dataset_graph'])),
             k_neighbors=k_neighbors,
-            save_path=self.files['graph_obj']
+            features=GraphBuilder.FEATURE_COLS,
+            code=code_version(graph_builder, neighbors, csr_graph, snapshot, incremental, columnar),
         )
 
-        return self._graph_cache
\ No newline at end of file
+    def _reusable(self, artifact, key):
+        """
+        Um artefato é reaproveitável se foi gerado com a impressão digital atual.
+        Sem manifesto (artefatos gerados antes do cache existir) ele é aceito como está.
+        """
+        if not os.path.exists(artifact):
+            return False
+        if not self.cache.exists() or self.cache.is_valid(artifact, key):
+            return True
+        print(f"[Service] Artefato desatualizado, ignorando: {os.path.basename(artifact)}")
+        return False
+
+    @staticmethod
+    def _as_representation(G, representation):
+        """
+        Converte o grafo para a representação pedida, se necessário
+        (None mantém a representação em que o grafo já está).
+        """
+        if representation == 'csr' and isinstance(G, nx.DiGraph):
+            return CSRGraph.from_networkx(G)
+        if representation == 'networkx' and isinstance(G, CSRGraph):
+            return G.to_networkx()
+        return G
\ No newline at end of file
@@ -0,0 +1,267 @@
+import bisect
+import heapq
+import weakref
+
+import numpy as np
+
+from src.algorithm.search import graph_version
+from src.preprocessing.csr_graph import CSRGraph
+
+
+# Tamanho dos n-gramas do índice invertido
+NGRAM = 3
+
+# Pontuação por tipo de match (mesmos níveis da busca linear do main)
+SCORE_EXACT_NAME = 1000
+SCORE_EXACT_ARTIST = 900
+SCORE_PREFIX_NAME = 500
+SCORE_PREFIX_ARTIST = 400
+SCORE_IN_NAME = 100
+SCORE_IN_ARTIST = 50
+# Penalidade por caractere do nome (preferência por matches mais específicos)
+NAME_LENGTH_PENALTY = 0.1
+
+
+class _FieldIndex:
+    """
+    Índice de um campo de texto (nome ou artista) já normalizado: cada valor
+    distinto aparece uma vez, com as posições dos nós que o têm.
+        exact:    valor -> id do valor
+        ordenado: valores em ordem (busca binária por prefixo)
+        ngrams:   trigrama -> ids dos valores que o contêm (índice invertido)
+    """
+
+    def __init__(self, values):
+        ids = {}
+        posicoes = []
+        for pos, valor in enumerate(values):
+            if valor not in ids:
+                ids[valor] = len(posicoes)
+                posicoes.append([])
+            posicoes[ids[valor]].append(pos)
+
+        self.values = list(ids)
+        self.exact = ids
+        self.positions = [np.asarray(p, dtype=np.int64) for p in posicoes]
+        self.sorted = sorted(self.values)
+        self._sorted_ids = [ids[v] for v in self.sorted]
+
+        ngrams = {}
+        for valor_id, valor in enumerate(self.values):
+            for gram in {valor[i:i + NGRAM] for i in range(len(valor) - NGRAM + 1)}:
+                ngrams.setdefault(gram, []).append(valor_id)
+        self.ngrams = {gram: np.asarray(ids_, dtype=np.int64) for gram, ids_ in ngrams.items()}
+
+    def equals(self, termo):
+        '''
+        :return: ids dos valores iguais a termo
+        '''
+        valor_id = self.exact.get(termo)
+        return [] if valor_id is None else [valor_id]
+
+    def starts_with(self, termo):
+        '''
+        :return: ids dos valores que começam com termo (faixa contígua da lista ordenada)
+        '''
+        inicio = bisect.bisect_left(self.sorted, termo)
+        fim = bisect.bisect_left(self.sorted, termo + '\U0010ffff', inicio)
+        return self._sorted_ids[inicio:fim]
+
+    def contains(self, termo):
+        '''
+        :return: ids dos valores que contêm termo. Termos com pelo menos NGRAM
+            caracteres usam a interseção das listas dos seus trigramas (conferida
+            depois); termos curtos percorrem os valores distintos.
+        '''
+        if len(termo) < NGRAM:
+            return [i for i, valor in enumerate(self.values) if termo in valor]
+
+        grams = {termo[i:i + NGRAM] for i in range(len(termo) - NGRAM + 1)}
+        listas = []
+        for gram in grams:
+            lista = self.ngrams.get(gram)
+            if lista is None:
+                return []
+            listas.append(lista)
+
+        listas.sort(key=len)
+        candidatos = listas[0]
+        for lista in listas[1:]:
+            candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+            if not len(candidatos):
+                return []
+
+        return [i for i in candidatos.tolist() if termo in self.values[i]]
+
+    def nodes(self, valor_ids):
+        '''
+        :return: posições (nós) de todos os valores em valor_ids
+        '''
+        if not valor_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.positions[i] for i in valor_ids])
+
+
+class SongIndex:
+    """
+    Índice de busca de músicas por nome/artista, construído uma vez por grafo:
+    campos já em minúsculas, índice invertido de trigramas e buscas exatas e
+    por prefixo. A pontuação é a da busca linear (match exato no nome 1000,
+    no artista 900, prefixo 500/400, substring 100/50, menos 0.1 por caractere
+    do nome), com empates na ordem dos nós do grafo. Só os nós que contêm o
+    termo são candidatos, e o top-k sai de um heap preenchido nível a nível.
+    """
+
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, G):
+        '''
+        :param G: grafo de músicas (CSRGraph ou NetworkX) com atributos name/artist
+        '''
+        self.G = G
+        if isinstance(G, CSRGraph):
+            self.node_ids = G.node_ids.tolist()
+            n = len(self.node_ids)
+            nomes = _as_list(G.node_attrs.get('name'), n)
+            artistas = _as_list(G.node_attrs.get('artist'), n)
+        else:
+            self.node_ids, nomes, artistas = [], [], []
+            for node_id, data in G.nodes(data=True):
+                self.node_ids.append(node_id)
+                nomes.append(data.get('name', ''))
+                artistas.append(data.get('artist', ''))
+
+        self.names = [_normalize(v) for v in nomes]
+        self.artists = [_normalize(v) for v in artistas]
+        self.name_index = _FieldIndex(self.names)
+        self.artist_index = _FieldIndex(self.artists)
+        self.signature = _signature(G)
+
+    @classmethod
+    def for_graph(cls, G):
+        '''
+        Índice do grafo, reaproveitado enquanto o grafo tiver a mesma versão
+        (graph_version) e o mesmo número de nós.
+
+        :param G: grafo de músicas
+        :return: SongIndex
+        '''
+        index = cls._cache.get(G)
+        if index is None or index.signature != _signature(G):
+            index = cls(G)
+            cls._cache[G] = index
+        return index
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def search(self, termo, limit=None):
+        '''
+        :param termo: texto digitado (comparado em minúsculas)
+        :param limit: máximo de resultados (None = todos, ordenados)
+        :return: tupla (total de músicas encontradas, lista de (node_id, data, score)
+            ordenada por relevância)
+        '''
+        if not termo:
+            return 0, []
+        termo = termo.lower()
+
+        no_nome = self.name_index.contains(termo)
+        no_artista = self.artist_index.contains(termo)
+        posicoes = np.union1d(self.name_index.nodes(no_nome), self.artist_index.nodes(no_artista))
+
+        if limit is None:
+            melhores = sorted(((self._score(pos, termo), -pos) for pos in posicoes.tolist()), reverse=True)
+        else:
+            niveis = [
+                (SCORE_EXACT_NAME, self.name_index, self.name_index.equals(termo)),
+                (SCORE_EXACT_ARTIST, self.artist_index, self.artist_index.equals(termo)),
+                (SCORE_PREFIX_NAME, self.name_index, self.name_index.starts_with(termo)),
+                (SCORE_PREFIX_ARTIST, self.artist_index, self.artist_index.starts_with(termo)),
+                (SCORE_IN_NAME, self.name_index, no_nome),
+                (SCORE_IN_ARTIST, self.artist_index, no_artista),
+            ]
+            melhores = sorted(self._top(termo, niveis, limit), reverse=True)
+
+        return len(posicoes), [(self.node_ids[-neg], self.node_data(-neg), score) for score, neg in melhores]
+
+    def _top(self, termo, niveis, limit):
+        '''
+        [INTERNO] Os `limit` melhores (score, -posição), percorrendo os níveis de
+        pontuação do maior para o menor. Um nó pertence ao primeiro nível em que
+        aparece e nunca pontua acima da base do nível; assim que o pior do heap
+        supera essa base, os níveis seguintes não podem mudar o resultado.
+        '''
+        heap = []
+        vistos = set()
+        if limit <= 0:
+            return heap
+
+        for base, campo, valor_ids in niveis:
+            if len(heap) == limit and heap[0][0] > base:
+                break
+            for pos in campo.nodes(valor_ids).tolist():
+                if pos in vistos:
+                    continue
+                vistos.add(pos)
+                item = (self._score(pos, termo), -pos)
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return heap
+
+    def _score(self, pos, termo):
+        '''
+        [INTERNO] Pontuação de um nó que contém o termo (mesmos níveis da busca linear).
+        '''
+        nome, artista = self.names[pos], self.artists[pos]
+        if termo == nome:
+            score = SCORE_EXACT_NAME
+        elif termo == artista:
+            score = SCORE_EXACT_ARTIST
+        elif nome.startswith(termo):
+            score = SCORE_PREFIX_NAME
+        elif artista.startswith(termo):
+            score = SCORE_PREFIX_ARTIST
+        elif termo in nome:
+            score = SCORE_IN_NAME
+        else:
+            score = SCORE_IN_ARTIST
+        return score - len(nome) * NAME_LENGTH_PENALTY
+
+    def node_data(self, pos):
+        '''
+        :param pos: posição do nó no índice
+        :return: atributos do nó, como em G.nodes[node_id]
+        '''
+        if isinstance(self.G, CSRGraph):
+            return self.G.node_data(pos)
+        return self.G.nodes[self.node_ids[pos]]
+
+
+def _as_list(values, n):
+    '''
+    [INTERNO] Coluna de atributo (lista, array ou StringColumn) como lista; ausente vira n valores vazios.
+    '''
+    if values is None:
+        return [None] * n
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _normalize(valor):
+    '''
+    [INTERNO] Texto em minúsculas; valores ausentes (None/NaN) viram ''.
+    '''
+    if isinstance(valor, str):
+        return valor.lower()
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return ''
+    return str(valor).lower()
+
+
+def _signature(G):
+    '''
+    [INTERNO] O que identifica o conteúdo do grafo indexado.
+    '''
+    return graph_version(G), G.number_of_nodes()
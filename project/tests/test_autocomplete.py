@@ -0,0 +1,118 @@
+import networkx as nx
+
+from src.preprocessing.csr_graph import CSRGraph
+from src.services.autocomplete import Autocomplete, artist_tokens
+
+
+def create_graph():
+    G = nx.DiGraph()
+    musicas = [
+        ("Love Story", "Taylor Swift"), ("Lover", "Taylor Swift"), ("Love", "Lana Del Rey"),
+        ("Starboy", "The Weeknd;Daft Punk"), ("Blinding Lights", "The Weeknd"), ("Lovely", "Billie Eilish;Khalid"),
+        ("Get Lucky", "Daft Punk"), ("Love", "Keyshia Cole"),
+    ]
+    for i, (nome, artista) in enumerate(musicas):
+        G.add_node(f"t{i}", name=nome, artist=artista)
+    return G
+
+
+def brute_force(G, prefix):
+    # Referência: melhor chave de cada música, pela mesma pontuação
+    prefix = prefix.lower()
+    resultado = []
+    for node_id, data in G.nodes(data=True):
+        nome, artista = data["name"].lower(), data["artist"].lower()
+        melhor = 0
+        if nome == prefix:
+            melhor = 1000
+        elif nome.startswith(prefix):
+            melhor = 500
+        for token in artist_tokens(artista):
+            if token == prefix:
+                melhor = max(melhor, 900)
+            elif token.startswith(prefix):
+                melhor = max(melhor, 400)
+        if melhor:
+            resultado.append((node_id, melhor - len(nome) * 0.1))
+    resultado.sort(key=lambda x: x[1], reverse=True)
+    return resultado
+
+
+def ids(sugestoes):
+    return [node_id for node_id, _, _ in sugestoes]
+
+
+def test_artist_tokens():
+    assert artist_tokens("the weeknd;daft punk") == ["the weeknd", "the", "weeknd", "daft punk", "daft", "punk"]
+    assert artist_tokens("adele") == ["adele"]
+    assert artist_tokens("") == []
+
+
+def test_complete_ranks_like_brute_force():
+    G = create_graph()
+    engine = Autocomplete(G)
+
+    for prefix in ["l", "lo", "LOVE", "love s", "t", "the", "daft", "punk", "taylor swift", "x", "b"]:
+        esperado = brute_force(G, prefix)
+        total, sugestoes = engine.complete(prefix, limit=3)
+        assert total == len(esperado)
+        assert [(n, s) for n, _, s in sugestoes] == esperado[:3]
+
+    assert engine.complete("") == (0, [])
+
+
+def test_preselection_falls_back_to_whole_range(monkeypatch):
+    # As chaves pré-selecionadas (nome e tokens de artista de "Zz") são todas da
+    # mesma música; a segunda sugestão só aparece ordenando a faixa inteira
+    monkeypatch.setattr("src.services.autocomplete.CANDIDATES_PER_RESULT", 1)
+    G = nx.DiGraph()
+    G.add_node("a", name="Zz", artist="Zzz;Zzzz Zzzzz")
+    G.add_node("b", name="Some long title here", artist="Zzq")
+
+    total, sugestoes = Autocomplete(G).complete("zz", limit=2)
+    assert total == 2
+    assert [(n, s) for n, _, s in sugestoes] == brute_force(G, "zz")
+    assert ids(sugestoes) == ["a", "b"]
+
+
+def test_ties_follow_node_order():
+    _, sugestoes = Autocomplete(create_graph()).complete("love")
+    assert ids(sugestoes)[:2] == ["t2", "t7"]  # "Love" exato nos dois
+
+
+def test_session_narrows_and_backtracks():
+    G = create_graph()
+    engine = Autocomplete(G)
+    sessao = engine.session()
+
+    faixas = []
+    for query in ["l", "lo", "lov", "love"]:
+        assert sessao.update(query) == engine.complete(query)
+        faixas.append(sessao._stack[-1][2] - sessao._stack[-1][1])
+    assert faixas == sorted(faixas, reverse=True)  # a faixa só encolhe
+
+    assert sessao.update("lu") == engine.complete("lu")  # backspace + novo caractere
+    assert sessao.query == "lu"
+    assert sessao.update("") == (0, [])
+
+
+def test_complete_many_in_input_order():
+    engine = Autocomplete(create_graph())
+    prefixes = ["the", "lo", "love", "daft", "l"]
+
+    assert engine.complete_many(prefixes, limit=2) == [engine.complete(p, limit=2) for p in prefixes]
+
+
+def test_csr_graph_and_cache():
+    G = create_graph()
+    csr = CSRGraph.from_networkx(G)
+    engine = Autocomplete.for_graph(csr)
+
+    assert Autocomplete.for_graph(csr) is engine
+    total, sugestoes = engine.complete("daft")
+    assert total == 2 and ids(sugestoes) == ["t3", "t6"]  # token "daft" exato; nome menor primeiro
+    assert sugestoes[1][1] == {"name": "Get Lucky", "artist": "Daft Punk"}
+    assert engine.keys == sorted(engine.keys)
+
+    csr.graph["version"] = "v2"
+    assert Autocomplete.for_graph(csr) is not engine
@@ -0,0 +1,102 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.algorithm.batch import batch_shortest_paths, group_by_origin
+from src.algorithm.search import SearchStatsAggregate, dijkstra, path_from_tree, shortest_path_tree
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.graph_builder import GraphBuilder
+
+
+def build_knn_graph(tmp_path, n=120, k=4, representation="csr"):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    df.to_csv(csv_file, index=False)
+    return GraphBuilder(csv_file).build_graph(k_neighbors=k, representation=representation)
+
+
+def random_pairs(G, n_pairs, n_origins, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes)
+    origens = rng.choice(nodes, size=n_origins, replace=False).tolist()
+    return [(origens[i % n_origins], rng.choice(nodes).item()) for i in range(n_pairs)]
+
+
+@pytest.mark.parametrize("representation", ["csr", "networkx"])
+def test_tree_paths_match_dijkstra(tmp_path, representation):
+    G = build_knn_graph(tmp_path, representation=representation)
+    tree = shortest_path_tree(G, "t0")
+
+    for destino in G.nodes:
+        assert path_from_tree(tree, destino) == dijkstra(G, "t0", destino)
+
+
+def test_tree_ties_follow_dijkstra():
+    # Dois caminhos de mesmo custo até "d": o desempate é o do dijkstra
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([("s", "b", 1.0), ("s", "a", 1.0), ("a", "d", 1.0), ("b", "d", 1.0)])
+    for grafo in (G, CSRGraph.from_networkx(G)):
+        assert path_from_tree(shortest_path_tree(grafo, "s"), "d") == dijkstra(grafo, "s", "d")
+
+
+def test_tree_unreachable_and_missing_source():
+    G = nx.DiGraph()
+    G.add_edge("a", "b", weight=1.0)
+    G.add_node("c")
+
+    tree = shortest_path_tree(G, "a")
+    assert path_from_tree(tree, "c") == (None, float("inf"))
+    assert path_from_tree(tree, "a") == (["a"], 0)
+    with pytest.raises(KeyError):
+        shortest_path_tree(G, "x")
+
+
+def test_group_by_origin_keeps_order():
+    grupos = group_by_origin([("a", 1), ("b", 2), ("a", 3)])
+    assert list(grupos) == ["a", "b"]
+    assert grupos["a"] == [(0, 1), (2, 3)]
+
+
+def test_batch_matches_per_pair_dijkstra(tmp_path, monkeypatch):
+    G = build_knn_graph(tmp_path)
+    pairs = random_pairs(G, 40, n_origins=3)
+
+    arvores = []
+    original = shortest_path_tree
+    monkeypatch.setattr("src.algorithm.batch.shortest_path_tree", lambda g, s, **kw: arvores.append(s) or original(g, s, **kw))
+
+    resultados = batch_shortest_paths(G, pairs)
+    assert resultados == [dijkstra(G, o, d) for o, d in pairs]
+    assert sorted(arvores) == sorted({o for o, _ in pairs})  # uma árvore por origem
+
+
+def test_batch_worker_pool(tmp_path):
+    G = build_knn_graph(tmp_path, n=60)
+    pairs = random_pairs(G, 12, n_origins=4, seed=1)
+
+    assert batch_shortest_paths(G, pairs, n_jobs=2) == [dijkstra(G, o, d) for o, d in pairs]
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_batch_stats_one_entry_per_tree(tmp_path, n_jobs):
+    G = build_knn_graph(tmp_path, n=60)
+    pairs = random_pairs(G, 12, n_origins=4, seed=1)
+
+    agregado = SearchStatsAggregate()
+    assert batch_shortest_paths(G, pairs, n_jobs=n_jobs, stats=agregado) == [dijkstra(G, o, d) for o, d in pairs]
+    assert len(agregado) == 4
+    origens = list(dict.fromkeys(o for o, _ in pairs))
+    # cada árvore fecha todos os nós alcançáveis da sua origem
+    assert agregado.values["settled"] == [len(shortest_path_tree(G, o)[0]) for o in origens]
+
+
+def test_batch_validates_nodes(tmp_path):
+    G = build_knn_graph(tmp_path, n=20)
+    with pytest.raises(KeyError):
+        batch_shortest_paths(G, [("t0", "nope")])
+    assert batch_shortest_paths(G, []) == []
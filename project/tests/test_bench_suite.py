@@ -0,0 +1,98 @@
+import os
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks import bench_suite
+from benchmarks.bench_suite import _cmd_compare, append_history, compare_runs, load_history
+
+
+def execucao(**casos):
+    """Execução do histórico com casos {nome: (wall_s, peak_rss_mb)}"""
+    return {
+        "timestamp": "2026-01-01T00:00:00",
+        "commit": "abc123",
+        "results": {nome: {"wall_s": t, "peak_rss_mb": m} for nome, (t, m) in casos.items()},
+    }
+
+
+def regressoes(base, atual, **kwargs):
+    return {l["case"]: l["regressions"] for l in compare_runs(base, atual, **kwargs)}
+
+
+def test_compare_runs_threshold():
+    base = execucao(a=(1.0, 100.0), b=(1.0, 100.0), c=(1.0, 100.0))
+    atual = execucao(a=(1.05, 100.0), b=(1.2, 100.0), c=(0.5, 100.0))
+
+    assert regressoes(base, atual, threshold=0.1) == {"a": [], "b": ["tempo"], "c": []}
+    assert regressoes(base, atual, threshold=0.01) == {"a": ["tempo"], "b": ["tempo"], "c": []}
+    linha = compare_runs(base, atual)[1]
+    assert linha["time_ratio"] == pytest.approx(1.2)
+    assert linha["rss_ratio"] == pytest.approx(1.0)
+
+
+def test_compare_runs_min_seconds_and_min_rss_mb():
+    base = execucao(rapido=(0.01, 100.0), memoria=(1.0, 10.0))
+    atual = execucao(rapido=(0.03, 100.0), memoria=(1.0, 14.0))
+
+    # 3x mais lento e 40% mais memória, mas abaixo do que se mede com confiança
+    assert regressoes(base, atual) == {"rapido": [], "memoria": []}
+    assert regressoes(base, atual, min_seconds=0.02, min_rss_mb=3.0) == {"rapido": ["tempo"], "memoria": ["memória"]}
+
+
+def test_compare_runs_zero_baseline():
+    base = execucao(a=(0.0, 0.0), b=(0.0, 0.0))
+    atual = execucao(a=(0.0, 0.0), b=(1.0, 50.0))
+
+    linhas = {l["case"]: l for l in compare_runs(base, atual)}
+    assert linhas["a"]["regressions"] == []
+    assert linhas["b"]["time_ratio"] == float("inf")
+    assert linhas["b"]["regressions"] == ["tempo", "memória"]
+
+
+def test_compare_runs_cases_missing_from_one_run():
+    base = execucao(comum=(1.0, 100.0), removido=(1.0, 100.0))
+    atual = execucao(comum=(1.0, 100.0), novo=(9.0, 900.0))
+
+    assert [l["case"] for l in compare_runs(base, atual)] == ["comum"]
+
+
+def test_compare_runs_without_rss():
+    """Pico de RSS não medido (None, ex: Windows): só o tempo é comparado."""
+    base = execucao(a=(1.0, None))
+    atual = execucao(a=(2.0, 500.0))
+
+    linha = compare_runs(base, atual)[0]
+    assert linha["regressions"] == ["tempo"]
+    assert linha["rss_ratio"] is None
+
+
+def test_history_and_compare_exit_code(tmp_path, capsys):
+    historico = os.path.join(tmp_path, "results", "history.json")
+    assert load_history(historico) == []
+
+    append_history(historico, execucao(a=(1.0, 100.0))["results"], {"sizes": [1000]})
+    append_history(historico, execucao(a=(1.0, 100.0))["results"], {"sizes": [1000]})
+    gravado = load_history(historico)
+    assert len(gravado) == 2 and gravado[0]["params"] == {"sizes": [1000]}
+
+    args = SimpleNamespace(history=historico, baseline=-2, current=-1, threshold=0.1, min_seconds=0.05,
+                           min_rss_mb=5.0)
+    assert _cmd_compare(args) == 0
+
+    append_history(historico, execucao(a=(2.0, 100.0))["results"], {})
+    assert _cmd_compare(args) == 1
+    assert "REGRESSÃO (tempo)" in capsys.readouterr().out
+
+    args.baseline = -10
+    assert _cmd_compare(args) == 2
+
+
+def test_git_commit_failure_is_none():
+    erro = subprocess.CalledProcessError(128, ["git"], stderr="fatal: not a git repository")
+    with patch.object(bench_suite.subprocess, "run", side_effect=erro):
+        assert bench_suite._git_commit() is None
+    with patch.object(bench_suite.subprocess, "run", side_effect=FileNotFoundError("git")):
+        assert bench_suite._git_commit() is None
@@ -0,0 +1,118 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing.columnar import (
+    ColumnarWriter,
+    append_columnar,
+    columnar_path,
+    is_columnar,
+    read_columnar,
+    read_columnar_meta,
+    write_columnar,
+)
+
+
+def create_typed_df():
+    return pd.DataFrame({
+        "track_id": ["a", "b", "c"],
+        "track_name": ["Canção", None, "Song C"],
+        "track_genre": pd.Categorical(["pop", "rock", "pop"]),
+        "tempo": np.array([120.5, 99.0, 140.25], dtype=np.float32),
+        "popularity": np.array([10, 20, 30], dtype=np.int64),
+    })
+
+
+def test_columnar_path():
+    assert columnar_path(os.path.join("dados", "songs.csv")) == os.path.join("dados", "songs.cols")
+    assert columnar_path("songs") == "songs.cols"
+
+
+def test_roundtrip_preserves_dtypes(tmp_path):
+    df = create_typed_df()
+    path = write_columnar(df, os.path.join(tmp_path, "songs.cols"))
+
+    assert is_columnar(path)
+    out = read_columnar(path)
+
+    assert list(out.columns) == list(df.columns)
+    assert out["tempo"].dtype == np.float32
+    assert out["popularity"].dtype == np.int64
+    assert isinstance(out["track_genre"].dtype, pd.CategoricalDtype)
+    assert out["track_name"].isna().tolist() == [False, True, False]
+    pd.testing.assert_frame_equal(out, df)
+
+
+def test_column_projection(tmp_path):
+    path = write_columnar(create_typed_df(), os.path.join(tmp_path, "songs.cols"))
+
+    out = read_columnar(path, columns=["tempo", "track_id"])
+    assert list(out.columns) == ["tempo", "track_id"]
+
+    with pytest.raises(KeyError):
+        read_columnar(path, columns=["inexistente"])
+
+
+
+def test_row_range(tmp_path):
+    df = create_typed_df()
+    path = write_columnar(df, os.path.join(tmp_path, "songs.cols"))
+
+    pd.testing.assert_frame_equal(read_columnar(path, start=1, stop=3), df.iloc[1:3])
+    pd.testing.assert_frame_equal(read_columnar(path, start=2, stop=10), df.iloc[2:])
+    assert len(read_columnar(path, start=5)) == 0
+
+
+def test_chunked_write_and_append_merge_categories(tmp_path):
+    df = create_typed_df()
+    path = os.path.join(tmp_path, "songs.cols")
+
+    writer = ColumnarWriter(path)
+    writer.write(df.iloc[:2])
+    writer.write(df.iloc[2:].assign(track_genre=pd.Categorical(["jazz"])))
+    writer.close()
+
+    extra = df.iloc[:1].assign(track_id="d", track_genre="rock")
+    append_columnar(extra, path)
+
+    out = read_columnar(path)
+    assert out["track_id"].tolist() == ["a", "b", "c", "d"]
+    assert out["track_genre"].tolist() == ["pop", "rock", "jazz", "rock"]
+    assert out["tempo"].dtype == np.float32
+
+
+def test_interrupted_append_is_ignored(tmp_path):
+    path = write_columnar(create_typed_df(), os.path.join(tmp_path, "songs.cols"))
+
+    # Append sem close: bytes a mais nos arquivos, meta.json ainda com 3 linhas
+    ColumnarWriter(path, append=True).write(create_typed_df())
+    assert len(read_columnar(path)) == 3
+
+    append_columnar(create_typed_df().iloc[:1], path)
+    out = read_columnar(path)
+    assert out["track_id"].tolist() == ["a", "b", "c", "a"]
+    assert out["track_name"].isna().tolist() == [False, True, False, False]
+    assert out["track_name"].iloc[3] == "Canção"
+
+
+def test_empty_dataset(tmp_path):
+    df = pd.DataFrame(columns=["track_id", "tempo"]).astype({"tempo": np.float32})
+    out = read_columnar(write_columnar(df, os.path.join(tmp_path, "vazio.cols")))
+
+    assert len(out) == 0
+    assert list(out.columns) == ["track_id", "tempo"]
+    assert out["tempo"].dtype == np.float32
+
+
+def test_invalid_meta(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_columnar_meta(os.path.join(tmp_path, "nada.cols"))
+
+    path = write_columnar(create_typed_df(), os.path.join(tmp_path, "songs.cols"))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"format": "outro"}, f)
+    with pytest.raises(ValueError):
+        read_columnar(path)
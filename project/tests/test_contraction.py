@@ -0,0 +1,139 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.algorithm.contraction import (
+    ContractionHierarchy,
+    ch_search,
+    load_hierarchy,
+    save_hierarchy,
+)
+from src.algorithm.search import dijkstra
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.snapshot import append_delta, save_snapshot
+from src.services.graph_service import GraphService
+
+
+def create_songs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    df.insert(1, "track_name", [f"Song {i}" for i in range(n)])
+    df.insert(2, "artists", [f"Artist {i % 5}" for i in range(n)])
+    return df
+
+
+def build_graph(tmp_path, n=150, k=4):
+    csv = os.path.join(tmp_path, "songs.csv")
+    create_songs(n).to_csv(csv, index=False)
+    builder = GraphBuilder(csv)
+    return builder, builder.build_graph(k_neighbors=k, representation="csr")
+
+
+def test_ch_paths_identical_to_dijkstra(tmp_path):
+    _, G = build_graph(tmp_path)
+    ch = ContractionHierarchy.build(G)
+    assert len(ch) == G.number_of_nodes()
+    assert np.all(np.asarray(ch.rank) >= 0)
+
+    rng = np.random.default_rng(1)
+    nodes = list(G.nodes)
+    for _ in range(60):
+        origem, destino = rng.choice(nodes, size=2, replace=False).tolist()
+        assert ch_search(G, origem, destino, ch) == dijkstra(G, origem, destino)
+
+
+def test_ch_unreachable_and_same_node():
+    # 0 -> 1 -> 2 e 3 isolado (só aponta para 2)
+    G = CSRGraph(
+        np.array([0, 1, 2, 2, 3]), np.array([1, 2, 2]), np.array([1.0, 2.0, 0.5]),
+        np.array(["a", "b", "c", "d"])
+    )
+    ch = ContractionHierarchy.build(G)
+    assert ch_search(G, "a", "c", ch) == (["a", "b", "c"], 3.0)
+    assert ch_search(G, "c", "a", ch) == (None, float("inf"))
+    assert ch_search(G, "d", "b", ch) == (None, float("inf"))
+    assert ch_search(G, "b", "b", ch) == (["b"], 0.0)
+
+
+def test_shortcuts_are_unpacked():
+    # Cadeia 0 -> 1 -> ... -> 5: contrair o meio exige atalhos
+    n = 6
+    G = CSRGraph(
+        np.r_[np.arange(n), n - 1], np.arange(1, n), np.linspace(0.1, 0.5, n - 1),
+        np.array([f"n{i}" for i in range(n)])
+    )
+    ch = ContractionHierarchy.build(G)
+    assert ch.num_shortcuts > 0
+    assert ch_search(G, "n0", "n5", ch) == dijkstra(G, "n0", "n5")
+
+
+def test_ch_validates_inputs(tmp_path):
+    _, G = build_graph(tmp_path, n=30)
+    with pytest.raises(ValueError):
+        ch_search(G, "t0", "t1")
+
+    G.hierarchy = ContractionHierarchy.build(G)
+    assert ch_search(G, "t0", "t1") == dijkstra(G, "t0", "t1")
+    with pytest.raises(TypeError):
+        ch_search(G.to_networkx(), "t0", "t1", G.hierarchy)
+
+
+def test_hierarchy_stored_with_snapshot(tmp_path):
+    builder, G = build_graph(tmp_path, n=60)
+    snapshot = os.path.join(tmp_path, "graph_snapshot")
+    save_snapshot(G, snapshot)
+
+    ch = ContractionHierarchy.build(G, key="chave")
+    save_hierarchy(snapshot, ch)
+
+    carregada = load_hierarchy(snapshot, key="chave")
+    assert np.array_equal(carregada.rank, ch.rank)
+    for a, b in zip(carregada.up + carregada.down, ch.up + ch.down):
+        assert np.array_equal(a, b)
+    assert ch_search(G, "t3", "t40", carregada) == dijkstra(G, "t3", "t40")
+    assert load_hierarchy(snapshot, key="outra") is None
+
+    novas = create_songs(62).iloc[60:].assign(track_id=["n0", "n1"])
+    append_delta(snapshot, builder.add_tracks(novas))
+    assert load_hierarchy(snapshot, key="chave") is None
+
+
+def test_service_get_hierarchy_reuses_snapshot(tmp_path):
+    service = GraphService(str(tmp_path))
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    create_songs(80).to_csv(os.path.join(service.dirs["processed"], service.files["dataset_graph"]), index=False)
+
+    ch = service.get_hierarchy(k_neighbors=4)
+    G = service.get_graph(k_neighbors=4)
+    assert G.hierarchy is ch
+    assert service.get_hierarchy(k_neighbors=4) is ch
+
+    with patch.object(ContractionHierarchy, "build") as build:
+        outra = GraphService(str(tmp_path)).get_hierarchy(k_neighbors=4)
+        build.assert_not_called()
+    assert np.array_equal(outra.rank, ch.rank)
+
+
+def test_service_refuses_large_k_without_permission(tmp_path, capsys):
+    service = GraphService(str(tmp_path))
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    create_songs(40).to_csv(os.path.join(service.dirs["processed"], service.files["dataset_graph"]), index=False)
+
+    assert service.get_hierarchy(k_neighbors=4) is not None
+    assert "AVISO" not in capsys.readouterr().out
+
+    k = GraphService.CH_MAX_K + 1
+    with patch.object(ContractionHierarchy, "build") as build:
+        assert service.get_hierarchy(k_neighbors=k) is None
+        build.assert_not_called()
+    assert "AVISO" in capsys.readouterr().out
+
+    ch = service.get_hierarchy(k_neighbors=k, allow_large_k=True)
+    assert service.get_graph(k_neighbors=k).hierarchy is ch
+    # Já salva no snapshot: carregada sem pedir permissão de novo
+    assert GraphService(str(tmp_path)).get_hierarchy(k_neighbors=k) is not None
@@ -0,0 +1,101 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.preprocessing.csr_graph import CSRGraph, networkx_memory_usage, memory_report
+from src.algorithm.search import dijkstra
+from main import buscar_musicas, formatar_musica
+
+
+def create_nx_graph():
+    G = nx.DiGraph()
+    G.add_node("a", name="Love Song", artist="Adele")
+    G.add_node("b", name="Lovely Day", artist="Bill Withers")
+    G.add_node("c", name="Hello", artist="Adele")
+    G.add_node("d", name="Ilha", artist="Nobody")
+    G.add_weighted_edges_from([
+        ("a", "b", 0.5), ("a", "c", 2.0),
+        ("b", "c", 0.7), ("c", "a", 1.0),
+        ("d", "a", 0.1),
+    ])
+    return G
+
+
+def test_from_knn():
+    G = CSRGraph.from_knn(
+        ["x", "y", "z"],
+        np.array([[1], [2], [0]]),
+        np.array([[0.1], [0.2], [0.3]]),
+        node_attrs={"name": ["X", "Y", "Z"], "artist": ["1", "2", "3"]}
+    )
+    assert G.indices.dtype == np.int32
+    assert G.number_of_nodes() == 3
+    assert G.number_of_edges() == 3
+    assert list(G["y"].items()) == [("z", {"weight": 0.2})]
+    assert G.nodes["z"] == {"name": "Z", "artist": "3"}
+
+
+def test_networkx_api_subset():
+    G_nx = create_nx_graph()
+    G = CSRGraph.from_networkx(G_nx)
+
+    assert len(G) == len(G.nodes) == 4
+    assert "a" in G.nodes and "zz" not in G.nodes
+    assert list(G.nodes) == list(G_nx.nodes)
+    assert dict(G.nodes(data=True)) == dict(G_nx.nodes(data=True))
+    for u in G_nx.nodes:
+        assert list(G[u].items()) == list(G_nx[u].items())
+        assert list(G[u]) == list(G_nx[u])
+    assert G["a"]["c"] == {"weight": 2.0}
+    assert "b" in G["a"]
+    with pytest.raises(KeyError):
+        G["zz"]
+    with pytest.raises(KeyError):
+        G["a"]["d"]
+    assert sorted(G.edges()) == sorted(G_nx.edges())
+
+
+def test_to_networkx_roundtrip():
+    G_nx = create_nx_graph()
+    G_back = CSRGraph.from_networkx(G_nx).to_networkx()
+
+    assert dict(G_back.nodes(data=True)) == dict(G_nx.nodes(data=True))
+    assert sorted(G_back.edges(data=True)) == sorted(G_nx.edges(data=True))
+
+
+def test_search_and_ui_functions_work_on_csr():
+    G_nx = create_nx_graph()
+    G = CSRGraph.from_networkx(G_nx)
+
+    assert dijkstra(G, "d", "c") == dijkstra(G_nx, "d", "c")
+    assert dijkstra(G, "c", "d") == (None, float("inf"))
+    assert [r[0] for r in buscar_musicas(G, "love")] == [r[0] for r in buscar_musicas(G_nx, "love")]
+    assert formatar_musica(G, "c") == "Hello — Adele"
+    assert formatar_musica(G, "zz") == "[ID desconhecido: zz]"
+
+
+def test_memory_report():
+    G_nx = create_nx_graph()
+    G = CSRGraph.from_networkx(G_nx)
+
+    report = memory_report(G_nx, G)
+    assert report["edges"] == 5
+    assert report["networkx_bytes"] == networkx_memory_usage(G_nx)
+    assert report["csr_bytes"] == G.memory_usage()
+    assert report["ratio"] > 1
+
+
+def test_invalid_indptr():
+    with pytest.raises(ValueError):
+        CSRGraph([0, 1], [0], [1.0], ["a", "b"])
+
+
+def test_reverse_index_matches_networkx_predecessors():
+    G_nx = create_nx_graph()
+    G = CSRGraph.from_networkx(G_nx)
+
+    for node in G_nx.nodes:
+        origens, pesos = G.predecessors_of(G.index_of(node))
+        esperado = {u: d["weight"] for u, d in G_nx.pred[node].items()}
+        assert dict(zip(G.node_ids[origens].tolist(), pesos.tolist())) == esperado
+    assert G.reverse_index() is G.reverse_index()
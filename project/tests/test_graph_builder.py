@@ -1,9 +1,14 @@
 # project/tests/test_graph.py
 import os
+import numpy as np
 import pandas as pd
 import pytest
 import networkx as nx
+from scipy.spatial.distance import cdist
+from sklearn.preprocessing import MinMaxScaler
 from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.columnar import write_columnar
+from src.preprocessing.csr_graph import CSRGraph
 
 def create_sample_csv(tmp_path, subset=None):
     """Cria um CSV de teste temporário com dados de músicas"""
@@ -237,3 +242,124 @@ def test_build_graph_k_neighbors_greater_than_nodes(tmp_path):
             assert "weight" in data
             assert data["weight"] >= 0
 
+
+
+def test_build_graph_blocked_matches_dense(tmp_path):
+    """Modo em blocos deve gerar exatamente as mesmas arestas do modo denso"""
+    rng = np.random.default_rng(7)
+    n = 60
+    df = pd.DataFrame({
+        "track_id": [f"id{i}" for i in range(n)],
+        "track_name": [f"Song{i}" for i in range(n)],
+        "artists": [f"Artist{i % 5}" for i in range(n)],
+        "danceability": rng.random(n).round(1),
+        "energy": rng.random(n).round(1),
+        "valence": rng.random(n).round(1),
+        "tempo": rng.integers(80, 90, n),
+        "acousticness": rng.random(n).round(1),
+        "instrumentalness": np.zeros(n),
+    })
+    # Duplica features para forçar empates (distância zero)
+    df.iloc[10, 3:] = df.iloc[3, 3:]
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    df.to_csv(csv_file, index=False)
+
+    # Referência: construção original (matriz densa + nsmallest por linha)
+    data = df.set_index("track_id")[["danceability", "energy", "valence", "tempo",
+                                      "acousticness", "instrumentalness"]]
+    norm = pd.DataFrame(MinMaxScaler().fit_transform(data), index=data.index)
+    df_dist = pd.DataFrame(cdist(norm, norm), index=norm.index, columns=norm.index)
+    arestas_ref = {
+        (u, v): w
+        for u in df_dist.index
+        for v, w in df_dist.loc[u].nsmallest(8).iloc[1:].items()
+    }
+
+    G_dense = GraphBuilder(csv_file).build_graph(k_neighbors=7)
+    G_blocked = GraphBuilder(csv_file).build_graph(k_neighbors=7, block_size=9)
+    G_budget = GraphBuilder(csv_file).build_graph(k_neighbors=7, memory_budget_mb=0.01)
+
+    for G in (G_dense, G_blocked, G_budget):
+        arestas = {(u, v): d["weight"] for u, v, d in G.edges(data=True)}
+        assert arestas == arestas_ref
+        assert dict(G.nodes(data=True)) == dict(G_dense.nodes(data=True))
+
+
+@pytest.mark.parametrize("backend", ["brute", "tree", "hnsw"])
+def test_build_graph_with_backend(tmp_path, backend):
+    """Todos os backends geram k arestas por nó e reportam recall"""
+    csv_file = create_sample_csv(tmp_path)
+    builder = GraphBuilder(csv_file)
+    G = builder.build_graph(k_neighbors=2, backend=backend, evaluate_recall=True)
+
+    assert G.number_of_nodes() == 4
+    assert G.number_of_edges() == 8
+    assert builder.recall == 1.0
+
+
+def test_build_graph_csr_representation(tmp_path):
+    """representation='csr' gera o mesmo grafo em formato compacto"""
+    csv_file = create_sample_csv(tmp_path)
+    G_nx = GraphBuilder(csv_file).build_graph(k_neighbors=2)
+    builder = GraphBuilder(csv_file)
+    G_csr = builder.build_graph(k_neighbors=2, representation="csr")
+
+    assert isinstance(G_csr, CSRGraph)
+    assert G_csr.features.shape == (4, 6)
+    assert dict(G_csr.nodes(data=True)) == dict(G_nx.nodes(data=True))
+    for u in G_nx.nodes:
+        assert list(G_csr[u].items()) == list(G_nx[u].items())
+
+    graph_path = os.path.join(tmp_path, "graph.graphml")
+    builder.save_graph(graph_path)
+    assert GraphBuilder.load_graph(graph_path).number_of_edges() == 8
+
+
+def test_build_graph_invalid_representation(tmp_path):
+    csv_file = create_sample_csv(tmp_path)
+    with pytest.raises(ValueError):
+        GraphBuilder(csv_file).build_graph(representation="igraph")
+
+
+def test_save_and_load_snapshot(tmp_path):
+    """Caminho sem .graphml salva snapshot binário e load_graph devolve CSRGraph"""
+    csv_file = create_sample_csv(tmp_path)
+    builder = GraphBuilder(csv_file)
+    G = builder.build_graph(k_neighbors=2)
+
+    snapshot_path = os.path.join(tmp_path, "graph_snapshot")
+    builder.save_graph(snapshot_path)
+    assert os.path.isdir(snapshot_path)
+
+    G_loaded = GraphBuilder.load_graph(snapshot_path)
+    assert isinstance(G_loaded, CSRGraph)
+    assert G_loaded.features.shape == (4, 6)
+    assert dict(G_loaded.nodes(data=True)) == dict(G.nodes(data=True))
+    for u in G.nodes:
+        assert list(G_loaded[u].items()) == list(G[u].items())
+
+
+def test_save_graph_invalid_format(tmp_path):
+    csv_file = create_sample_csv(tmp_path)
+    builder = GraphBuilder(csv_file)
+    builder.build_graph(k_neighbors=2)
+    with pytest.raises(ValueError):
+        builder.save_graph(os.path.join(tmp_path, "g.bin"), fmt="pickle")
+
+
+def test_build_graph_from_columnar(tmp_path):
+    """O dataset colunar gera o mesmo grafo que o CSV, lendo só as colunas usadas"""
+    csv_file = create_sample_csv(tmp_path)
+    df = pd.read_csv(csv_file, dtype={"track_id": str})
+    df["track_genre"] = pd.Categorical(["pop", "rock", "pop", "jazz"])
+    cols_path = write_columnar(df, os.path.join(tmp_path, "songs.cols"))
+
+    G_csv = GraphBuilder(csv_file).build_graph(k_neighbors=2)
+    builder = GraphBuilder(cols_path)
+    G_cols = builder.build_graph(k_neighbors=2)
+
+    assert "track_genre" not in builder.df.columns
+    # No CSV os ids são lidos como inteiros; no colunar ficam como texto
+    assert dict(G_cols.nodes(data=True)) == {str(u): d for u, d in G_csv.nodes(data=True)}
+    for u in G_csv.nodes:
+        assert list(G_cols[str(u)]) == [str(v) for v in G_csv[u]]
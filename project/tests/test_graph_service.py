@@ -1,9 +1,12 @@
 # project/tests/test_graph_service.py
 import os
+import shutil
 import pytest
 import networkx as nx
 from unittest.mock import patch, MagicMock
 from src.services.graph_service import GraphService
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.graph_builder import GraphBuilder
 
 
 def test_service_initialization(tmp_path):
@@ -29,8 +32,7 @@ def test_run_full_etl_success(mock_dp, tmp_path):
     result = service.run_full_etl(samples_per_genre=100)
 
     assert result is True
-    instance.process_full_dataset.assert_called_once()
-    instance.process_graph_dataset.assert_called_once()
+    instance.process_all_datasets.assert_called_once()
 
 
 def test_run_full_etl_missing_file(tmp_path):
@@ -189,9 +191,183 @@ def test_run_full_etl_raises_exception(mock_dp, tmp_path):
         f.write("track_id,track_name\n1,A")
 
     instance = mock_dp.return_value
-    instance.process_full_dataset.side_effect = Exception("erro crítico")
+    instance.process_all_datasets.side_effect = Exception("erro crítico")
 
     result = service.run_full_etl(samples_per_genre=10)
 
     assert result is False
-    instance.process_full_dataset.assert_called_once()
+    instance.process_all_datasets.assert_called_once()
+
+
+@patch("src.services.graph_service.GraphBuilder")
+def test_get_graph_csr_from_disk(mock_builder, tmp_path):
+    service = GraphService(str(tmp_path))
+
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    with open(service.files["graph_obj"], "w") as f:
+        f.write("<graphml>fake</graphml>")
+
+    G = nx.DiGraph()
+    G.add_node("a", name="A", artist="X")
+    G.add_node("b", name="B", artist="Y")
+    G.add_edge("a", "b", weight=0.5)
+    mock_builder.load_graph.return_value = G
+
+    g = service.get_graph(representation="csr")
+    assert isinstance(g, CSRGraph)
+    assert list(g["a"].items()) == [("b", {"weight": 0.5})]
+
+    # cache é convertido de volta se pedirem networkx
+    assert isinstance(service.get_graph(representation="networkx"), nx.DiGraph)
+
+
+def _write_songs_csv(service):
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    csv_graph = os.path.join(service.dirs["processed"], service.files["dataset_graph"])
+    with open(csv_graph, "w") as f:
+        f.write(
+            "track_id,track_name,artists,danceability,energy,valence,tempo,acousticness,instrumentalness\n"
+            "1,A,B,0.5,0.6,0.7,120,0.1,0.0\n"
+            "2,C,D,0.6,0.5,0.6,130,0.2,0.0\n"
+            "3,E,F,0.1,0.9,0.2,100,0.7,0.5\n"
+        )
+
+
+def test_get_graph_prefers_snapshot(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_songs_csv(service)
+
+    G = service.get_graph(k_neighbors=1)
+    assert isinstance(G, CSRGraph)
+    assert os.path.isdir(service.files["graph_snapshot"])
+
+    novo = GraphService(str(tmp_path))
+    with patch.object(GraphBuilder, "load_graph", wraps=GraphBuilder.load_graph) as load:
+        G2 = novo.get_graph(k_neighbors=1)
+        load.assert_called_once_with(service.files["graph_snapshot"])
+    assert list(G2.nodes) == list(G.nodes)
+
+
+def test_graphml_import_creates_snapshot_and_export(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_songs_csv(service)
+    G = service.get_graph(k_neighbors=1)
+
+    graphml = service.export_graphml()
+    assert os.path.exists(graphml)
+
+    # Sem snapshot, o GraphML é importado e convertido em snapshot
+    shutil.rmtree(service.files["graph_snapshot"])
+    novo = GraphService(str(tmp_path))
+    G2 = novo.get_graph(k_neighbors=1)
+    assert isinstance(G2, nx.DiGraph)
+    assert G2.number_of_edges() == G.number_of_edges()
+    assert os.path.isdir(service.files["graph_snapshot"])
+
+
+def _write_raw_csv(service, tempo_extra=120):
+    os.makedirs(service.dirs["raw"], exist_ok=True)
+    with open(service.files["input_raw"], "w") as f:
+        f.write(
+            "track_id,track_name,artists,track_genre,tempo,danceability,energy,valence,acousticness,instrumentalness\n"
+            "1,A,B,pop,120,0.5,0.6,0.7,0.1,0.0\n"
+            "2,C,D,rock,130,0.6,0.5,0.6,0.2,0.0\n"
+            "3,E,F,jazz,100,0.1,0.9,0.2,0.7,0.5\n"
+            f"4,G,H,pop,{tempo_extra},0.3,0.3,0.3,0.3,0.3\n"
+        )
+
+
+def test_etl_is_skipped_when_inputs_unchanged(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_raw_csv(service)
+    assert service.run_full_etl(samples_per_genre=10)
+
+    with patch("src.services.graph_service.DataProcessor") as mock_dp:
+        assert GraphService(str(tmp_path)).run_full_etl(samples_per_genre=10)
+        mock_dp.assert_not_called()
+
+        # Parâmetro diferente invalida os artefatos
+        GraphService(str(tmp_path)).run_full_etl(samples_per_genre=5)
+        mock_dp.assert_called_once()
+
+
+def test_etl_reruns_when_raw_dataset_changes(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_raw_csv(service)
+    service.run_full_etl(samples_per_genre=10)
+
+    _write_raw_csv(service, tempo_extra=150)
+    with patch("src.services.graph_service.DataProcessor") as mock_dp:
+        GraphService(str(tmp_path)).run_full_etl(samples_per_genre=10)
+        mock_dp.assert_called_once()
+
+
+def test_etl_reruns_when_csv_engine_changes(tmp_path):
+    """O leitor do CSV (pyarrow ou c) depende do que está instalado e entra na impressão digital."""
+    service = GraphService(str(tmp_path))
+    _write_raw_csv(service)
+    with patch("src.preprocessing.processor.resolve_engine", return_value="c"):
+        service.run_full_etl(samples_per_genre=10)
+
+    with patch("src.preprocessing.processor.resolve_engine", return_value="pyarrow"), \
+            patch("src.services.graph_service.DataProcessor") as mock_dp:
+        GraphService(str(tmp_path)).run_full_etl(samples_per_genre=10)
+        mock_dp.assert_called_once()
+
+
+def test_warm_start_reuses_graph_and_detects_stale(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_raw_csv(service)
+    service.run_full_etl(samples_per_genre=10)
+    G = service.get_graph(k_neighbors=2)
+
+    # Mesmas entradas: nada é reconstruído
+    with patch.object(GraphBuilder, "build_graph") as build:
+        G2 = GraphService(str(tmp_path)).get_graph(k_neighbors=2)
+        build.assert_not_called()
+    assert list(G2.nodes) == list(G.nodes)
+
+    # k diferente ou songs.csv alterado: o snapshot antigo é ignorado
+    with patch.object(GraphBuilder, "build_graph") as build:
+        GraphService(str(tmp_path)).get_graph(k_neighbors=1)
+        build.assert_called_once()
+
+    _write_raw_csv(service, tempo_extra=150)
+    novo = GraphService(str(tmp_path))
+    novo.run_full_etl(samples_per_genre=10)
+    with patch.object(GraphBuilder, "build_graph") as build:
+        novo.get_graph(k_neighbors=2)
+        build.assert_called_once()
+
+
+def test_build_cache_memoizes_digest(tmp_path):
+    from src.services.build_cache import BuildCache, file_digest
+
+    arquivo = os.path.join(tmp_path, "a.csv")
+    with open(arquivo, "w") as f:
+        f.write("x\n1\n")
+
+    cache = BuildCache(str(tmp_path))
+    assert cache.digest(arquivo) == file_digest(arquivo)
+    cache.record(arquivo, "chave")
+    assert BuildCache(str(tmp_path)).is_valid(arquivo, "chave")
+    assert not BuildCache(str(tmp_path)).is_valid(arquivo, "outra")
+
+    # Com tamanho e mtime iguais o hash memorizado é reaproveitado
+    with patch("src.services.build_cache.file_digest") as digest:
+        assert BuildCache(str(tmp_path)).digest(arquivo) == file_digest(arquivo)
+        digest.assert_not_called()
+
+
+def test_graph_version_changes_on_rebuild(tmp_path):
+    service = GraphService(str(tmp_path))
+    _write_songs_csv(service)
+
+    G = service.get_graph(k_neighbors=1)
+    versao = G.graph["version"]
+    assert service.get_graph(k_neighbors=1).graph["version"] == versao
+    assert service.get_graph(k_neighbors=1, representation="networkx").graph["version"] == versao
+
+    assert service.get_graph(k_neighbors=2).graph["version"] != versao
+    G = service.get_graph(k_neighbors=2, force_rebuild=True)
+    assert G.graph["version"] is not None
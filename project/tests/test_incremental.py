@@ -0,0 +1,182 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import networkx as nx
+
+from src.algorithm.search import dijkstra
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.incremental import IncrementalKNN, ReverseNeighborIndex
+from src.preprocessing.neighbors import blocked_knn
+from src.preprocessing.snapshot import append_delta, compact_snapshot, load_snapshot, save_snapshot
+from src.services.graph_service import GraphService
+
+
+FEATURES = GraphBuilder.FEATURE_COLS
+
+
+def create_songs(n, seed=0, prefix="t"):
+    """Músicas aleatórias com valores repetidos (para forçar empates de distância)"""
+    rng = np.random.default_rng(seed)
+    data = {"track_id": [f"{prefix}{i}" for i in range(n)],
+            "track_name": [f"Song {prefix}{i}" for i in range(n)],
+            "artists": [f"Artist {i % 7}" for i in range(n)]}
+    for col in FEATURES:
+        data[col] = rng.choice(np.linspace(0, 1, 6), size=n)
+    data["tempo"] = data["tempo"] * 100 + 60
+    return pd.DataFrame(data)
+
+
+def build(tmp_path, df, k, representation="csr", name="songs.csv"):
+    csv = os.path.join(tmp_path, name)
+    df.to_csv(csv, index=False)
+    builder = GraphBuilder(csv)
+    builder.build_graph(k_neighbors=k, representation=representation)
+    return builder
+
+
+def assert_same_graph(G, H):
+    a = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    b = H if isinstance(H, CSRGraph) else CSRGraph.from_networkx(H)
+    assert list(a.nodes) == list(b.nodes)
+    assert np.array_equal(a.indptr, b.indptr)
+    assert np.array_equal(a.indices, b.indices)
+    assert np.array_equal(a.weights, b.weights)
+    assert dict(a.nodes(data=True)) == dict(b.nodes(data=True))
+
+
+def test_incremental_knn_matches_full_knn():
+    rng = np.random.default_rng(1)
+    data = rng.choice(np.linspace(0, 1, 5), size=(400, 3))
+    base = 250
+
+    indices, distances = blocked_knn(data[:base], 10)
+    inc = IncrementalKNN(data[:base], indices, distances, 10, rebuild_ratio=0.1)
+    inc.add(data[base:320])
+    inc.add(data[320:])
+
+    esperado_idx, esperado_dist = blocked_knn(data, 10)
+    assert np.array_equal(inc.indices, esperado_idx)
+    assert np.array_equal(inc.distances, esperado_dist)
+
+
+def test_incremental_knn_small_base_grows():
+    data = np.random.default_rng(2).random((8, 2))
+    indices, distances = blocked_knn(data[:2], 5)
+    inc = IncrementalKNN(data[:2], indices, distances, 5)
+
+    linhas = inc.add(data[2:])
+    assert linhas.tolist() == list(range(8))
+    esperado_idx, esperado_dist = blocked_knn(data, 5)
+    assert np.array_equal(inc.indices, esperado_idx)
+    assert np.array_equal(inc.distances, esperado_dist)
+
+
+def test_reverse_index_returns_superset():
+    rng = np.random.default_rng(3)
+    data = rng.random((200, 3))
+    _, distances = blocked_knn(data, 5)
+    radii = distances[:, -1]
+    index = ReverseNeighborIndex(data, radii, n_bands=4)
+
+    point = rng.random(3)
+    esperado = np.flatnonzero(np.linalg.norm(data - point, axis=1) < radii)
+    assert set(esperado) <= set(index.candidates(point))
+
+
+@pytest.mark.parametrize("representation", ["csr", "networkx"])
+def test_add_tracks_matches_rebuild(tmp_path, representation):
+    songs = create_songs(260)
+    base, novas = songs.iloc[:200], songs.iloc[200:]
+
+    builder = build(tmp_path, base, k=8, representation=representation)
+    for inicio in range(0, len(novas), 20):
+        delta = builder.add_tracks(novas.iloc[inicio:inicio + 20])
+        assert delta is not None
+
+    esperado = build(tmp_path, songs, k=8, representation=representation, name="full.csv")
+    assert type(builder.G) is type(esperado.G)
+    assert_same_graph(builder.G, esperado.G)
+    if representation == "networkx":
+        assert isinstance(builder.G, nx.DiGraph)
+        assert builder.G["t205"] == esperado.G["t205"]
+
+
+def test_add_tracks_keeps_previous_graph_intact(tmp_path):
+    """Quem ainda tem o grafo anterior continua buscando nele normalmente."""
+    builder = build(tmp_path, create_songs(60), k=5)
+    antigo = builder.G
+    esperado = dijkstra(antigo, "t0", "t1")  # cria o índice id -> posição do grafo antigo
+
+    assert builder.add_tracks(create_songs(5, seed=1, prefix="n")) is not None
+    assert builder.G is not antigo and "n0" in builder.G
+
+    assert "n0" not in antigo
+    assert len(antigo) == 60
+    assert dijkstra(antigo, "t0", "t1") == esperado
+
+
+def test_add_tracks_out_of_range_requires_rebuild(tmp_path):
+    songs = create_songs(50)
+    builder = build(tmp_path, songs, k=5)
+
+    nova = create_songs(1, prefix="n")
+    nova["tempo"] = 500.0
+    assert builder.add_tracks(nova) is None
+    assert len(builder.G) == 50
+
+
+def test_add_tracks_rejects_existing_ids(tmp_path):
+    songs = create_songs(30)
+    builder = build(tmp_path, songs, k=5)
+
+    with pytest.raises(ValueError):
+        builder.add_tracks(songs.iloc[:2])
+
+
+def test_snapshot_delta_roundtrip(tmp_path):
+    songs = create_songs(120)
+    builder = build(tmp_path, songs.iloc[:100], k=6)
+    path = os.path.join(tmp_path, "snap")
+    save_snapshot(builder.csr_graph, path)
+
+    # O builder carregado do snapshot também consegue inserir
+    carregado = GraphBuilder(os.path.join(tmp_path, "songs.csv"))
+    carregado.G = load_snapshot(path)
+    append_delta(path, carregado.add_tracks(songs.iloc[100:110]))
+    append_delta(path, carregado.add_tracks(songs.iloc[110:]))
+    assert len(os.listdir(os.path.join(path, "deltas"))) == 2
+
+    esperado = build(tmp_path, songs, k=6, name="full.csv")
+    assert_same_graph(load_snapshot(path), esperado.G)
+
+    compact_snapshot(path)
+    assert not os.path.exists(os.path.join(path, "deltas"))
+    assert_same_graph(load_snapshot(path), esperado.G)
+
+
+def test_service_add_tracks(tmp_path):
+    service = GraphService(str(tmp_path))
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    csv = os.path.join(service.dirs["processed"], service.files["dataset_graph"])
+    songs = create_songs(80)
+    songs.iloc[:70].to_csv(csv, index=False)
+
+    versao = service.get_graph(k_neighbors=5).graph["version"]
+    G = service.add_tracks(songs.iloc[70:], k_neighbors=5)
+    assert len(G) == 80
+    assert G.graph["version"] != versao  # caches de caminhos da versão anterior não valem mais
+    assert len(pd.read_csv(csv)) == 80
+
+    # Um serviço novo lê snapshot + delta e obtém o mesmo grafo de um rebuild
+    esperado = build(tmp_path, songs, k=5, name="full.csv")
+    assert_same_graph(GraphService(str(tmp_path)).get_graph(k_neighbors=5), esperado.G)
+
+    # Fora do intervalo: cai no rebuild, e o CSV continua com todas as músicas
+    nova = create_songs(1, prefix="n")
+    nova["tempo"] = 999.0
+    G = service.add_tracks(nova, k_neighbors=5)
+    assert len(G) == 81
+    assert "n0" in G
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import instrumentation
+from src.instrumentation import JsonLinesSink, LoggingSink, capture, count, span, traced
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.processor import DataProcessor
+
+
+def create_raw_csv(tmp_path, n=40):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    df.insert(1, "track_name", [f"Song {i}" for i in range(n)])
+    df.insert(2, "artists", [f"Artist {i % 7}" for i in range(n)])
+    df.insert(3, "track_genre", ["pop", "rock"] * (n // 2))
+    df.loc[3, "energy"] = None                  # nulo
+    df.loc[5, "track_id"] = "t4"                # id repetido
+    df.loc[8, ["track_name", "artists"]] = [df.loc[7, "track_name"], df.loc[7, "artists"]]  # nome+artista repetido
+    csv_file = os.path.join(tmp_path, "raw.csv")
+    df.to_csv(csv_file, index=False)
+    return csv_file
+
+
+def test_disabled_is_a_shared_noop():
+    assert not instrumentation.enabled()
+    assert span("a") is span("b", k=1)
+    with span("a") as s:
+        s.set(x=1)
+    count("rows", 10)  # sem sink: nada acontece
+
+
+def test_nested_spans_and_counters():
+    with capture() as sink:
+        with span("build", k=5) as externo:
+            with span("knn"):
+                count("edges", 3)
+            count("edges", 4)
+            externo.set(nodes=2)
+
+    knn, build = sink.spans()
+    assert (knn["path"], knn["parent"]) == ("build/knn", "build")
+    assert (build["path"], build["parent"]) == ("build", None)
+    assert build["attrs"] == {"k": 5, "nodes": 2}
+    assert build["duration_s"] >= knn["duration_s"] >= 0
+    assert [e["span"] for e in sink.events if e["type"] == "counter"] == ["build/knn", "build"]
+    assert sink.counters() == {"edges": 7}
+    assert not instrumentation.enabled()
+
+
+def test_span_records_error():
+    with capture() as sink:
+        with pytest.raises(ValueError):
+            with span("falha"):
+                raise ValueError("x")
+        with span("depois"):
+            pass
+
+    assert sink.spans("falha")[0]["attrs"] == {"error": "ValueError"}
+    assert sink.spans("depois")[0]["path"] == "depois"  # a pilha foi desfeita
+
+
+def test_traced_iterator():
+    with capture() as sink:
+        assert list(traced("read", iter([1, 2, 3]), source="x")) == [1, 2, 3]
+    assert len(sink.spans("read")) == 4  # um por next(), inclusive o que encerra
+    assert list(traced("read", [])) == []
+
+
+def test_json_lines_and_logging_sinks(tmp_path, caplog):
+    path = os.path.join(tmp_path, "trace.jsonl")
+    json_sink = instrumentation.add_sink(JsonLinesSink(path))
+    log_sink = instrumentation.add_sink(LoggingSink())
+    try:
+        with caplog.at_level(logging.INFO, logger="src.instrumentation"):
+            with span("save", fmt="snapshot"):
+                count("bytes", 10)
+    finally:
+        instrumentation.remove_sink(json_sink)
+        instrumentation.remove_sink(log_sink)
+
+    with open(path, encoding="utf-8") as f:
+        eventos = [json.loads(linha) for linha in f]
+    assert [e["type"] for e in eventos] == ["counter", "span"]
+    assert eventos[1]["attrs"] == {"fmt": "snapshot"}
+    assert "save bytes=10" in caplog.text
+    assert "fmt=snapshot" in caplog.text
+
+
+def test_etl_spans_and_row_counters(tmp_path):
+    raw = create_raw_csv(tmp_path)
+    with capture() as sink:
+        DataProcessor(raw, os.path.join(tmp_path, "out"), chunksize=16, engine="c").process_all_datasets(samples_per_genre=5)
+
+    caminhos = {e["path"] for e in sink.spans()}
+    for etapa in ("read_csv", "clean", "dedupe", "write_full", "sample", "write_graph"):
+        assert f"etl/{etapa}" in caminhos
+    assert len(sink.spans("clean")) == 3  # 40 linhas em blocos de 16 (leitor C fixado)
+    assert sum(e["attrs"]["rows"] for e in sink.spans("clean")) == 40
+
+    c = sink.counters()
+    assert c["rows_read"] == 40
+    assert c["rows_dropped_null"] == 1
+    assert c["rows_dropped_duplicate"] == 2
+    assert c["rows_valid"] == 37
+    assert c["rows_sampled"] == 10
+
+
+def test_graph_build_spans(tmp_path):
+    raw = create_raw_csv(tmp_path)
+    builder = GraphBuilder(raw)
+    with capture() as sink:
+        builder.build_graph(k_neighbors=3, representation="csr", save_path=os.path.join(tmp_path, "snap"))
+        GraphBuilder.load_graph(os.path.join(tmp_path, "snap"))
+
+    caminhos = {e["path"] for e in sink.spans()}
+    assert {"build_graph/read_csv", "build_graph/normalize", "build_graph/knn", "build_graph/edges",
+            "build_graph/save_graph", "load_graph"} <= caminhos
+    assert sink.spans("build_graph")[0]["attrs"] == {"k": 3, "representation": "csr"}
+    assert sink.counters() == {"nodes": 39, "edges": 39 * 3}
@@ -0,0 +1,113 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+from src.algorithm.landmarks import (
+    LandmarkIndex,
+    _sparse_matrix,
+    alt_search,
+    load_landmarks,
+    save_landmarks,
+)
+from src.algorithm.search import dijkstra
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.snapshot import append_delta, save_snapshot
+from src.services.graph_service import GraphService
+
+
+def create_songs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    df.insert(1, "track_name", [f"Song {i}" for i in range(n)])
+    df.insert(2, "artists", [f"Artist {i % 5}" for i in range(n)])
+    return df
+
+
+def build_graph(tmp_path, n=150, k=4):
+    csv = os.path.join(tmp_path, "songs.csv")
+    create_songs(n).to_csv(csv, index=False)
+    builder = GraphBuilder(csv)
+    return builder, builder.build_graph(k_neighbors=k, representation="csr")
+
+
+@pytest.mark.parametrize("strategy", ["farthest", "random"])
+def test_alt_matches_dijkstra(tmp_path, strategy):
+    _, G = build_graph(tmp_path)
+    index = LandmarkIndex.build(G, n_landmarks=6, strategy=strategy)
+    assert len(index) == 6 and len(set(index.landmarks.tolist())) == 6
+
+    rng = np.random.default_rng(1)
+    nodes = list(G.nodes)
+    for _ in range(40):
+        origem, destino = rng.choice(nodes, size=2, replace=False).tolist()
+        esperado, custo = dijkstra(G, origem, destino)
+        path, cost = alt_search(G, origem, destino, index)
+        assert cost == pytest.approx(custo)
+        assert (path is None) == (esperado is None)
+
+
+def test_heuristic_is_admissible(tmp_path):
+    _, G = build_graph(tmp_path)
+    index = LandmarkIndex.build(G, n_landmarks=4)
+    exatas = csgraph_dijkstra(_sparse_matrix(G).T.tocsr(), indices=[0, 10, 99])[:, :]
+
+    for linha, alvo in enumerate([0, 10, 99]):
+        limites = np.asarray(index.heuristic(alvo)(list(range(len(G)))))
+        # exatas[linha] = distância de cada nó até o alvo (grafo reverso)
+        assert np.all(limites <= exatas[linha] + 1e-12)
+
+
+def test_alt_uses_graph_landmarks_and_validates(tmp_path):
+    _, G = build_graph(tmp_path, n=40)
+    with pytest.raises(ValueError):
+        alt_search(G, "t0", "t1")
+
+    G.landmarks = LandmarkIndex.build(G, n_landmarks=2)
+    assert alt_search(G, "t0", "t1")[1] == pytest.approx(dijkstra(G, "t0", "t1")[1])
+    with pytest.raises(TypeError):
+        alt_search(G.to_networkx(), "t0", "t1", G.landmarks)
+
+
+def test_landmarks_stored_with_snapshot(tmp_path):
+    builder, G = build_graph(tmp_path, n=60)
+    snapshot = os.path.join(tmp_path, "graph_snapshot")
+    save_snapshot(G, snapshot)
+
+    index = LandmarkIndex.build(G, n_landmarks=3, key="chave")
+    save_landmarks(snapshot, index)
+
+    carregado = load_landmarks(snapshot, key="chave")
+    assert np.array_equal(carregado.landmarks, index.landmarks)
+    assert np.array_equal(carregado.forward, index.forward)
+    assert load_landmarks(snapshot, key="outra") is None
+
+    # Um delta (add_tracks) muda o grafo: os landmarks deixam de valer
+    novas = create_songs(62).iloc[60:].assign(track_id=["n0", "n1"])
+    novas[GraphBuilder.FEATURE_COLS] = 0.5
+    append_delta(snapshot, builder.add_tracks(novas))
+    assert load_landmarks(snapshot, key="chave") is None
+
+
+def test_service_get_landmarks_reuses_snapshot(tmp_path):
+    service = GraphService(str(tmp_path))
+    os.makedirs(service.dirs["processed"], exist_ok=True)
+    create_songs(80).to_csv(os.path.join(service.dirs["processed"], service.files["dataset_graph"]), index=False)
+
+    index = service.get_landmarks(n_landmarks=3, k_neighbors=4)
+    G = service.get_graph(k_neighbors=4)
+    assert G.landmarks is index
+    assert service.get_landmarks(n_landmarks=3, k_neighbors=4) is index
+
+    # Serviço novo: mesmo grafo, landmarks lidos do snapshot sem recalcular
+    with patch.object(LandmarkIndex, "build") as build:
+        outro = GraphService(str(tmp_path)).get_landmarks(n_landmarks=3, k_neighbors=4)
+        build.assert_not_called()
+    assert np.array_equal(outro.landmarks, index.landmarks)
+
+    # L diferente: recalcula
+    assert len(GraphService(str(tmp_path)).get_landmarks(n_landmarks=5, k_neighbors=4)) == 5
@@ -10,6 +10,8 @@ from main import (
     processar_busca_caminho,
     menu_principal,
     executar_interface,
+    preparar_algoritmo,
+    selecionar_algoritmo,
     main,
 )
 
@@ -57,6 +59,19 @@ def test_listar_e_selecionar_musica_select_first(mock_input):
     assert node == 10
 
 
+@patch("builtins.input")
+def test_listar_e_selecionar_musica_autocomplete(mock_input, capsys):
+    G = nx.DiGraph()
+    G.add_node(10, name="Hello", artist="Adele")
+    G.add_node(11, name="Help", artist="The Beatles")
+    G.add_node(12, name="Yesterday", artist="The Beatles")
+
+    mock_input.side_effect = ["be*", "0", "beatles *", "2"]
+
+    assert listar_e_selecionar_musica(G, "ORIGEM") == 12
+    assert "Encontradas 2 música(s)" in capsys.readouterr().out
+
+
 @patch("builtins.input")
 def test_listar_e_selecionar_musica_cancel(mock_input):
     mock_input.side_effect = ["sair"]
@@ -93,6 +108,25 @@ def test_processar_busca_caminho_no_path(mock_dijkstra, capsys):
     assert "Nenhum caminho encontrado" in out
 
 
+@patch("main.dijkstra")
+def test_processar_busca_caminho_verbose(mock_dijkstra, capsys):
+    G = nx.DiGraph()
+    G.add_node(1, name="A", artist="X")
+    G.add_node(2, name="B", artist="Y")
+
+    def busca(G, origem, destino, stats=None):
+        stats.record(pops=5, stale=1, relaxed=12, pushes=6)
+        return [1, 2], 1.0
+    mock_dijkstra.side_effect = busca
+
+    processar_busca_caminho(G, 1, 2, verbose=True)
+
+    out = capsys.readouterr().out
+    assert "Estatísticas da busca" in out
+    assert "Nós fechados         : 4" in out
+    assert "Arestas examinadas   : 12" in out
+
+
 def test_processar_busca_caminho_same_node(capsys):
     G = nx.DiGraph()
     G.add_node(1, name="A", artist="X")
@@ -145,3 +179,118 @@ def test_main_file_not_found(mock_service, capsys):
 
     out = capsys.readouterr().out
     assert "Arquivo não encontrado" in out
+
+
+@patch("main.bidirectional_dijkstra")
+def test_processar_busca_caminho_algoritmo(mock_bidi, capsys):
+    G = nx.DiGraph()
+    G.add_node(1, name="A", artist="X")
+    G.add_node(2, name="B", artist="Y")
+    mock_bidi.return_value = ([1, 2], 1.0)
+
+    processar_busca_caminho(G, 1, 2, algoritmo="bidirecional")
+
+    mock_bidi.assert_called_once_with(G, 1, 2)
+    assert "Dijkstra bidirecional" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        processar_busca_caminho(G, 1, 2, algoritmo="bfs")
+
+
+@patch("builtins.input")
+def test_selecionar_algoritmo(mock_input):
+    mock_input.side_effect = ["3", "9"]
+    assert selecionar_algoritmo("dijkstra") == "astar"
+    assert selecionar_algoritmo("astar") == "astar"
+
+
+@patch("main.alt_search")
+def test_processar_busca_caminho_alt(mock_alt, capsys):
+    G = nx.DiGraph()
+    G.add_node(1, name="A", artist="X")
+    G.add_node(2, name="B", artist="Y")
+    mock_alt.return_value = ([1, 2], 1.0)
+
+    processar_busca_caminho(G, 1, 2, algoritmo="alt")
+
+    mock_alt.assert_called_once_with(G, 1, 2)
+    assert "ALT" in capsys.readouterr().out
+
+
+@patch("main.executar_interface")
+@patch("main.GraphService")
+def test_main_landmarks_failure_is_not_fatal(mock_service, mock_exec, capsys):
+    instance = mock_service.return_value
+    G = nx.DiGraph()
+    G.add_node(1)
+    instance.get_graph.return_value = G
+    instance.get_landmarks.side_effect = TypeError("sem CSR")
+
+    main()
+    instance.get_landmarks.assert_not_called()
+
+    main(algoritmo="alt")
+    instance.get_landmarks.assert_called_once()
+    assert "ALT (A* com landmarks) indisponível" in capsys.readouterr().out
+    assert mock_exec.call_count == 2
+    assert mock_exec.call_args.args[1] == "dijkstra"
+
+
+@patch("main.executar_interface")
+@patch("main.GraphService")
+def test_main_ch_builds_hierarchy(mock_service, mock_exec):
+    instance = mock_service.return_value
+    G = nx.DiGraph()
+    G.add_node(1)
+    instance.get_graph.return_value = G
+
+    main(algoritmo="ch")
+    instance.get_hierarchy.assert_called_once()
+    assert mock_exec.call_args.args[1] == "ch"
+
+    instance.get_hierarchy.reset_mock()
+    main()
+    instance.get_hierarchy.assert_not_called()
+
+    # Falha na hierarquia: segue com Dijkstra
+    instance.get_hierarchy.side_effect = RuntimeError("sem memória")
+    main(algoritmo="ch")
+    assert mock_exec.call_args.args[1] == "dijkstra"
+
+
+@patch("builtins.input")
+def test_executar_interface_prepares_index_from_menu(mock_input, capsys):
+    """Escolher ALT ou a hierarquia de contração no menu prepara o índice na hora."""
+    service = MagicMock()
+    G = nx.DiGraph()
+    service.get_graph.return_value = G
+    mock_input.side_effect = ["2", "5", "2", "5", "0"]
+
+    executar_interface(G, service=service)
+    assert service.get_hierarchy.call_count == 2
+
+    service.get_landmarks.assert_not_called()
+    mock_input.side_effect = ["2", "4", "0"]
+    executar_interface(G, service=service)
+    service.get_landmarks.assert_called_once()
+
+    service.get_hierarchy.side_effect = RuntimeError("sem memória")
+    mock_input.side_effect = ["2", "5", "0"]
+    executar_interface(G, service=service)
+    out = capsys.readouterr().out
+    assert "Hierarquia de contração indisponível" in out
+    assert "Algoritmo mantido: Dijkstra" in out
+
+
+@patch("builtins.input")
+def test_preparar_ch_asks_confirmation_for_large_k(mock_input):
+    """Acima de CH_MAX_K a hierarquia só é construída se o usuário confirmar."""
+    service = MagicMock()
+    service.get_hierarchy.return_value = None  # o serviço recusou pelo k do grafo
+
+    mock_input.side_effect = ["n"]
+    assert not preparar_algoritmo(service, "ch")
+    service.get_hierarchy.assert_called_once_with()
+
+    mock_input.side_effect = ["s"]
+    assert preparar_algoritmo(service, "ch")
+    service.get_hierarchy.assert_called_with(allow_large_k=True)
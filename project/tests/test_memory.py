@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.instrumentation import capture
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.memory import (
+    ESTIMATE_MARGIN,
+    MB,
+    MemoryTracker,
+    current_rss,
+    estimate_build_memory,
+    peak_rss,
+    plan_build,
+)
+from src.preprocessing.neighbors import BYTES_PER_CELL, resolve_block_size
+
+
+def create_csv(tmp_path, n=300):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    df.to_csv(csv_file, index=False)
+    return csv_file
+
+
+def test_rss_readings():
+    assert current_rss() > 0
+    assert peak_rss() >= current_rss() * 0.9
+
+
+def test_peak_rss_without_resource_module(monkeypatch):
+    """Sem /proc e sem o módulo resource (Windows) o pico é None, não um erro de import."""
+    import builtins
+    import sys
+    real_open = builtins.open
+
+    def sem_proc(path, *args, **kwargs):
+        if str(path).startswith("/proc"):
+            raise OSError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", sem_proc)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert peak_rss() is None
+    assert current_rss() is None
+
+
+def test_tracker_peak_per_stage():
+    with MemoryTracker(python_allocations=True) as memoria:
+        with memoria.stage("grande"):
+            a = np.ones(20 * MB // 8)
+            a[::512] = 2.0  # garante as páginas residentes
+            del a
+        with memoria.stage("pequena"):
+            pass
+
+    grande, pequena = memoria.stages
+    assert grande["python_peak"] >= 20 * MB
+    assert pequena["python_peak"] < MB
+    if grande["peak_reset"]:
+        assert grande["rss_peak"] - grande["rss_start"] >= 15 * MB
+        assert pequena["rss_peak"] < grande["rss_peak"]
+    assert memoria.peak() == max(grande["rss_peak"], pequena["rss_peak"])
+    assert [linha.split()[0] for linha in memoria.report()] == ["grande", "pequena"]
+
+
+def test_tracker_stage_is_a_span():
+    with capture() as sink, MemoryTracker() as memoria:
+        with memoria.stage("knn", rows=10):
+            pass
+        with memoria.measure("sem_span"):
+            pass
+
+    (evento,) = sink.spans()
+    assert evento["name"] == "knn"
+    assert evento["attrs"]["rows"] == 10 and evento["attrs"]["rss_peak_mb"] > 0
+    assert [e["stage"] for e in memoria.stages] == ["knn", "sem_span"]
+
+
+def test_estimate_by_strategy():
+    csr = estimate_build_memory(10_000, 6, 10, "csr", block_size=100)
+    nx_ = estimate_build_memory(10_000, 6, 10, "networkx", block_size=100)
+    assert nx_["edges"] > 10 * csr["edges"]
+    assert nx_["knn"] == csr["knn"]
+
+    maior = estimate_build_memory(10_000, 6, 10, "csr", block_size=200)
+    assert maior["knn"] - csr["knn"] == 100 * 10_000 * BYTES_PER_CELL
+    assert estimate_build_memory(10_000, 6, 10, "csr", backend="tree")["knn"] < csr["knn"]
+
+
+def test_plan_picks_block_that_fits():
+    n = 20_000
+    plano = plan_build(n, 6, 10, memory_budget=100, baseline=20 * MB, representation="csr")
+    assert 1 <= plano["block_size"] < resolve_block_size(n)
+    assert plano["peak"] <= plano["budget"] == 100 * MB
+
+    # Um bloco a mais passaria do orçamento
+    maior = estimate_build_memory(n, 6, 10, "csr", block_size=plano["block_size"] + 1)
+    assert 20 * MB + max(maior.values()) * ESTIMATE_MARGIN > 100 * MB
+
+    # Orçamento folgado: bloco padrão
+    assert plan_build(n, 6, 10, memory_budget=4096, baseline=0, representation="csr")["block_size"] == resolve_block_size(n)
+
+
+def test_plan_falls_back_to_serial_and_fails_early():
+    n = 20_000
+    # 4 processos com blocos de uma linha não cabem; um processo cabe
+    sem_bloco = estimate_build_memory(n, 6, 10, "csr", block_size=1, n_jobs=1)["knn"]
+    orcamento = (sem_bloco * ESTIMATE_MARGIN + 2 * n * BYTES_PER_CELL * ESTIMATE_MARGIN) / MB
+    plano = plan_build(n, 6, 10, memory_budget=orcamento, baseline=0, representation="csr", n_jobs=4)
+    assert plano["n_jobs"] == 1 and plano["block_size"] >= 1
+
+    with pytest.raises(MemoryError, match="representation='csr'"):
+        plan_build(200_000, 6, 50, memory_budget=500, baseline=0, representation="networkx")
+    with pytest.raises(MemoryError):
+        plan_build(n, 6, 10, memory_budget=10, baseline=20 * MB, representation="csr")
+
+
+def test_build_with_memory_budget(tmp_path, capsys):
+    csv_file = create_csv(tmp_path)
+    esperado = GraphBuilder(csv_file).build_graph(k_neighbors=5, representation="csr")
+
+    builder = GraphBuilder(csv_file)
+    G = builder.build_graph(k_neighbors=5, representation="csr", build_memory_budget_mb=(current_rss() + 200 * MB) / MB)
+
+    assert np.array_equal(G.indices, esperado.indices)
+    assert np.array_equal(G.weights, esperado.weights)
+    assert builder.build_plan["block_size"] >= 1
+    assert [e["stage"] for e in builder.memory_report] == ["read_csv", "normalize", "knn", "edges"]
+    out = capsys.readouterr().out
+    assert "Orçamento de memória" in out
+    assert "Memória por etapa" in out
+
+
+def test_build_over_budget_fails_before_knn(tmp_path):
+    builder = GraphBuilder(create_csv(tmp_path))
+    with pytest.raises(MemoryError):
+        builder.build_graph(k_neighbors=5, build_memory_budget_mb=1)
+    assert [e["stage"] for e in builder.memory_report] == ["read_csv"]
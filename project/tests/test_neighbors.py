@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing.neighbors import (
+    topk_smallest,
+    resolve_block_size,
+    blocked_knn,
+    knn_recall,
+    estimate_recall,
+    BruteForceBackend,
+    TreeBackend,
+    HNSWBackend,
+    get_backend,
+)
+
+
+def test_topk_smallest_matches_nsmallest_with_ties():
+    """Desempate deve seguir a ordem de Series.nsmallest(keep='first')"""
+    rng = np.random.default_rng(0)
+    dist = rng.integers(0, 4, size=(30, 25)).astype(float)
+
+    cols, vals = topk_smallest(dist, 6)
+
+    for row in range(dist.shape[0]):
+        esperado = pd.Series(dist[row]).nsmallest(6)
+        assert list(cols[row]) == list(esperado.index)
+        assert list(vals[row]) == list(esperado.values)
+
+
+def test_topk_smallest_k_larger_than_columns():
+    dist = np.array([[3.0, 1.0, 2.0]])
+    cols, vals = topk_smallest(dist, 10)
+    assert list(cols[0]) == [1, 2, 0]
+    assert list(vals[0]) == [1.0, 2.0, 3.0]
+
+
+def test_resolve_block_size():
+    assert resolve_block_size(100) == 100
+    assert resolve_block_size(100_000) < 100_000
+    assert resolve_block_size(100, block_size=7) == 7
+    assert resolve_block_size(1000, memory_budget_mb=1) >= 1
+    with pytest.raises(ValueError):
+        resolve_block_size(100, block_size=0)
+    with pytest.raises(ValueError):
+        resolve_block_size(100, memory_budget_mb=-1)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 8, 50])
+def test_blocked_knn_independent_of_block_size(block_size):
+    rng = np.random.default_rng(1)
+    data = rng.random((40, 6))
+
+    idx_ref, dist_ref = blocked_knn(data, 5)
+    idx, dist = blocked_knn(data, 5, block_size=block_size)
+
+    assert np.array_equal(idx, idx_ref)
+    assert np.array_equal(dist, dist_ref)
+    assert idx.shape == (40, 5)
+    assert not np.any(idx == np.arange(40)[:, None])
+
+
+def test_blocked_knn_small_dataset():
+    idx, dist = blocked_knn(np.array([[0.0, 0.0], [1.0, 0.0]]), 5)
+    assert idx.tolist() == [[1], [0]]
+    assert dist.tolist() == [[1.0], [1.0]]
+
+
+def test_knn_recall():
+    exact = np.array([[1, 2], [0, 2]])
+    assert knn_recall(exact, exact) == 1.0
+    assert knn_recall(np.array([[1, 3], [3, 4]]), exact) == 0.25
+
+
+def test_estimate_recall_exact_backend():
+    rng = np.random.default_rng(2)
+    data = rng.random((80, 6))
+    idx, _ = blocked_knn(data, 5)
+    assert estimate_recall(data, idx, sample_size=20) == 1.0
+
+
+@pytest.mark.parametrize("kind", ["kd", "ball"])
+def test_tree_backend_matches_brute_force(kind):
+    rng = np.random.default_rng(3)
+    data = rng.random((120, 6))
+
+    idx_ref, dist_ref = BruteForceBackend().kneighbors(data, 8)
+    idx, dist = TreeBackend(kind=kind).kneighbors(data, 8)
+
+    assert np.array_equal(idx, idx_ref)
+    assert np.allclose(dist, dist_ref)
+
+
+def test_tree_backend_invalid_kind():
+    with pytest.raises(ValueError):
+        TreeBackend(kind="octree")
+
+
+def test_hnsw_backend_recall():
+    rng = np.random.default_rng(4)
+    data = rng.random((400, 6))
+
+    idx, dist = HNSWBackend(M=8, ef_construction=64, ef_search=64).kneighbors(data, 10)
+
+    assert idx.shape == (400, 10)
+    assert not np.any(idx == np.arange(400)[:, None])
+    assert np.all(np.diff(dist, axis=1) >= 0)
+    assert estimate_recall(data, idx, sample_size=400) > 0.9
+
+
+def test_hnsw_backend_tiny_dataset():
+    idx, dist = HNSWBackend().kneighbors(np.array([[0.0], [1.0], [3.0]]), 5)
+    assert idx.tolist() == [[1, 2], [0, 2], [1, 0]]
+    assert dist.tolist() == [[1.0, 3.0], [1.0, 2.0], [2.0, 3.0]]
+
+
+def test_get_backend():
+    assert isinstance(get_backend("brute"), BruteForceBackend)
+    assert isinstance(get_backend("tree", kind="ball"), TreeBackend)
+    backend = HNSWBackend()
+    assert get_backend(backend) is backend
+    with pytest.raises(ValueError):
+        get_backend("faiss")
@@ -0,0 +1,170 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.preprocessing.out_of_core as out_of_core
+from src.preprocessing.columnar import write_columnar
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.memory import MB, plan_build
+from src.preprocessing.out_of_core import OutOfCoreBuild
+from src.preprocessing.snapshot import META_FILE
+
+
+def create_df(n=120, int_ids=False):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", list(range(1000, 1000 + n)) if int_ids else [f"t{i}" for i in range(n)])
+    df.insert(1, "track_name", [f"Música {i}" if i % 7 else None for i in range(n)])
+    df.insert(2, "artists", [f"Artista {i % 5}" for i in range(n)])
+    df.loc[[3, 50], "energy"] = np.nan  # descartadas pelo dropna
+    return df
+
+
+def snapshot_files(path):
+    arquivos = {}
+    for nome in sorted(os.listdir(path)):
+        caminho = os.path.join(path, nome)
+        if nome == META_FILE:
+            with open(caminho, encoding="utf-8") as f:
+                arquivos[nome] = json.load(f)
+        else:
+            array = np.load(caminho)
+            arquivos[nome] = (array.dtype, array.tolist())
+    return arquivos
+
+
+def build_in_memory(source, save_path, k=5):
+    GraphBuilder(source).build_graph(k_neighbors=k, representation="csr", save_path=save_path)
+    return snapshot_files(save_path)
+
+
+@pytest.mark.parametrize("int_ids", [False, True])
+def test_out_of_core_matches_in_memory(tmp_path, monkeypatch, int_ids):
+    monkeypatch.setattr(out_of_core, "READ_CHUNKSIZE", 32)
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    create_df(int_ids=int_ids).to_csv(csv_file, index=False)
+    esperado = build_in_memory(csv_file, os.path.join(tmp_path, "mem"))
+
+    save_path = os.path.join(tmp_path, "ooc")
+    builder = GraphBuilder(csv_file)
+    G = builder.build_graph(k_neighbors=5, representation="csr", save_path=save_path,
+                            out_of_core=True, block_size=7)
+
+    assert snapshot_files(save_path) == esperado
+    assert len(G) == 118 and G.graph["k_neighbors"] == 5
+    assert builder.df is None
+    assert not os.path.exists(save_path + ".build")
+    assert [e["stage"] for e in builder.memory_report] == ["normalize", "knn", "assemble"]
+
+
+def test_out_of_core_columnar_in_chunks(tmp_path):
+    source = write_columnar(create_df(), os.path.join(tmp_path, "songs.cols"))
+    esperado = build_in_memory(source, os.path.join(tmp_path, "mem"))
+
+    build = OutOfCoreBuild(source, os.path.join(tmp_path, "work"), 5, GraphBuilder.FEATURE_COLS,
+                           GraphBuilder.LOAD_COLS, block_size=16, chunksize=25)
+    build.prepare()
+    build.knn()
+    meta = esperado[META_FILE]["graph"]
+    build.assemble(os.path.join(tmp_path, "ooc"), meta)
+
+    assert snapshot_files(os.path.join(tmp_path, "ooc")) == esperado
+
+
+def test_out_of_core_resumes_after_crash(tmp_path, monkeypatch):
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    create_df().to_csv(csv_file, index=False)
+    esperado = build_in_memory(csv_file, os.path.join(tmp_path, "mem"))
+    save_path = os.path.join(tmp_path, "ooc")
+
+    monkeypatch.setattr(out_of_core, "READ_CHUNKSIZE", 50)
+    knn_block = out_of_core._knn_block
+    chamadas = []
+
+    def falha_no_quarto(queries, data, kk):
+        chamadas.append(len(queries))
+        if len(chamadas) == 4:
+            raise RuntimeError("queda simulada")
+        return knn_block(queries, data, kk)
+
+    monkeypatch.setattr(out_of_core, "_knn_block", falha_no_quarto)
+    with pytest.raises(RuntimeError):
+        GraphBuilder(csv_file).build_graph(k_neighbors=5, representation="csr", save_path=save_path,
+                                           out_of_core=True, block_size=10)
+    assert not os.path.exists(save_path)
+
+    work = OutOfCoreBuild(csv_file, save_path + ".build", 5, GraphBuilder.FEATURE_COLS, GraphBuilder.LOAD_COLS)
+    assert work.progress["rows_done"] == 30
+
+    # Bytes de um bloco pela metade: descartados na retomada
+    with open(os.path.join(work.work_dir, "indices.bin"), "ab") as f:
+        f.write(b"\x00" * 12)
+
+    chamadas.clear()
+    monkeypatch.setattr(out_of_core, "_knn_block", lambda q, d, kk: chamadas.append(len(q)) or knn_block(q, d, kk))
+    GraphBuilder(csv_file).build_graph(k_neighbors=5, representation="csr", save_path=save_path,
+                                       out_of_core=True, block_size=10)
+
+    assert len(chamadas) == 9  # só as linhas 30..117
+    assert snapshot_files(save_path) == esperado
+
+
+def test_out_of_core_restarts_when_parameters_change(tmp_path):
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    create_df().to_csv(csv_file, index=False)
+    work_dir = os.path.join(tmp_path, "work")
+
+    build = OutOfCoreBuild(csv_file, work_dir, 5, GraphBuilder.FEATURE_COLS, GraphBuilder.LOAD_COLS)
+    build.prepare()
+    assert OutOfCoreBuild(csv_file, work_dir, 5, GraphBuilder.FEATURE_COLS, GraphBuilder.LOAD_COLS).progress
+    assert not OutOfCoreBuild(csv_file, work_dir, 6, GraphBuilder.FEATURE_COLS, GraphBuilder.LOAD_COLS).progress
+
+    with pytest.raises(RuntimeError):
+        build.assemble(os.path.join(tmp_path, "ooc"))
+
+
+def test_out_of_core_requires_csr_snapshot(tmp_path):
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    create_df().to_csv(csv_file, index=False)
+    builder = GraphBuilder(csv_file)
+    with pytest.raises(ValueError):
+        builder.build_graph(out_of_core=True, save_path=os.path.join(tmp_path, "g"))
+    with pytest.raises(ValueError):
+        builder.build_graph(out_of_core=True, representation="csr")
+    with pytest.raises(ValueError):
+        builder.build_graph(out_of_core=True, representation="csr", save_path=os.path.join(tmp_path, "g.graphml"))
+
+
+def test_plan_falls_back_to_out_of_core():
+    n = 200_000
+    plano = plan_build(n, 6, 50, memory_budget=200, baseline=0, representation="csr", out_of_core=True)
+    assert plano["out_of_core"] and plano["n_jobs"] == 1
+    assert plano["block_size"] >= 1 and plano["peak"] <= plano["budget"]
+
+    with pytest.raises(MemoryError):
+        plan_build(n, 6, 50, memory_budget=200, baseline=0, representation="csr")
+    assert not plan_build(1000, 6, 10, memory_budget=4096, baseline=0, out_of_core=True)["out_of_core"]
+
+
+def test_build_budget_switches_to_out_of_core(tmp_path, monkeypatch, capsys):
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    create_df().to_csv(csv_file, index=False)
+    esperado = build_in_memory(csv_file, os.path.join(tmp_path, "mem"))
+
+    def plano_em_disco(n, n_features, k, memory_budget, **kw):
+        assert kw["out_of_core"]
+        return {"block_size": 16, "n_jobs": 1, "out_of_core": True, "estimate": {}, "peak": 0,
+                "budget": memory_budget * MB}
+
+    monkeypatch.setattr("src.preprocessing.graph_builder.plan_build", plano_em_disco)
+    save_path = os.path.join(tmp_path, "ooc")
+    builder = GraphBuilder(csv_file)
+    builder.build_graph(k_neighbors=5, representation="csr", save_path=save_path, build_memory_budget_mb=100)
+
+    assert builder.build_plan["out_of_core"]
+    assert [e["stage"] for e in builder.memory_report] == ["read_csv", "normalize", "knn", "assemble"]
+    assert snapshot_files(save_path) == esperado
+    assert "K-NN em disco" in capsys.readouterr().out
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.preprocessing import parallel
+from src.preprocessing.graph_builder import GraphBuilder
+from src.preprocessing.neighbors import BruteForceBackend, TreeBackend, blocked_knn
+from src.preprocessing.parallel import (
+    SharedMatrix,
+    effective_n_jobs,
+    resolve_n_jobs,
+    shard_bounds,
+)
+
+
+@pytest.fixture
+def small_jobs(monkeypatch):
+    """Permite o pool mesmo com poucas linhas (o padrão só paraleliza bases grandes)"""
+    monkeypatch.setattr(parallel, "MIN_ROWS_PER_JOB", 1)
+
+
+def test_resolve_n_jobs():
+    assert resolve_n_jobs(None) == 1
+    assert resolve_n_jobs(3) == 3
+    assert resolve_n_jobs(-1) == (os.cpu_count() or 1)
+    for invalido in (0, -2):
+        with pytest.raises(ValueError):
+            resolve_n_jobs(invalido)
+
+
+def test_effective_n_jobs_small_base_is_serial():
+    assert effective_n_jobs(10, n_jobs=8) == 1
+    assert effective_n_jobs(parallel.MIN_ROWS_PER_JOB * 4, n_jobs=2) == 2
+
+
+def test_shard_bounds_cover_all_rows():
+    faixas = shard_bounds(10, 3)
+    assert faixas[0][0] == 0 and faixas[-1][1] == 10
+    assert all(a[1] == b[0] for a, b in zip(faixas, faixas[1:]))
+    assert shard_bounds(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_shared_matrix_roundtrip():
+    data = np.arange(12, dtype=np.float64).reshape(4, 3)
+    with SharedMatrix(data) as shared:
+        parallel._init_worker(shared.spec)
+        try:
+            assert np.array_equal(parallel._SHARED["data"], data)
+        finally:
+            parallel._SHARED.pop("shm").close()
+            parallel._SHARED.clear()
+
+
+def test_parallel_brute_matches_serial(small_jobs):
+    rng = np.random.default_rng(0)
+    # Valores discretos forçam empates, que precisam ser resolvidos como no serial
+    data = rng.integers(0, 5, size=(60, 3)).astype(float)
+
+    esperado = blocked_knn(data, 7, block_size=9)
+    idx, dist = BruteForceBackend(block_size=9, n_jobs=2).kneighbors(data, 7)
+
+    assert np.array_equal(idx, esperado[0])
+    assert np.array_equal(dist, esperado[1])
+
+
+def test_parallel_tree_matches_serial(small_jobs):
+    data = np.random.default_rng(1).random((50, 4))
+
+    esperado = TreeBackend().kneighbors(data, 5)
+    idx, dist = TreeBackend(n_jobs=3).kneighbors(data, 5)
+
+    assert np.array_equal(idx, esperado[0])
+    assert np.array_equal(dist, esperado[1])
+
+
+def test_build_graph_n_jobs(tmp_path, small_jobs):
+    rng = np.random.default_rng(2)
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    cols = GraphBuilder.FEATURE_COLS
+    with open(csv_file, "w") as f:
+        f.write("track_id,track_name,artists," + ",".join(cols) + "\n")
+        for i, row in enumerate(rng.random((30, len(cols)))):
+            f.write(f"t{i},Song{i},Artist{i}," + ",".join(f"{v:.4f}" for v in row) + "\n")
+
+    G_serial = GraphBuilder(csv_file).build_graph(k_neighbors=4)
+    G_paralelo = GraphBuilder(csv_file).build_graph(k_neighbors=4, n_jobs=2)
+
+    for u in G_serial.nodes:
+        assert list(G_paralelo[u].items()) == list(G_serial[u].items())
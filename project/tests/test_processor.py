@@ -1,6 +1,9 @@
+import importlib.util
 import os
 import pandas as pd
 import pytest
+from src.preprocessing import processor
+from src.preprocessing.columnar import columnar_path, read_columnar
 from src.preprocessing.processor import DataProcessor
 
 def create_raw_csv(tmp_path, missing_cols=False, genres=True, duplicates=False):
@@ -33,12 +36,23 @@ def create_raw_csv(tmp_path, missing_cols=False, genres=True, duplicates=False):
     return csv_file
 
 
+# Os dois leitores do CSV bruto devem gerar a mesma saída
+ENGINES = [
+    "c",
+    pytest.param("pyarrow", marks=pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None,
+                                                      reason="pyarrow não instalado")),
+]
 
 
-def test_load_and_filter_basic(tmp_path):
+@pytest.fixture(params=ENGINES)
+def engine(request):
+    return request.param
+
+
+def test_load_and_filter_basic(tmp_path, engine):
     """testa carregamento basico e limpeza."""
     raw = create_raw_csv(tmp_path)
-    dp = DataProcessor(raw, tmp_path)
+    dp = DataProcessor(raw, tmp_path, engine=engine)
 
     df = dp._load_and_filter()
 
@@ -56,10 +70,10 @@ def test_load_and_filter_missing_file(tmp_path):
         dp._load_and_filter()
 
 
-def test_load_and_filter_missing_columns(tmp_path):
+def test_load_and_filter_missing_columns(tmp_path, engine):
     """CSV faltando colunas obrigatórias deve avisar e continuar."""
     raw = create_raw_csv(tmp_path, missing_cols=True)
-    dp = DataProcessor(raw, tmp_path)
+    dp = DataProcessor(raw, tmp_path, engine=engine)
 
     df = dp._load_and_filter()
 
@@ -67,10 +81,10 @@ def test_load_and_filter_missing_columns(tmp_path):
     assert "tempo" not in df.columns
 
 
-def test_load_and_filter_remove_duplicates(tmp_path):
+def test_load_and_filter_remove_duplicates(tmp_path, engine):
     """Testa remoção de duplicatas pelo track_id."""
     raw = create_raw_csv(tmp_path, duplicates=True)
-    dp = DataProcessor(raw, tmp_path)
+    dp = DataProcessor(raw, tmp_path, engine=engine)
 
     df = dp._load_and_filter()
 
@@ -173,3 +187,162 @@ def test_process_graph_dataset_triggers_sampling(tmp_path):
     df_out = pd.read_csv(graph_path)
 
     assert len(df_out) == 5
+
+
+def create_raw_with_duplicates(tmp_path, n=60):
+    """CSV bruto com duplicatas espalhadas (mesmo id / mesmo nome+artista) e nulos"""
+    rows = []
+    for i in range(n):
+        rows.append({
+            "track_id": str(i % 45),  # ids repetidos a partir da linha 45
+            "track_name": f"Song{i % 50}",  # pares nome+artista repetidos
+            "artists": f"A{i % 50}",
+            "track_genre": ["pop", "rock", "jazz", "funk"][i % 4],
+            "tempo": 100 + i,
+            "danceability": 0.5,
+            "energy": None if i == 7 else 0.5,
+            "valence": 0.1,
+            "acousticness": 0.2,
+            "instrumentalness": 0.0,
+        })
+    csv_file = os.path.join(tmp_path, "raw.csv")
+    pd.DataFrame(rows).to_csv(csv_file, index=False)
+    return csv_file
+
+
+def test_chunked_dedupe_matches_full_read(tmp_path, engine):
+    """Deduplicação entre blocos dá o mesmo resultado que ler o arquivo inteiro."""
+    raw = create_raw_with_duplicates(tmp_path)
+
+    esperado = pd.read_csv(raw, dtype={"track_id": str}).dropna()
+    esperado = esperado.drop_duplicates(subset="track_id").drop_duplicates(subset=["track_name", "artists"])
+
+    for chunksize in (1, 7, 1000):
+        df = DataProcessor(raw, tmp_path, chunksize=chunksize, engine=engine)._load_and_filter()
+        assert df["track_id"].tolist() == esperado["track_id"].tolist()
+
+
+def test_process_all_datasets_single_pass(tmp_path, monkeypatch, engine):
+    """Os dois arquivos saem de uma única leitura do CSV bruto."""
+    raw = create_raw_with_duplicates(tmp_path)
+    dp = DataProcessor(raw, os.path.join(tmp_path, "out"), chunksize=10, engine=engine)
+
+    leituras = []
+    original = dp._iter_clean_chunks
+    monkeypatch.setattr(dp, "_iter_clean_chunks", lambda: leituras.append(1) or original())
+
+    full_path, graph_path = dp.process_all_datasets(samples_per_genre=5)
+
+    assert leituras == [1]
+    full = pd.read_csv(full_path)
+    graph = pd.read_csv(graph_path)
+    assert len(full) == len(dp._load_and_filter())
+    assert set(graph["track_genre"]) == {"pop", "rock", "jazz"}
+    assert (graph["track_genre"].value_counts() <= 5).all()
+
+
+def test_typed_ingest_dtypes(tmp_path, engine):
+    """Só as colunas usadas, com tipos compactos."""
+    raw = create_raw_csv(tmp_path)
+    df = pd.read_csv(raw)
+    df["popularity"] = 10
+    df.to_csv(raw, index=False)
+
+    out = DataProcessor(raw, tmp_path, engine=engine)._load_and_filter()
+
+    assert "popularity" not in out.columns
+    assert out["danceability"].dtype == "float32"
+    assert out["tempo"].dtype == "float32"
+    assert isinstance(out["track_genre"].dtype, pd.CategoricalDtype)
+    assert out["track_id"].tolist() == ["1", "2", "3"]
+
+
+def test_artists_are_interned(tmp_path, engine):
+    raw = create_raw_csv(tmp_path)
+    df = pd.read_csv(raw)
+    df["artists"] = ["Mesmo" + " Artista"] * 3
+    df.to_csv(raw, index=False)
+
+    artistas = DataProcessor(raw, tmp_path, chunksize=1, engine=engine)._load_and_filter()["artists"].tolist()
+    assert artistas[0] is artistas[1] is artistas[2]
+
+
+def test_engine_fallback_and_validation(tmp_path, monkeypatch, capsys):
+    raw = create_raw_csv(tmp_path)
+
+    real_find_spec = importlib.util.find_spec
+
+    def sem_pyarrow(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            return None
+        return real_find_spec(name, *args, **kwargs)
+
+    monkeypatch.setattr(processor.importlib.util, "find_spec", sem_pyarrow)
+    dp = DataProcessor(raw, tmp_path, engine="pyarrow")
+    assert dp._resolve_engine() == "c"
+    df = dp._load_and_filter()
+    assert len(df) == 3
+    assert "pyarrow não instalado" in capsys.readouterr().out
+    assert DataProcessor(raw, tmp_path, engine="auto")._resolve_engine() == "c"
+
+    with pytest.raises(ValueError):
+        DataProcessor(raw, tmp_path, engine="java")
+
+
+def test_columnar_output_matches_csv(tmp_path, engine):
+    """output_format='both' grava CSV e colunar com o mesmo conteúdo, e o colunar mantém os tipos."""
+    raw = create_raw_with_duplicates(tmp_path)
+    dp = DataProcessor(raw, os.path.join(tmp_path, "out"), chunksize=10, engine=engine, output_format="both")
+    full_path, graph_path = dp.process_all_datasets(samples_per_genre=5)
+
+    for csv_path in (full_path, graph_path):
+        cols = read_columnar(columnar_path(csv_path))
+        csv = pd.read_csv(csv_path, dtype={"track_id": str})
+        assert cols["track_id"].tolist() == csv["track_id"].tolist()
+        assert cols["tempo"].dtype == "float32"
+        assert isinstance(cols["track_genre"].dtype, pd.CategoricalDtype)
+        assert cols["tempo"].tolist() == csv["tempo"].astype("float32").tolist()
+
+    # Só colunar: os paths devolvidos são os diretórios .cols
+    only = DataProcessor(raw, os.path.join(tmp_path, "cols"), engine=engine, output_format="columnar")
+    full_cols, graph_cols = only.process_all_datasets(samples_per_genre=5)
+    assert full_cols.endswith(".cols") and graph_cols.endswith(".cols")
+    assert not os.path.exists(os.path.join(tmp_path, "cols", "songs.csv"))
+
+    with pytest.raises(ValueError):
+        DataProcessor(raw, tmp_path, output_format="parquet")
+
+
+def test_engines_same_nulls_and_chunks(tmp_path, engine, monkeypatch):
+    """Tokens de nulo do pandas (ex: 'None') e blocos de chunksize linhas em qualquer leitor."""
+    rows = []
+    for i in range(25):
+        rows.append({
+            "track_id": str(i),
+            "track_name": "None" if i == 3 else ("<NA>" if i == 4 else f"Song{i}"),
+            "artists": f"A{i}",
+            "track_genre": "pop",
+            "tempo": "null" if i == 5 else 100 + i,
+            "danceability": 0.5,
+            "energy": 0.5,
+            "valence": 0.1,
+            "acousticness": 0.2,
+            "instrumentalness": 0.0,
+        })
+    raw = os.path.join(tmp_path, "raw.csv")
+    pd.DataFrame(rows).to_csv(raw, index=False)
+
+    dp = DataProcessor(raw, tmp_path, chunksize=7, engine=engine)
+    tamanhos = []
+    original = dp._read_raw_chunks
+
+    def lendo(cols):
+        for chunk in original(cols):
+            tamanhos.append((len(chunk), chunk.index[0]))
+            yield chunk
+
+    monkeypatch.setattr(dp, "_read_raw_chunks", lendo)
+    df = dp._load_and_filter()
+
+    assert tamanhos == [(7, 0), (7, 7), (7, 14), (4, 21)]
+    assert df["track_id"].tolist() == [str(i) for i in range(25) if i not in (3, 4, 5)]
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing.processor import DataProcessor
+from src.preprocessing.sampling import ReservoirSampler
+
+
+def reference_reservoir(values, size, rng):
+    """Algoritmo R sequencial, linha a linha"""
+    reservoir = []
+    for t, value in enumerate(values, start=1):
+        if len(reservoir) < size:
+            reservoir.append(value)
+        else:
+            j = rng.integers(0, t, dtype=np.int64)
+            if j < size:
+                reservoir[j] = value
+    return reservoir
+
+
+def stream(df, chunksize):
+    for inicio in range(0, len(df), chunksize):
+        yield df.iloc[inicio:inicio + chunksize]
+
+
+def create_stream(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "track_id": np.arange(n),
+        "track_genre": rng.choice(["pop", "rock", "jazz", "funk"], size=n),
+    })
+
+
+def test_matches_sequential_algorithm_r():
+    df = create_stream()
+    sampler = ReservoirSampler(20, groups=["pop", "rock"], seed=7)
+    for chunk in stream(df, 33):
+        sampler.update(chunk, "track_genre")
+
+    for i, genre in enumerate(["pop", "rock"]):
+        ids = df.loc[df["track_genre"] == genre, "track_id"].tolist()
+        esperado = reference_reservoir(ids, 20, np.random.default_rng([7, i]))
+        resultado = sampler.result()
+        assert sorted(resultado.loc[resultado["track_genre"] == genre, "track_id"]) == sorted(esperado)
+
+
+@pytest.mark.parametrize("chunksize", [1, 17, 1000])
+def test_independent_of_chunk_size(chunksize):
+    df = create_stream()
+    referencia = ReservoirSampler(15, groups=["pop", "jazz"]).update(df, "track_genre").result()
+
+    sampler = ReservoirSampler(15, groups=["pop", "jazz"])
+    for chunk in stream(df, chunksize):
+        sampler.update(chunk, "track_genre")
+
+    pd.testing.assert_frame_equal(sampler.result(), referencia)
+
+
+def test_sizes_order_and_ignored_groups():
+    df = create_stream()
+    sampler = ReservoirSampler(10, groups=["rock", "pop"]).update(df, "track_genre")
+    resultado = sampler.result()
+
+    assert resultado["track_genre"].tolist() == ["rock"] * 10 + ["pop"] * 10
+    # Dentro do grupo, ordem original do fluxo
+    assert resultado["track_id"].iloc[:10].is_monotonic_increasing
+    assert sampler.seen["rock"] == (df["track_genre"] == "rock").sum()
+
+
+def test_small_groups_keep_everything():
+    df = create_stream(n=20)
+    resultado = ReservoirSampler(100, groups=["pop"]).update(df, "track_genre").result()
+    assert resultado["track_id"].tolist() == df.loc[df["track_genre"] == "pop", "track_id"].tolist()
+
+
+def test_sampling_is_uniform():
+    df = pd.DataFrame({"track_id": np.arange(50)})
+    contagem = np.zeros(50)
+    for seed in range(400):
+        sampler = ReservoirSampler(10, seed=seed)
+        for chunk in stream(df, 7):
+            sampler.update(chunk)
+        contagem[sampler.result()["track_id"].to_numpy()] += 1
+
+    # Cada linha deve aparecer ~ 400 * 10/50 = 80 vezes
+    assert np.all(np.abs(contagem - 80) < 35)
+
+
+def test_processor_uses_configured_genres(tmp_path):
+    rows = create_stream(n=300)
+    for col in DataProcessor("x", "y").REQUIRED_COLS:
+        if col not in rows.columns:
+            rows[col] = "x" if col in ("track_name", "artists") else 0.5
+    rows["track_name"] = [f"Song{i}" for i in range(len(rows))]
+    raw = os.path.join(tmp_path, "raw.csv")
+    rows.to_csv(raw, index=False)
+
+    dp = DataProcessor(raw, tmp_path, chunksize=50, target_genres=["funk", "jazz"], seed=3)
+    df = pd.read_csv(dp.process_graph_dataset(samples_per_genre=8))
+    assert df["track_genre"].tolist() == ["funk"] * 8 + ["jazz"] * 8
+
+    # Mesma semente, mesmo resultado
+    dp2 = DataProcessor(raw, os.path.join(tmp_path, "b"), chunksize=300, target_genres=["funk", "jazz"], seed=3)
+    pd.testing.assert_frame_equal(pd.read_csv(dp2.process_graph_dataset(samples_per_genre=8)), df)
@@ -1,7 +1,17 @@
 # test_graph_algorithms.py
+import os
+import sys
+import numpy as np
+import pandas as pd
 import pytest
 import networkx as nx
-from src.algorithm.search import dijkstra, mostrar_grafo
+from src.algorithm.contraction import ContractionHierarchy, ch_search
+from src.algorithm.landmarks import LandmarkIndex, alt_search
+from src.algorithm.search import (
+    dijkstra, astar, bidirectional_dijkstra, mostrar_grafo, PathCache, graph_version,
+    SearchStats, SearchStatsAggregate, shortest_path_tree,
+)
+from src.preprocessing.graph_builder import GraphBuilder
 
 def create_test_graph():
     G = nx.Graph()
@@ -63,3 +73,255 @@ def test_dijkstra_path_and_no_path():
     path, cost = dijkstra(G, "X", "Y")
     assert path is None
     assert cost == float("inf")
+
+
+def build_knn_graph(tmp_path, n=120, k=4, representation="csr"):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n, len(GraphBuilder.FEATURE_COLS))), columns=GraphBuilder.FEATURE_COLS)
+    df.insert(0, "track_id", [f"t{i}" for i in range(n)])
+    csv_file = os.path.join(tmp_path, "songs.csv")
+    df.to_csv(csv_file, index=False)
+    builder = GraphBuilder(csv_file)
+    return builder, builder.build_graph(k_neighbors=k, representation=representation)
+
+def test_astar_matches_dijkstra_on_knn_graph(tmp_path):
+    _, G = build_knn_graph(tmp_path)
+    rng = np.random.default_rng(1)
+    nodes = list(G.nodes)
+    for _ in range(40):
+        origem, destino = rng.choice(nodes, size=2, replace=False).tolist()
+        esperado, custo = dijkstra(G, origem, destino)
+        path, cost = astar(G, origem, destino)
+        assert cost == pytest.approx(custo)
+        if esperado is not None:
+            assert path[0] == origem and path[-1] == destino
+            assert sum(G[u][v]["weight"] for u, v in zip(path, path[1:])) == pytest.approx(custo)
+        else:
+            assert path is None
+
+def test_astar_networkx_with_features_dict(tmp_path):
+    builder, G = build_knn_graph(tmp_path, representation="networkx")
+    csr = builder.csr_graph
+    features = {node: csr.features[i] for i, node in enumerate(csr.node_ids.tolist())}
+    nodes = list(G.nodes)
+    for origem, destino in zip(nodes[:10], nodes[-10:]):
+        assert astar(G, origem, destino, features)[1] == pytest.approx(dijkstra(G, origem, destino)[1])
+
+def test_astar_without_features_behaves_like_dijkstra():
+    G = create_test_graph()
+    assert astar(G, "A", "Q") == dijkstra(G, "A", "Q")
+    assert astar(G, "A", "A") == (["A"], 0.0)
+    with pytest.raises(KeyError):
+        astar(G, "A", "Z")
+
+SONGS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "processed", "songs.csv")
+
+@pytest.mark.skipif(not os.path.exists(SONGS_CSV), reason="songs.csv não disponível")
+def test_bidirectional_matches_dijkstra_on_songs_csv():
+    G = GraphBuilder(SONGS_CSV).build_graph(k_neighbors=10, representation="csr")
+    rng = np.random.default_rng(2)
+    nodes = list(G.nodes)
+    for _ in range(25):
+        origem, destino = rng.choice(nodes, size=2, replace=False).tolist()
+        esperado, custo = dijkstra(G, origem, destino)
+        path, cost = bidirectional_dijkstra(G, origem, destino)
+        assert cost == pytest.approx(custo)
+        if esperado is None:
+            assert path is None
+        else:
+            assert path[0] == origem and path[-1] == destino
+            assert sum(G[u][v]["weight"] for u, v in zip(path, path[1:])) == pytest.approx(custo)
+
+def test_bidirectional_networkx_graphs(tmp_path):
+    G = create_test_graph()
+    assert bidirectional_dijkstra(G, "A", "Q")[1] == dijkstra(G, "A", "Q")[1]
+    assert bidirectional_dijkstra(G, "A", "A") == (["A"], 0.0)
+
+    _, D = build_knn_graph(tmp_path, n=60, representation="networkx")
+    nodes = list(D.nodes)
+    for origem, destino in zip(nodes[:15], nodes[-15:]):
+        assert bidirectional_dijkstra(D, origem, destino)[1] == pytest.approx(dijkstra(D, origem, destino)[1])
+
+    D = nx.DiGraph()
+    D.add_edge("X", "Y", weight=1)
+    assert bidirectional_dijkstra(D, "Y", "X") == (None, float("inf"))
+    with pytest.raises(KeyError):
+        bidirectional_dijkstra(D, "X", "Z")
+
+
+def versioned_graph(version="v1"):
+    G = create_test_graph()
+    G.graph["version"] = version
+    return G
+
+
+def test_path_cache_memoizes_results():
+    G = versioned_graph()
+    chamadas = []
+
+    def busca(graph, source, target):
+        chamadas.append((source, target))
+        return dijkstra(graph, source, target)
+
+    cache = PathCache(hot_origin_queries=100)
+    primeiro = cache.shortest_path(G, "A", "Q", busca)
+    primeiro[0].append("lixo")  # o cache devolve cópias
+    assert cache.shortest_path(G, "A", "Q", busca) == dijkstra(G, "A", "Q")
+    assert chamadas == [("A", "Q")]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_path_cache_tree_for_hot_origin():
+    G = versioned_graph()
+    cache = PathCache(hot_origin_queries=2)
+
+    for destino in ["Q", "P", "O", "N", "A"]:
+        assert cache.shortest_path(G, "A", destino) == dijkstra(G, "A", destino)
+
+    stats = cache.stats()
+    assert stats["trees"] == 1
+    assert stats["misses"] == 2 and stats["tree_hits"] == 3
+    # O resultado (A, Q) guardado antes da árvore ficou redundante e saiu
+    assert stats["entries"] == 1
+
+
+def test_path_cache_tree_bytes_count_node_ids(tmp_path):
+    """Os ids de uma árvore de CSRGraph (strings novas a cada árvore) contam no orçamento."""
+    _, G = build_knn_graph(tmp_path)
+    G.graph["version"] = "v1"
+    cache = PathCache(hot_origin_queries=1)
+    cache.shortest_path(G, "t0", "t1")
+
+    dist, prev = shortest_path_tree(G, "t0")
+    tabelas = sys.getsizeof(dist) + sys.getsizeof(prev) + 24 * len(dist)
+    assert cache.nbytes >= tabelas + sum(map(sys.getsizeof, dist))
+
+
+def test_path_cache_oversized_tree_falls_back_to_pairs(monkeypatch):
+    """Se a árvore de uma origem não cabe no orçamento, só os pares são guardados, sem novas árvores."""
+    import src.algorithm.search as search
+
+    G = versioned_graph()
+    cache = PathCache(hot_origin_queries=2)
+    cache.max_bytes = search._result_nbytes(dijkstra(G, "A", "Q")) * 3  # cabem pares, não a árvore
+
+    arvores = []
+    original = search.shortest_path_tree
+    monkeypatch.setattr(search, "shortest_path_tree", lambda g, s, **kw: arvores.append(s) or original(g, s, **kw))
+
+    for destino in ["Q", "P", "O", "N", "P"]:
+        assert cache.shortest_path(G, "A", destino) == dijkstra(G, "A", destino)
+
+    assert arvores == ["A"]  # uma tentativa só
+    stats = cache.stats()
+    assert stats["trees"] == 0
+    assert stats["hits"] == 1  # o par (A, P) ficou no cache
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_path_cache_tracks_bounded_origins():
+    G = versioned_graph()
+    cache = PathCache(hot_origin_queries=100, max_tracked_origins=3)
+    for origem in "ABCDEFGH":
+        cache.shortest_path(G, origem, "Q")
+    assert list(cache._origin_queries) == ["F", "G", "H"]
+
+
+def test_path_cache_invalidated_by_graph_version():
+    cache = PathCache()
+    G = versioned_graph("v1")
+    cache.shortest_path(G, "A", "Q")
+
+    novo = versioned_graph("v2")
+    novo["O"]["Q"]["weight"] = 100
+    assert cache.shortest_path(novo, "A", "Q") == dijkstra(novo, "A", "Q")
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["hits"] == 0
+
+
+def test_path_cache_ignores_unversioned_graphs():
+    G = create_test_graph()
+    assert graph_version(G) is None
+
+    cache = PathCache()
+    cache.shortest_path(G, "A", "Q")
+    assert len(cache) == 0 and cache.stats()["misses"] == 0
+
+
+def test_path_cache_byte_budget_evicts_lru():
+    G = versioned_graph()
+    cache = PathCache(hot_origin_queries=100)
+    cache.shortest_path(G, "A", "Q")
+    cache.max_bytes = cache.nbytes * 2
+
+    for destino in ["P", "O", "N"]:
+        cache.shortest_path(G, "A", destino)
+
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.stats()["evictions"] >= 1
+    cache.shortest_path(G, "A", "Q")  # a mais antiga saiu primeiro
+    assert cache.stats()["hits"] == 0
+
+
+def test_search_stats_counts():
+    G = nx.Graph()
+    G.add_edge("A", "B", weight=1)
+    G.add_edge("B", "C", weight=2)
+    stats = SearchStats()
+    assert dijkstra(G, "A", "C", stats=stats) == (["A", "B", "C"], 3)
+    # A e B expandidos (1 + 2 arestas), C fechado ao sair da fila
+    assert (stats.settled, stats.relaxed, stats.pushes, stats.pops, stats.stale) == (3, 3, 3, 3, 0)
+    assert stats.elapsed_s > 0
+
+    # s -> a entra na fila com 5 e de novo com 2 (via b): a entrada antiga é descartada
+    D = nx.DiGraph()
+    D.add_weighted_edges_from([("s", "a", 5), ("s", "b", 1), ("b", "a", 1), ("a", "t", 1)])
+    stats = SearchStats()
+    shortest_path_tree(D, "s", stats=stats)
+    assert stats.as_dict() | {"elapsed_s": 0} == {
+        "settled": 4, "relaxed": 4, "pushes": 5, "pops": 5, "stale": 1, "elapsed_s": 0
+    }
+
+
+def test_search_stats_for_every_algorithm(tmp_path):
+    _, G = build_knn_graph(tmp_path)
+    G.landmarks = LandmarkIndex.build(G, n_landmarks=4)
+    G.hierarchy = ContractionHierarchy.build(G)
+    buscas = [dijkstra, astar, bidirectional_dijkstra, alt_search, ch_search]
+
+    nodes = list(G.nodes)
+    for origem, destino in zip(nodes[:5], nodes[-5:]):
+        esperado = dijkstra(G, origem, destino)
+        for busca in buscas:
+            stats = SearchStats()
+            assert busca(G, origem, destino, stats=stats)[1] == pytest.approx(esperado[1])
+            assert stats.settled + stats.stale == stats.pops <= stats.pushes
+            assert stats.relaxed > 0 and stats.elapsed_s > 0
+
+    # Menos nós fechados que o Dijkstra (em média) nas buscas guiadas
+    fechados = {}
+    for busca in buscas:
+        agregado = SearchStatsAggregate()
+        for origem, destino in zip(nodes[:20], nodes[-20:]):
+            stats = SearchStats()
+            busca(G, origem, destino, stats=stats)
+            agregado.add(stats)
+        fechados[busca.__name__] = agregado.summary()["settled"]["total"]
+    assert fechados["ch_search"] < fechados["dijkstra"]
+    assert fechados["alt_search"] < fechados["dijkstra"]
+
+
+def test_search_stats_aggregate():
+    agregado = SearchStatsAggregate()
+    for settled in (1, 2, 2, 10):
+        stats = SearchStats()
+        stats.record(pops=settled + 1, stale=1, relaxed=settled * 4, pushes=settled + 3)
+        agregado.add(stats)
+
+    assert len(agregado) == 4
+    contagens, bordas = agregado.histogram("settled", bins=[0, 5, 20])
+    assert contagens.tolist() == [3, 1]
+    resumo = agregado.summary()
+    assert resumo["settled"]["total"] == 15
+    assert resumo["relaxed"]["max"] == 40
+    assert resumo["stale"]["p50"] == 1
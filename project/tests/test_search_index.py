@@ -0,0 +1,127 @@
+import os
+
+import networkx as nx
+import pandas as pd
+import pytest
+
+from src.preprocessing.csr_graph import CSRGraph
+from src.services.search_index import SongIndex
+
+
+SONGS_CSV = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "processed", "songs.csv")
+
+
+def linear_search(G, termo):
+    # Busca linear original (referência para o ranking)
+    termo = termo.lower()
+    candidatos = []
+    for node_id, data in G.nodes(data=True):
+        nome = data.get("name", "").lower()
+        artista = data.get("artist", "").lower()
+        score = 0
+        if termo == nome:
+            score = 1000
+        elif termo == artista:
+            score = 900
+        elif nome.startswith(termo):
+            score = 500
+        elif artista.startswith(termo):
+            score = 400
+        elif termo in nome:
+            score = 100
+        elif termo in artista:
+            score = 50
+        if score > 0:
+            candidatos.append((node_id, score - len(nome) * 0.1))
+    candidatos.sort(key=lambda x: x[1], reverse=True)
+    return candidatos
+
+
+def create_graph():
+    G = nx.DiGraph()
+    musicas = [
+        ("Love", "Adele"), ("Love Song", "Adele"), ("Lovely Day", "Bill Withers"),
+        ("Glove", "Love"), ("Hello", "Adele"), ("Adele", "Someone"), ("Loveless", "LOVE Band"),
+        ("Love", "Other"),
+    ]
+    for i, (nome, artista) in enumerate(musicas):
+        G.add_node(f"t{i}", name=nome, artist=artista)
+    return G
+
+
+def ranking(resultados):
+    return [(node_id, score) for node_id, _, score in resultados]
+
+
+@pytest.mark.parametrize("termo", ["love", "LOVE", "lo", "e", "adele", "ove s", "xyz", "glove", "love band"])
+def test_ranking_matches_linear_search(termo):
+    G = create_graph()
+    total, resultados = SongIndex(G).search(termo)
+
+    assert ranking(resultados) == linear_search(G, termo)
+    assert total == len(resultados)
+
+
+def test_top_k_from_heap_keeps_ties_in_node_order():
+    G = create_graph()
+    index = SongIndex(G)
+
+    esperado = linear_search(G, "love")
+    total, top = index.search("love", limit=3)
+    assert total == len(esperado)
+    assert ranking(top) == esperado[:3]
+    assert [node_id for node_id, _, _ in top[:2]] == ["t0", "t7"]  # empate: ordem dos nós
+
+
+def test_exact_and_prefix_lookups():
+    index = SongIndex(create_graph())
+    nomes = index.name_index
+
+    assert [nomes.values[i] for i in nomes.equals("love")] == ["love"]
+    assert sorted(nomes.values[i] for i in nomes.starts_with("love")) == ["love", "love song", "loveless", "lovely day"]
+    assert nomes.equals("lov") == []
+    assert sorted(nomes.values[i] for i in nomes.contains("ove")) == [
+        "glove", "love", "love song", "loveless", "lovely day"
+    ]
+
+
+def test_csr_graph_and_missing_values():
+    G = create_graph()
+    G.add_node("t8", name=None, artist="Love")
+    csr = CSRGraph.from_networkx(G)
+
+    total, resultados = SongIndex(csr).search("love")
+    assert total == 7
+    assert dict(ranking(resultados))["t8"] == 900  # nome ausente vira '', artista exato
+    assert resultados[0][1] == {"name": "Love", "artist": "Adele"}
+
+
+def test_index_reused_until_graph_changes():
+    G = create_graph()
+    index = SongIndex.for_graph(G)
+    assert SongIndex.for_graph(G) is index
+
+    G.graph["version"] = "v2"
+    assert SongIndex.for_graph(G) is not index
+
+    G.add_node("t9", name="Love Me", artist="X")
+    G.graph["version"] = "v3"
+    assert "t9" in [node_id for node_id, _, _ in SongIndex.for_graph(G).search("love me")[1]]
+
+
+@pytest.mark.skipif(not os.path.exists(SONGS_CSV), reason="dataset não disponível")
+def test_rankings_identical_on_shipped_dataset():
+    df = pd.read_csv(SONGS_CSV, usecols=["track_id", "track_name", "artists"]).fillna("")
+    G = nx.DiGraph()
+    for track_id, nome, artista in df.itertuples(index=False):
+        G.add_node(track_id, name=nome, artist=artista)
+
+    index = SongIndex(G)
+    termos = ["a", "lo", "love", "the", "queen", "taylor swift", "beyoncé", "amor", "remix", "feat", "zzzz"]
+    termos += df["track_name"].iloc[::600].tolist() + df["artists"].iloc[::900].tolist()
+
+    for termo in termos:
+        esperado = linear_search(G, termo)
+        total, top = index.search(termo, limit=20)
+        assert total == len(esperado)
+        assert ranking(top) == esperado[:20]
@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.preprocessing.csr_graph import CSRGraph
+from src.preprocessing.snapshot import (
+    StringColumn,
+    save_snapshot,
+    load_snapshot,
+    read_snapshot_meta,
+    is_snapshot,
+)
+
+
+def create_csr_graph(node_ids=("a", "b", "c")):
+    return CSRGraph.from_knn(
+        list(node_ids),
+        np.array([[1, 2], [0, 2], [1, 0]]),
+        np.array([[0.1, 0.2], [0.1, 0.3], [0.3, 0.2]]),
+        node_attrs={"name": ["Canção", "Song B", "Song C"], "artist": ["Zé", "B", "C"]},
+        features=np.arange(9, dtype=float).reshape(3, 3)
+    )
+
+
+def test_string_column_roundtrip():
+    values = ["ação", "", None, "☃ snow", "x"]
+    col = StringColumn.from_values(values)
+
+    assert len(col) == 5
+    assert col.tolist() == values
+    assert col[0] == "ação"
+    assert col[-1] == "x"
+    assert col[np.array([3, 0])].tolist() == ["☃ snow", "ação"]
+    assert np.asarray(col).dtype == object
+    with pytest.raises(IndexError):
+        col[5]
+
+
+def test_snapshot_roundtrip(tmp_path):
+    G = create_csr_graph()
+    G.graph["k_neighbors"] = 2
+    path = os.path.join(tmp_path, "snap")
+    save_snapshot(G, path)
+
+    assert is_snapshot(path)
+    assert not os.path.exists(path + ".tmp")
+
+    loaded = load_snapshot(path)
+    # Arrays continuam apontando para o arquivo mapeado (sem cópia)
+    assert not loaded.indices.flags.owndata
+    assert not loaded.weights.flags.owndata
+    assert isinstance(loaded.features, np.memmap)
+    assert loaded.graph["k_neighbors"] == 2
+    assert list(loaded.nodes) == ["a", "b", "c"]
+    assert dict(loaded.nodes(data=True)) == dict(G.nodes(data=True))
+    for u in G.nodes:
+        assert list(loaded[u].items()) == list(G[u].items())
+    assert np.array_equal(loaded.features, G.features)
+
+
+def test_snapshot_integer_ids_and_no_mmap(tmp_path):
+    G = create_csr_graph(node_ids=(10, 20, 30))
+    G.features = None
+    path = os.path.join(tmp_path, "snap")
+    save_snapshot(G, path)
+
+    assert read_snapshot_meta(path)["node_id_kind"] == "int"
+    loaded = load_snapshot(path, mmap=False)
+    assert loaded.features is None
+    assert 20 in loaded.nodes
+    assert list(loaded[20].items()) == [(10, {"weight": 0.1}), (30, {"weight": 0.3})]
+
+
+def test_snapshot_overwrite(tmp_path):
+    path = os.path.join(tmp_path, "snap")
+    save_snapshot(create_csr_graph(), path)
+    save_snapshot(create_csr_graph(node_ids=("x", "y", "z")), path)
+    assert list(load_snapshot(path).nodes) == ["x", "y", "z"]
+
+
+def test_snapshot_invalid(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_snapshot(os.path.join(tmp_path, "nada"))
+
+    path = os.path.join(tmp_path, "snap")
+    save_snapshot(create_csr_graph(), path)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["version"] = 999
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
+    with pytest.raises(ValueError):
+        load_snapshot(path)